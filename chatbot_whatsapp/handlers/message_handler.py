@@ -1,20 +1,47 @@
-import json
-import os
-from datetime import datetime
+from django.conf import settings
+from ..services import lembretes
+from ..services.cadastros import salvar_cadastro
+from ..services.form_parser import ROTULOS_CAMPOS, campos_ausentes, extrair_formulario
 from ..services.gemini_service import GeminiService
+from ..services.intent_classifier import AGENDAMENTO, intent_classifier
+from ..services.state_store import get_state_store
+from ..utils.texto import sim_ou_nao
+
+
+def respostas_faq():
+    """
+    Respostas diretas por intenção (sem passar pelo Gemini).
+    Horário e endereço só respondem aqui quando configurados no settings;
+    caso contrário a pergunta segue para a IA. O pedido de atendente é
+    tratado em MessageHandler.chamar_atendente (avisa a equipe).
+    """
+    respostas = {
+        'saudacao': "Olá! 👋 Sou o Assistente VaccineSafe. Posso ajudar com agendamento de vacinas, horários, documentos e outras dúvidas. Como posso ajudar?",
+        'agradecimento': "Por nada! 😊 Se precisar de mais alguma coisa, é só chamar. A VaccineSafe agradece o contato! ❤️",
+        'documentos': "Para se vacinar, traga um *documento com foto*, o *CPF* e, se tiver, a *carteirinha de vacinação*. 📄",
+    }
+    horario = getattr(settings, 'CHATBOT_HORARIO_FUNCIONAMENTO', '')
+    endereco = getattr(settings, 'CHATBOT_ENDERECO_CLINICA', '')
+    if horario:
+        respostas['horario'] = f"🕒 *Horário de funcionamento:* {horario}"
+    if endereco:
+        respostas['endereco'] = f"📍 *Endereço:* {endereco}"
+    return respostas
+
 
 class MessageHandler:
-    def __init__(self):
+    def __init__(self, state_store=None):
         self.gemini = GeminiService()
-        self.estados = {}  # {chat_id: estado_atual}
+        # Estado compartilhado entre workers (Redis/banco, ver services/state_store)
+        self.estados = state_store or get_state_store()
     
     def processar_mensagem(self, chat_id, mensagem):
         """Processa a mensagem e decide a resposta"""
         print(f"Processando mensagem: {chat_id} - {mensagem}")
         
-        estado_atual = self.estados.get(chat_id, 'inicio')
-        mensagem_lower = mensagem.lower()
-        
+        estado_atual = self.estados.get_estado(chat_id)
+        # Renova o TTL da conversa a cada mensagem recebida
+        self.estados.update(chat_id, ultima_mensagem=mensagem)
         print(f"Estado atual: {estado_atual}")
         
         # Fluxo: Aguardando formulário de cadastro
@@ -23,24 +50,41 @@ class MessageHandler:
         
         # Fluxo: Perguntou sobre vacinação anterior
         elif estado_atual == 'perguntou_vacinacao':
-            return self.processar_resposta_vacinacao(chat_id, mensagem_lower)
+            return self.processar_resposta_vacinacao(chat_id, mensagem)
         
         # Mensagem normal - usa IA
         else:
             return self.processar_mensagem_normal(chat_id, mensagem)
     
     def processar_mensagem_normal(self, chat_id, mensagem):
-        """Processa mensagem usando Gemini"""
+        """
+        Processa mensagem livre: intenções reconhecidas localmente (FAQ e
+        agendamento) são respondidas direto; só as ambíguas vão ao Gemini
+        """
+        faq = respostas_faq()
+        # Só intenções com resposta local contam como acerto do classificador
+        disponiveis = set(faq) | {AGENDAMENTO}
+        if lembretes.equipe_configurada():
+            disponiveis.add('atendente')
+        intencao = intent_classifier.classificar(mensagem, disponiveis=disponiveis)
+        if intencao == AGENDAMENTO:
+            return self.iniciar_agendamento(chat_id)
+        if intencao == 'atendente':
+            return self.chamar_atendente(chat_id, mensagem)
+        resposta_faq = faq.get(intencao)
+        if resposta_faq:
+            print(f"Intenção reconhecida: {intencao}")
+            return {
+                "acao": "enviar_mensagem",
+                "mensagem": resposta_faq
+            }
+        
         resposta_ia = self.gemini.gerar_resposta(mensagem)
         print(f"Resposta do Gemini: {resposta_ia}")
         
         # Se detectou agendamento
         if "FLUXO_AGENDAMENTO" in resposta_ia:
-            self.estados[chat_id] = 'perguntou_vacinacao'
-            return {
-                "acao": "enviar_mensagem",
-                "mensagem": "Para agendar sua vacina, preciso verificar: você já se vacinou conosco antes? (responda 'sim' ou 'não')"
-            }
+            return self.iniciar_agendamento(chat_id)
         
         # Resposta normal da IA
         return {
@@ -48,10 +92,37 @@ class MessageHandler:
             "mensagem": resposta_ia
         }
     
+    def chamar_atendente(self, chat_id, mensagem):
+        """
+        Avisa a equipe (CHATBOT_STAFF_CHAT_IDS) pelo WhatsApp. Sem equipe
+        configurada a intenção nem chega aqui: a mensagem vai para o Gemini.
+        """
+        ids = lembretes.avisar_atendente(chat_id, mensagem)
+        if ids:
+            from ..tasks import enviar_lote_programado
+            try:
+                enviar_lote_programado.delay(ids)
+            except Exception as e:
+                # Fica pendente: disparar_envios_programados envia na próxima rodada
+                print(f"⚠️ Aviso de atendente não enfileirado: {e}")
+        return {
+            "acao": "enviar_mensagem",
+            "mensagem": "Certo! Avisei nossa equipe e um atendente falará com você em breve. 🙋"
+        }
+    
+    def iniciar_agendamento(self, chat_id):
+        """Entra no fluxo de agendamento (pergunta sobre vacinação anterior)"""
+        self.estados.set_estado(chat_id, 'perguntou_vacinacao')
+        return {
+            "acao": "enviar_mensagem",
+            "mensagem": "Para agendar sua vacina, preciso verificar: você já se vacinou conosco antes? (responda 'sim' ou 'não')"
+        }
+    
     def processar_resposta_vacinacao(self, chat_id, resposta):
         """Processa resposta sobre vacinação anterior"""
-        if 'não' in resposta or 'nao' in resposta or 'n' in resposta:
-            self.estados[chat_id] = 'aguardando_cadastro'
+        ja_vacinou = sim_ou_nao(resposta)
+        if ja_vacinou is False:
+            self.estados.set_estado(chat_id, 'aguardando_cadastro')
             formulario = """
 *📝 CADASTRO RÁPIDO*
 
@@ -62,6 +133,7 @@ Por favor, envie seus dados em *UMA ÚNICA MENSAGEM* no formato abaixo:
 *Telefone:* (11) 99999-9999
 *Email:* seu@email.com
 *Data Nascimento:* 01/01/1990
+*Sexo:* Feminino / Masculino
 *Endereço:* Rua Exemplo, 123 - Cidade - Estado
 
 *Envie tudo em uma única mensagem!* 📱
@@ -71,8 +143,8 @@ Por favor, envie seus dados em *UMA ÚNICA MENSAGEM* no formato abaixo:
                 "mensagem": formulario
             }
         
-        elif 'sim' in resposta or 's' in resposta:
-            self.estados[chat_id] = 'inicio'
+        elif ja_vacinou:
+            self.estados.set_estado(chat_id, 'inicio')
             return {
                 "acao": "enviar_mensagem",
                 "mensagem": "Perfeito! Vamos ao agendamento... \n\nEm breve implementaremos a funcionalidade completa de agendamento! 📅"
@@ -86,14 +158,16 @@ Por favor, envie seus dados em *UMA ÚNICA MENSAGEM* no formato abaixo:
     
     def processar_formulario_cadastro(self, chat_id, mensagem):
         """Processa formulário de cadastro"""
-        dados = self.extrair_dados_formulario(mensagem)
+        formulario = extrair_formulario(mensagem)
+        dados = formulario.dados
+        print(f"Dados extraídos: {dados} (erros: {formulario.erros})")
         
-        if dados and len(dados) >= 3:  # Pelo menos 3 campos
-            # Salvar dados
-            self.salvar_dados_localmente(chat_id, dados)
-            
+        # Nome, CPF, telefone, data de nascimento e sexo válidos são obrigatórios
+        # (sem eles o cadastro automático no sistema legado falharia)
+        ausentes = campos_ausentes(dados)
+        if not ausentes and self.salvar_dados(chat_id, dados):
             # Limpar estado
-            self.estados[chat_id] = 'inicio'
+            self.estados.set_estado(chat_id, 'inicio')
             
             return {
                 "acao": "enviar_mensagem",
@@ -109,52 +183,27 @@ Agora podemos prosseguir com o agendamento! Em breve esta funcionalidade estará
 Obrigado por escolher a VaccineSafe! ❤️"""
             }
         else:
+            correcoes = ''.join(f"• {erro}\n" for erro in formulario.erros.values())
+            correcoes += ''.join(
+                f"• falta {ROTULOS_CAMPOS[campo]}\n" for campo in ausentes if campo not in formulario.erros
+            )
             return {
                 "acao": "enviar_mensagem",
-                "mensagem": "❌ *Dados incompletos ou formato incorreto.*\n\nPor favor, envie novamente no formato solicitado, com pelo menos Nome, CPF e Telefone.\n\nExemplo:\n*Nome Completo:* Maria Silva\n*CPF:* 123.456.789-00\n*Telefone:* (11) 99999-9999\n*Email:* maria@email.com\n*Data Nascimento:* 15/05/1990\n*Endereço:* Rua das Flores, 123"
+                "mensagem": "❌ *Dados incompletos ou formato incorreto.*\n\n" + (f"{correcoes}\n" if correcoes else "") + "Por favor, envie novamente no formato solicitado, com pelo menos Nome, CPF, Telefone, Data Nascimento e Sexo.\n\nExemplo:\n*Nome Completo:* Maria Silva\n*CPF:* 123.456.789-00\n*Telefone:* (11) 99999-9999\n*Email:* maria@email.com\n*Data Nascimento:* 15/05/1990\n*Sexo:* Feminino\n*Endereço:* Rua das Flores, 123"
             }
     
-    def extrair_dados_formulario(self, texto):
-        """Extrai dados do formulário usando regex"""
-        import re
-        
-        padroes = {
-            'nome': r'\*?Nome Completo:\*?\s*([^\n]+)',
-            'cpf': r'\*?CPF:\*?\s*([^\n]+)',
-            'telefone': r'\*?Telefone:\*?\s*([^\n]+)',
-            'email': r'\*?Email:\*?\s*([^\n]+)',
-            'data_nascimento': r'\*?Data Nascimento:\*?\s*([^\n]+)',
-            'endereco': r'\*?Endereço:\*?\s*([^\n]+)',
-        }
-        
-        dados = {}
-        for campo, padrao in padroes.items():
-            match = re.search(padrao, texto, re.IGNORECASE | re.MULTILINE)
-            if match:
-                dados[campo] = match.group(1).strip()
-        
-        print(f"Dados extraídos: {dados}")
-        return dados
-    
-    def salvar_dados_localmente(self, chat_id, dados):
-        """Salva dados em arquivo JSON local"""
+    def salvar_dados(self, chat_id, dados):
+        """
+        Grava o cadastro no banco (ClienteCadastrado) e o coloca na fila de
+        cadastro automático no sistema legado. Retorna False se o CPF for inválido.
+        """
         try:
-            os.makedirs('cadastros', exist_ok=True)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            arquivo = f"cadastros/cliente_{chat_id}_{timestamp}.json"
-            
-            # Adicionar metadata
-            dados_com_meta = {
-                **dados,
-                'chat_id': chat_id,
-                'data_cadastro': datetime.now().isoformat(),
-                'timestamp': timestamp
-            }
-            
-            with open(arquivo, 'w', encoding='utf-8') as f:
-                json.dump(dados_com_meta, f, ensure_ascii=False, indent=2)
-            
-            print(f"Dados salvos em: {arquivo}")
-            
+            cliente = salvar_cadastro(chat_id, dados)
         except Exception as e:
-            print(f"Erro ao salvar dados: {e}")
\ No newline at end of file
+            print(f"Erro ao salvar dados: {e}")
+            return False
+        if cliente is None:
+            print(f"CPF inválido no cadastro de {chat_id}: {dados.get('cpf')}")
+            return False
+        print(f"Cadastro salvo: cliente {cliente.pk}")
+        return True
@@ -0,0 +1,272 @@
+"""
+Comando Django para conferir propriedades e medir o parser do formulário de
+cadastro do chatbot e a detecção de sim/não
+Uso:
+  python manage.py bench_form_parser
+  python manage.py bench_form_parser --cases 5000 --seed 7
+  python manage.py bench_form_parser --messages 20000 --iterations 5
+
+Propriedades conferidas em casos gerados aleatoriamente:
+- valores válidos escritos com variações de formatação (negrito, rótulos sem
+  acento/abreviados, separadores, ordem, linhas extras) são recuperados
+  exatamente, já normalizados
+- no modelo original, todo campo que o parser anterior encontrava é
+  encontrado, com o mesmo valor normalizado
+- CPF, telefone e data inválidos vão para `erros` e nunca para `dados`
+- texto aleatório não quebra o parser
+- sim/não só por palavra inteira: frases neutras ("entendi", "bom dia")
+  não contam como resposta
+"""
+
+import random
+import re
+import string
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot_whatsapp.services.form_parser import extrair_formulario
+from chatbot_whatsapp.utils.texto import RESPOSTAS_NAO, RESPOSTAS_SIM, sim_ou_nao
+
+
+# ----------------------------------------------------------------------
+# Implementação de referência (MessageHandler anterior)
+# ----------------------------------------------------------------------
+def reference_extract(texto):
+    padroes = {
+        'nome': r'\*?Nome Completo:\*?\s*([^\n]+)',
+        'cpf': r'\*?CPF:\*?\s*([^\n]+)',
+        'telefone': r'\*?Telefone:\*?\s*([^\n]+)',
+        'email': r'\*?Email:\*?\s*([^\n]+)',
+        'data_nascimento': r'\*?Data Nascimento:\*?\s*([^\n]+)',
+        'sexo': r'\*?Sexo:\*?\s*([^\n]+)',
+        'endereco': r'\*?Endereço:\*?\s*([^\n]+)',
+    }
+    dados = {}
+    for campo, padrao in padroes.items():
+        match = re.search(padrao, texto, re.IGNORECASE | re.MULTILINE)
+        if match:
+            dados[campo] = match.group(1).strip()
+    return dados
+
+
+def reference_yes_no(resposta):
+    resposta = resposta.lower()
+    if 'não' in resposta or 'nao' in resposta or 'n' in resposta:
+        return False
+    if 'sim' in resposta or 's' in resposta:
+        return True
+    return None
+
+
+# ----------------------------------------------------------------------
+# Geração de dados
+# ----------------------------------------------------------------------
+NOMES = ['Maria Silva', 'João de Souza', 'Ana Paula Costa', 'Théo Martins', "Lúcia D'Ávila", 'Pedro Henrique Jr.']
+ENDERECOS = ['Rua das Flores, 123', 'Av. Paulista, 1000 - ap 12', 'Rua Fartura, 369 - Centro - SP']
+SEXOS = ['Feminino', 'Masculino', 'F', 'M']
+ROTULOS = {
+    'nome': ['Nome Completo', 'Nome completo', 'NOME', 'nome'],
+    'cpf': ['CPF', 'Cpf', 'cpf'],
+    'telefone': ['Telefone', 'Celular', 'WhatsApp', 'Tel', 'fone'],
+    'email': ['Email', 'E-mail', 'e-mail', 'EMAIL'],
+    'data_nascimento': ['Data Nascimento', 'Data de Nascimento', 'Nascimento', 'Data nasc', 'Dt. Nasc'],
+    'sexo': ['Sexo', 'Gênero', 'genero'],
+    'endereco': ['Endereço', 'Endereco', 'Endereço completo', 'ENDEREÇO'],
+}
+MOLDURAS = ['*{r}:* {v}', '{r}: {v}', '*{r}*: {v}', '_{r}:_ {v}', '• {r} - {v}', '{r} = {v}', '  *{r}:*   {v}  ', '- {r}: *{v}*']
+RUIDO = ['Oi, seguem meus dados', 'Obrigado!', '', 'Qualquer dúvida me chama', '📱', 'att,']
+NEUTRAS = ['entendi', 'bom dia', 'sei lá', 'ainda vou ver', 'pode ser amanhã?', 'quanto custa', 'ok obrigada',
+           'mais ou menos', 'talvez', 'não sei', 'depende', 'sim e não']
+
+
+def gerar_cpf(rng):
+    while True:
+        cpf = ''.join(rng.choice(string.digits) for _ in range(11))
+        if cpf != cpf[0] * 11:
+            return cpf
+
+
+def formatar_cpf(rng, cpf):
+    return rng.choice([cpf, f'{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}', f'{cpf[:3]} {cpf[3:6]} {cpf[6:9]} {cpf[9:]}'])
+
+
+def gerar_registro(rng):
+    ddd = rng.randint(11, 99)
+    celular = rng.random() < 0.8
+    numero = f'9{rng.randint(1000, 9999)}{rng.randint(1000, 9999)}' if celular else f'{rng.randint(2000, 5999)}{rng.randint(1000, 9999)}'
+    dia, mes, ano = rng.randint(1, 28), rng.randint(1, 12), rng.randint(1930, 2020)
+    return {
+        'nome': rng.choice(NOMES),
+        'cpf': gerar_cpf(rng),
+        'telefone': f'{ddd}{numero}',
+        'email': f'{rng.choice(["maria", "joao.s", "ana_p"])}{rng.randint(1, 999)}@email.com',
+        'data_nascimento': f'{dia:02d}/{mes:02d}/{ano}',
+        'sexo': rng.choice(SEXOS),
+        'endereco': rng.choice(ENDERECOS),
+    }
+
+
+def escrever_valor(rng, campo, valor):
+    if campo == 'cpf':
+        return formatar_cpf(rng, valor)
+    if campo == 'telefone':
+        ddd, numero = valor[:2], valor[2:]
+        return rng.choice([valor, f'({ddd}) {numero[:-4]}-{numero[-4:]}', f'+55 {ddd} {numero}', f'55{valor}'])
+    if campo == 'data_nascimento':
+        dia, mes, ano = valor.split('/')
+        return rng.choice([valor, f'{dia}-{mes}-{ano}', f'{dia}.{mes}.{ano}', f'{int(dia)}/{int(mes)}/{ano}'])
+    if campo == 'email':
+        return rng.choice([valor, valor.upper()])
+    return valor
+
+
+def escrever_mensagem(rng, registro, campos=None):
+    campos = list(campos or registro)
+    rng.shuffle(campos)
+    linhas = [rng.choice(RUIDO)] if rng.random() < 0.5 else []
+    for campo in campos:
+        moldura = rng.choice(MOLDURAS)
+        linhas.append(moldura.format(r=rng.choice(ROTULOS[campo]), v=escrever_valor(rng, campo, registro[campo])))
+        if rng.random() < 0.1:
+            linhas.append('')
+    if rng.random() < 0.5:
+        linhas.append(rng.choice(RUIDO))
+    return rng.choice(['\n', '\r\n']).join(linhas) if rng.random() < 0.2 else '\n'.join(linhas)
+
+
+def mensagem_modelo(registro):
+    """Mensagem exatamente no modelo enviado pelo chatbot"""
+    return (
+        f"*Nome Completo:* {registro['nome']}\n*CPF:* {registro['cpf']}\n*Telefone:* {registro['telefone']}\n"
+        f"*Email:* {registro['email']}\n*Data Nascimento:* {registro['data_nascimento']}\n"
+        f"*Sexo:* {registro['sexo']}\n*Endereço:* {registro['endereco']}"
+    )
+
+
+def normalizar_referencia(campo, valor):
+    if campo in ('cpf', 'telefone'):
+        return re.sub(r'\D', '', valor)
+    if campo == 'email':
+        return valor.lower()
+    if campo == 'sexo':
+        return 'Feminino' if valor.upper().startswith('F') else 'Masculino'
+    return valor
+
+
+class Command(BaseCommand):
+    help = 'Testes de propriedade e benchmark do parser do formulário de cadastro do chatbot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cases', type=int, default=2000, help='Casos aleatórios por propriedade')
+        parser.add_argument('--messages', type=int, default=5000, help='Mensagens no benchmark')
+        parser.add_argument('--iterations', type=int, default=5, help='Repetições do benchmark')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _falha(self, propriedade, caso, mensagem, detalhe):
+        raise CommandError(f'❌ {propriedade} (caso {caso}): {detalhe}\n{mensagem!r}')
+
+    def _bench(self, fn, iterations):
+        best = None
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        casos = options['cases']
+
+        # 1. Variações de formatação: valores recuperados exatamente
+        for caso in range(casos):
+            registro = gerar_registro(rng)
+            campos = rng.sample(list(registro), rng.randint(1, len(registro)))
+            mensagem = escrever_mensagem(rng, registro, campos)
+            resultado = extrair_formulario(mensagem)
+            esperado = {c: normalizar_referencia(c, registro[c]) for c in campos}
+            if resultado.erros or resultado.dados != esperado:
+                self._falha('variações de formatação', caso, mensagem, f'{resultado} != {esperado}')
+
+        # 2. Modelo original: tudo que o parser anterior achava, com o mesmo valor
+        for caso in range(casos):
+            registro = gerar_registro(rng)
+            registro['cpf'] = formatar_cpf(rng, registro['cpf'])
+            mensagem = mensagem_modelo(registro)
+            anterior = reference_extract(mensagem)
+            atual = extrair_formulario(mensagem).dados
+            for campo, valor in anterior.items():
+                if atual.get(campo) != normalizar_referencia(campo, valor):
+                    self._falha('equivalência no modelo', caso, mensagem, f'{campo}: {atual.get(campo)!r} != {valor!r}')
+
+        # 3. Valores inválidos vão para erros, nunca para dados
+        invalidos = {
+            'cpf': lambda: rng.choice([str(rng.randint(0, 10 ** 9)), rng.choice(string.digits) * 11, '123.456.789-0']),
+            'telefone': lambda: rng.choice(['9999-999', '1234', '(11) 9999-99999999']),
+            'data_nascimento': lambda: rng.choice(['31/02/1990', '15/13/1990', '1990-05-15', '00/01/2000', f'01/01/{date_futura()}']),
+            'email': lambda: rng.choice(['maria.email.com', 'maria@', '@x.com', 'ma ria@x.com']),
+        }
+
+        def date_futura():
+            return time.localtime().tm_year + rng.randint(1, 5)
+
+        for caso in range(casos):
+            registro = gerar_registro(rng)
+            campo = rng.choice(list(invalidos))
+            valor = invalidos[campo]()
+            linhas = mensagem_modelo(registro).split('\n')
+            rotulo = {'cpf': 'CPF', 'telefone': 'Telefone', 'data_nascimento': 'Data Nascimento', 'email': 'Email'}[campo]
+            mensagem = '\n'.join(f'*{rotulo}:* {valor}' if l.startswith(f'*{rotulo}:*') else l for l in linhas)
+            resultado = extrair_formulario(mensagem)
+            if campo in resultado.dados or campo not in resultado.erros:
+                self._falha('valor inválido', caso, mensagem, f'{campo}={valor!r} -> {resultado}')
+
+        # 4. Texto aleatório não quebra o parser
+        alfabeto = string.printable + 'áéíóúçãõ•*_–:'
+        for caso in range(casos):
+            mensagem = ''.join(rng.choice(alfabeto) for _ in range(rng.randint(0, 300)))
+            if rng.random() < 0.5:
+                mensagem = mensagem_modelo(gerar_registro(rng))[:rng.randint(0, 200)] + mensagem
+            try:
+                extrair_formulario(mensagem)
+            except Exception as e:
+                self._falha('texto aleatório', caso, mensagem, repr(e))
+
+        # 5. Sim/não por palavra inteira
+        erradas_antes = 0
+        for caso in range(casos):
+            neutra = rng.choice(NEUTRAS)
+            tipo = rng.choice(['sim', 'nao', 'neutra'])
+            if tipo == 'neutra':
+                mensagem, esperado = neutra, None
+                if neutra in ('não sei', 'sim e não'):
+                    esperado = False if neutra == 'não sei' else None
+            else:
+                palavra = rng.choice(sorted(RESPOSTAS_SIM if tipo == 'sim' else RESPOSTAS_NAO))
+                palavra = rng.choice([palavra, palavra.upper(), palavra.capitalize(), {'nao': 'não', 'ja': 'já'}.get(palavra, palavra)])
+                mensagem = rng.choice(['{p}', '{p}!', '{p}, obrigado', 'acho que {p}', '{p} {p}']).format(p=palavra)
+                esperado = tipo == 'sim'
+            if sim_ou_nao(mensagem) != esperado:
+                self._falha('sim/não', caso, mensagem, f'{sim_ou_nao(mensagem)!r} != {esperado!r}')
+            if reference_yes_no(mensagem) != esperado:
+                erradas_antes += 1
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Propriedades conferidas ({casos} casos cada)'))
+        self.stdout.write(f'   Sim/não: o detector anterior errava {erradas_antes} de {casos} casos')
+
+        # Benchmark
+        mensagens = [mensagem_modelo(gerar_registro(rng)) for _ in range(options['messages'])]
+        respostas = [rng.choice(NEUTRAS + ['sim', 'não', 'Sim!', 'nunca']) for _ in range(options['messages'])]
+        iterations = max(options['iterations'], 1)
+        rows = [
+            ('formulário', lambda: [reference_extract(m) for m in mensagens], lambda: [extrair_formulario(m) for m in mensagens]),
+            ('sim/não', lambda: [reference_yes_no(r) for r in respostas], lambda: [sim_ou_nao(r) for r in respostas]),
+        ]
+        for label, old, new in rows:
+            t_old = self._bench(old, iterations)
+            t_new = self._bench(new, iterations)
+            self.stdout.write(
+                f'⏱️  {label} ({len(mensagens)} mensagens): anterior {t_old * 1000:.2f} ms | atual {t_new * 1000:.2f} ms '
+                f'({t_old / t_new if t_new else 0:.2f}x)'
+            )
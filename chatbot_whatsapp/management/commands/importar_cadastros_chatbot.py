@@ -0,0 +1,53 @@
+"""
+Comando Django para importar os cadastros antigos do chatbot (cadastros/*.json)
+para ClienteCadastrado e para a fila de cadastro automático no sistema legado
+Uso:
+  python manage.py importar_cadastros_chatbot
+  python manage.py importar_cadastros_chatbot --pasta cadastros --lote 200 --mover
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot_whatsapp.services.cadastros import importar_arquivos
+
+
+class Command(BaseCommand):
+    help = 'Importa os JSON de cadastros do chatbot para o banco, em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pasta',
+            type=str,
+            default='cadastros',
+            help='Pasta com os arquivos cliente_*.json (padrão: cadastros)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Arquivos por lote de gravação (padrão: 500)'
+        )
+        parser.add_argument(
+            '--mover',
+            action='store_true',
+            help='Move os arquivos importados para <pasta>/importados'
+        )
+
+    def handle(self, *args, **options):
+        pasta = options['pasta']
+        if not os.path.isdir(pasta):
+            raise CommandError(f'❌ Pasta não encontrada: {pasta}')
+        if options['lote'] <= 0:
+            raise CommandError('❌ --lote deve ser maior que zero')
+
+        result = importar_arquivos(pasta, lote=options['lote'], mover=options['mover'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Importação concluída: {result['arquivos']} arquivos, {result['criados']} clientes criados, "
+                f"{result['atualizados']} atualizados, {result['enfileirados']} enviados para cadastro "
+                f"({result['incompletos']} sem nascimento/sexo, só gravados; {result['invalidos']} inválidos)"
+            )
+        )
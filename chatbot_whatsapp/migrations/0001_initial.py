@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClienteCadastrado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.CharField(max_length=255)),
+                ('nome', models.CharField(max_length=255)),
+                ('cpf', models.CharField(max_length=14)),
+                ('telefone', models.CharField(max_length=20)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('data_nascimento', models.DateField(blank=True, null=True)),
+                ('endereco', models.TextField(blank=True, null=True)),
+                ('data_cadastro', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'chatbot_clientes',
+            },
+        ),
+        migrations.CreateModel(
+            name='Conversa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.CharField(max_length=255)),
+                ('ultima_mensagem', models.TextField()),
+                ('estado', models.CharField(default='inicio', max_length=100)),
+                ('data_criacao', models.DateTimeField(auto_now_add=True)),
+                ('data_atualizacao', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'chatbot_conversas',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot_whatsapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversa',
+            name='dados',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='conversa',
+            name='chat_id',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='conversa',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='conversa',
+            name='ultima_mensagem',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot_whatsapp', '0002_conversa_state_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MensagemRecebida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_id', models.CharField(blank=True, default='', max_length=255)),
+                ('chat_id', models.CharField(max_length=255)),
+                ('corpo', models.TextField()),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('respondida', 'Respondida'), ('erro', 'Erro')], default='pendente', max_length=20)),
+                ('acao', models.CharField(blank=True, default='', max_length=50)),
+                ('resposta', models.TextField(blank=True, default='')),
+                ('erro', models.TextField(blank=True, null=True)),
+                ('tentativas', models.IntegerField(default=0)),
+                ('recebida_em', models.DateTimeField(auto_now_add=True)),
+                ('processada_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'chatbot_mensagens_recebidas',
+                'ordering': ['-recebida_em'],
+                'indexes': [models.Index(fields=['chat_id', 'recebida_em'], name='chatbot_msg_chat_idx'), models.Index(fields=['status', 'recebida_em'], name='chatbot_msg_status_idx')],
+            },
+        ),
+    ]
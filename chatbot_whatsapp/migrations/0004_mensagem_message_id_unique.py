@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot_whatsapp', '0003_mensagem_recebida'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='mensagemrecebida',
+            constraint=models.UniqueConstraint(condition=models.Q(('message_id', ''), _negated=True), fields=('message_id',), name='unique_chatbot_message_id'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot_whatsapp', '0004_mensagem_message_id_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvioProgramado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('lembrete_agendamento', 'Lembrete de agendamento'), ('estoque_baixo', 'Estoque baixo')], max_length=30)),
+                ('chave', models.CharField(max_length=255, unique=True)),
+                ('chat_id', models.CharField(max_length=255)),
+                ('texto', models.TextField()),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('enviando', 'Enviando'), ('enviado', 'Enviado'), ('entregue', 'Entregue'), ('lido', 'Lido'), ('erro', 'Erro')], default='pendente', max_length=20)),
+                ('message_id', models.CharField(blank=True, db_index=True, default='', max_length=255)),
+                ('ack', models.IntegerField(default=0)),
+                ('erro', models.TextField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True)),
+                ('ack_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'chatbot_envios_programados',
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['status', 'criado_em'], name='chatbot_envio_status_idx')],
+            },
+        ),
+    ]
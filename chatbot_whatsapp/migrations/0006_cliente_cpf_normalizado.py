@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:56
+
+import re
+
+from django.db import migrations, models
+
+
+def normalizar_clientes(apps, schema_editor):
+    """CPF/telefone só com dígitos; CPFs repetidos ficam com o cadastro mais recente"""
+    ClienteCadastrado = apps.get_model('chatbot_whatsapp', 'ClienteCadastrado')
+    vistos = set()
+    for cliente in ClienteCadastrado.objects.order_by('-data_cadastro', '-id'):
+        cpf = re.sub(r'\D', '', cliente.cpf or '')
+        if cpf in vistos:
+            cliente.delete()
+            continue
+        vistos.add(cpf)
+        cliente.cpf = cpf
+        cliente.telefone = re.sub(r'\D', '', cliente.telefone or '')
+        cliente.save(update_fields=['cpf', 'telefone'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot_whatsapp', '0005_envio_programado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientecadastrado',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='clientecadastrado',
+            name='sexo',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.RunPython(normalizar_clientes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='clientecadastrado',
+            name='cpf',
+            field=models.CharField(max_length=14, unique=True),
+        ),
+    ]
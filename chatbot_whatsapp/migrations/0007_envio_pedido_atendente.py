@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot_whatsapp', '0006_cliente_cpf_normalizado'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='envioprogramado',
+            name='tipo',
+            field=models.CharField(choices=[('lembrete_agendamento', 'Lembrete de agendamento'), ('estoque_baixo', 'Estoque baixo'), ('pedido_atendente', 'Pedido de atendente')], max_length=30),
+        ),
+    ]
@@ -1,24 +1,136 @@
 from django.db import models
 
 class Conversa(models.Model):
-    chat_id = models.CharField(max_length=255)
-    ultima_mensagem = models.TextField()
+    """Estado de uma conversa (backend 'db' de services/state_store)"""
+    chat_id = models.CharField(max_length=255, unique=True)
+    ultima_mensagem = models.TextField(blank=True, default='')
     estado = models.CharField(max_length=100, default='inicio')
+    # Dados extras do fluxo (ex.: respostas parciais)
+    dados = models.JSONField(default=dict, blank=True)
     data_criacao = models.DateTimeField(auto_now_add=True)
-    data_atualizacao = models.DateTimeField(auto_now=True)
+    data_atualizacao = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         db_table = 'chatbot_conversas'
 
 class ClienteCadastrado(models.Model):
+    """
+    Cadastro feito pelo chatbot (ver services/cadastros). CPF e telefone
+    são gravados só com dígitos; o CPF identifica o cliente.
+    """
     chat_id = models.CharField(max_length=255)
     nome = models.CharField(max_length=255)
-    cpf = models.CharField(max_length=14)
+    cpf = models.CharField(max_length=14, unique=True)
     telefone = models.CharField(max_length=20)
     email = models.EmailField(blank=True, null=True)
     data_nascimento = models.DateField(blank=True, null=True)
+    sexo = models.CharField(max_length=20, blank=True, default='')
     endereco = models.TextField(blank=True, null=True)
     data_cadastro = models.DateTimeField(auto_now_add=True)
+    data_atualizacao = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'chatbot_clientes'
+
+class MensagemRecebida(models.Model):
+    """
+    Mensagem recebida pelo webhook do WAHA.
+    O webhook só grava e enfileira; a resposta é gerada e enviada pela task
+    chatbot_whatsapp.tasks.processar_mensagem_recebida.
+    """
+    STATUS_PENDENTE = 'pendente'
+    STATUS_PROCESSANDO = 'processando'
+    STATUS_RESPONDIDA = 'respondida'
+    STATUS_ERRO = 'erro'
+    
+    message_id = models.CharField(max_length=255, blank=True, default='')
+    chat_id = models.CharField(max_length=255)
+    corpo = models.TextField()
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (STATUS_PENDENTE, 'Pendente'),
+            (STATUS_PROCESSANDO, 'Processando'),
+            (STATUS_RESPONDIDA, 'Respondida'),
+            (STATUS_ERRO, 'Erro'),
+        ],
+        default=STATUS_PENDENTE
+    )
+    # Resultado do MessageHandler (guardado antes do envio: um retry só reenvia)
+    acao = models.CharField(max_length=50, blank=True, default='')
+    resposta = models.TextField(blank=True, default='')
+    erro = models.TextField(blank=True, null=True)
+    tentativas = models.IntegerField(default=0)
+    recebida_em = models.DateTimeField(auto_now_add=True)
+    processada_em = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'chatbot_mensagens_recebidas'
+        ordering = ['-recebida_em']
+        indexes = [
+            models.Index(fields=['chat_id', 'recebida_em'], name='chatbot_msg_chat_idx'),
+            models.Index(fields=['status', 'recebida_em'], name='chatbot_msg_status_idx'),
+        ]
+        constraints = [
+            # Idempotência do webhook (ver services/message_dedup)
+            models.UniqueConstraint(
+                fields=['message_id'],
+                condition=~models.Q(message_id=''),
+                name='unique_chatbot_message_id',
+            ),
+        ]
+
+class EnvioProgramado(models.Model):
+    """
+    Mensagem ativa enviada pelo chatbot (lembrete de agendamento, aviso de
+    estoque baixo, pedido de atendente para a equipe). A `chave` torna cada envio idempotente; o `message_id`
+    devolvido pelo WAHA liga os eventos message.ack à linha (entregue/lida).
+    """
+    TIPO_LEMBRETE = 'lembrete_agendamento'
+    TIPO_ESTOQUE = 'estoque_baixo'
+    TIPO_ATENDENTE = 'pedido_atendente'
+    
+    STATUS_PENDENTE = 'pendente'
+    STATUS_ENVIANDO = 'enviando'
+    STATUS_ENVIADO = 'enviado'
+    STATUS_ENTREGUE = 'entregue'
+    STATUS_LIDO = 'lido'
+    STATUS_ERRO = 'erro'
+    
+    tipo = models.CharField(
+        max_length=30,
+        choices=[
+            (TIPO_LEMBRETE, 'Lembrete de agendamento'),
+            (TIPO_ESTOQUE, 'Estoque baixo'),
+            (TIPO_ATENDENTE, 'Pedido de atendente'),
+        ]
+    )
+    chave = models.CharField(max_length=255, unique=True)
+    chat_id = models.CharField(max_length=255)
+    texto = models.TextField()
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (STATUS_PENDENTE, 'Pendente'),
+            (STATUS_ENVIANDO, 'Enviando'),
+            (STATUS_ENVIADO, 'Enviado'),
+            (STATUS_ENTREGUE, 'Entregue'),
+            (STATUS_LIDO, 'Lido'),
+            (STATUS_ERRO, 'Erro'),
+        ],
+        default=STATUS_PENDENTE
+    )
+    message_id = models.CharField(max_length=255, blank=True, default='', db_index=True)
+    # Último ack do WAHA: 1 servidor, 2 aparelho, 3 lido, 4 reproduzido
+    ack = models.IntegerField(default=0)
+    erro = models.TextField(blank=True, null=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    enviado_em = models.DateTimeField(blank=True, null=True)
+    ack_em = models.DateTimeField(blank=True, null=True)
     
     class Meta:
-        db_table = 'chatbot_clientes'
\ No newline at end of file
+        db_table = 'chatbot_envios_programados'
+        ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['status', 'criado_em'], name='chatbot_envio_status_idx'),
+        ]
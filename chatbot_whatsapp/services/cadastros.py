@@ -0,0 +1,171 @@
+"""
+Cadastros feitos pelo chatbot.
+
+O MessageHandler gravava cada cadastro em um JSON solto em cadastros/, que
+nunca chegava ao banco nem ao sistema legado. Agora:
+
+- `salvar_cadastro` grava/atualiza o ClienteCadastrado (CPF e telefone só com
+  dígitos, CPF único) e coloca o cliente na mesma fila de cadastro automático
+  das respostas do Google Forms (web_scraping.services.registration_pipeline),
+  processada pela task sync_google_forms_and_register_patients.
+- `importar_arquivos` faz o mesmo, em lotes, com os JSON antigos de
+  cadastros/ (ver o comando importar_cadastros_chatbot).
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from web_scraping.services import registration_pipeline
+
+from ..models import ClienteCadastrado
+from ..utils.texto import normalizar_cpf, normalizar_telefone
+
+CAMPOS_ATUALIZAVEIS = ['chat_id', 'nome', 'telefone', 'email', 'data_nascimento', 'sexo', 'endereco']
+
+
+def _data(valor) -> Optional[datetime]:
+    for formato in ('%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d', '%d-%m-%Y'):
+        try:
+            return datetime.strptime(str(valor or '').strip(), formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def cliente_de_dados(chat_id: str, dados: Dict) -> Optional[ClienteCadastrado]:
+    """Monta o ClienteCadastrado (sem salvar); None se o CPF não tiver 11 dígitos"""
+    cpf = normalizar_cpf(dados.get('cpf'))
+    if len(cpf) != 11:
+        return None
+    return ClienteCadastrado(
+        chat_id=chat_id or dados.get('chat_id') or '',
+        nome=(dados.get('nome') or '').strip(),
+        cpf=cpf,
+        telefone=normalizar_telefone(dados.get('telefone')),
+        email=(dados.get('email') or '').strip() or None,
+        data_nascimento=_data(dados.get('data_nascimento')),
+        sexo=(dados.get('sexo') or '').strip(),
+        endereco=(dados.get('endereco') or '').strip() or None,
+    )
+
+
+def para_formulario(cliente: ClienteCadastrado) -> Dict:
+    """Dados no formato das respostas do Google Forms (entrada do registration_pipeline)"""
+    return {
+        'Nome completo': cliente.nome,
+        'CPF': cliente.cpf,
+        'Data de nascimento': cliente.data_nascimento.strftime('%d/%m/%Y') if cliente.data_nascimento else '',
+        'Sexo': cliente.sexo,
+        'E-mail': cliente.email or '',
+        'Celular principal': cliente.telefone,
+        'Endereço completo (rua e número)': cliente.endereco or '',
+        'Origem': 'chatbot',
+    }
+
+
+def completo_para_cadastro(cliente: ClienteCadastrado) -> bool:
+    """Campos que o cadastro no sistema legado exige (PatientRegistrationScraper._validate_form_data)"""
+    return bool(cliente.nome and cliente.data_nascimento and cliente.sexo)
+
+
+def _gravar(clientes: List[ClienteCadastrado]) -> Dict:
+    """
+    Cria/atualiza os clientes pelo CPF (em lote) e enfileira para cadastro os
+    que estão completos; os demais ficam só no banco (ex.: JSON antigos sem
+    sexo), em vez de falhar no pipeline a cada tentativa.
+    """
+    por_cpf = {c.cpf: c for c in clientes}
+    existentes = {c.cpf: c for c in ClienteCadastrado.objects.filter(cpf__in=list(por_cpf))}
+
+    novos, alterados = [], []
+    for cpf, cliente in por_cpf.items():
+        atual = existentes.get(cpf)
+        if atual is None:
+            novos.append(cliente)
+            continue
+        for campo in CAMPOS_ATUALIZAVEIS:
+            valor = getattr(cliente, campo)
+            if valor not in (None, ''):
+                setattr(atual, campo, valor)
+        alterados.append(atual)
+
+    ClienteCadastrado.objects.bulk_create(novos, batch_size=500, ignore_conflicts=True)
+    if alterados:
+        ClienteCadastrado.objects.bulk_update(alterados, CAMPOS_ATUALIZAVEIS, batch_size=500)
+
+    completos = [c for c in novos + alterados if completo_para_cadastro(c)]
+    enfileirados = registration_pipeline.ingest_responses([para_formulario(c) for c in completos])
+    return {
+        'criados': len(novos),
+        'atualizados': len(alterados),
+        'enfileirados': enfileirados,
+        'incompletos': len(novos) + len(alterados) - len(completos),
+    }
+
+
+def salvar_cadastro(chat_id: str, dados: Dict) -> Optional[ClienteCadastrado]:
+    """Grava o cadastro recebido pelo chatbot; None se o CPF for inválido"""
+    cliente = cliente_de_dados(chat_id, dados)
+    if cliente is None:
+        return None
+    _gravar([cliente])
+    return ClienteCadastrado.objects.get(cpf=cliente.cpf)
+
+
+def _arquivos(pasta: str) -> Iterable[os.DirEntry]:
+    with os.scandir(pasta) as entradas:
+        for entrada in entradas:
+            if entrada.is_file() and entrada.name.endswith('.json'):
+                yield entrada
+
+
+def importar_arquivos(pasta: str = 'cadastros', lote: int = 500, mover: bool = False) -> Dict:
+    """
+    Importa os JSON antigos de `pasta` em lotes de `lote` arquivos.
+
+    Args:
+        mover: move os arquivos importados para <pasta>/importados
+
+    Returns:
+        {'arquivos', 'criados', 'atualizados', 'enfileirados', 'incompletos', 'invalidos'}
+    """
+    totais = {'arquivos': 0, 'criados': 0, 'atualizados': 0, 'enfileirados': 0, 'incompletos': 0, 'invalidos': 0}
+    if not os.path.isdir(pasta):
+        return totais
+    destino = os.path.join(pasta, 'importados')
+
+    def processar(entradas):
+        clientes, caminhos = [], []
+        for entrada in entradas:
+            try:
+                with open(entrada.path, encoding='utf-8') as f:
+                    dados = json.load(f)
+            except (OSError, ValueError):
+                dados = None
+            cliente = cliente_de_dados('', dados) if isinstance(dados, dict) else None
+            if cliente is None:
+                totais['invalidos'] += 1
+                continue
+            clientes.append(cliente)
+            caminhos.append(entrada.path)
+        if clientes:
+            for chave, valor in _gravar(clientes).items():
+                totais[chave] += valor
+        if mover:
+            os.makedirs(destino, exist_ok=True)
+            for caminho in caminhos:
+                shutil.move(caminho, os.path.join(destino, os.path.basename(caminho)))
+
+    pendentes = []
+    for entrada in _arquivos(pasta):
+        totais['arquivos'] += 1
+        pendentes.append(entrada)
+        if len(pendentes) >= lote:
+            processar(pendentes)
+            pendentes = []
+    if pendentes:
+        processar(pendentes)
+    return totais
@@ -0,0 +1,157 @@
+"""
+Parser do formulário de cadastro enviado pelo paciente no chatbot.
+
+O paciente responde ao modelo
+
+    *Nome Completo:* Maria Silva
+    *CPF:* 123.456.789-00
+    *Telefone:* (11) 99999-9999
+    ...
+
+com muitas variações: sem negrito, com '_' ou '•', rótulo sem acento ou
+abreviado ("Nascimento", "Celular", "E-mail"), '-' ou '=' no lugar de ':'.
+Um único padrão compilado no módulo reconhece qualquer rótulo e a mensagem é
+percorrida em uma passada (finditer, uma linha por campo). Cada valor é
+validado e normalizado na hora:
+
+- CPF: 11 dígitos, não repetidos (mesma regra do cadastro no sistema legado)
+- Telefone: DDD + número (10 ou 11 dígitos; DDI 55 é removido)
+- Data de nascimento: dd/mm/aaaa (aceita '-', '.', e ano com 2 dígitos)
+- Sexo: Feminino/Masculino (aceita 'F', 'masc', 'mulher'...)
+- E-mail: formato básico
+
+Campos inválidos ficam fora dos dados e vão para `erros`, para a resposta do
+chatbot dizer o que corrigir. Propriedades e desempenho:
+`python manage.py bench_form_parser`.
+"""
+
+import re
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple
+
+from ..utils.texto import normalizar_cpf, normalizar_telefone
+
+# Rótulos aceitos por campo (sem acento; o texto é comparado sem diferenciar caixa)
+ROTULOS = {
+    'nome': r'nome(?: completo)?',
+    'cpf': r'cpf',
+    'telefone': r'telefone|celular|whats(?:app)?|fone|tel',
+    'email': r'e-?mail',
+    'data_nascimento': r'(?:data (?:de )?)?nascimento|data nasc\.?|dt\.? nasc\.?|nasc\.?',
+    'sexo': r'sexo|g[eê]nero',
+    'endereco': r'endere[cç]o(?: completo)?',
+}
+
+# Uma alternativa por campo, cada uma com o valor em um grupo com o nome do
+# campo: m.lastgroup diz qual rótulo casou sem percorrer os grupos
+_SEPARADOR = r'[ \t*_]*[:=\-–][ \t*_]*'
+_VALOR = r'[^\n]*?'
+LINHA_RE = re.compile(
+    r'^[ \t*_•\-]*(?:'
+    + '|'.join(f'(?:{padrao}){_SEPARADOR}(?P<{campo}>{_VALOR})' for campo, padrao in ROTULOS.items())
+    + r')[ \t*_\r]*$',
+    re.IGNORECASE | re.MULTILINE,
+)
+DATA_RE = re.compile(r'^(\d{1,2})[/.\-](\d{1,2})[/.\-](\d{2}|\d{4})$')
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+class Formulario(NamedTuple):
+    dados: Dict[str, str]
+    erros: Dict[str, str]
+
+
+def _validar_cpf(valor: str):
+    cpf = normalizar_cpf(valor)
+    if len(cpf) != 11 or cpf == cpf[0] * 11:
+        return None, 'CPF deve ter 11 dígitos'
+    return cpf, None
+
+
+def _validar_telefone(valor: str):
+    telefone = normalizar_telefone(valor)
+    if len(telefone) not in (10, 11):
+        return None, 'telefone deve ter DDD e número'
+    return telefone, None
+
+
+def _validar_data(valor: str):
+    m = DATA_RE.match(valor.strip())
+    if not m:
+        return None, 'data deve estar no formato dd/mm/aaaa'
+    dia, mes, ano = (int(g) for g in m.groups())
+    if ano < 100:
+        # Ano com 2 dígitos: o século que não cai no futuro
+        ano += 2000 if 2000 + ano <= date.today().year else 1900
+    try:
+        nascimento = date(ano, mes, dia)
+    except ValueError:
+        return None, 'data de nascimento inexistente'
+    if nascimento > date.today():
+        return None, 'data de nascimento no futuro'
+    return f'{dia:02d}/{mes:02d}/{ano}', None
+
+
+def _validar_email(valor: str):
+    if not EMAIL_RE.match(valor):
+        return None, 'e-mail inválido'
+    return valor.lower(), None
+
+
+def _validar_sexo(valor: str):
+    # Mesmos valores que o PatientRegistrationScraper sabe selecionar no sistema legado
+    texto = valor.strip().lower()
+    if texto in ('m', 'h') or texto.startswith(('masc', 'homem')):
+        return 'Masculino', None
+    if texto == 'f' or texto.startswith(('fem', 'mulher')):
+        return 'Feminino', None
+    return None, 'sexo deve ser Feminino ou Masculino'
+
+
+VALIDADORES = {
+    'cpf': _validar_cpf,
+    'telefone': _validar_telefone,
+    'data_nascimento': _validar_data,
+    'sexo': _validar_sexo,
+    'email': _validar_email,
+}
+
+# Sem data de nascimento e sexo o cadastro no sistema legado falha
+# (PatientRegistrationScraper._validate_form_data): todos são exigidos no chat
+OBRIGATORIOS = ('nome', 'cpf', 'telefone', 'data_nascimento', 'sexo')
+
+ROTULOS_CAMPOS = {
+    'nome': 'Nome Completo',
+    'cpf': 'CPF',
+    'telefone': 'Telefone',
+    'data_nascimento': 'Data Nascimento',
+    'sexo': 'Sexo',
+}
+
+
+def extrair_formulario(texto: str) -> Formulario:
+    """
+    Extrai e valida os campos do formulário de cadastro.
+    Se um rótulo aparece mais de uma vez, vale o primeiro.
+    """
+    dados: Dict[str, str] = {}
+    erros: Dict[str, str] = {}
+    for m in LINHA_RE.finditer(texto or ''):
+        campo = m.lastgroup
+        valor = m.group(campo).strip()
+        if not valor or campo in dados or campo in erros:
+            continue
+        validar = VALIDADORES.get(campo)
+        if validar is None:
+            dados[campo] = valor
+            continue
+        normalizado, erro = validar(valor)
+        if erro:
+            erros[campo] = erro
+        else:
+            dados[campo] = normalizado
+    return Formulario(dados, erros)
+
+
+def campos_ausentes(dados: Dict[str, str], obrigatorios: Iterable[str] = OBRIGATORIOS) -> List[str]:
+    return [c for c in obrigatorios if c not in dados]
@@ -1,6 +1,7 @@
 import google.generativeai as genai
 from django.conf import settings
 import os
+from .response_cache import response_cache
 
 class GeminiService:
     def __init__(self):
@@ -12,12 +13,11 @@ class GeminiService:
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel('gemini-pro')
     
-    def gerar_resposta(self, mensagem, contexto=None):
-        try:
-            prompt = f"""
+    # Montado uma vez; a cada mensagem só os campos são preenchidos
+    PROMPT = """
             Você é um assistente de uma clínica de vacinação chamada "VaccineSafe". 
             
-            CONTEXTO ATUAL: {contexto or 'Conversa inicial'}
+            CONTEXTO ATUAL: Conversa inicial
             
             SUAS INSTRUÇÕES:
             1. Se o usuário quer AGENDAMENTO (palavras: agendar, marcar, vacina, tomar vacina, agendamento), 
@@ -38,9 +38,20 @@ class GeminiService:
             
             SUA RESPOSTA (seja direto):
             """
+    
+    def gerar_resposta(self, mensagem):
+        # O prompt só depende da mensagem: a resposta pode vir do cache
+        resposta = response_cache.get(mensagem)
+        if resposta is not None:
+            return resposta
+        
+        try:
+            prompt = self.PROMPT.format(mensagem=mensagem)
             
             response = self.model.generate_content(prompt)
-            return response.text.strip()
+            resposta = response.text.strip()
+            response_cache.set(mensagem, resposta)
+            return resposta
             
         except Exception as e:
             print(f"Erro no Gemini: {e}")
@@ -0,0 +1,218 @@
+"""
+Classificação local de intenções das mensagens do chatbot.
+
+Antes, toda mensagem livre ia para o Gemini — inclusive "oi", "quero agendar",
+"qual o horário?". Agora a mensagem passa primeiro por esta camada:
+
+1. Regras (regex sobre o texto normalizado, sem acentos nem pontuação).
+   Saudações e agradecimentos só casam quando são a mensagem inteira.
+2. Um classificador Naive Bayes pequeno (unigramas), treinado uma vez por
+   processo com os exemplos abaixo e, se configurado, com o histórico
+   rotulado em CHATBOT_INTENT_TRAINING_FILE (lista JSON de
+   {"texto": ..., "intencao": ...}).
+
+Mais de uma regra casando, mensagem longa ou confiança abaixo de
+CHATBOT_INTENT_MIN_CONFIDENCE contam como ambíguas: retornam None e o
+MessageHandler cai no Gemini. Agendamento tem guardas próprias, porque um
+falso positivo tira o paciente da conversa: negação/cancelamento ("não quero
+marcar", "cancelar o agendamento"), relatos de sintoma ("teve febre depois
+da vacina") e dúvidas ("pode tomar a vacina?") nunca iniciam o fluxo, e o
+Naive Bayes só decide agendamento se a mensagem tiver uma palavra própria
+dele (palavras como "vacina", "filho" ou "tomar" aparecem em qualquer
+dúvida). Acertos (por intenção) e misses ficam em
+contadores no cache, ver `stats()`; só conta acerto a intenção que o chamador
+consegue responder localmente (`disponiveis`).
+"""
+
+import json
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..utils.texto import normalizar_texto
+
+AGENDAMENTO = 'agendamento'
+
+REGRAS = {
+    'saudacao': r'^(oi+|ola|opa|eai|e ai|bom dia|boa tarde|boa noite|hello|hi)( (tudo bem|tudo bom|td bem))?$',
+    'agradecimento': r'^(obrigad[oa]|muito obrigad[oa]|valeu|vlw|brigad[oa]|grat[oa])( (mesmo|viu))?$',
+    AGENDAMENTO: r'\b(agendar|agendamento|marcar|remarcar|tomar (a )?vacina|quero (me )?vacinar)\b',
+    'horario': r'\b(horario|horarios|que horas|abre|fecha|funcionamento|aberto)\b',
+    'endereco': r'\b(endereco|onde fica|localizacao|como chego|como chegar|local da clinica)\b',
+    'documentos': r'\b(documento|documentos|o que levar|carteirinha|cartao de vacina)\b',
+    'atendente': r'\b(atendente|humano|falar com alguem)\b',
+}
+
+# Mensagens com estas palavras nunca iniciam o agendamento (vão para o Gemini):
+# negação/cancelamento, sintomas e dúvidas do tipo "pode tomar?"
+GUARDA_AGENDAMENTO = re.compile(
+    r'\b(nao|nunca|cancelar|cancela|cancelamento|desmarcar|desmarca|desistir|pode|podem|'
+    r'febre|reacao|dor|doendo|alergia|alergico|alergica|doente|efeito|efeitos|sintoma|sintomas|depois)\b'
+)
+
+# O Naive Bayes só decide agendamento se a mensagem tiver uma destas palavras
+PALAVRAS_AGENDAMENTO = {'agendar', 'agendamento', 'agenda', 'marcar', 'remarcar', 'vaga', 'vagas', 'vacinar'}
+
+EXEMPLOS = [
+    ('oi', 'saudacao'), ('ola bom dia', 'saudacao'), ('boa tarde tudo bem', 'saudacao'),
+    ('obrigado', 'agradecimento'), ('valeu pela ajuda', 'agradecimento'), ('muito obrigada', 'agradecimento'),
+    ('quero agendar uma vacina', AGENDAMENTO), ('gostaria de marcar vacina', AGENDAMENTO),
+    ('tem vaga amanha para vacinar', AGENDAMENTO), ('quero tomar a vacina da gripe', AGENDAMENTO),
+    ('posso vacinar meu filho semana que vem', AGENDAMENTO),
+    ('qual o horario de atendimento', 'horario'), ('voces abrem sabado', 'horario'),
+    ('ate que horas funciona', 'horario'), ('abre domingo', 'horario'),
+    ('qual o endereco', 'endereco'), ('onde fica a clinica', 'endereco'), ('como chego ai', 'endereco'),
+    ('preciso levar algum documento', 'documentos'), ('precisa da carteirinha de vacinacao', 'documentos'),
+    ('o que levar no dia', 'documentos'),
+    ('quero falar com um atendente', 'atendente'), ('tem alguem ai pra me atender', 'atendente'),
+]
+
+# Mensagens maiores que isso são perguntas abertas: deixa para o Gemini
+MAX_PALAVRAS = 12
+
+
+class IntentClassifier:
+    """Regras + Naive Bayes multinomial, treinado no primeiro uso."""
+
+    prefix = 'chatbot:intent'
+
+    def __init__(self):
+        self._regras = {intencao: re.compile(padrao) for intencao, padrao in REGRAS.items()}
+        self._lock = threading.Lock()
+        self._modelo = None
+
+    @staticmethod
+    def _min_confidence() -> float:
+        return getattr(settings, 'CHATBOT_INTENT_MIN_CONFIDENCE', 0.75)
+
+    # ------------------------------------------------------------------
+    # Treino
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _exemplos() -> List[Tuple[str, str]]:
+        exemplos = list(EXEMPLOS)
+        arquivo = getattr(settings, 'CHATBOT_INTENT_TRAINING_FILE', '')
+        if arquivo:
+            try:
+                with open(arquivo, encoding='utf-8') as f:
+                    exemplos += [(item['texto'], item['intencao']) for item in json.load(f)]
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"⚠️ Histórico de intenções não carregado ({arquivo}): {e}")
+        return exemplos
+
+    def _treinar(self) -> Dict:
+        contagens = defaultdict(Counter)
+        documentos = Counter()
+        for texto, intencao in self._exemplos():
+            contagens[intencao].update(normalizar_texto(texto).split())
+            documentos[intencao] += 1
+        vocabulario = set()
+        for palavras in contagens.values():
+            vocabulario.update(palavras)
+        total = sum(documentos.values())
+        return {
+            'priors': {i: math.log(n / total) for i, n in documentos.items()},
+            'contagens': contagens,
+            'totais': {i: sum(c.values()) for i, c in contagens.items()},
+            'vocabulario': len(vocabulario),
+        }
+
+    @property
+    def modelo(self) -> Dict:
+        if self._modelo is None:
+            with self._lock:
+                if self._modelo is None:
+                    self._modelo = self._treinar()
+        return self._modelo
+
+    def _prever(self, palavras: List[str]) -> Tuple[Optional[str], float]:
+        """Intenção mais provável e sua probabilidade (softmax dos log-scores)"""
+        modelo = self.modelo
+        v = modelo['vocabulario']
+        scores = {}
+        for intencao, prior in modelo['priors'].items():
+            contagem = modelo['contagens'][intencao]
+            total = modelo['totais'][intencao]
+            scores[intencao] = prior + sum(math.log((contagem[p] + 1) / (total + v)) for p in palavras)
+        if not scores:
+            return None, 0.0
+        melhor = max(scores, key=scores.get)
+        soma = sum(math.exp(s - scores[melhor]) for s in scores.values())
+        return melhor, 1 / soma
+
+    # ------------------------------------------------------------------
+    # Classificação
+    # ------------------------------------------------------------------
+    def _identificar(self, texto: str) -> Optional[str]:
+        palavras = texto.split()
+        if not palavras or len(palavras) > MAX_PALAVRAS:
+            return None
+        permite_agendamento = not GUARDA_AGENDAMENTO.search(texto)
+
+        casadas = [intencao for intencao, regra in self._regras.items() if regra.search(texto)]
+        if len(casadas) > 1:
+            return None
+        if casadas:
+            if casadas[0] == AGENDAMENTO and not permite_agendamento:
+                return None
+            return casadas[0]
+
+        # Classificador só conta palavras conhecidas; sem nenhuma, não há sinal
+        conhecidas = [p for p in palavras if any(p in c for c in self.modelo['contagens'].values())]
+        if not conhecidas:
+            return None
+        intencao, confianca = self._prever(conhecidas)
+        if intencao is None or confianca < self._min_confidence():
+            return None
+        if intencao == AGENDAMENTO and not (permite_agendamento and PALAVRAS_AGENDAMENTO.intersection(palavras)):
+            return None
+        return intencao
+
+    def classificar(self, mensagem: str, disponiveis: Optional[Set[str]] = None) -> Optional[str]:
+        """
+        Intenção da mensagem, ou None se for ambígua (vai para o Gemini).
+        Com `disponiveis`, intenções fora do conjunto (ex.: horário sem
+        resposta configurada) também retornam None e contam como miss.
+        """
+        intencao = self._identificar(normalizar_texto(mensagem))
+        if intencao is None or (disponiveis is not None and intencao not in disponiveis):
+            self._incr('misses')
+            return None
+        self._incr(f'hits:{intencao}')
+        return intencao
+
+    # ------------------------------------------------------------------
+    # Estatísticas (contadores no cache compartilhado)
+    # ------------------------------------------------------------------
+    def _stat_key(self, name: str) -> str:
+        return f'{self.prefix}:stats:{name}'
+
+    def _incr(self, name: str) -> None:
+        key = self._stat_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, 1, None):
+                cache.incr(key)
+
+    def stats(self) -> Dict:
+        intencoes = sorted(set(REGRAS) | set(self.modelo['priors']))
+        por_intencao = {i: cache.get(self._stat_key(f'hits:{i}'), 0) for i in intencoes}
+        hits = sum(por_intencao.values())
+        misses = cache.get(self._stat_key('misses'), 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 3) if total else 0.0,
+            'por_intencao': por_intencao,
+        }
+
+
+# Instância global (treinada no primeiro uso)
+intent_classifier = IntentClassifier()
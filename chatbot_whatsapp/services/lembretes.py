@@ -0,0 +1,255 @@
+"""
+Lembretes de agendamento e avisos de estoque baixo pelo WhatsApp.
+
+1. `preparar_lembretes` seleciona os agendamentos do dia (uma consulta no
+   índice appointment_date_status_idx, com usuário e vacina via
+   select_related), monta os textos em lote e grava um EnvioProgramado por
+   agendamento com bulk_create. A chave 'lembrete:<id>:<data>' torna a
+   preparação idempotente: rodar de novo não duplica lembretes.
+2. `preparar_avisos_estoque` faz o mesmo para a equipe
+   (CHATBOT_STAFF_CHAT_IDS), com a lista de vacinas abaixo do mínimo.
+3. `lotes_pendentes` divide os envios pendentes em lotes; cada lote vira uma
+   task na fila 'lembretes' (ver tasks.enviar_lote_programado), que envia
+   pelo WahaService.enviar_em_massa (limite de envios por minuto).
+4. `avisar_atendente` grava um aviso para a equipe quando um paciente pede
+   para falar com uma pessoa (no máximo um por conversa por hora).
+5. Os eventos message.ack do WAHA atualizam o status pelo message_id
+   (`registrar_ack`): enviado -> entregue -> lido.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Appointment, Vaccine
+
+from ..models import EnvioProgramado
+from ..utils.texto import chat_id_do_telefone
+from .waha_service import envio_incerto
+
+STATUS_LEMBRAVEIS = ('scheduled', 'confirmed')
+
+TEMPLATE_LEMBRETE = (
+    "Olá, {nome}! 👋\n\n"
+    "Lembrete da *VaccineSafe*: você tem vacinação agendada para *{data}* às *{hora}*.\n"
+    "{vacina}"
+    "\nTraga um documento com foto e, se tiver, a carteirinha de vacinação. 📄\n"
+    "Se não puder comparecer, responda esta mensagem para remarcar."
+)
+
+# Itens listados no aviso de estoque (os mais distantes do mínimo primeiro)
+MAX_ITENS_ESTOQUE = 30
+
+TEMPLATE_ESTOQUE = (
+    "⚠️ *Estoque baixo* ({data})\n\n"
+    "{itens}\n\n"
+    "Verifique a reposição no painel de estoque."
+)
+
+TEMPLATE_ATENDENTE = (
+    "🙋 *Pedido de atendente*\n\n"
+    "O contato *{telefone}* pediu para falar com alguém da equipe.\n"
+    "Mensagem: \"{mensagem}\""
+)
+
+
+def _lote() -> int:
+    return getattr(settings, 'CHATBOT_ENVIO_LOTE', 50)
+
+
+def _staff_chat_ids() -> List[str]:
+    valor = getattr(settings, 'CHATBOT_STAFF_CHAT_IDS', '')
+    ids = [v.strip() for v in valor.split(',')] if isinstance(valor, str) else list(valor)
+    return [i if '@' in i else chat_id_do_telefone(i) for i in ids if i]
+
+
+def equipe_configurada() -> bool:
+    return bool(_staff_chat_ids())
+
+
+def _texto_lembrete(appointment: Appointment) -> str:
+    vacina = f"💉 Vacina: {appointment.vaccine.name}" if appointment.vaccine else ''
+    if vacina and appointment.dose:
+        vacina += f" ({appointment.dose})"
+    return TEMPLATE_LEMBRETE.format(
+        nome=(appointment.user.name or '').split(' ')[0] or 'tudo bem',
+        data=appointment.appointment_date.strftime('%d/%m/%Y'),
+        hora=appointment.appointment_time,
+        vacina=f"{vacina}\n" if vacina else '',
+    )
+
+
+def preparar_lembretes(dia: Optional[date] = None) -> Dict:
+    """
+    Grava os lembretes dos agendamentos de `dia` (padrão: amanhã).
+    Retorna {'dia', 'agendamentos', 'criados', 'sem_telefone'}.
+    """
+    dia = dia or timezone.localdate() + timedelta(days=1)
+    agendamentos = (
+        Appointment.objects
+        .filter(appointment_date=dia, status__in=STATUS_LEMBRAVEIS)
+        .select_related('user', 'vaccine')
+        .order_by()
+    )
+
+    envios = []
+    sem_telefone = 0
+    for appointment in agendamentos:
+        chat_id = chat_id_do_telefone(appointment.user.phone)
+        if not chat_id:
+            sem_telefone += 1
+            continue
+        envios.append(EnvioProgramado(
+            tipo=EnvioProgramado.TIPO_LEMBRETE,
+            chave=f'lembrete:{appointment.pk}:{dia.isoformat()}',
+            chat_id=chat_id,
+            texto=_texto_lembrete(appointment),
+        ))
+
+    chaves = [e.chave for e in envios]
+    existentes = set(EnvioProgramado.objects.filter(chave__in=chaves).values_list('chave', flat=True))
+    EnvioProgramado.objects.bulk_create(
+        [e for e in envios if e.chave not in existentes], batch_size=500, ignore_conflicts=True
+    )
+    return {
+        'dia': dia.isoformat(),
+        'agendamentos': len(envios) + sem_telefone,
+        'criados': len(envios) - len(existentes),
+        'sem_telefone': sem_telefone,
+    }
+
+
+def preparar_avisos_estoque(dia: Optional[date] = None) -> Dict:
+    """Grava um aviso por membro da equipe com as vacinas abaixo do estoque mínimo"""
+    dia = dia or timezone.localdate()
+    baixas = list(
+        Vaccine.objects
+        .filter(current_stock__lt=F('minimum_stock'))
+        .order_by(F('current_stock') - F('minimum_stock'), 'name')
+        .values_list('name', 'current_stock', 'minimum_stock')
+    )
+    staff = _staff_chat_ids()
+    if not baixas or not staff:
+        return {'vacinas': len(baixas), 'criados': 0}
+
+    itens = [f"• {nome}: {atual} (mínimo {minimo})" for nome, atual, minimo in baixas[:MAX_ITENS_ESTOQUE]]
+    if len(baixas) > MAX_ITENS_ESTOQUE:
+        itens.append(f"… e mais {len(baixas) - MAX_ITENS_ESTOQUE} itens")
+    texto = TEMPLATE_ESTOQUE.format(data=dia.strftime('%d/%m/%Y'), itens='\n'.join(itens))
+    criados = EnvioProgramado.objects.bulk_create([
+        EnvioProgramado(
+            tipo=EnvioProgramado.TIPO_ESTOQUE,
+            chave=f'estoque:{dia.isoformat()}:{chat_id}',
+            chat_id=chat_id,
+            texto=texto,
+        )
+        for chat_id in staff
+    ], ignore_conflicts=True)
+    return {'vacinas': len(baixas), 'criados': len(criados)}
+
+
+def avisar_atendente(chat_id: str, mensagem: str) -> List[int]:
+    """
+    Grava o aviso de pedido de atendente para cada membro da equipe.
+    Retorna os ids dos envios pendentes (vazio sem CHATBOT_STAFF_CHAT_IDS).
+    """
+    staff = _staff_chat_ids()
+    if not staff:
+        return []
+    hora = timezone.now().strftime('%Y%m%d%H')
+    texto = TEMPLATE_ATENDENTE.format(telefone=chat_id.split('@')[0], mensagem=mensagem[:300])
+    chaves = [f'atendente:{chat_id}:{hora}:{destino}' for destino in staff]
+    EnvioProgramado.objects.bulk_create([
+        EnvioProgramado(tipo=EnvioProgramado.TIPO_ATENDENTE, chave=chave, chat_id=destino, texto=texto)
+        for chave, destino in zip(chaves, staff)
+    ], ignore_conflicts=True)
+    return list(
+        EnvioProgramado.objects
+        .filter(chave__in=chaves, status=EnvioProgramado.STATUS_PENDENTE)
+        .values_list('pk', flat=True)
+    )
+
+
+def lotes_pendentes() -> List[List[int]]:
+    """IDs dos envios pendentes, em lotes de CHATBOT_ENVIO_LOTE"""
+    ids = list(
+        EnvioProgramado.objects
+        .filter(status=EnvioProgramado.STATUS_PENDENTE)
+        .order_by('criado_em', 'id')
+        .values_list('pk', flat=True)
+    )
+    tamanho = _lote()
+    return [ids[i:i + tamanho] for i in range(0, len(ids), tamanho)]
+
+
+def _message_id(resposta) -> str:
+    """Id da mensagem na resposta do sendText (string ou {'_serialized': ...})"""
+    if not isinstance(resposta, dict):
+        return ''
+    mid = resposta.get('id') or (resposta.get('key') or {}).get('id') or ''
+    if isinstance(mid, dict):
+        mid = mid.get('_serialized') or mid.get('id') or ''
+    return str(mid)
+
+
+def enviar_lote(ids: List[int], waha) -> Dict:
+    """
+    Envia um lote de EnvioProgramado pendentes e grava o resultado de cada um.
+    Só envia as linhas que este worker conseguiu marcar como 'enviando'.
+    """
+    EnvioProgramado.objects.filter(pk__in=ids, status=EnvioProgramado.STATUS_PENDENTE).update(
+        status=EnvioProgramado.STATUS_ENVIANDO
+    )
+    envios = list(
+        EnvioProgramado.objects
+        .filter(pk__in=ids, status=EnvioProgramado.STATUS_ENVIANDO)
+        .order_by('criado_em', 'id')
+    )
+    if not envios:
+        return {'enviados': 0, 'erros': 0}
+
+    resultados = waha.enviar_em_massa([(e.chat_id, e.texto) for e in envios])
+    agora = timezone.now()
+    for envio, resultado in zip(envios, resultados):
+        if resultado['enviado']:
+            envio.status = EnvioProgramado.STATUS_ENVIADO
+            envio.message_id = _message_id(resultado['resposta'])
+            envio.enviado_em = agora
+            envio.erro = None
+            if envio_incerto(resultado['resposta']):
+                # Pode ter sido entregue: fica como enviado (sem ack) e não é repetido
+                envio.erro = f"Sem confirmação do WAHA ({resultado['resposta']['erro']})"
+        elif resultado['interrompido']:
+            # Circuito do WAHA aberto: volta para a fila da próxima rodada
+            envio.status = EnvioProgramado.STATUS_PENDENTE
+        else:
+            envio.status = EnvioProgramado.STATUS_ERRO
+            envio.erro = 'WAHA não confirmou o envio'
+    EnvioProgramado.objects.bulk_update(envios, ['status', 'message_id', 'enviado_em', 'erro'])
+
+    enviados = sum(1 for r in resultados if r['enviado'])
+    adiados = sum(1 for r in resultados if r['interrompido'])
+    return {'enviados': enviados, 'adiados': adiados, 'erros': len(envios) - enviados - adiados}
+
+
+def registrar_ack(message_id: str, ack) -> int:
+    """Atualiza o envio com o ack do WAHA (só avança). Retorna linhas alteradas."""
+    try:
+        ack = int(ack)
+    except (TypeError, ValueError):
+        return 0
+    if not message_id:
+        return 0
+    if ack < 0:
+        return EnvioProgramado.objects.filter(message_id=message_id).exclude(
+            status=EnvioProgramado.STATUS_ERRO
+        ).update(status=EnvioProgramado.STATUS_ERRO, erro='WAHA informou falha na entrega', ack_em=timezone.now())
+    if ack < 2:
+        return 0
+    status = EnvioProgramado.STATUS_LIDO if ack >= 3 else EnvioProgramado.STATUS_ENTREGUE
+    return EnvioProgramado.objects.filter(message_id=message_id, ack__lt=ack).update(
+        ack=ack, status=status, ack_em=timezone.now()
+    )
@@ -0,0 +1,50 @@
+"""
+Deduplicação das mensagens recebidas pelo webhook.
+
+O WAHA reentrega o webhook quando a resposta demora ou falha, e a mesma
+mensagem pode chegar mais de uma vez; cada cópia custaria uma chamada ao
+Gemini e uma resposta repetida. O id da mensagem do WAHA é marcado como visto
+com cache.add (SET NX com TTL no Redis; no LocMemCache de dev vale por processo
+e o próprio cache limita o número de entradas). CHATBOT_DEDUP_TTL define por
+quantos segundos um id é lembrado.
+
+A restrição única parcial em MensagemRecebida.message_id cobre o caso de o
+cache ter sido limpo dentro da janela.
+"""
+
+import hashlib
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+PREFIX = 'chatbot:seen'
+
+
+def _ttl() -> int:
+    return getattr(settings, 'CHATBOT_DEDUP_TTL', 24 * 60 * 60)
+
+
+def chave_mensagem(message_id: str, chat_id: str = '', corpo: str = '', timestamp=None) -> Optional[str]:
+    """
+    Chave de deduplicação: o id do WAHA ou, na falta dele, um hash de
+    chat + texto + timestamp. Sem id nem timestamp não há como deduplicar.
+    """
+    if message_id:
+        return message_id
+    if timestamp:
+        return hashlib.sha1(f'{chat_id}|{timestamp}|{corpo}'.encode('utf-8')).hexdigest()
+    return None
+
+
+def primeira_vez(chave: Optional[str]) -> bool:
+    """True se a chave ainda não foi vista dentro do TTL (e a marca como vista)."""
+    if not chave:
+        return True
+    return cache.add(f'{PREFIX}:{chave}', 1, _ttl())
+
+
+def esquecer(chave: Optional[str]) -> None:
+    """Desmarca a chave (ex.: a mensagem não chegou a ser gravada)."""
+    if chave:
+        cache.delete(f'{PREFIX}:{chave}')
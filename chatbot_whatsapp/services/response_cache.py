@@ -0,0 +1,173 @@
+"""
+Cache das respostas do Gemini.
+
+Muitos pacientes fazem a mesma pergunta com palavras um pouco diferentes
+("que horas abre?", "Que horas abre??"). A chave é o texto normalizado
+(minúsculas, sem acentos nem pontuação, ver utils.texto):
+
+- Acerto exato: cache do Django (compartilhado entre workers via CACHE_URL),
+  por CHATBOT_RESPONSE_CACHE_TTL segundos.
+- Acerto por similaridade (opcional, desligado por padrão): LRU local do
+  processo, com até CHATBOT_RESPONSE_CACHE_SIZE entradas; compara trigramas
+  de caracteres (Jaccard) e aceita a partir de
+  CHATBOT_RESPONSE_CACHE_SIMILARITY (0 desliga). Trigramas não distinguem
+  "hepatite a" de "hepatite b", "2 anos" de "9 anos" nem "pode" de "não
+  pode": números, palavras de uma letra e negações precisam ser idênticos
+  (e na mesma ordem) para a resposta ser reaproveitada.
+
+O prompt do Gemini só depende da mensagem, então a chave basta. Acertos e
+misses ficam em contadores, ver `stats()`.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..utils.texto import normalizar_texto
+
+
+def trigramas(texto: str) -> FrozenSet[str]:
+    """Trigramas de caracteres do texto normalizado (com bordas)"""
+    texto = f' {texto} '
+    return frozenset(texto[i:i + 3] for i in range(len(texto) - 2))
+
+
+NEGACOES = {'nao', 'nem', 'nunca', 'sem', 'jamais'}
+
+
+def termos_decisivos(texto: str) -> Tuple[str, ...]:
+    """Números, palavras de uma letra e negações, na ordem do texto"""
+    return tuple(p for p in texto.split() if len(p) == 1 or p in NEGACOES or any(c.isdigit() for c in p))
+
+
+def similaridade(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ResponseCache:
+    """Cache exato (compartilhado) + LRU local com busca por similaridade."""
+
+    prefix = 'chatbot:gemini'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lru: 'OrderedDict[str, tuple]' = OrderedDict()
+
+    @staticmethod
+    def ttl() -> int:
+        return getattr(settings, 'CHATBOT_RESPONSE_CACHE_TTL', 60 * 60)
+
+    @staticmethod
+    def max_entries() -> int:
+        return getattr(settings, 'CHATBOT_RESPONSE_CACHE_SIZE', 500)
+
+    @staticmethod
+    def min_similarity() -> float:
+        return getattr(settings, 'CHATBOT_RESPONSE_CACHE_SIMILARITY', 0)
+
+    def _key(self, texto: str) -> str:
+        return f'{self.prefix}:resposta:{texto}'
+
+    def _stat_key(self, name: str) -> str:
+        return f'{self.prefix}:stats:{name}'
+
+    # ------------------------------------------------------------------
+    # LRU local (texto normalizado -> (resposta, trigramas, termos decisivos, expira_em))
+    # ------------------------------------------------------------------
+    def _lru_put(self, texto: str, resposta: str) -> None:
+        with self._lock:
+            self._lru[texto] = (resposta, trigramas(texto), termos_decisivos(texto), time.monotonic() + self.ttl())
+            self._lru.move_to_end(texto)
+            while len(self._lru) > self.max_entries():
+                self._lru.popitem(last=False)
+
+    def _lru_similar(self, texto: str) -> Optional[str]:
+        minimo = self.min_similarity()
+        if minimo <= 0:
+            return None
+        alvo = trigramas(texto)
+        decisivos = termos_decisivos(texto)
+        agora = time.monotonic()
+        melhor, melhor_score = None, minimo
+        with self._lock:
+            for chave, (resposta, grams, termos, expira_em) in list(self._lru.items()):
+                if expira_em < agora:
+                    del self._lru[chave]
+                    continue
+                if termos != decisivos:
+                    continue
+                score = similaridade(alvo, grams)
+                if score >= melhor_score:
+                    melhor, melhor_score = chave, score
+            if melhor is None:
+                return None
+            self._lru.move_to_end(melhor)
+            return self._lru[melhor][0]
+
+    # ------------------------------------------------------------------
+    # Leitura/escrita
+    # ------------------------------------------------------------------
+    def get(self, mensagem: str) -> Optional[str]:
+        """Resposta em cache para a mensagem (exata ou semelhante) ou None"""
+        texto = normalizar_texto(mensagem)
+        if not texto or self.ttl() <= 0:
+            return None
+
+        resposta = cache.get(self._key(texto))
+        if resposta is not None:
+            self._incr('hits')
+            self._lru_put(texto, resposta)
+            return resposta
+
+        resposta = self._lru_similar(texto)
+        if resposta is not None:
+            self._incr('hits_similar')
+            return resposta
+
+        self._incr('misses')
+        return None
+
+    def set(self, mensagem: str, resposta: str) -> None:
+        texto = normalizar_texto(mensagem)
+        if not texto or not resposta or self.ttl() <= 0:
+            return
+        cache.set(self._key(texto), resposta, self.ttl())
+        self._lru_put(texto, resposta)
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._lru.clear()
+
+    # ------------------------------------------------------------------
+    # Estatísticas (contadores no cache compartilhado)
+    # ------------------------------------------------------------------
+    def _incr(self, name: str) -> None:
+        key = self._stat_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, 1, None):
+                cache.incr(key)
+
+    def stats(self) -> Dict:
+        hits = cache.get(self._stat_key('hits'), 0)
+        hits_similar = cache.get(self._stat_key('hits_similar'), 0)
+        misses = cache.get(self._stat_key('misses'), 0)
+        total = hits + hits_similar + misses
+        return {
+            'hits': hits,
+            'hits_similar': hits_similar,
+            'misses': misses,
+            'hit_rate': round((hits + hits_similar) / total, 3) if total else 0.0,
+            'local_entries': len(self._lru),
+        }
+
+
+# Instância global
+response_cache = ResponseCache()
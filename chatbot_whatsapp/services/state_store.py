@@ -0,0 +1,200 @@
+"""
+Armazenamento do estado das conversas do chatbot.
+
+O MessageHandler guardava o estado em um dict do processo: com mais de um
+worker web, mensagens seguidas do mesmo chat caíam em processos diferentes e
+perdiam o fluxo, e um restart zerava todas as conversas. O estado agora fica
+em um backend compartilhado:
+
+- RedisStateStore: um hash por chat_id (estado, ultima_mensagem, dados) com TTL.
+- DatabaseStateStore: tabela chatbot_conversas (model Conversa, chat_id único).
+- MemoryStateStore: dict do processo (comportamento original; só para dev).
+
+O backend ativo é escolhido por settings.CHATBOT_STATE_BACKEND ('redis', 'db'
+ou 'memory'); vazio usa Redis quando há CACHE_URL e o banco caso contrário.
+Conversas paradas há mais de CHATBOT_STATE_TTL segundos voltam ao 'inicio'.
+"""
+
+import json
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+ESTADO_INICIAL = 'inicio'
+
+
+def _default_ttl() -> int:
+    return getattr(settings, 'CHATBOT_STATE_TTL', 24 * 60 * 60)
+
+
+def _estado_vazio() -> Dict:
+    return {'estado': ESTADO_INICIAL, 'ultima_mensagem': '', 'dados': {}}
+
+
+class BaseStateStore:
+    """
+    Interface mínima do estado de conversa.
+    O estado é um dict {'estado', 'ultima_mensagem', 'dados'}.
+    """
+
+    def __init__(self, ttl: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else _default_ttl()
+
+    def get(self, chat_id: str) -> Dict:
+        """Retorna o estado da conversa (estado inicial se não existe ou expirou)."""
+        raise NotImplementedError
+
+    def update(self, chat_id: str, **fields) -> None:
+        """Grava os campos informados e renova o TTL da conversa."""
+        raise NotImplementedError
+
+    def clear(self, chat_id: str) -> None:
+        """Descarta o estado da conversa."""
+        raise NotImplementedError
+
+    def get_estado(self, chat_id: str) -> str:
+        return self.get(chat_id)['estado'] or ESTADO_INICIAL
+
+    def set_estado(self, chat_id: str, estado: str, ultima_mensagem: Optional[str] = None) -> None:
+        fields = {'estado': estado}
+        if ultima_mensagem is not None:
+            fields['ultima_mensagem'] = ultima_mensagem
+        self.update(chat_id, **fields)
+
+
+class MemoryStateStore(BaseStateStore):
+    """Estado em memória do processo, com TTL (não compartilhado entre workers)."""
+
+    def __init__(self, ttl: Optional[int] = None):
+        super().__init__(ttl)
+        self._lock = threading.Lock()
+        self._states: Dict[str, Dict] = {}
+        self._expires: Dict[str, float] = {}
+
+    def get(self, chat_id: str) -> Dict:
+        with self._lock:
+            if self._expires.get(chat_id, 0) < time.monotonic():
+                self._states.pop(chat_id, None)
+                self._expires.pop(chat_id, None)
+                return _estado_vazio()
+            state = self._states[chat_id]
+            return {**state, 'dados': dict(state['dados'])}
+
+    def update(self, chat_id: str, **fields) -> None:
+        with self._lock:
+            state = self._states.get(chat_id) or _estado_vazio()
+            state.update(fields)
+            self._states[chat_id] = state
+            self._expires[chat_id] = time.monotonic() + self.ttl
+
+    def clear(self, chat_id: str) -> None:
+        with self._lock:
+            self._states.pop(chat_id, None)
+            self._expires.pop(chat_id, None)
+
+
+class RedisStateStore(BaseStateStore):
+    """
+    Um hash Redis por conversa ('chatbot:state:<chat_id>') com EXPIRE.
+    Atualizações gravam só os campos alterados (HSET) e renovam o TTL.
+    """
+
+    def __init__(self, url: Optional[str] = None, ttl: Optional[int] = None, prefix: str = 'chatbot:state'):
+        super().__init__(ttl)
+        import redis
+
+        url = url or getattr(settings, 'CHATBOT_STATE_REDIS_URL', '') or getattr(settings, 'CACHE_URL', '')
+        if not url:
+            raise ValueError("RedisStateStore requer CHATBOT_STATE_REDIS_URL ou CACHE_URL")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def _key(self, chat_id: str) -> str:
+        return f'{self.prefix}:{chat_id}'
+
+    def get(self, chat_id: str) -> Dict:
+        raw = self.client.hgetall(self._key(chat_id))
+        state = _estado_vazio()
+        if raw:
+            state['estado'] = raw.get('estado') or ESTADO_INICIAL
+            state['ultima_mensagem'] = raw.get('ultima_mensagem', '')
+            state['dados'] = json.loads(raw['dados']) if raw.get('dados') else {}
+        return state
+
+    def update(self, chat_id: str, **fields) -> None:
+        mapping = {
+            k: json.dumps(v, ensure_ascii=False) if k == 'dados' else ('' if v is None else str(v))
+            for k, v in fields.items()
+        }
+        mapping['atualizado_em'] = timezone.now().isoformat()
+        key = self._key(chat_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def clear(self, chat_id: str) -> None:
+        self.client.delete(self._key(chat_id))
+
+
+class DatabaseStateStore(BaseStateStore):
+    """
+    Estado na tabela chatbot_conversas (Conversa), uma linha por chat_id.
+    A expiração é aplicada na leitura, pela data_atualizacao.
+    """
+
+    @staticmethod
+    def _model():
+        from ..models import Conversa
+        return Conversa
+
+    def get(self, chat_id: str) -> Dict:
+        conversa = self._model().objects.filter(chat_id=chat_id).first()
+        if not conversa or conversa.data_atualizacao < timezone.now() - timedelta(seconds=self.ttl):
+            return _estado_vazio()
+        return {
+            'estado': conversa.estado or ESTADO_INICIAL,
+            'ultima_mensagem': conversa.ultima_mensagem,
+            'dados': conversa.dados or {},
+        }
+
+    def update(self, chat_id: str, **fields) -> None:
+        model = self._model()
+        data = {k: v for k, v in fields.items() if k in ('estado', 'ultima_mensagem', 'dados')}
+        if 'ultima_mensagem' in data and data['ultima_mensagem'] is None:
+            data['ultima_mensagem'] = ''
+        # data_atualizacao é auto_now: o update_or_create sempre renova o TTL
+        model.objects.update_or_create(chat_id=chat_id, defaults=data)
+
+    def clear(self, chat_id: str) -> None:
+        self._model().objects.filter(chat_id=chat_id).delete()
+
+    def purge_expired(self) -> int:
+        """Remove conversas paradas há mais que o TTL. Retorna quantas foram removidas."""
+        cutoff = timezone.now() - timedelta(seconds=self.ttl)
+        deleted, _ = self._model().objects.filter(data_atualizacao__lt=cutoff).delete()
+        return deleted
+
+
+BACKENDS = {
+    'redis': RedisStateStore,
+    'db': DatabaseStateStore,
+    'memory': MemoryStateStore,
+}
+
+
+def get_state_store(name: Optional[str] = None) -> BaseStateStore:
+    """Instancia o backend configurado em settings.CHATBOT_STATE_BACKEND."""
+    name = (name or getattr(settings, 'CHATBOT_STATE_BACKEND', '') or '').lower()
+    if not name:
+        name = 'redis' if getattr(settings, 'CACHE_URL', '') else 'db'
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(
+            f"CHATBOT_STATE_BACKEND inválido: '{name}'. Opções: {', '.join(BACKENDS)}"
+        )
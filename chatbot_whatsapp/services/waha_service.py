@@ -1,60 +1,249 @@
+"""
+Cliente HTTP do WAHA (WhatsApp HTTP API).
+
+- Uma requests.Session por processo, com pool de conexões keep-alive
+  (WAHA_POOL_SIZE): nada de uma conexão TCP nova por mensagem.
+- Timeout de conexão/leitura curto (WAHA_CONNECT_TIMEOUT / WAHA_READ_TIMEOUT).
+- Envios (sendText, sendButtons) não são idempotentes: só se repetem, até
+  WAHA_MAX_RETRIES vezes com backoff exponencial e jitter, quando a conexão
+  nem chegou a ser aberta. Timeout de leitura, conexão derrubada depois do
+  envio ou 5xx significam que o WAHA pode ter entregue a mensagem: o envio
+  volta marcado como incerto (`envio_incerto`) e não é repetido — nem aqui
+  nem pelo chamador —, para o paciente não receber a mesma mensagem duas
+  vezes. 4xx não se repetem.
+- Circuit breaker compartilhado pelo cache: após WAHA_CIRCUIT_FAILURES falhas
+  seguidas o circuito abre por WAHA_CIRCUIT_RESET_SECONDS e os envios falham
+  na hora (retornam None) em vez de prender workers esperando um WAHA fora do
+  ar. Passado o prazo, a próxima chamada testa o WAHA de novo.
+- enviar_em_massa: envio de campanhas/lembretes limitado a
+  WAHA_SEND_RATE_PER_MINUTE mensagens por minuto.
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 from django.conf import settings
-import os
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _sem_conexao(erro: Exception) -> bool:
+    """True se a falha foi ao abrir a conexão (o WAHA não recebeu nada)"""
+    if isinstance(erro, requests.ConnectTimeout):
+        return True
+    motivo = getattr(erro.args[0], 'reason', None) if erro.args else None
+    # NewConnectionError cobre recusa, DNS e timeout de conexão no urllib3
+    return isinstance(motivo, NewConnectionError)
+
+
+def envio_incerto(resposta) -> bool:
+    """Resposta de um envio que pode ou não ter sido entregue (não repetir)"""
+    return isinstance(resposta, dict) and bool(resposta.get('incerto'))
+
+
+def get_session() -> requests.Session:
+    """Session HTTP compartilhada pelo processo (criada no primeiro uso)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool = getattr(settings, 'WAHA_POOL_SIZE', 10)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update({'Content-Type': 'application/json'})
+                _session = session
+    return _session
+
+
+class CircuitBreaker:
+    """Circuito aberto/fechado com estado no cache (vale para todos os workers)."""
+
+    prefix = 'chatbot:waha:circuit'
+
+    @staticmethod
+    def _threshold() -> int:
+        return getattr(settings, 'WAHA_CIRCUIT_FAILURES', 5)
+
+    @staticmethod
+    def _reset_seconds() -> int:
+        return getattr(settings, 'WAHA_CIRCUIT_RESET_SECONDS', 30)
+
+    def is_open(self) -> bool:
+        return cache.get(f'{self.prefix}:open') is not None
+
+    def record_success(self) -> None:
+        cache.delete(f'{self.prefix}:failures')
+
+    def record_failure(self) -> None:
+        key = f'{self.prefix}:failures'
+        # Falhas esquecidas após alguns ciclos sem erro
+        if cache.add(key, 1, self._reset_seconds() * 10):
+            failures = 1
+        else:
+            try:
+                failures = cache.incr(key)
+            except ValueError:
+                failures = 1
+        if failures >= self._threshold():
+            if cache.add(f'{self.prefix}:open', 1, self._reset_seconds()):
+                logger.error(f"WAHA indisponível ({failures} falhas seguidas): circuito aberto por {self._reset_seconds()}s")
+
+
+class RateLimiter:
+    """Intervalo mínimo entre envios (por processo), com pequena variação aleatória."""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._next - now)
+            # WhatsApp penaliza envios em ritmo perfeitamente regular
+            self._next = max(now, self._next) + self.interval * random.uniform(1.0, 1.3)
+        if delay:
+            time.sleep(delay)
+
+
+circuit_breaker = CircuitBreaker()
+
 
 class WahaService:
     def __init__(self):
         self.base_url = getattr(settings, 'WAHA_URL', 'http://localhost:3000')
         self.session = getattr(settings, 'WAHA_SESSION', 'default')
+        self.http = get_session()
+        self.timeout = (
+            getattr(settings, 'WAHA_CONNECT_TIMEOUT', 5),
+            getattr(settings, 'WAHA_READ_TIMEOUT', 15),
+        )
+        self.max_retries = getattr(settings, 'WAHA_MAX_RETRIES', 3)
+    
+    def _post(self, endpoint, payload) -> Optional[Dict]:
+        """
+        POST de envio no WAHA, com circuit breaker.
+        Retorna o JSON da resposta; None se a mensagem certamente não foi
+        enviada; {'incerto': True, 'erro': ...} se pode ter sido (timeout de
+        leitura, conexão derrubada, 5xx) — nesse caso não há nova tentativa.
+        """
+        if circuit_breaker.is_open():
+            logger.warning(f"WAHA indisponível (circuito aberto): {endpoint} não enviado")
+            return None
+        
+        url = f"{self.base_url}{endpoint}"
+        for tentativa in range(self.max_retries + 1):
+            try:
+                response = self.http.post(url, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                erro = type(e).__name__
+                if not _sem_conexao(e):
+                    circuit_breaker.record_failure()
+                    logger.error(f"WAHA sem resposta em {endpoint} ({erro}); envio incerto, não será repetido")
+                    return {'incerto': True, 'erro': erro}
+            else:
+                if response.status_code >= 500:
+                    circuit_breaker.record_failure()
+                    logger.error(f"WAHA falhou em {endpoint} ({response.status_code}); envio incerto, não será repetido")
+                    return {'incerto': True, 'erro': str(response.status_code)}
+                circuit_breaker.record_success()
+                if not response.ok:
+                    logger.error(f"WAHA recusou {endpoint}: {response.status_code} - {response.text[:200]}")
+                    return None
+                return response.json() if response.content else {}
+            
+            # Só chega aqui se a conexão nem foi aberta: repetir é seguro
+            circuit_breaker.record_failure()
+            if tentativa >= self.max_retries or circuit_breaker.is_open():
+                break
+            # Backoff exponencial com jitter completo
+            atraso = random.uniform(0, 0.5 * (2 ** tentativa))
+            logger.warning(f"WAHA falhou em {endpoint} ({erro}); nova tentativa em {atraso:.1f}s")
+            time.sleep(atraso)
+        
+        logger.error(f"WAHA falhou em {endpoint} após {tentativa + 1} tentativa(s): {erro}")
+        return None
     
     def enviar_mensagem(self, chat_id, mensagem):
         """Envia mensagem de texto via WAHA"""
         try:
-            url = f"{self.base_url}/api/sendText"
-            payload = {
+            resultado = self._post("/api/sendText", {
                 "session": self.session,
                 "chatId": chat_id,
                 "text": mensagem
-            }
-            
-            print(f"Enviando mensagem para {chat_id}: {mensagem}")
-            
-            response = requests.post(
-                url, 
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                print("Mensagem enviada com sucesso!")
-                return response.json()
-            else:
-                print(f"Erro ao enviar mensagem: {response.status_code} - {response.text}")
-                return None
+            })
+            if resultado is not None and not envio_incerto(resultado):
+                logger.info(f"Mensagem enviada para {chat_id} ({len(mensagem)} caracteres)")
+            return resultado
                 
         except Exception as e:
-            print(f"Erro no WahaService: {e}")
+            logger.error(f"Erro no WahaService: {e}")
             return None
     
     def enviar_botoes(self, chat_id, titulo, corpo, botoes):
         """Envia mensagem com botões (se o engine suportar)"""
         try:
-            url = f"{self.base_url}/api/sendButtons"
-            payload = {
+            resultado = self._post("/api/sendButtons", {
                 "session": self.session,
                 "chatId": chat_id,
                 "title": titulo,
                 "body": corpo,
                 "buttons": botoes
-            }
-            
-            response = requests.post(url, json=payload, timeout=30)
-            return response.json()
-            
+            })
+            # Incerto também retorna: o fallback poderia duplicar a mensagem
+            if resultado is not None:
+                return resultado
         except Exception as e:
-            print(f"Erro ao enviar botões: {e}")
-            # Fallback para mensagem normal
-            mensagem = f"{titulo}\n\n{corpo}\n\nOpções: {', '.join([btn['text'] for btn in botoes])}"
-            return self.enviar_mensagem(chat_id, mensagem)
\ No newline at end of file
+            logger.error(f"Erro ao enviar botões: {e}")
+        
+        # Fallback para mensagem normal
+        mensagem = f"{titulo}\n\n{corpo}\n\nOpções: {', '.join([btn['text'] for btn in botoes])}"
+        return self.enviar_mensagem(chat_id, mensagem)
+    
+    def enviar_em_massa(self, mensagens: Iterable[Tuple[str, str]], por_minuto: Optional[int] = None) -> List[Dict]:
+        """
+        Envia várias mensagens (campanhas, lembretes) respeitando o limite de
+        envio por minuto. Com o circuito aberto o lote é interrompido e as
+        mensagens restantes voltam como não enviadas.
+        
+        Args:
+            mensagens: pares (chat_id, texto)
+            por_minuto: limite de envios (padrão WAHA_SEND_RATE_PER_MINUTE)
+        
+        Returns:
+            [{'chat_id', 'enviado', 'resposta', 'interrompido'}] na ordem
+            recebida; interrompido=True quando nem houve tentativa de envio.
+            Envio incerto conta como enviado (não deve ser repetido); ver
+            envio_incerto(resposta).
+        """
+        por_minuto = por_minuto or getattr(settings, 'WAHA_SEND_RATE_PER_MINUTE', 20)
+        limiter = RateLimiter(por_minuto)
+        resultados = []
+        interrompido = False
+        for chat_id, texto in mensagens:
+            if interrompido or circuit_breaker.is_open():
+                interrompido = True
+                resultados.append({'chat_id': chat_id, 'enviado': False, 'resposta': None, 'interrompido': True})
+                continue
+            limiter.wait()
+            resposta = self.enviar_mensagem(chat_id, texto)
+            resultados.append({'chat_id': chat_id, 'enviado': resposta is not None, 'resposta': resposta, 'interrompido': False})
+        
+        enviados = sum(1 for r in resultados if r['enviado'])
+        logger.info(f"Envio em massa: {enviados}/{len(resultados)} mensagens enviadas")
+        return resultados
@@ -0,0 +1,49 @@
+"""
+Autenticação do webhook do WAHA.
+
+A rota /chatbot/webhook/ é pública (sem sessão): sem conferir quem chama,
+qualquer um poderia fazer o worker chamar o Gemini e enviar mensagens para
+qualquer número, ou forjar eventos message.ack. Aceitamos duas formas:
+
+- HMAC do WAHA: com WHATSAPP_HOOK_HMAC_KEY no WAHA, cada webhook traz
+  X-Webhook-Hmac (hex do HMAC do corpo) e X-Webhook-Hmac-Algorithm
+  (sha512 por padrão). A chave é WAHA_WEBHOOK_HMAC_KEY.
+- Token compartilhado: cabeçalho X-Webhook-Token ou ?token= na URL do
+  webhook, igual a WAHA_WEBHOOK_TOKEN.
+
+Sem nenhuma das duas configurada, todo POST é recusado.
+"""
+
+import hashlib
+import hmac
+
+from django.conf import settings
+
+ALGORITMOS = {'sha512': hashlib.sha512, 'sha256': hashlib.sha256}
+
+
+def configurado() -> bool:
+    return bool(getattr(settings, 'WAHA_WEBHOOK_HMAC_KEY', '') or getattr(settings, 'WAHA_WEBHOOK_TOKEN', ''))
+
+
+def _hmac_valido(request, chave: str) -> bool:
+    assinatura = request.headers.get('X-Webhook-Hmac', '')
+    algoritmo = ALGORITMOS.get(request.headers.get('X-Webhook-Hmac-Algorithm', 'sha512').lower())
+    if not assinatura or algoritmo is None:
+        return False
+    esperado = hmac.new(chave.encode('utf-8'), request.body, algoritmo).hexdigest()
+    return hmac.compare_digest(esperado, assinatura.strip().lower())
+
+
+def _token_valido(request, token: str) -> bool:
+    enviado = request.headers.get('X-Webhook-Token') or request.GET.get('token') or ''
+    return bool(enviado) and hmac.compare_digest(enviado.encode('utf-8'), token.encode('utf-8'))
+
+
+def requisicao_autorizada(request) -> bool:
+    """True se o webhook traz um HMAC ou token válido"""
+    chave = getattr(settings, 'WAHA_WEBHOOK_HMAC_KEY', '')
+    if chave and _hmac_valido(request, chave):
+        return True
+    token = getattr(settings, 'WAHA_WEBHOOK_TOKEN', '')
+    return bool(token) and _token_valido(request, token)
@@ -0,0 +1,260 @@
+"""
+Tarefas Celery do chatbot WhatsApp.
+
+O webhook apenas valida, grava a MensagemRecebida e enfileira
+`processar_mensagem_recebida`; a chamada ao Gemini e o envio pelo WAHA rodam
+aqui, na fila 'chatbot' (CELERY_TASK_ROUTES), consumida por um worker próprio
+com concorrência limitada (ver docker-compose, serviço celery-chatbot).
+Os envios programados (lembretes, avisos de estoque) usam a fila 'lembretes'
+e o worker celery-lembretes, com concorrência 1 para que o limite de envios
+por minuto do WahaService valha para a campanha inteira.
+
+Ordem por conversa: duas mensagens seguidas do mesmo paciente ("não" e logo
+depois o formulário) não podem ser processadas em paralelo, senão disputam o
+estado da conversa. Cada task tenta o lock do chat_id (cache.add, compartilhado
+via CACHE_URL) e, com ele, esvazia a fila daquele chat em ordem de chegada.
+Se o lock já está com outro worker, a task apenas sai: quem detém o lock
+confere a fila de novo depois de liberá-lo, então a mensagem não fica para
+trás. Chats diferentes usam locks diferentes e rodam em paralelo.
+"""
+
+import logging
+import uuid
+from datetime import date, timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import MensagemRecebida
+from .services import lembretes
+from .services.waha_service import envio_incerto
+
+logger = logging.getLogger(__name__)
+
+# Instâncias por processo do worker (criadas no primeiro uso: o GeminiService
+# exige GEMINI_API_KEY e não deve quebrar o import do webhook)
+_handler = None
+_waha = None
+
+
+def get_handler():
+    global _handler
+    if _handler is None:
+        from .handlers.message_handler import MessageHandler
+        _handler = MessageHandler()
+    return _handler
+
+
+def get_waha():
+    global _waha
+    if _waha is None:
+        from .services.waha_service import WahaService
+        _waha = WahaService()
+    return _waha
+
+
+def enfileirar_mensagem(mensagem):
+    """Agenda o processamento; falha no broker fica para reenfileirar_mensagens_pendentes"""
+    try:
+        processar_mensagem_recebida.delay(mensagem.id)
+        return True
+    except Exception as e:
+        logger.error(f"Não foi possível enfileirar a mensagem {mensagem.id}: {e}")
+        return False
+
+
+MAX_RETRIES = 3
+LOCK_PREFIX = 'chatbot:chat-lock'
+
+
+def _lock_ttl():
+    return getattr(settings, 'CHATBOT_CHAT_LOCK_SECONDS', 120)
+
+
+def _fila_da_conversa(chat_id):
+    """Mensagens ainda não respondidas do chat, na ordem de chegada"""
+    return (
+        MensagemRecebida.objects
+        .filter(
+            chat_id=chat_id,
+            status__in=[MensagemRecebida.STATUS_PENDENTE, MensagemRecebida.STATUS_ERRO],
+            tentativas__lte=MAX_RETRIES,
+        )
+        .order_by('recebida_em', 'id')
+    )
+
+
+def _processar(mensagem):
+    """
+    Gera a resposta de uma mensagem e envia pelo WAHA.
+
+    A resposta é gravada antes do envio: se o WAHA falhar, o retry apenas
+    reenvia, sem nova chamada ao Gemini nem nova transição de estado. Só há
+    retry quando a mensagem certamente não saiu; envio incerto (timeout,
+    5xx) fica como respondida, com o aviso em `erro`.
+    """
+    mensagem.tentativas += 1
+    try:
+        if not mensagem.acao:
+            resultado = get_handler().processar_mensagem(mensagem.chat_id, mensagem.corpo)
+            mensagem.acao = resultado.get('acao') or ''
+            mensagem.resposta = resultado.get('mensagem') or ''
+            mensagem.save(update_fields=['acao', 'resposta', 'tentativas'])
+
+        mensagem.erro = None
+        if mensagem.acao in ('enviar_mensagem', 'solicitar_cadastro') and mensagem.resposta:
+            resultado = get_waha().enviar_mensagem(mensagem.chat_id, mensagem.resposta)
+            if resultado is None:
+                raise RuntimeError('WAHA não confirmou o envio')
+            if envio_incerto(resultado):
+                # O WAHA pode ter entregue: repetir arriscaria mensagem duplicada
+                mensagem.erro = f"Envio sem confirmação do WAHA ({resultado['erro']}); não repetido"
+                logger.warning(f"Mensagem {mensagem.id} de {mensagem.chat_id}: {mensagem.erro}")
+
+        mensagem.status = MensagemRecebida.STATUS_RESPONDIDA
+        mensagem.processada_em = timezone.now()
+        mensagem.save(update_fields=['status', 'erro', 'processada_em', 'tentativas'])
+
+    except Exception as e:
+        logger.exception(f"Erro ao processar mensagem {mensagem.id} de {mensagem.chat_id}: {e}")
+        mensagem.status = MensagemRecebida.STATUS_ERRO
+        mensagem.erro = str(e)
+        mensagem.save(update_fields=['status', 'erro', 'tentativas'])
+        raise
+
+
+def _esvaziar_conversa(chat_id, lock_key):
+    """
+    Processa, em ordem, as mensagens pendentes do chat enquanto detém o lock.
+    Para na primeira falha (as seguintes esperam o retry dela).
+    Retorna (ids processados, (mensagem, exceção) da falha ou None).
+    """
+    processadas = []
+    while True:
+        mensagem = _fila_da_conversa(chat_id).first()
+        if mensagem is None:
+            return processadas, None
+
+        claimed = MensagemRecebida.objects.filter(
+            pk=mensagem.pk,
+            status__in=[MensagemRecebida.STATUS_PENDENTE, MensagemRecebida.STATUS_ERRO],
+        ).update(status=MensagemRecebida.STATUS_PROCESSANDO)
+        if not claimed:
+            return processadas, None
+        mensagem.status = MensagemRecebida.STATUS_PROCESSANDO
+
+        try:
+            _processar(mensagem)
+        except Exception as e:
+            return processadas, (mensagem, e)
+        processadas.append(mensagem.id)
+        # Renova o lock a cada mensagem: conversas longas não o perdem no meio
+        cache.touch(lock_key, _lock_ttl())
+
+
+@shared_task(bind=True, max_retries=MAX_RETRIES)
+def processar_mensagem_recebida(self, mensagem_id):
+    """
+    Processa a fila da conversa a que a mensagem pertence, em ordem.
+
+    Sem o lock do chat, a task sai ('deferred'): o worker que o detém vai
+    processar esta mensagem depois das anteriores.
+    """
+    mensagem = MensagemRecebida.objects.filter(pk=mensagem_id).only('chat_id', 'status').first()
+    if mensagem is None or mensagem.status == MensagemRecebida.STATUS_RESPONDIDA:
+        return {'status': 'ignored', 'mensagem_id': mensagem_id}
+
+    chat_id = mensagem.chat_id
+    lock_key = f'{LOCK_PREFIX}:{chat_id}'
+    processadas = []
+
+    while True:
+        token = uuid.uuid4().hex
+        if not cache.add(lock_key, token, _lock_ttl()):
+            return {'status': 'deferred', 'mensagem_id': mensagem_id, 'processadas': processadas}
+        try:
+            feitas, falha = _esvaziar_conversa(chat_id, lock_key)
+            processadas.extend(feitas)
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+        if falha is not None:
+            falhou, erro = falha
+            if falhou.tentativas <= MAX_RETRIES:
+                raise self.retry(exc=erro, countdown=5 * (2 ** self.request.retries))
+            # Tentativas esgotadas: fica em 'erro' e a conversa segue
+            logger.error(f"Mensagem {falhou.id} de {chat_id} descartada após {falhou.tentativas} tentativas")
+
+        # Mensagem que chegou enquanto o lock era liberado (a task dela saiu
+        # como 'deferred'): confere de novo antes de terminar
+        if not _fila_da_conversa(chat_id).exists():
+            return {'status': 'success', 'mensagem_id': mensagem_id, 'processadas': processadas}
+
+
+@shared_task
+def reenfileirar_mensagens_pendentes(minutos=5):
+    """
+    Reenfileira mensagens que ficaram pendentes (broker fora do ar no webhook),
+    presas em 'processando' (worker morto) ou em 'erro' com tentativas
+    restantes há mais de `minutos`.
+    """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    presas = MensagemRecebida.objects.filter(status=MensagemRecebida.STATUS_PROCESSANDO, recebida_em__lt=limite)
+    presas.update(status=MensagemRecebida.STATUS_PENDENTE)
+
+    pendentes = list(
+        MensagemRecebida.objects
+        .filter(
+            status__in=[MensagemRecebida.STATUS_PENDENTE, MensagemRecebida.STATUS_ERRO],
+            tentativas__lte=MAX_RETRIES,
+            recebida_em__lt=limite,
+        )
+        .order_by('recebida_em')
+    )
+    # Uma task por conversa basta: ela esvazia a fila do chat em ordem
+    primeiras = {}
+    for mensagem in pendentes:
+        primeiras.setdefault(mensagem.chat_id, mensagem)
+    for mensagem in primeiras.values():
+        enfileirar_mensagem(mensagem)
+    if pendentes:
+        logger.warning(f"{len(pendentes)} mensagens do chatbot reenfileiradas ({len(primeiras)} conversas)")
+    return {'requeued': len(pendentes), 'chats': len(primeiras)}
+
+
+@shared_task
+def disparar_envios_programados():
+    """
+    Divide os envios pendentes em lotes e agenda um enviar_lote_programado por
+    lote (fila 'lembretes': não disputa workers com as respostas do chatbot)
+    """
+    lotes = lembretes.lotes_pendentes()
+    for ids in lotes:
+        enviar_lote_programado.delay(ids)
+    return {'lotes': len(lotes), 'envios': sum(len(ids) for ids in lotes)}
+
+
+@shared_task
+def preparar_lembretes_agendamento(dia=None):
+    """Grava os lembretes de amanhã (ou de `dia`, 'YYYY-MM-DD') e dispara os envios"""
+    resultado = lembretes.preparar_lembretes(date.fromisoformat(dia) if dia else None)
+    logger.info(f"Lembretes de {resultado['dia']}: {resultado['criados']} novos, {resultado['sem_telefone']} sem telefone")
+    resultado['disparo'] = disparar_envios_programados()
+    return resultado
+
+
+@shared_task
+def preparar_avisos_estoque_baixo():
+    """Avisa a equipe (CHATBOT_STAFF_CHAT_IDS) das vacinas abaixo do mínimo"""
+    resultado = lembretes.preparar_avisos_estoque()
+    resultado['disparo'] = disparar_envios_programados()
+    return resultado
+
+
+@shared_task
+def enviar_lote_programado(ids):
+    """Envia um lote de EnvioProgramado pelo WAHA (com limite de envios por minuto)"""
+    return lembretes.enviar_lote(ids, get_waha())
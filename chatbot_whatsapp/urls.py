@@ -3,5 +3,6 @@ from . import views
 
 urlpatterns = [
     path('webhook/whatsapp/', views.webhook_whatsapp, name='webhook_whatsapp'),
+    path('stats/', views.estatisticas, name='chatbot_stats'),
     path('dashboard/', views.dashboard, name='chatbot_dashboard'),
 ]
\ No newline at end of file
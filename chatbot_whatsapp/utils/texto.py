@@ -0,0 +1,66 @@
+import re
+import unicodedata
+
+_NAO_ALFANUMERICO = re.compile(r'[^a-z0-9\s]')
+_ESPACOS = re.compile(r'\s+')
+_NAO_DIGITO = re.compile(r'\D')
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sem acentos nem pontuação e com espaços simples"""
+    texto = unicodedata.normalize('NFKD', str(texto or '').lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = _NAO_ALFANUMERICO.sub(' ', texto)
+    return _ESPACOS.sub(' ', texto).strip()
+
+
+def tokens(texto):
+    """Palavras do texto normalizado"""
+    return normalizar_texto(texto).split()
+
+
+def chat_id_do_telefone(telefone, ddi='55'):
+    """
+    Converte um telefone ('(11) 99999-9999', '+55 11 99999-9999') no chat_id
+    do WhatsApp ('5511999999999@c.us'). Retorna '' se não houver dígitos suficientes.
+    """
+    digitos = _NAO_DIGITO.sub('', str(telefone or ''))
+    if len(digitos) in (10, 11):
+        digitos = ddi + digitos
+    if len(digitos) < 12:
+        return ''
+    return f'{digitos}@c.us'
+
+
+def normalizar_cpf(cpf):
+    """Apenas os dígitos do CPF"""
+    return _NAO_DIGITO.sub('', str(cpf or ''))
+
+
+def normalizar_telefone(telefone, ddi='55'):
+    """DDD + número, só dígitos ('+55 (11) 99999-9999' -> '11999999999')"""
+    digitos = _NAO_DIGITO.sub('', str(telefone or ''))
+    if len(digitos) in (12, 13) and digitos.startswith(ddi):
+        digitos = digitos[len(ddi):]
+    return digitos
+
+
+RESPOSTAS_SIM = frozenset({'sim', 's', 'ss', 'sin', 'yes', 'claro', 'ja', 'isso', 'positivo', 'afirmativo', 'aham', 'uhum'})
+RESPOSTAS_NAO = frozenset({'nao', 'n', 'nn', 'no', 'nunca', 'negativo', 'nope', 'jamais'})
+# Comparação sem normalizar acentos (mais rápida): as grafias acentuadas entram nos conjuntos
+_SIM = RESPOSTAS_SIM | {'já'}
+_NAO = RESPOSTAS_NAO | {'não', 'nã'}
+_PALAVRA = re.compile(r'\w+')
+
+
+def sim_ou_nao(texto):
+    """
+    Resposta sim/não por palavras inteiras: True (sim), False (não) ou None
+    (nenhuma das duas, ou as duas ao mesmo tempo)
+    """
+    palavras = set(_PALAVRA.findall(str(texto or '').lower()))
+    sim = not palavras.isdisjoint(_SIM)
+    nao = not palavras.isdisjoint(_NAO)
+    if sim == nao:
+        return None
+    return sim
@@ -1,55 +1,132 @@
 import json
+import logging
+from django.core.cache import cache
+from django.db import IntegrityError
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import render
-from .handlers.message_handler import MessageHandler
-from .services.waha_service import WahaService
+from .models import MensagemRecebida
+from .services import lembretes, message_dedup, webhook_auth
+from .services.intent_classifier import intent_classifier
+from .services.response_cache import response_cache
+from .tasks import enfileirar_mensagem
+
+logger = logging.getLogger(__name__)
+
+
+def _extrair_mensagem(data):
+    """
+    Extrai chat_id, texto e id da mensagem do corpo do webhook.
+    Aceita o formato do WAHA ({'event', 'session', 'payload': {...}}) e o
+    formato simples ({'chatId'/'from', 'body'}).
+    """
+    payload = data.get('payload') if isinstance(data.get('payload'), dict) else data
+    return {
+        'chat_id': payload.get('chatId') or payload.get('from'),
+        'mensagem': payload.get('body', '') or '',
+        'message_id': str(payload.get('id') or ''),
+        'timestamp': payload.get('timestamp'),
+        'from_me': bool(payload.get('fromMe')),
+    }
+
+
+def _evento_mensagem(data):
+    """Mensagem recebida: deduplica pelo id, grava e enfileira a resposta"""
+    dados = _extrair_mensagem(data)
+    chat_id = dados['chat_id']
+    mensagem = dados['mensagem']
+    
+    if dados['from_me']:
+        return JsonResponse({'status': 'ignored', 'processed': False})
+    
+    if not chat_id or not mensagem:
+        return JsonResponse({'error': 'chatId and body are required'}, status=400)
+    
+    # Reentregas do WAHA: 200 sem gravar nem responder de novo
+    chave = message_dedup.chave_mensagem(dados['message_id'], chat_id, mensagem, dados['timestamp'])
+    if not message_dedup.primeira_vez(chave):
+        logger.info(f"Mensagem duplicada ignorada: {chave}")
+        return JsonResponse({'status': 'duplicate', 'processed': False})
+    
+    # Gravar e enfileirar
+    try:
+        recebida = MensagemRecebida.objects.create(
+            message_id=chave or '',
+            chat_id=chat_id,
+            corpo=mensagem,
+        )
+    except IntegrityError:
+        logger.info(f"Mensagem duplicada ignorada (banco): {chave}")
+        return JsonResponse({'status': 'duplicate', 'processed': False})
+    except Exception:
+        message_dedup.esquecer(chave)
+        raise
+    queued = enfileirar_mensagem(recebida)
+    
+    return JsonResponse({'status': 'success', 'queued': queued, 'id': recebida.id})
+
+
+def _evento_ack(data):
+    """Confirmação de entrega/leitura de mensagem enviada: atualiza o envio programado"""
+    payload = data.get('payload') if isinstance(data.get('payload'), dict) else {}
+    atualizados = lembretes.registrar_ack(str(payload.get('id') or ''), payload.get('ack'))
+    return JsonResponse({'status': 'success', 'event': 'message.ack', 'updated': atualizados})
+
+
+def _evento_sessao(data):
+    """Status da sessão do WAHA (WORKING, SCAN_QR_CODE, FAILED...): guardado no cache"""
+    payload = data.get('payload') if isinstance(data.get('payload'), dict) else {}
+    status = payload.get('status') or ''
+    cache.set(f"chatbot:waha:session:{data.get('session', 'default')}", status, None)
+    logger.info(f"Sessão WAHA {data.get('session', 'default')}: {status}")
+    return JsonResponse({'status': 'success', 'event': 'session.status'})
+
+
+# Roteamento por evento do WAHA; só 'message' chega ao Gemini (via task)
+EVENT_HANDLERS = {
+    'message': _evento_mensagem,
+    'message.ack': _evento_ack,
+    'session.status': _evento_sessao,
+}
 
-# Instâncias globais
-handler = MessageHandler()
-waha = WahaService()
 
 @csrf_exempt
 def webhook_whatsapp(request):
     """
     Webhook que recebe mensagens do WAHA
     URL: http://your-domain.com/chatbot/webhook/whatsapp/
+    
+    Apenas valida, grava a mensagem e enfileira o processamento
+    (tasks.processar_mensagem_recebida): a resposta do Gemini e o envio pelo
+    WAHA acontecem no worker, fora da requisição. Eventos que não são
+    mensagens são tratados aqui mesmo, sem passar pela IA.
+    Só aceita POST autenticado pelo HMAC do WAHA ou pelo token compartilhado
+    (services/webhook_auth).
     """
     if request.method == 'POST':
+        if not webhook_auth.configurado():
+            logger.error("Webhook recusado: configure WAHA_WEBHOOK_HMAC_KEY ou WAHA_WEBHOOK_TOKEN")
+            return JsonResponse({'error': 'Webhook authentication not configured'}, status=403)
+        if not webhook_auth.requisicao_autorizada(request):
+            logger.warning(f"Webhook recusado: assinatura/token inválido ({request.META.get('REMOTE_ADDR')})")
+            return JsonResponse({'error': 'Invalid webhook signature'}, status=401)
+
         try:
-            # Log para debug
-            print("=== WEBHOOK RECEBIDO ===")
-            
             # Obter dados do request
             if request.content_type == 'application/json':
                 data = json.loads(request.body)
             else:
                 return JsonResponse({'error': 'Content-Type must be application/json'}, status=400)
             
-            print("Dados recebidos:", json.dumps(data, indent=2))
-            
-            # Extrair informações
-            chat_id = data.get('chatId') or data.get('from')
-            mensagem = data.get('body', '')
-            session = data.get('session', 'default')
-            
-            if not chat_id or not mensagem:
-                return JsonResponse({'error': 'chatId and body are required'}, status=400)
-            
-            # Processar mensagem
-            resultado = handler.processar_mensagem(chat_id, mensagem)
-            print("Resultado do processamento:", resultado)
-            
-            # Executar ação
-            if resultado.get('acao') == 'enviar_mensagem':
-                waha.enviar_mensagem(chat_id, resultado['mensagem'])
-            
-            elif resultado.get('acao') == 'solicitar_cadastro':
-                waha.enviar_mensagem(chat_id, resultado['mensagem'])
-                handler.estados[chat_id] = 'aguardando_cadastro'
-            
-            return JsonResponse({'status': 'success', 'processed': True})
+            # Sem 'event' é o formato simples (sempre uma mensagem)
+            evento = data.get('event') or 'message'
+            handler = EVENT_HANDLERS.get(evento)
+            if handler is None:
+                return JsonResponse({'status': 'ignored', 'event': evento})
+            return handler(data)
             
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
         except Exception as e:
             print(f"Erro no webhook: {str(e)}")
             return JsonResponse({'error': str(e)}, status=500)
@@ -60,6 +137,17 @@ def webhook_whatsapp(request):
     
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
+def estatisticas(request):
+    """
+    Métricas do chatbot em JSON
+    GET /chatbot/stats/
+    """
+    return JsonResponse({
+        'status': 'success',
+        'intencoes': intent_classifier.stats(),
+        'respostas_gemini': response_cache.stats(),
+    })
+
 def dashboard(request):
     """Dashboard para monitorar o chatbot"""
-    return render(request, 'chatbot/dashboard.html')
\ No newline at end of file
+    return render(request, 'chatbot/dashboard.html')
@@ -22,6 +22,8 @@ except ImportError:
 
 from web_scraping.utils.browser_manager import BrowserManager
 from web_scraping.services.patient_registration_scraper import PatientRegistrationScraper
+from web_scraping.services.registration_metrics import record_registration_attempt
+from web_scraping.services import registration_pipeline
 from web_scraping.models import (
     ProcessedGoogleFormSubmission,
     PatientRegistrationLog,
@@ -32,18 +34,23 @@ logger = logging.getLogger(__name__)
 
 
 @shared_task(bind=True, max_retries=3)
-def sync_google_forms_and_register_patients(self):
+def sync_google_forms_and_register_patients(self, full_rescan=False):
     """
     Sincroniza respostas do Google Forms e registra automaticamente os pacientes
     na plataforma GoC Franquias.
     
     Flow:
-    1. Coleta respostas do Google Forms
-    2. Para cada resposta nova:
+    1. Devolve à fila submissões presas em 'processando' (worker morto)
+    2. Lê da planilha apenas as linhas novas e grava como submissões pendentes
+    3. Para cada submissão da fila (registration_pipeline):
        - Valida dados
        - Verifica duplicata por CPF
        - Faz login e preenche formulário automaticamente
        - Registra resultado
+       com checkpoint persistido após cada etapa
+    
+    Args:
+        full_rescan: relê a planilha inteira em vez de continuar da última linha
     
     Retorno:
         dict com estatísticas da sincronização
@@ -60,20 +67,35 @@ def sync_google_forms_and_register_patients(self):
         )
         logger.info(f"Iniciando sincronização #{sync_record.id}")
         
-        # 1. Coletar respostas do Google Forms
-        forms_responses = _collect_google_forms_responses()
-        if not forms_responses:
-            logger.warning("Nenhuma resposta encontrada no Google Forms")
+        requeued = registration_pipeline.requeue_stale()
+        
+        # 1. Coletar respostas novas do Google Forms e enfileirar
+        start_row = 2 if full_rescan else _next_sheet_row()
+        forms_responses, last_row = _collect_google_forms_responses(start_row)
+        new_submissions = registration_pipeline.ingest_responses(forms_responses)
+        sync_record.total_new_responses = new_submissions
+        sync_record.last_sheet_row = last_row if last_row is not None else start_row - 1
+        sync_record.save(update_fields=['total_new_responses', 'last_sheet_row'])
+        
+        logger.info(
+            f"{len(forms_responses)} respostas lidas a partir da linha {start_row}, "
+            f"{new_submissions} novas submissões"
+        )
+        
+        queue = registration_pipeline.pending_queue()
+        if not queue:
+            logger.info("Nenhuma submissão pendente")
             sync_record.status = 'completed'
-            sync_record.total_new_responses = 0
+            sync_record.duration_seconds = int((datetime.now() - start_time).total_seconds())
             sync_record.save()
             return {
                 'status': 'completed',
-                'message': 'Nenhuma resposta encontrada',
-                'sync_id': sync_record.id
+                'message': 'Nenhuma submissão pendente',
+                'sync_id': sync_record.id,
+                'requeued': requeued
             }
         
-        logger.info(f"Encontradas {len(forms_responses)} respostas no Google Forms")
+        logger.info(f"{len(queue)} submissões na fila")
         
         # 2. Inicializar browser
         browser = BrowserManager()
@@ -82,77 +104,54 @@ def sync_google_forms_and_register_patients(self):
         if not browser.driver:
             raise Exception("Falha ao inicializar navegador após 3 tentativas")
         
-        # 3. Processar cada resposta
+        # 3. Processar cada submissão da fila
         scraper = PatientRegistrationScraper(browser)
         
         successfully_registered = 0
         duplicates_found = 0
         errors = 0
+        processed = 0
         
-        for form_data in forms_responses:
+        for submission_id in queue:
+            submission = registration_pipeline.claim(submission_id)
+            if submission is None:
+                continue  # Outro worker pegou ou já foi concluída
+            
+            processed += 1
+            cpf = submission.cpf
+            full_name = submission.full_name
+            
             try:
-                cpf = form_data.get('CPF', '').strip()
-                email = form_data.get('E-mail', '').strip()
-                full_name = form_data.get('Nome completo', '').strip()
-                
-                if not cpf:
-                    logger.warning(f"Resposta sem CPF - pulando")
-                    continue
-                
-                # Verificar se já foi processada
-                submission, created = ProcessedGoogleFormSubmission.objects.get_or_create(
-                    cpf=cpf,
-                    defaults={
-                        'email': email,
-                        'full_name': full_name,
-                        'raw_form_data': form_data,
-                        'status': 'pending'
-                    }
-                )
-                
-                if not created and submission.status in ['success', 'duplicate']:
-                    logger.info(f"CPF {cpf} já foi processado - pulando")
-                    duplicates_found += 1
-                    continue
-                
-                # Atualizar status para processando
-                submission.status = 'processing'
-                submission.attempts += 1
-                submission.last_attempt_at = timezone.now()
-                submission.save()
-                
-                logger.info(f"Processando: {full_name} (CPF: {cpf})")
-                
-                # Registrar paciente
-                result = scraper.register_patient_from_google_forms(form_data)
+                if submission.stage == ProcessedGoogleFormSubmission.STAGE_CONFIRMED:
+                    # Cadastro confirmado antes da queda do worker; só faltou encerrar
+                    result = {'success': True, 'message': 'Cadastro já confirmado', 'patient_id': None}
+                else:
+                    if submission.stage:
+                        logger.info(f"Retomando: {full_name} (CPF: {cpf}) após etapa '{submission.stage}'")
+                    else:
+                        logger.info(f"Processando: {full_name} (CPF: {cpf})")
+                    
+                    # Registrar paciente
+                    result = scraper.register_patient_from_google_forms(
+                        submission.raw_form_data or {},
+                        resume_from=submission.stage,
+                        checkpoint=registration_pipeline.checkpoint_callback(submission),
+                    )
+                    
+                    # Registrar tentativa (um log por etapa, com duração)
+                    record_registration_attempt(submission, submission.attempts, result, scraper.step_timings)
                 
-                # Registrar tentativa
-                PatientRegistrationLog.objects.create(
-                    submission=submission,
-                    attempt_number=submission.attempts,
-                    success=result['success'],
-                    message=result['message'],
-                    step='form_submit'
-                )
+                status = registration_pipeline.finish(submission, result)
                 
-                if result['success']:
-                    submission.status = 'success'
-                    submission.patient_id_in_platform = result.get('patient_id')
+                if status == 'success':
                     successfully_registered += 1
                     logger.info(f"✅ Paciente {full_name} registrado com sucesso (ID: {result.get('patient_id')})")
+                elif status == 'duplicate':
+                    duplicates_found += 1
+                    logger.warning(f"⚠️ Paciente {full_name} - Duplicata detectada")
                 else:
-                    # Verificar se é duplicata
-                    if 'duplicado' in result['message'].lower() or 'já existe' in result['message'].lower():
-                        submission.status = 'duplicate'
-                        duplicates_found += 1
-                        logger.warning(f"⚠️ Paciente {full_name} - Duplicata detectada")
-                    else:
-                        submission.status = 'error'
-                        submission.error_message = result['message']
-                        errors += 1
-                        logger.error(f"❌ Erro ao registrar {full_name}: {result['message']}")
-                
-                submission.save()
+                    errors += 1
+                    logger.error(f"❌ Erro ao registrar {full_name}: {result['message']}")
                 
                 # Pequeno delay entre registros
                 time.sleep(2)
@@ -162,17 +161,14 @@ def sync_google_forms_and_register_patients(self):
                 errors += 1
                 
                 try:
-                    submission.status = 'error'
-                    submission.error_message = str(e)
-                    submission.save()
+                    registration_pipeline.finish(submission, {'success': False, 'message': str(e)})
                     
-                    PatientRegistrationLog.objects.create(
-                        submission=submission,
-                        attempt_number=submission.attempts,
-                        success=False,
-                        message=f"Erro durante processamento",
+                    record_registration_attempt(
+                        submission,
+                        submission.attempts,
+                        {'success': False, 'message': "Erro durante processamento"},
+                        scraper.step_timings,
                         error_details=str(e),
-                        step='form_submit'
                     )
                 except:
                     pass
@@ -182,7 +178,6 @@ def sync_google_forms_and_register_patients(self):
         duration = (end_time - start_time).total_seconds()
         
         sync_record.status = 'completed'
-        sync_record.total_new_responses = len(forms_responses)
         sync_record.successfully_registered = successfully_registered
         sync_record.duplicates_found = duplicates_found
         sync_record.errors = errors
@@ -202,7 +197,9 @@ def sync_google_forms_and_register_patients(self):
         return {
             'status': 'completed',
             'sync_id': sync_record.id,
-            'total_processed': len(forms_responses),
+            'total_processed': processed,
+            'new_submissions': new_submissions,
+            'requeued': requeued,
             'successfully_registered': successfully_registered,
             'duplicates_found': duplicates_found,
             'errors': errors,
@@ -228,17 +225,42 @@ def sync_google_forms_and_register_patients(self):
                 pass
 
 
-def _collect_google_forms_responses():
+@shared_task
+def requeue_stale_registrations():
+    """
+    Devolve à fila submissões presas em 'processando' além do prazo
+    (GOOGLE_FORMS_REGISTRATION_LEASE_SECONDS), para serem retomadas do checkpoint
+    """
+    return {'requeued': registration_pipeline.requeue_stale()}
+
+
+def _next_sheet_row():
+    """Primeira linha da planilha ainda não ingerida (2 = logo após o cabeçalho)"""
+    last = (
+        GoogleFormsSync.objects
+        .filter(last_sheet_row__isnull=False)
+        .order_by('-synced_at', '-id')
+        .values_list('last_sheet_row', flat=True)
+        .first()
+    )
+    return (last or 1) + 1
+
+
+def _collect_google_forms_responses(start_row=2):
     """
     Coleta respostas do Google Forms via Google Sheets API
     
+    Args:
+        start_row: primeira linha de dados a ler (1 é o cabeçalho)
+    
     Returns:
-        list: Lista de dicionários com dados das respostas
+        tuple: (lista de dicionários com dados das respostas,
+                última linha lida ou None se a leitura falhou)
     """
     
     if service_account is None or build is None:
         logger.error('Google API libraries not installed')
-        return []
+        return [], None
     
     try:
         service_account_file = getattr(settings, 'GOOGLE_SERVICE_ACCOUNT_FILE', None) or os.environ.get('GOOGLE_SERVICE_ACCOUNT_FILE')
@@ -247,7 +269,7 @@ def _collect_google_forms_responses():
         
         if not service_account_file or not sheet_id:
             logger.error('Google Forms configuration missing')
-            return []
+            return [], None
         
         # Resolver caminho
         if not os.path.isabs(service_account_file):
@@ -255,7 +277,7 @@ def _collect_google_forms_responses():
         
         if not os.path.isfile(service_account_file):
             logger.error(f'Service account file not found: {service_account_file}')
-            return []
+            return [], None
         
         # Autenticar
         scopes = ['https://www.googleapis.com/auth/spreadsheets.readonly']
@@ -274,23 +296,27 @@ def _collect_google_forms_responses():
         
         if not target_sheet:
             logger.error(f'Sheet "{sheet_name}" not found')
-            return []
+            return [], None
         
-        # Ler dados
+        # Ler cabeçalho e apenas as linhas a partir de start_row (uma requisição)
         sheet_title = target_sheet['properties']['title']
-        result = service.spreadsheets().values().get(
+        result = service.spreadsheets().values().batchGet(
             spreadsheetId=sheet_id,
-            range=f"{sheet_title}!A:Z"
+            ranges=[f"{sheet_title}!A1:Z1", f"{sheet_title}!A{start_row}:Z"]
         ).execute()
         
-        rows = result.get('values', [])
-        if not rows:
-            return []
+        header_range, data_range = result.get('valueRanges', [{}, {}])
+        header_rows = header_range.get('values', [])
+        rows = data_range.get('values', [])
+        if not header_rows or not rows:
+            return [], start_row - 1
         
         # Converter para dicionários
-        headers = rows[0]
+        headers = header_rows[0]
         data = []
-        for row in rows[1:]:
+        for row in rows:
+            if not any(cell.strip() for cell in row):
+                continue
             while len(row) < len(headers):
                 row.append('')
             data.append(dict(zip(headers, row)))
@@ -299,11 +325,11 @@ def _collect_google_forms_responses():
         data = _deduplicate_by_cpf(data)
         
         logger.info(f"Coletadas {len(data)} respostas únicas do Google Forms")
-        return data
+        return data, start_row + len(rows) - 1
         
     except Exception as e:
         logger.exception(f"Erro ao coletar respostas do Google Forms: {str(e)}")
-        return []
+        return [], None
 
 
 def _deduplicate_by_cpf(responses):
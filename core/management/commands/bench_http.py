@@ -0,0 +1,151 @@
+"""
+Comando Django para medir requisições/s do servidor web (runserver x gunicorn)
+Uso:
+  python manage.py bench_http
+  python manage.py bench_http --url http://localhost:8000 --requests 500 --concurrency 20
+  python manage.py bench_http --url http://localhost:8001 --url http://localhost:8000
+  python manage.py bench_http --path / --path /chatbot/stats/
+
+Cada --url é medida com os mesmos caminhos (padrão: dashboard e endpoints JSON)
+e, com mais de uma, o resumo compara cada uma com a primeira ("antes").
+Para comparar os modos, suba o mesmo código duas vezes:
+  APP_MODE=dev  -> python manage.py runserver 0.0.0.0:8001
+  APP_MODE=prod -> gunicorn vacination_system.wsgi:application -c gunicorn.conf.py
+
+As páginas exigem login: o comando grava uma sessão autenticada do usuário
+--username no banco (o servidor medido precisa usar o mesmo banco) e a remove
+no fim. Os requests levam X-Forwarded-Proto: https, como atrás do proxy, para
+que o redirecionamento HTTPS de DEBUG=False não conte no lugar da página.
+"""
+
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+from user_auth.user_manager import user_manager
+
+DEFAULT_PATHS = ['/', '/scraping/stock-data/', '/chatbot/stats/', '/scraping/sync-status/']
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+class Command(BaseCommand):
+    help = 'Teste de carga HTTP do dashboard e dos endpoints JSON (requisições/s, p50, p95)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', default=None,
+                            help='Servidor a medir (repita para comparar; padrão http://localhost:8000)')
+        parser.add_argument('--path', action='append', default=None,
+                            help=f'Caminho a medir (repita; padrão {" ".join(DEFAULT_PATHS)})')
+        parser.add_argument('--requests', type=int, default=200, help='Requisições por caminho')
+        parser.add_argument('--concurrency', type=int, default=10, help='Clientes simultâneos')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Timeout por requisição (segundos)')
+        parser.add_argument('--username', type=str, default=None,
+                            help='Usuário da sessão autenticada (padrão SUPERADMIN_USERNAME)')
+
+    def handle(self, *args, **options):
+        urls = [u.rstrip('/') for u in (options['url'] or ['http://localhost:8000'])]
+        paths = options['path'] or DEFAULT_PATHS
+        total = options['requests']
+        concurrency = options['concurrency']
+        if total < 1 or concurrency < 1:
+            raise CommandError('❌ --requests e --concurrency devem ser maiores que zero')
+
+        username = options['username'] or getattr(settings, 'SUPERADMIN_USERNAME', 'admin')
+        user = user_manager.get_user_by_username(username)
+        if not user:
+            raise CommandError(f'❌ Usuário "{username}" não encontrado')
+
+        session = SessionStore()
+        session['user_authenticated'] = True
+        session['user'] = {**user, 'must_change_password': False}
+        session['username'] = username
+        session.create()
+        self.headers = {
+            'Cookie': f'{settings.SESSION_COOKIE_NAME}={session.session_key}',
+            'X-Forwarded-Proto': 'https',
+        }
+        self.timeout = options['timeout']
+        self._local = threading.local()
+
+        resultados = {}
+        try:
+            for url in urls:
+                self.stdout.write(f'\n🚀 {url}  ({total} requisições por caminho, {concurrency} clientes)')
+                for path in paths:
+                    self._conferir(url, path)
+                    r = self._medir(url + path, total, concurrency)
+                    resultados[(url, path)] = r
+                    self.stdout.write(
+                        f'  {path:<30} {r["rps"]:>8.1f} req/s   p50 {r["p50"]:>7.1f} ms   '
+                        f'p95 {r["p95"]:>7.1f} ms   erros {r["erros"]}'
+                    )
+        finally:
+            session.delete()
+
+        if len(urls) > 1:
+            base = urls[0]
+            self.stdout.write(f'\n📊 Comparação com {base}')
+            for url in urls[1:]:
+                for path in paths:
+                    antes, depois = resultados[(base, path)], resultados[(url, path)]
+                    ganho = depois['rps'] / antes['rps'] if antes['rps'] else 0
+                    self.stdout.write(
+                        f'  {path:<30} {antes["rps"]:>8.1f} -> {depois["rps"]:>8.1f} req/s  ({ganho:.2f}x)  '
+                        f'p95 {antes["p95"]:.1f} -> {depois["p95"]:.1f} ms'
+                    )
+
+        erros = sum(r['erros'] for r in resultados.values())
+        if erros:
+            raise CommandError(f'❌ {erros} requisição(ões) falharam ou não retornaram 200')
+        self.stdout.write(self.style.SUCCESS('\n✅ Teste de carga concluído'))
+
+    def _client(self):
+        # Uma sessão HTTP por thread: mantém a conexão aberta (keep-alive)
+        if not hasattr(self._local, 'client'):
+            self._local.client = requests.Session()
+            self._local.client.headers.update(self.headers)
+        return self._local.client
+
+    def _conferir(self, url, path):
+        """Uma requisição antes da medição: falha cedo se o servidor não responde ou redireciona"""
+        try:
+            resposta = requests.get(url + path, headers=self.headers, timeout=self.timeout, allow_redirects=False)
+        except requests.RequestException as e:
+            raise CommandError(f'❌ {url} não respondeu: {e}')
+        if resposta.status_code != 200:
+            destino = resposta.headers.get('Location', '')
+            raise CommandError(f'❌ {url}{path} retornou {resposta.status_code} {destino}'.rstrip())
+
+    def _requisitar(self, url):
+        inicio = time.perf_counter()
+        try:
+            resposta = self._client().get(url, timeout=self.timeout, allow_redirects=False)
+            ok = resposta.status_code == 200
+        except requests.RequestException:
+            ok = False
+        return ok, (time.perf_counter() - inicio) * 1000
+
+    def _medir(self, url, total, concurrency):
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            respostas = list(pool.map(self._requisitar, [url] * total))
+        duracao = time.perf_counter() - inicio
+
+        tempos = [ms for ok, ms in respostas if ok]
+        erros = total - len(tempos)
+        return {
+            'rps': len(tempos) / duracao if duracao else 0,
+            'p50': statistics.median(tempos) if tempos else 0,
+            'p95': _percentil(tempos, 0.95) if tempos else 0,
+            'erros': erros,
+        }
@@ -0,0 +1,60 @@
+"""
+Comando Django para importar o estoque interno (data/vaccines.json) para a tabela core.Vaccine
+Uso:
+  python manage.py import_stock_json
+  python manage.py import_stock_json --if-not-imported
+  python manage.py import_stock_json --file data/vaccines.json --no-replay
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from web_scraping.services.inventory_service import inventory_service
+
+
+class Command(BaseCommand):
+    help = 'Importa o vaccines.json (snapshot + diário de movimentos) para o inventário no banco'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', '-f',
+            type=str,
+            default=None,
+            help='Caminho do vaccines.json (padrão: settings.INTERNAL_STOCK_JSON)'
+        )
+        parser.add_argument(
+            '--if-not-imported',
+            action='store_true',
+            help='Só importa se o JSON ainda não foi importado/exportado (sem journal_offset)'
+        )
+        parser.add_argument(
+            '--no-replay',
+            action='store_true',
+            help='Não aplica os movimentos do diário posteriores ao snapshot'
+        )
+
+    def handle(self, *args, **options):
+        path = options.get('file') or inventory_service.ledger.snapshot_path
+        if not os.path.exists(path):
+            raise CommandError(f'❌ Arquivo não encontrado: {path}')
+
+        try:
+            if options['if_not_imported'] and 'journal_offset' in inventory_service.ledger.load_snapshot(path):
+                self.stdout.write('ℹ️  Snapshot já importado; importação ignorada.')
+                return
+
+            result = inventory_service.import_json(path, replay_journal=not options['no_replay'])
+        except ValueError as e:
+            raise CommandError(f'❌ JSON inválido: {str(e)}')
+
+        # Reexporta o snapshot com o offset do diário (marca como importado)
+        if path == inventory_service.ledger.snapshot_path:
+            inventory_service.export_json()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Importação concluída: {result['created']} criados, {result['updated']} atualizados "
+                f"({result['replayed']} movimentos do diário aplicados)"
+            )
+        )
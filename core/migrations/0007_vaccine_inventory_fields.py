@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_add_vaccine_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vaccine',
+            name='name',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='vaccine',
+            name='min_age_months',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vaccine',
+            name='max_age_months',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vaccine',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
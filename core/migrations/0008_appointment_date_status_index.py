@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_vaccine_inventory_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date', 'status'], name='appointment_date_status_idx'),
+        ),
+    ]
@@ -15,7 +15,7 @@ class User(models.Model):
         return self.name
 
 class Vaccine(models.Model):
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
     lot_number = models.CharField(max_length=50, blank=True, null=True)
     expiry_date = models.DateField(blank=True, null=True)
     current_stock = models.IntegerField(default=0)
@@ -25,10 +25,44 @@ class Vaccine(models.Model):
     laboratory = models.CharField(max_length=100, blank=True, null=True)
     purchase_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     sale_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    min_age_months = models.IntegerField(default=0)
+    max_age_months = models.IntegerField(default=0)
+    # Versão do estoque: atualizar explicitamente em update()/bulk_update()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
 
+    def to_stock_item(self) -> dict:
+        """Converte para o formato de item do estoque interno (vaccines.json)."""
+        return {
+            'name': self.name,
+            'laboratory': self.laboratory or '',
+            'purchase_price': float(self.purchase_price or 0),
+            'sale_price': float(self.sale_price or 0),
+            'current_stock': self.current_stock,
+            'available_stock': self.available_stock,
+            'min_stock': self.minimum_stock,
+            'min_age_months': self.min_age_months,
+            'max_age_months': self.max_age_months,
+        }
+
+    def apply_stock_item(self, item: dict) -> None:
+        """Copia os campos de um item do estoque interno para a instância (sem salvar)."""
+        from decimal import Decimal
+
+        if 'laboratory' in item:
+            self.laboratory = item['laboratory'] or None
+        for key in ('current_stock', 'available_stock', 'min_age_months', 'max_age_months'):
+            if item.get(key) is not None:
+                setattr(self, key, int(item[key]))
+        if item.get('min_stock') is not None:
+            self.minimum_stock = int(item['min_stock'])
+            self.min_stock = int(item['min_stock'])
+        for key in ('purchase_price', 'sale_price'):
+            if item.get(key) is not None:
+                setattr(self, key, Decimal(str(item[key])).quantize(Decimal('0.01')))
+
 class Appointment(models.Model):
     STATUS_CHOICES = [
         ('scheduled', 'Agendado'),
@@ -49,6 +83,10 @@ class Appointment(models.Model):
 
     class Meta:
         ordering = ['appointment_date', 'appointment_time']
+        indexes = [
+            # Seleção dos lembretes do dia seguinte (chatbot_whatsapp.services.lembretes)
+            models.Index(fields=['appointment_date', 'status'], name='appointment_date_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.name} - {self.appointment_date} {self.appointment_time}"
@@ -2,6 +2,7 @@
 from django.shortcuts import render, redirect
 from django.http import JsonResponse
 from .models import User, Appointment, Vaccine, ChatMessage
+from django.db import transaction
 from django.db.models import Count
 import random
 from datetime import datetime, timedelta
@@ -10,8 +11,10 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
-from web_scraping.services.calendar_scraper import CalendarScraper
-from web_scraping.utils.browser_manager import BrowserManager
+from web_scraping.models import ScrapingJob
+from web_scraping.views import enqueue_job_response, calendar_sync_params
+from web_scraping.services.inventory_service import inventory_service
+from web_scraping.services.stock_ledger import stock_ledger, MOVEMENT_ADJUSTMENT
 from user_auth.decorators import login_required
 from user_auth.user_manager import user_manager
 import calendar
@@ -44,10 +47,11 @@ def dashboard(request):
     current_user = request.session.get('user', {})
     is_admin = _is_admin(current_user)
 
-    # Stock info
-    vaccine_names = list(Vaccine.objects.values_list('name', flat=True))
-    vaccine_stock = list(Vaccine.objects.values_list('current_stock', flat=True))
-    vaccine_min_stock = list(Vaccine.objects.values_list('minimum_stock', flat=True))
+    # Stock info (mesmo snapshot cacheado da API de estoque)
+    stock = inventory_service.dashboard_stock()
+    vaccine_names = stock['names']
+    vaccine_stock = stock['current']
+    vaccine_min_stock = stock['minimum']
 
     # Notifications (last 3 chat messages needing human)
     notifications = []
@@ -86,7 +90,7 @@ def dashboard(request):
     # Dashboard metrics
     vaccines_applied = Appointment.objects.filter(status='completed').count()
     patients_registered = total_users
-    stock_percentage = int((sum(vaccine_stock) / (sum(vaccine_min_stock) or 1)) * 100) if vaccine_min_stock else 0
+    stock_percentage = stock['stock_percentage']
     next_vaccinations = Appointment.objects.filter(appointment_date__gte=today).count()
 
     # Series for charts (real data)
@@ -110,9 +114,9 @@ def dashboard(request):
         patients_series_values.append(count)
 
     # Stock per vaccine (current vs minimum)
-    stock_chart_labels = list(Vaccine.objects.values_list('name', flat=True))
-    stock_chart_current = list(Vaccine.objects.values_list('current_stock', flat=True))
-    stock_chart_minimum = list(Vaccine.objects.values_list('minimum_stock', flat=True))
+    stock_chart_labels = vaccine_names
+    stock_chart_current = vaccine_stock
+    stock_chart_minimum = vaccine_min_stock
 
     # Upcoming vaccinations next 7 days
     upcoming_series_labels = []
@@ -235,23 +239,12 @@ def dashboard(request):
 @method_decorator(csrf_exempt, name='dispatch')
 class SyncCalendarView(View):
     def post(self, request):
+        # Scraping roda no worker Celery; a resposta traz o id do job para acompanhar o progresso
         try:
-            browser_manager = BrowserManager()
-            calendar_scraper = CalendarScraper(browser_manager)
-            
-            appointments = calendar_scraper.scrape_calendar()
-            
-            return JsonResponse({
-                'status': 'success',
-                'message': f'Calendário sincronizado com sucesso. {len(appointments)} agendamentos encontrados.',
-                'appointments_count': len(appointments)
-            })
-            
-        except Exception as e:
-            return JsonResponse({
-                'status': 'error',
-                'message': f'Erro ao sincronizar calendário: {str(e)}'
-            }, status=500)
+            params = calendar_sync_params(request)
+        except ValueError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+        return enqueue_job_response(request, ScrapingJob.TYPE_SYNC_CALENDAR, params=params)
 
 class CalendarAppointmentsView(View):
     def get(self, request):
@@ -710,6 +703,8 @@ def create_vaccine(request):
             sale_price=sale_price_d,
             purchase_price=purchase_price_d,
         )
+        # Estado inicial no diário de movimentos (auditoria)
+        stock_ledger.record_initial(vaccine.to_stock_item(), user=request.session.get('username'))
 
         return JsonResponse({
             'status': 'success',
@@ -773,8 +768,6 @@ def update_vaccine(request, vaccine_id: int):
 
         if name:
             vaccine.name = name
-        if laboratory:
-            vaccine.laboratory = laboratory
         if lot_number:
             vaccine.lot_number = lot_number
 
@@ -809,20 +802,35 @@ def update_vaccine(request, vaccine_id: int):
         if new_available is not None and new_current is not None and int(new_available) > int(new_current):
             return JsonResponse({'status': 'error', 'message': 'available_stock não pode ser maior que current_stock.'}, status=400)
 
-        # Atribuições
-        if new_current is not None:
-            vaccine.current_stock = new_current
-        if new_available is not None:
-            vaccine.available_stock = new_available
-        if new_min is not None:
-            vaccine.minimum_stock = new_min
-            vaccine.min_stock = new_min
+        # Campos de estoque passam pelo ledger (movimento auditável)
+        stock_fields = {}
+        if laboratory:
+            stock_fields['laboratory'] = laboratory
+        if new_current is not None and new_current != vaccine.current_stock:
+            stock_fields['current_stock'] = new_current
+        if new_available is not None and new_available != vaccine.available_stock:
+            stock_fields['available_stock'] = new_available
+        if new_min is not None and new_min != vaccine.minimum_stock:
+            stock_fields['min_stock'] = new_min
         if new_sale is not None:
-            vaccine.sale_price = new_sale
+            stock_fields['sale_price'] = float(new_sale)
         if new_purchase is not None:
-            vaccine.purchase_price = new_purchase
+            stock_fields['purchase_price'] = float(new_purchase)
 
-        vaccine.save()
+        # Nome/lote/validade e o movimento de estoque são gravados juntos: se o
+        # ledger recusar o movimento, nada da edição fica salvo
+        try:
+            with transaction.atomic():
+                vaccine.save()
+                if stock_fields:
+                    stock_ledger.record(
+                        vaccine.name, MOVEMENT_ADJUSTMENT, fields=stock_fields,
+                        user=request.session.get('username'), pk=vaccine.id,
+                    )
+        except ValueError as ve:
+            return JsonResponse({'status': 'error', 'message': str(ve)}, status=400)
+        if stock_fields:
+            vaccine.refresh_from_db()
 
         return JsonResponse({
             'status': 'success',
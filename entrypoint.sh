@@ -4,7 +4,10 @@
 set -e
 
 echo "🔄 Aplicando migrations do banco de dados..."
-python manage.py migrate --noinput
+python manage.py migrate --noinput --fake-initial
+
+echo "💉 Importando estoque interno (vaccines.json) para o inventário, se ainda não importado..."
+python manage.py import_stock_json --if-not-imported || true
 
 echo "📦 Coletando arquivos estáticos..."
 python manage.py collectstatic --noinput || true
@@ -26,5 +29,14 @@ else:
     print(f'ℹ️  Superusuário "{username}" já existe.')
 END
 
-echo "🚀 Iniciando servidor Django..."
-exec python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+# APP_MODE=prod (padrão da imagem): gunicorn com workers gthread (gunicorn.conf.py)
+# APP_MODE=dev: runserver com auto-reload
+APP_MODE="${APP_MODE:-prod}"
+
+if [ "$APP_MODE" = "dev" ]; then
+    echo "🚀 Iniciando servidor Django (dev, runserver)..."
+    exec python manage.py runserver 0.0.0.0:8000
+fi
+
+echo "🚀 Iniciando servidor Django (prod, gunicorn)..."
+exec gunicorn vacination_system.wsgi:application -c gunicorn.conf.py
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+Configuração do gunicorn (modo de produção, APP_MODE=prod no entrypoint.sh).
+
+Uso:
+  gunicorn vacination_system.wsgi:application -c gunicorn.conf.py
+
+Workers gthread: as views fazem I/O bloqueante (sistema matriz, WAHA, banco) e
+o stream de progresso dos jobs (SSE) fica aberto por até
+SCRAPING_JOB_STREAM_SECONDS; com threads, um request lento ocupa uma thread e
+não o processo inteiro. Processos (GUNICORN_WORKERS) dão paralelismo de CPU;
+threads (GUNICORN_THREADS) cobrem a espera de I/O.
+
+Recarga sem derrubar conexões: `kill -HUP <pid do master>` (no Docker,
+`docker-compose kill -s HUP web`) sobe workers novos com o código atual e
+encerra os antigos depois de terminarem os requests em andamento. Por isso o
+app não é pré-carregado no master (preload_app=False).
+"""
+
+import multiprocessing
+
+# Todo nome deste módulo é lido como configuração do gunicorn, e 'config' é uma delas
+from decouple import config as env
+
+bind = env('GUNICORN_BIND', default='0.0.0.0:8000')
+
+# Padrão (2 x CPUs) + 1, limitado para não estourar a memória em hosts grandes
+workers = env('GUNICORN_WORKERS', default=min(multiprocessing.cpu_count() * 2 + 1, 9), cast=int)
+worker_class = 'gthread'
+threads = env('GUNICORN_THREADS', default=4, cast=int)
+
+# O stream SSE dura até 120 s; o timeout só derruba worker travado
+timeout = env('GUNICORN_TIMEOUT', default=150, cast=int)
+graceful_timeout = env('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+keepalive = env('GUNICORN_KEEPALIVE', default=5, cast=int)
+
+# Recicla workers periodicamente (vazamentos de memória do Selenium/pandas)
+max_requests = env('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = env('GUNICORN_MAX_REQUESTS_JITTER', default=100, cast=int)
+
+preload_app = False
+# Heartbeat dos workers em memória (evita fsync em disco lento do container)
+worker_tmp_dir = '/dev/shm'
+
+# Atrás do proxy do Easypanel: confia no X-Forwarded-Proto/For
+forwarded_allow_ips = env('GUNICORN_FORWARDED_ALLOW_IPS', default='*')
+
+accesslog = env('GUNICORN_ACCESS_LOG', default='-')
+errorlog = '-'
+loglevel = env('GUNICORN_LOG_LEVEL', default='info')
+access_log_format = '%(h)s "%(r)s" %(s)s %(b)s %(M)sms'
@@ -0,0 +1,84 @@
+"""
+Comando Django para importar data/users.json para o backend de banco
+Uso:
+  python manage.py import_users_json
+  python manage.py import_users_json --file data/users.json --update
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from user_auth.models import PlatformUser
+from user_auth.storage import JsonUserBackend
+
+
+class Command(BaseCommand):
+    help = 'Importa os usuários do users.json para a tabela do banco (backend "db")'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', '-f',
+            type=str,
+            default=None,
+            help='Caminho do users.json (padrão: data/users.json)'
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Atualiza usuários que já existem no banco (padrão: ignora)'
+        )
+
+    def handle(self, *args, **options):
+        users_file = Path(options['file']) if options.get('file') else None
+        if users_file is not None and not users_file.exists():
+            raise CommandError(f'❌ Arquivo não encontrado: {users_file}')
+
+        users = JsonUserBackend(users_file).load_users()
+        if not users:
+            self.stdout.write(self.style.WARNING('⚠️  Nenhum usuário encontrado no JSON'))
+            return
+
+        existing = set(PlatformUser.objects.values_list('username', flat=True))
+        used_ids = set(PlatformUser.objects.values_list('id', flat=True))
+        to_create = []
+        updated = 0
+        skipped = 0
+        seen = set()
+
+        with transaction.atomic():
+            for record in users:
+                username = record.get('username')
+                if not username or username in seen:
+                    skipped += 1
+                    continue
+                seen.add(username)
+
+                data = PlatformUser.fields_from_record(record)
+                if username in existing:
+                    if options['update']:
+                        data.pop('id', None)
+                        PlatformUser.objects.filter(username=username).update(**data)
+                        updated += 1
+                    else:
+                        skipped += 1
+                    continue
+
+                # Preserva o id original quando não colide com um id já usado
+                # (o users.json antigo pode ter ids repetidos após deleções)
+                if not data.get('id') or data['id'] in used_ids:
+                    data.pop('id', None)
+                else:
+                    used_ids.add(data['id'])
+                to_create.append(PlatformUser(**data))
+
+            PlatformUser.objects.bulk_create(to_create)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Importação concluída: {len(to_create)} criados, '
+                f'{updated} atualizados, {skipped} ignorados'
+            )
+        )
+        self.stdout.write('   Defina USER_STORAGE_BACKEND=db no .env para usar o banco.')
@@ -18,6 +18,7 @@ class AuthenticationMiddleware:
         '/auth/logout/',
         '/auth/change-password/',
         '/admin/',  # O Django admin cuida da própria autenticação
+        '/chatbot/webhook/',  # Chamado pelo WAHA (sem sessão)
     ]
 
     # URLs que podem ser acessadas mesmo quando o usuário precisa trocar a senha
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformUser',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=150, unique=True)),
+                ('password_hash', models.CharField(max_length=64)),
+                ('password_plain', models.CharField(blank=True, max_length=128, null=True)),
+                ('name', models.CharField(max_length=200)),
+                ('position', models.CharField(db_index=True, default='Operador', max_length=100)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_login', models.DateTimeField(blank=True, null=True)),
+                ('must_change_password', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Usuário da Plataforma',
+                'verbose_name_plural': 'Usuários da Plataforma',
+                'db_table': 'user_auth_platform_users',
+                'ordering': ['id'],
+            },
+        ),
+    ]
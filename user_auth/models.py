@@ -0,0 +1,83 @@
+"""
+Modelo de usuários da plataforma (backend 'db' do UserManager).
+Espelha os campos do data/users.json.
+"""
+
+from datetime import datetime
+from typing import Dict
+
+from django.db import models
+from django.utils import timezone
+
+
+class PlatformUser(models.Model):
+    """
+    Usuário da plataforma armazenado no banco.
+    Não confundir com core.User (pacientes) nem com django.contrib.auth.
+    """
+
+    username = models.CharField(max_length=150, unique=True)
+    password_hash = models.CharField(max_length=64)
+    password_plain = models.CharField(max_length=128, blank=True, null=True)
+    name = models.CharField(max_length=200)
+    position = models.CharField(max_length=100, default='Operador', db_index=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_login = models.DateTimeField(blank=True, null=True)
+    must_change_password = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'user_auth_platform_users'
+        verbose_name = "Usuário da Plataforma"
+        verbose_name_plural = "Usuários da Plataforma"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.name} ({self.username})"
+
+    @staticmethod
+    def _to_iso(value):
+        if not value:
+            return None
+        if timezone.is_aware(value):
+            value = timezone.localtime(value).replace(tzinfo=None)
+        return value.isoformat()
+
+    @staticmethod
+    def _from_iso(value):
+        if not value:
+            return None
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def to_record(self) -> Dict:
+        """Converte para o formato de registro do users.json."""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'password_hash': self.password_hash,
+            'password_plain': self.password_plain,
+            'name': self.name,
+            'position': self.position,
+            'created_at': self._to_iso(self.created_at),
+            'last_login': self._to_iso(self.last_login),
+            'must_change_password': self.must_change_password,
+        }
+
+    @classmethod
+    def fields_from_record(cls, record: Dict) -> Dict:
+        """Filtra/converte um registro do users.json para kwargs do modelo."""
+        data = {}
+        for key in ('id', 'username', 'password_hash', 'password_plain', 'name', 'position'):
+            if key in record:
+                data[key] = record[key]
+        for key in ('created_at', 'last_login'):
+            if key in record:
+                data[key] = cls._from_iso(record[key])
+        if 'must_change_password' in record:
+            data['must_change_password'] = bool(record['must_change_password'])
+        if data.get('created_at') is None:
+            data.pop('created_at', None)
+        return data
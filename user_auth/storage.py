@@ -0,0 +1,202 @@
+"""
+Backends de armazenamento para os usuários da plataforma.
+
+O UserManager trabalha sobre registros "crus" (dicts com password_hash e
+password_plain) e delega a persistência para um backend:
+
+- JsonUserBackend: arquivo data/users.json (comportamento original).
+- DatabaseUserBackend: tabela user_auth_platform_users (indexada por username).
+
+O backend ativo é escolhido por settings.USER_STORAGE_BACKEND ('json' ou 'db').
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+
+# Campos persistidos de cada usuário (mesma ordem do users.json)
+USER_FIELDS = (
+    'id',
+    'username',
+    'password_hash',
+    'password_plain',
+    'name',
+    'position',
+    'created_at',
+    'last_login',
+    'must_change_password',
+)
+
+
+class BaseUserBackend:
+    """
+    Interface mínima de armazenamento de usuários.
+    Todas as operações recebem/retornam dicts no formato do users.json.
+    """
+
+    def get(self, username: str) -> Optional[Dict]:
+        """Retorna o registro completo do usuário ou None."""
+        raise NotImplementedError
+
+    def list(self) -> List[Dict]:
+        """Retorna todos os registros (ordenados por id)."""
+        raise NotImplementedError
+
+    def insert(self, record: Dict) -> Dict:
+        """Insere um novo usuário, atribuindo um id único. Retorna o registro salvo."""
+        raise NotImplementedError
+
+    def update(self, username: str, fields: Dict) -> Optional[Dict]:
+        """Atualiza campos do usuário. Retorna o registro atualizado ou None."""
+        raise NotImplementedError
+
+    def delete(self, username: str) -> bool:
+        """Remove o usuário. Retorna True se algo foi removido."""
+        raise NotImplementedError
+
+
+class JsonUserBackend(BaseUserBackend):
+    """
+    Armazena usuários em um arquivo JSON (lista de objetos).
+    Cada operação lê o arquivo inteiro; a escrita é atômica (tmp + rename).
+    """
+
+    def __init__(self, users_file: Optional[Path] = None):
+        if users_file is None:
+            users_file = Path(__file__).resolve().parent.parent / 'data' / 'users.json'
+        self.users_file = Path(users_file)
+        self._ensure_users_file()
+
+    def _ensure_users_file(self):
+        """Garante que o arquivo de usuários existe."""
+        self.users_file.parent.mkdir(parents=True, exist_ok=True)
+        if not self.users_file.exists():
+            self.users_file.write_text(json.dumps([], indent=2))
+
+    def load_users(self) -> List[Dict]:
+        """Carrega todos os usuários do arquivo JSON."""
+        try:
+            with open(self.users_file, 'r', encoding='utf-8') as f:
+                users = json.load(f)
+                # Normaliza campos novos para compatibilidade
+                for u in users:
+                    if 'must_change_password' not in u:
+                        u['must_change_password'] = False
+                return users
+        except (json.JSONDecodeError, FileNotFoundError):
+            return []
+
+    def save_users(self, users: List[Dict]) -> None:
+        """Salva usuários no arquivo JSON (escrita atômica)."""
+        self.users_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.users_file.parent), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(users, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.users_file)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, username: str) -> Optional[Dict]:
+        for user in self.load_users():
+            if user.get('username') == username:
+                return user
+        return None
+
+    def list(self) -> List[Dict]:
+        return self.load_users()
+
+    def insert(self, record: Dict) -> Dict:
+        users = self.load_users()
+        # max(id) + 1 evita colisão de ids após deleções (len(users) + 1 colidia)
+        next_id = max((int(u.get('id') or 0) for u in users), default=0) + 1
+        new_user = dict(record)
+        new_user['id'] = next_id
+        users.append(new_user)
+        self.save_users(users)
+        return new_user
+
+    def update(self, username: str, fields: Dict) -> Optional[Dict]:
+        users = self.load_users()
+        for user in users:
+            if user.get('username') == username:
+                user.update(fields)
+                self.save_users(users)
+                return user
+        return None
+
+    def delete(self, username: str) -> bool:
+        users = self.load_users()
+        remaining = [u for u in users if u.get('username') != username]
+        if len(remaining) < len(users):
+            self.save_users(remaining)
+            return True
+        return False
+
+
+class DatabaseUserBackend(BaseUserBackend):
+    """
+    Armazena usuários na tabela PlatformUser.
+    Buscas por username usam o índice único; escritas são transacionais,
+    seguras para múltiplos containers escrevendo ao mesmo tempo.
+    """
+
+    @staticmethod
+    def _model():
+        from .models import PlatformUser
+        return PlatformUser
+
+    def get(self, username: str) -> Optional[Dict]:
+        obj = self._model().objects.filter(username=username).first()
+        return obj.to_record() if obj else None
+
+    def list(self) -> List[Dict]:
+        return [obj.to_record() for obj in self._model().objects.order_by('id')]
+
+    def insert(self, record: Dict) -> Dict:
+        from django.db import IntegrityError
+        model = self._model()
+        data = model.fields_from_record(record)
+        data.pop('id', None)
+        try:
+            obj = model.objects.create(**data)
+        except IntegrityError:
+            raise ValueError(f"Usuário '{record.get('username')}' já existe")
+        return obj.to_record()
+
+    def update(self, username: str, fields: Dict) -> Optional[Dict]:
+        model = self._model()
+        data = model.fields_from_record(fields)
+        data.pop('id', None)
+        data.pop('username', None)
+        if data and not model.objects.filter(username=username).update(**data):
+            return None
+        return self.get(username)
+
+    def delete(self, username: str) -> bool:
+        deleted, _ = self._model().objects.filter(username=username).delete()
+        return deleted > 0
+
+
+BACKENDS = {
+    'json': JsonUserBackend,
+    'db': DatabaseUserBackend,
+}
+
+
+def get_user_backend(name: Optional[str] = None) -> BaseUserBackend:
+    """Instancia o backend configurado em settings.USER_STORAGE_BACKEND."""
+    name = (name or getattr(settings, 'USER_STORAGE_BACKEND', 'json') or 'json').lower()
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(
+            f"USER_STORAGE_BACKEND inválido: '{name}'. Opções: {', '.join(BACKENDS)}"
+        )
@@ -1,34 +1,27 @@
 """
-Gerenciador de usuários com armazenamento em JSON.
-Implementa autenticação simples e segura sem banco de dados.
+Gerenciador de usuários da plataforma.
+Implementa autenticação simples com armazenamento plugável:
+users.json (padrão) ou tabela no banco (USER_STORAGE_BACKEND='db').
 """
 
-import json
 import hashlib
-import os
-from pathlib import Path
 from typing import Dict, Optional, List
 from datetime import datetime
 
 from django.conf import settings
 
+from .storage import BaseUserBackend, get_user_backend
+
 
 class UserManager:
     """
-    Gerencia usuários armazenados em arquivo JSON.
-    Implementa hashing de senhas para segurança.
+    Gerencia usuários da plataforma.
+    Implementa hashing de senhas para segurança; a persistência é delegada
+    a um backend (JSON ou banco), ver user_auth.storage.
     """
     
-    def __init__(self):
-        self.base_dir = Path(__file__).resolve().parent.parent
-        self.users_file = self.base_dir / 'data' / 'users.json'
-        self._ensure_users_file()
-    
-    def _ensure_users_file(self):
-        """Garante que o arquivo de usuários existe."""
-        self.users_file.parent.mkdir(parents=True, exist_ok=True)
-        if not self.users_file.exists():
-            self.users_file.write_text(json.dumps([], indent=2))
+    def __init__(self, backend: Optional[BaseUserBackend] = None):
+        self.backend = backend or get_user_backend()
     
     @staticmethod
     def hash_password(password: str) -> str:
@@ -36,17 +29,8 @@ class UserManager:
         return hashlib.sha256(password.encode()).hexdigest()
     
     def load_users(self) -> List[Dict]:
-        """Carrega todos os usuários do arquivo JSON."""
-        try:
-            with open(self.users_file, 'r', encoding='utf-8') as f:
-                users = json.load(f)
-                # Normaliza campos novos para compatibilidade
-                for u in users:
-                    if 'must_change_password' not in u:
-                        u['must_change_password'] = False
-                return users
-        except (json.JSONDecodeError, FileNotFoundError):
-            return []
+        """Carrega todos os usuários do backend (registros completos)."""
+        return self.backend.list()
 
     def _compute_role(self, user: Dict) -> str:
         """Resolve o papel do usuário (não persiste automaticamente)."""
@@ -56,57 +40,40 @@ class UserManager:
         if user.get('position') == 'Administrador':
             return 'ADMIN'
         return 'USER'
-    
-    def save_users(self, users: List[Dict]) -> None:
-        """Salva usuários no arquivo JSON."""
-        self.users_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.users_file, 'w', encoding='utf-8') as f:
-            json.dump(users, f, indent=2, ensure_ascii=False)
+
+    def _public_user(self, user: Dict) -> Dict:
+        """Retorna cópia do usuário sem senha e com papel resolvido."""
+        user_copy = user.copy()
+        user_copy.pop('password_hash', None)
+        user_copy.pop('password_plain', None)
+        user_copy['role'] = self._compute_role(user)
+        user_copy['is_superadmin'] = (user_copy['role'] == 'SUPERADMIN')
+        return user_copy
     
     def authenticate(self, username: str, password: str) -> Optional[Dict]:
         """
         Autentica um usuário com username e senha.
         Retorna os dados do usuário se autenticado, None caso contrário.
         """
-        users = self.load_users()
-        password_hash = self.hash_password(password)
-        
-        for user in users:
-            if user.get('username') == username and user.get('password_hash') == password_hash:
-                # Retorna usuário sem a senha
-                user_copy = user.copy()
-                user_copy.pop('password_hash', None)
-                user_copy.pop('password_plain', None)
-                user_copy['role'] = self._compute_role(user)
-                user_copy['is_superadmin'] = (user_copy['role'] == 'SUPERADMIN')
-                return user_copy
-        
+        user = self.backend.get(username)
+        if user and user.get('password_hash') == self.hash_password(password):
+            # Retorna usuário sem a senha
+            return self._public_user(user)
         return None
     
     def get_user_by_username(self, username: str) -> Optional[Dict]:
         """Obtém usuário pelo username."""
-        users = self.load_users()
-        for user in users:
-            if user.get('username') == username:
-                user_copy = user.copy()
-                user_copy.pop('password_hash', None)
-                user_copy.pop('password_plain', None)
-                user_copy['role'] = self._compute_role(user)
-                user_copy['is_superadmin'] = (user_copy['role'] == 'SUPERADMIN')
-                return user_copy
-        return None
+        user = self.backend.get(username)
+        return self._public_user(user) if user else None
 
     def get_user_password_for_superadmin(self, username: str) -> Optional[str]:
         """Retorna a senha atual (texto) do usuário, se armazenada."""
-        users = self.load_users()
-        for user in users:
-            if user.get('username') == username:
-                return user.get('password_plain')
-        return None
+        user = self.backend.get(username)
+        return user.get('password_plain') if user else None
     
     def user_exists(self, username: str) -> bool:
         """Verifica se um usuário já existe."""
-        return self.get_user_by_username(username) is not None
+        return self.backend.get(username) is not None
     
     def create_user(self, username: str, password: str, name: str,
                    position: str = 'Operador', must_change_password: bool = True) -> Dict:
@@ -125,10 +92,8 @@ class UserManager:
         if self.user_exists(username):
             raise ValueError(f"Usuário '{username}' já existe")
         
-        users = self.load_users()
-        
-        new_user = {
-            'id': len(users) + 1,
+        # O id é atribuído pelo backend
+        new_user = self.backend.insert({
             'username': username,
             'password_hash': self.hash_password(password),
             # Atenção: armazenar senha em texto plano é sensível. Necessário para o caso de uso
@@ -139,71 +104,35 @@ class UserManager:
             'created_at': datetime.now().isoformat(),
             'last_login': None,
             'must_change_password': bool(must_change_password),
-        }
-        
-        users.append(new_user)
-        self.save_users(users)
+        })
         
         # Retorna sem a senha
-        user_copy = new_user.copy()
-        user_copy.pop('password_hash')
-        user_copy.pop('password_plain', None)
-        user_copy['role'] = self._compute_role(new_user)
-        user_copy['is_superadmin'] = (user_copy['role'] == 'SUPERADMIN')
-        return user_copy
+        return self._public_user(new_user)
     
     def update_last_login(self, username: str) -> None:
         """Atualiza o timestamp do último login."""
-        users = self.load_users()
-        for user in users:
-            if user.get('username') == username:
-                user['last_login'] = datetime.now().isoformat()
-                break
-        self.save_users(users)
+        self.backend.update(username, {'last_login': datetime.now().isoformat()})
     
     def update_user(self, username: str, **kwargs) -> Optional[Dict]:
         """
         Atualiza dados do usuário.
         Não permite alterar username ou password_hash diretamente.
         """
-        users = self.load_users()
+        # Campos permitidos para atualização
+        allowed_fields = {'name', 'position'}
+        fields = {k: v for k, v in kwargs.items() if k in allowed_fields}
         
-        for user in users:
-            if user.get('username') == username:
-                # Campos permitidos para atualização
-                allowed_fields = {'name', 'position'}
-                
-                for key, value in kwargs.items():
-                    if key in allowed_fields:
-                        user[key] = value
-                
-                self.save_users(users)
-                
-                user_copy = user.copy()
-                user_copy.pop('password_hash', None)
-                user_copy.pop('password_plain', None)
-                user_copy['role'] = self._compute_role(user)
-                user_copy['is_superadmin'] = (user_copy['role'] == 'SUPERADMIN')
-                return user_copy
-        
-        return None
+        user = self.backend.update(username, fields)
+        return self._public_user(user) if user else None
     
     def delete_user(self, username: str) -> bool:
         """Deleta um usuário."""
-        users = self.load_users()
-        original_count = len(users)
-        users = [u for u in users if u.get('username') != username]
-        
-        if len(users) < original_count:
-            self.save_users(users)
-            return True
-        return False
+        return self.backend.delete(username)
     
     def list_all_users(self) -> List[Dict]:
         """Lista todos os usuários (sem senhas)."""
-        users = self.load_users()
         safe_users = []
-        for user in users:
+        for user in self.backend.list():
             safe = {k: v for k, v in user.items() if k not in ('password_hash', 'password_plain')}
             safe['role'] = self._compute_role(user)
             safe_users.append(safe)
@@ -211,46 +140,33 @@ class UserManager:
     
     def change_password(self, username: str, old_password: str, new_password: str) -> bool:
         """Altera a senha de um usuário."""
-        users = self.load_users()
-        old_password_hash = self.hash_password(old_password)
-        new_password_hash = self.hash_password(new_password)
+        user = self.backend.get(username)
+        if not user or user.get('password_hash') != self.hash_password(old_password):
+            return False
         
-        for user in users:
-            if user.get('username') == username:
-                if user.get('password_hash') == old_password_hash:
-                    user['password_hash'] = new_password_hash
-                    user['password_plain'] = new_password
-                    user['must_change_password'] = False
-                    self.save_users(users)
-                    return True
-                return False
-        
-        return False
+        return self.backend.update(username, {
+            'password_hash': self.hash_password(new_password),
+            'password_plain': new_password,
+            'must_change_password': False,
+        }) is not None
 
     def set_password_admin(self, username: str, new_password: str, force_user_reset: bool = True) -> bool:
         """Reseta a senha (sem exigir senha antiga). Uso restrito ao SUPERADMIN."""
-        users = self.load_users()
-        for user in users:
-            if user.get('username') == username:
-                user['password_hash'] = self.hash_password(new_password)
-                user['password_plain'] = new_password
-                if force_user_reset:
-                    user['must_change_password'] = True
-                self.save_users(users)
-                return True
-        return False
+        fields = {
+            'password_hash': self.hash_password(new_password),
+            'password_plain': new_password,
+        }
+        if force_user_reset:
+            fields['must_change_password'] = True
+        return self.backend.update(username, fields) is not None
 
     def set_password_self(self, username: str, new_password: str) -> bool:
         """Define a senha do próprio usuário (sem exigir old_password) e libera acesso."""
-        users = self.load_users()
-        for user in users:
-            if user.get('username') == username:
-                user['password_hash'] = self.hash_password(new_password)
-                user['password_plain'] = new_password
-                user['must_change_password'] = False
-                self.save_users(users)
-                return True
-        return False
+        return self.backend.update(username, {
+            'password_hash': self.hash_password(new_password),
+            'password_plain': new_password,
+            'must_change_password': False,
+        }) is not None
 
 
 # Instância global do gerenciador
@@ -28,6 +28,36 @@ app.conf.beat_schedule = {
         # 'schedule': crontab(minute=0),  # A cada hora
         # 'schedule': crontab(hour=0, minute=0),  # Diariamente à meia-noite
     },
+    # Devolve à fila cadastros presos em 'processando' (worker morto no meio do lote)
+    'requeue-stale-registrations': {
+        'task': 'core.google_forms_tasks.requeue_stale_registrations',
+        'schedule': crontab(minute='*/5'),  # A cada 5 minutos
+    },
+    # Reenfileira mensagens do chatbot que não chegaram ao worker
+    'requeue-chatbot-messages': {
+        'task': 'chatbot_whatsapp.tasks.reenfileirar_mensagens_pendentes',
+        'schedule': crontab(minute='*/5'),  # A cada 5 minutos
+    },
+    # Lembretes dos agendamentos de amanhã (WhatsApp)
+    'appointment-reminders': {
+        'task': 'chatbot_whatsapp.tasks.preparar_lembretes_agendamento',
+        'schedule': crontab(hour=18, minute=0),  # Diariamente às 18h
+    },
+    # Aviso de estoque baixo para a equipe
+    'low-stock-notice': {
+        'task': 'chatbot_whatsapp.tasks.preparar_avisos_estoque_baixo',
+        'schedule': crontab(hour=8, minute=0),  # Diariamente às 8h
+    },
+    # Reenvia envios programados adiados (WAHA fora do ar)
+    'dispatch-scheduled-messages': {
+        'task': 'chatbot_whatsapp.tasks.disparar_envios_programados',
+        'schedule': crontab(minute='*/15'),  # A cada 15 minutos
+    },
+    # Exporta o snapshot do estoque (vaccines.json) a partir do inventário
+    'compact-stock-ledger': {
+        'task': 'web_scraping.tasks.compact_stock_ledger',
+        'schedule': crontab(minute='*/15'),  # A cada 15 minutos
+    },
 }
 
 @app.task(bind=True)
@@ -17,6 +17,10 @@ SUPERADMIN_USERNAME = config('SUPERADMIN_USERNAME', default='admin')
 # Senha padrão para usuários criados (se não informada ou se o criador não for SUPERADMIN)
 DEFAULT_USER_PASSWORD = config('DEFAULT_USER_PASSWORD', default='123456')
 
+# Backend de armazenamento dos usuários: 'json' (data/users.json) ou 'db' (tabela indexada).
+# Para migrar: python manage.py import_users_json e depois USER_STORAGE_BACKEND=db
+USER_STORAGE_BACKEND = config('USER_STORAGE_BACKEND', default='json')
+
 ALLOWED_HOSTS = ['*']
 
 CSRF_TRUSTED_ORIGINS = [
@@ -61,6 +65,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Arquivos estáticos servidos pelo próprio worker (gunicorn não serve /static/)
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -130,15 +136,18 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# Configuração explícita de armazenamento (sem whitenoise)
+# Estáticos: o collectstatic grava também as versões .gz e o WhiteNoise as
+# entrega com cache do navegador. Sem manifest: templates com {% static %} de
+# arquivos ausentes continuam funcionando como antes.
 STORAGES = {
     'default': {
         'BACKEND': 'django.core.files.storage.FileSystemStorage',
     },
     'staticfiles': {
-        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+        'BACKEND': 'whitenoise.storage.CompressedStaticFilesStorage',
     },
 }
+WHITENOISE_MAX_AGE = config('WHITENOISE_MAX_AGE', default=60 * 60, cast=int)
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -167,6 +176,11 @@ GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
 
 WAHA_URL = "http://localhost:3000"  # URL do seu WAHA
 WAHA_SESSION = "default"
+# Autenticação do webhook (chatbot_whatsapp.services.webhook_auth): a mesma chave
+# de WHATSAPP_HOOK_HMAC_KEY no WAHA e/ou um token enviado em X-Webhook-Token ou
+# ?token=. Sem nenhum dos dois o webhook recusa todas as mensagens.
+WAHA_WEBHOOK_HMAC_KEY = config('WAHA_WEBHOOK_HMAC_KEY', default='')
+WAHA_WEBHOOK_TOKEN = config('WAHA_WEBHOOK_TOKEN', default='')
 
 # ============================================================================
 # CELERY CONFIGURATION
@@ -181,6 +195,14 @@ CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutos
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_WORKER_MAX_TASKS_PER_CHILD = 1000
+# Mensagens do chatbot em fila própria: um worker dedicado (celery-chatbot) com
+# concorrência limitada responde sem esperar os scrapers da fila padrão.
+# Os lotes de lembretes vão para 'lembretes' (worker celery-lembretes) e não
+# atrasam as respostas.
+CELERY_TASK_ROUTES = {
+    'chatbot_whatsapp.tasks.enviar_lote_programado': {'queue': 'lembretes'},
+    'chatbot_whatsapp.tasks.*': {'queue': 'chatbot'},
+}
 
 # ============================================================================
 # GOOGLE FORMS / SHEETS CONFIGURATION
@@ -191,6 +213,12 @@ GOOGLE_SHEET_ID = config('GOOGLE_SHEET_ID', default='16LDp9i6FKn8R2fNOEJt_wyCm-R
 GOOGLE_SHEET_NAME = config('GOOGLE_SHEET_NAME', default='Respostas ao formulário 1')
 FORMS_RESPONSES_DIR = config('FORMS_RESPONSES_DIR', default='forms_responses')
 
+# Pipeline de cadastro (web_scraping.services.registration_pipeline): prazo de uma
+# submissão em 'processando' antes de voltar à fila (renovado a cada etapa) e
+# tentativas automáticas por submissão com erro
+GOOGLE_FORMS_REGISTRATION_LEASE_SECONDS = config('GOOGLE_FORMS_REGISTRATION_LEASE_SECONDS', default=10 * 60, cast=int)
+GOOGLE_FORMS_REGISTRATION_MAX_ATTEMPTS = config('GOOGLE_FORMS_REGISTRATION_MAX_ATTEMPTS', default=5, cast=int)
+
 # Validação do arquivo de credenciais Google (apenas warning, não bloqueia)
 _google_creds_path = BASE_DIR / GOOGLE_SERVICE_ACCOUNT_FILE if GOOGLE_SERVICE_ACCOUNT_FILE else None
 if _google_creds_path and not _google_creds_path.exists():
@@ -207,7 +235,93 @@ ALLOWED_HOSTS = ['*']
 STOCK_SCRAPER_MAX_PAGES = 100  # Número máximo de páginas a processar
 STOCK_SCRAPER_AJAX_WAIT_SECONDS = 2.0  # Tempo de espera entre páginas
 
-# Banco interno de estoque (JSON)
-# Se não definido em tempo de execução, a view usa BASE_DIR/data/vaccines.json
+# Snapshot JSON do estoque interno (import/export da tabela core.Vaccine)
+# Se não definido em tempo de execução, usa BASE_DIR/data/vaccines.json
 INTERNAL_STOCK_JSON = str(BASE_DIR / 'data' / 'vaccines.json')
 
+# Diário append-only de movimentos de estoque (entradas, saídas, ajustes).
+# Os saldos ficam na tabela core.Vaccine; o vaccines.json é o snapshot exportado
+# periodicamente (import: python manage.py import_stock_json).
+STOCK_LEDGER_JOURNAL = str(BASE_DIR / 'data' / 'stock_movements.jsonl')
+
+# Jobs assíncronos de scraping (web_scraping.ScrapingJob)
+# Job ativo sem progresso por mais tempo que isso é considerado morto (libera nova execução)
+SCRAPING_JOB_STALE_SECONDS = config('SCRAPING_JOB_STALE_SECONDS', default=15 * 60, cast=int)
+# Duração máxima de uma conexão SSE de progresso (o cliente volta ao polling depois)
+SCRAPING_JOB_STREAM_SECONDS = config('SCRAPING_JOB_STREAM_SECONDS', default=120, cast=int)
+SCRAPING_JOB_STREAM_INTERVAL = 1.0
+
+# Calendário por intervalo de meses: navegadores em paralelo por job e tamanho máximo do intervalo
+CALENDAR_SCRAPER_MAX_BROWSERS = config('CALENDAR_SCRAPER_MAX_BROWSERS', default=3, cast=int)
+CALENDAR_SYNC_MAX_MONTHS = 12
+
+# Coalescência de operações idênticas (web_scraping.services.single_flight):
+# chamadas simultâneas compartilham a execução e o resultado fica válido por este TTL
+SINGLE_FLIGHT_RESULT_TTL = config('SINGLE_FLIGHT_RESULT_TTL', default=30, cast=int)
+SINGLE_FLIGHT_WAIT_TIMEOUT = 180
+
+# Cache da busca de paciente por CPF no sistema legado (segundos).
+# "Não encontrado" expira antes; cadastros feitos pela plataforma invalidam o CPF.
+PATIENT_SEARCH_CACHE_TTL = config('PATIENT_SEARCH_CACHE_TTL', default=60 * 60, cast=int)
+PATIENT_SEARCH_NEGATIVE_TTL = config('PATIENT_SEARCH_NEGATIVE_TTL', default=5 * 60, cast=int)
+
+# Estado das conversas do chatbot WhatsApp (chatbot_whatsapp.services.state_store):
+# 'redis' (hash por chat_id), 'db' (tabela chatbot_conversas) ou 'memory' (só dev).
+# Vazio: Redis se CACHE_URL estiver definido, senão banco. TTL em segundos.
+CHATBOT_STATE_BACKEND = config('CHATBOT_STATE_BACKEND', default='')
+CHATBOT_STATE_REDIS_URL = config('CHATBOT_STATE_REDIS_URL', default='')
+CHATBOT_STATE_TTL = config('CHATBOT_STATE_TTL', default=24 * 60 * 60, cast=int)
+# Janela (segundos) em que um id de mensagem do WAHA é lembrado para ignorar reentregas
+CHATBOT_DEDUP_TTL = config('CHATBOT_DEDUP_TTL', default=24 * 60 * 60, cast=int)
+# Validade (segundos) do lock por conversa: mensagens do mesmo chat são processadas
+# uma de cada vez, em ordem; o lock expira sozinho se o worker morrer
+CHATBOT_CHAT_LOCK_SECONDS = config('CHATBOT_CHAT_LOCK_SECONDS', default=120, cast=int)
+# Classificador local de intenções (chatbot_whatsapp.services.intent_classifier):
+# abaixo da confiança mínima a mensagem vai para o Gemini. O arquivo de treino
+# opcional é uma lista JSON de {"texto", "intencao"} tirada do histórico.
+CHATBOT_INTENT_MIN_CONFIDENCE = config('CHATBOT_INTENT_MIN_CONFIDENCE', default=0.75, cast=float)
+CHATBOT_INTENT_TRAINING_FILE = config('CHATBOT_INTENT_TRAINING_FILE', default='')
+# Respostas diretas de horário/endereço (vazio: a pergunta segue para o Gemini)
+CHATBOT_HORARIO_FUNCIONAMENTO = config('CHATBOT_HORARIO_FUNCIONAMENTO', default='')
+CHATBOT_ENDERECO_CLINICA = config('CHATBOT_ENDERECO_CLINICA', default='')
+# Cache das respostas do Gemini (chatbot_whatsapp.services.response_cache): TTL em
+# segundos (0 desliga), tamanho do LRU local e similaridade mínima da busca por
+# mensagens parecidas (0, o padrão, desliga; números, letras soltas e negações
+# precisam coincidir mesmo acima do mínimo)
+CHATBOT_RESPONSE_CACHE_TTL = config('CHATBOT_RESPONSE_CACHE_TTL', default=60 * 60, cast=int)
+CHATBOT_RESPONSE_CACHE_SIZE = config('CHATBOT_RESPONSE_CACHE_SIZE', default=500, cast=int)
+CHATBOT_RESPONSE_CACHE_SIMILARITY = config('CHATBOT_RESPONSE_CACHE_SIMILARITY', default=0, cast=float)
+# Cliente HTTP do WAHA (chatbot_whatsapp.services.waha_service): pool de conexões,
+# timeouts (segundos), retries só quando a conexão falha (envio incerto não se
+# repete), circuit breaker e limite
+# de envios por minuto nos envios em massa
+WAHA_POOL_SIZE = config('WAHA_POOL_SIZE', default=10, cast=int)
+WAHA_CONNECT_TIMEOUT = config('WAHA_CONNECT_TIMEOUT', default=5, cast=float)
+WAHA_READ_TIMEOUT = config('WAHA_READ_TIMEOUT', default=15, cast=float)
+WAHA_MAX_RETRIES = config('WAHA_MAX_RETRIES', default=3, cast=int)
+WAHA_CIRCUIT_FAILURES = config('WAHA_CIRCUIT_FAILURES', default=5, cast=int)
+WAHA_CIRCUIT_RESET_SECONDS = config('WAHA_CIRCUIT_RESET_SECONDS', default=30, cast=int)
+WAHA_SEND_RATE_PER_MINUTE = config('WAHA_SEND_RATE_PER_MINUTE', default=20, cast=int)
+# Envios programados (chatbot_whatsapp.services.lembretes): equipe que recebe os
+# avisos de estoque baixo (chat_ids ou telefones separados por vírgula) e tamanho
+# dos lotes de envio
+CHATBOT_STAFF_CHAT_IDS = config('CHATBOT_STAFF_CHAT_IDS', default='')
+CHATBOT_ENVIO_LOTE = config('CHATBOT_ENVIO_LOTE', default=50, cast=int)
+
+# Cache compartilhado entre processos/containers (locks e resultados do single-flight).
+# Sem CACHE_URL usa cache em memória local (coalescência apenas dentro do processo).
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
@@ -8,4 +8,5 @@ urlpatterns = [
     path('auth/', include('user_auth.urls')),
     path('', include('core.urls')),
     path('scraping/', include('web_scraping.urls')),
+    path('chatbot/', include('chatbot_whatsapp.urls')),
 ]
\ No newline at end of file
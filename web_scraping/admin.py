@@ -9,7 +9,8 @@ from django.db.models import Count
 from .models import (
     ProcessedGoogleFormSubmission,
     PatientRegistrationLog,
-    GoogleFormsSync
+    GoogleFormsSync,
+    ScrapingJob
 )
 
 
@@ -23,12 +24,14 @@ class ProcessedGoogleFormSubmissionAdmin(admin.ModelAdmin):
         'email',
         'status_badge',
         'patient_id_in_platform',
+        'stage',
         'attempts',
         'processed_at'
     ]
     
     list_filter = [
         'status',
+        'stage',
         'processed_at',
         'attempts'
     ]
@@ -42,6 +45,8 @@ class ProcessedGoogleFormSubmissionAdmin(admin.ModelAdmin):
     readonly_fields = [
         'processed_at',
         'last_attempt_at',
+        'stage_updated_at',
+        'lease_expires_at',
         'raw_form_data_display'
     ]
     
@@ -53,7 +58,7 @@ class ProcessedGoogleFormSubmissionAdmin(admin.ModelAdmin):
             'fields': ('status', 'patient_id_in_platform', 'error_message')
         }),
         ('Rastreamento', {
-            'fields': ('attempts', 'processed_at', 'last_attempt_at')
+            'fields': ('attempts', 'processed_at', 'last_attempt_at', 'stage', 'stage_updated_at', 'lease_expires_at')
         }),
         ('Dados do Formulário', {
             'fields': ('raw_form_data_display',),
@@ -103,6 +108,7 @@ class PatientRegistrationLogAdmin(admin.ModelAdmin):
         'attempt_number',
         'step',
         'success_badge',
+        'duration_ms',
         'timestamp'
     ]
     
@@ -129,7 +135,7 @@ class PatientRegistrationLogAdmin(admin.ModelAdmin):
             'fields': ('submission',)
         }),
         ('Informações da Tentativa', {
-            'fields': ('attempt_number', 'step', 'success', 'timestamp')
+            'fields': ('attempt_number', 'step', 'success', 'duration_ms', 'timestamp')
         }),
         ('Mensagens', {
             'fields': ('message_display', 'error_details_display')
@@ -210,7 +216,7 @@ class GoogleFormsSyncAdmin(admin.ModelAdmin):
             'fields': ('statistics_display',)
         }),
         ('Duração', {
-            'fields': ('duration_seconds',)
+            'fields': ('duration_seconds', 'last_sheet_row')
         }),
         ('Erros', {
             'fields': ('error_message',),
@@ -272,3 +278,49 @@ class GoogleFormsSyncAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         """Permitir apenas admin deletar"""
         return request.user.is_superuser
+
+
+@admin.register(ScrapingJob)
+class ScrapingJobAdmin(admin.ModelAdmin):
+    """Admin para jobs assíncronos de scraping"""
+    
+    list_display = [
+        'id',
+        'job_type',
+        'status',
+        'phase',
+        'pages_done',
+        'rows_extracted',
+        'requested_by',
+        'created_at',
+        'finished_at'
+    ]
+    
+    list_filter = [
+        'job_type',
+        'status',
+        'created_at'
+    ]
+    
+    readonly_fields = [
+        'job_type',
+        'dedup_key',
+        'params',
+        'status',
+        'phase',
+        'pages_done',
+        'rows_extracted',
+        'message',
+        'result',
+        'error_message',
+        'task_id',
+        'requested_by',
+        'created_at',
+        'started_at',
+        'finished_at',
+        'updated_at'
+    ]
+    
+    def has_add_permission(self, request):
+        """Jobs são criados apenas pelos endpoints de sincronização"""
+        return False
@@ -0,0 +1 @@
+"""Management package for `web_scraping` app."""
@@ -0,0 +1 @@
+"""Commands package for web_scraping management commands."""
@@ -0,0 +1,214 @@
+"""
+Comando Django para medir e conferir o parser de agendamentos do cellContents
+Uso:
+  python manage.py bench_appointment_parser
+  python manage.py bench_appointment_parser --days 120 --per-day 40 --iterations 20
+  python manage.py bench_appointment_parser --fixture gravacao_agenda.html --fuzz 0
+  python manage.py bench_appointment_parser --fuzz 5000 --seed 7
+
+O fixture pode ser o HTML gravado da AgendaAtendimentos.aspx (com `var cellContents = {...};`)
+ou um JSON {data: html}. Sem fixture, um cellContents grande é gerado com a mesma estrutura.
+
+Compara o parser atual (services/appointment_parser) com a implementação anterior do
+CalendarScraper (mantida abaixo como referência): a saída deve ser idêntica.
+"""
+
+import json
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from web_scraping.services import appointment_parser
+
+
+# ----------------------------------------------------------------------
+# Implementação de referência (parser anterior do CalendarScraper)
+# ----------------------------------------------------------------------
+def reference_parse_day(date_str, html_content):
+    appointments = []
+    appointment_pattern = r'<div align=left style="[^"]*margin: 1px;[^"]*background-color: #F4511E[^"]*"[^>]*>(.*?)</div>'
+    matches = re.findall(appointment_pattern, html_content, re.DOTALL | re.IGNORECASE)
+    for i, match in enumerate(matches):
+        appointment_data = reference_parse_single(match, date_str, i)
+        if appointment_data:
+            appointments.append(appointment_data)
+    return appointments
+
+
+def reference_parse_single(appointment_html, date_str, index):
+    try:
+        font_matches = re.findall(r'<font[^>]*>(.*?)</font>', appointment_html, re.DOTALL)
+        if not font_matches:
+            return None
+        font_content = font_matches[0]
+        lines = [line.strip() for line in re.split(r'<BR\s*/?>', font_content) if line.strip()]
+        if not lines:
+            return None
+        appointment_data = {'date': date_str, 'lines': lines}
+        first_line = lines[0]
+        time_match = re.search(r'(\d{1,2}:\d{2})', first_line)
+        if time_match:
+            appointment_data['time'] = time_match.group(1)
+            appointment_data['patient_name'] = first_line.replace(time_match.group(1), '').strip()
+        else:
+            appointment_data['time'] = "09:00"
+            appointment_data['patient_name'] = first_line
+        appointment_data['vaccine_info'] = lines[1] if len(lines) > 1 else "Vacina não especificada"
+        appointment_data['observations'] = ' | '.join(lines[2:]) if len(lines) > 2 else ""
+        phone_match = re.search(r'(\d{2}\s*\d{4,5}-\d{4})', appointment_html)
+        appointment_data['phone'] = phone_match.group(1) if phone_match else "Não informado"
+        return appointment_data
+    except Exception:
+        return None
+
+
+def reference_clean_js_object(js_obj_str):
+    js_obj_str = js_obj_str.replace("'", '"')
+    js_obj_str = re.sub(r',\s*}', '}', js_obj_str)
+    js_obj_str = re.sub(r',\s*]', ']', js_obj_str)
+    js_obj_str = js_obj_str.replace('\n', '\\n')
+    js_obj_str = js_obj_str.replace('\r', '\\r')
+    return js_obj_str
+
+
+# ----------------------------------------------------------------------
+# Geração de dados
+# ----------------------------------------------------------------------
+NAMES = ['Maria Silva', 'João Souza', 'Ana Paula Costa', 'Pedro Henrique', 'Lúcia Ferreira', 'Théo Martins']
+VACCINES = ['Gripe Tetravalente', 'Hexavalente', 'Meningocócica ACWY', 'Febre Amarela', 'HPV Nonavalente']
+BREAKS = ['<BR>', '<BR/>', '<BR />', '<br>']
+STYLE = 'cursor: pointer; margin: 1px; padding: 2px; background-color: #F4511E; color: white'
+OTHER_STYLE = 'margin: 1px; background-color: #039BE5'
+
+
+def make_block(rng):
+    lines = []
+    if rng.random() < 0.9:
+        lines.append(f"{rng.randint(7, 18):02d}:{rng.choice(['00', '15', '30', '45'])} {rng.choice(NAMES)}")
+    else:
+        lines.append(rng.choice(NAMES))
+    if rng.random() < 0.9:
+        lines.append(rng.choice(VACCINES))
+    for _ in range(rng.randint(0, 3)):
+        lines.append(rng.choice(['Dose 2', 'Levar carteirinha', '  ', f'Tel: 11 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}']))
+    body = ''.join(line + rng.choice(BREAKS) for line in lines)
+    style = STYLE if rng.random() < 0.85 else OTHER_STYLE
+    return f'<div align=left style="{style}" onclick="abrir({rng.randint(1, 99999)})"><font size=1 color=white>{body}</font></div>'
+
+
+def make_cell_contents(rng, days, per_day):
+    contents = {}
+    for day in range(days):
+        d, m, y = 1 + day % 28, 1 + (day // 28) % 12, 2025 + day // 336
+        contents[f'{d:02d}-{m:02d}-{y}'] = ''.join(make_block(rng) for _ in range(rng.randint(per_day // 2, per_day)))
+    return contents
+
+
+FUZZ_TOKENS = [
+    '<BR>', '<br>', '<BR/>', '<BR  />', '</div>', '<div>', '<font>', '<font color=red>', '</font>', '<FONT>',
+    '12:30', '7:5', '11 98765-4321', '1198765-4321', ' ', '\n', '\r', "'", '"', ',', ', }', ',]', '}', ']',
+    'margin: 1px;', 'background-color: #F4511E', '<div align=left style="margin: 1px; background-color: #f4511e">',
+    'é', '١٢:٣٤',
+]
+
+
+def mutate(rng, text):
+    chars = list(text)
+    for _ in range(rng.randint(1, 6)):
+        op = rng.random()
+        pos = rng.randint(0, len(chars))
+        if op < 0.6:
+            chars[pos:pos] = list(rng.choice(FUZZ_TOKENS))
+        elif chars:
+            del chars[pos:pos + rng.randint(1, 8)]
+    return ''.join(chars)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark e teste de equivalência (fuzz) do parser de agendamentos do cellContents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fixture', type=str, default=None,
+                            help='HTML gravado da agenda ou JSON {data: html} (padrão: gerado)')
+        parser.add_argument('--days', type=int, default=90, help='Dias no cellContents gerado')
+        parser.add_argument('--per-day', type=int, default=30, help='Máximo de agendamentos por dia gerado')
+        parser.add_argument('--iterations', type=int, default=10, help='Repetições do benchmark')
+        parser.add_argument('--fuzz', type=int, default=2000, help='Casos aleatórios de equivalência (0 desliga)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _load_fixture(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                raw = f.read()
+        except OSError as e:
+            raise CommandError(f'❌ Não foi possível ler o fixture: {e}')
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            contents = appointment_parser.extract_cell_contents_from_html(raw)
+            if contents is None:
+                raise CommandError('❌ Fixture sem `var cellContents = {...};`')
+            return contents
+
+    def _bench(self, fn, iterations):
+        best = None
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['fixture']:
+            contents = self._load_fixture(options['fixture'])
+        else:
+            contents = make_cell_contents(rng, options['days'], options['per_day'])
+        js_literal = '{' + ',\n'.join(f"'{k}': '{v}'," for k, v in contents.items()) + '\n}'
+
+        # Equivalência no fixture completo
+        reference = [a for d, h in contents.items() for a in reference_parse_day(d, h)]
+        current = appointment_parser.parse_cell_contents(contents)
+        if reference != current:
+            raise CommandError('❌ Saída do parser difere da implementação de referência no fixture')
+        if reference_clean_js_object(js_literal) != appointment_parser.clean_js_object(js_literal):
+            raise CommandError('❌ clean_js_object difere da implementação de referência no fixture')
+
+        size_kb = sum(len(h) for h in contents.values()) / 1024
+        self.stdout.write(f'📅 Fixture: {len(contents)} dias, {len(current)} agendamentos, {size_kb:.0f} KB de HTML')
+
+        iterations = max(options['iterations'], 1)
+        rows = [
+            ('parse (cellContents)',
+             lambda: [reference_parse_day(d, h) for d, h in contents.items()],
+             lambda: appointment_parser.parse_cell_contents(contents)),
+            ('clean_js_object',
+             lambda: reference_clean_js_object(js_literal),
+             lambda: appointment_parser.clean_js_object(js_literal)),
+        ]
+        for label, old, new in rows:
+            t_old = self._bench(old, iterations)
+            t_new = self._bench(new, iterations)
+            self.stdout.write(
+                f'⏱️  {label}: anterior {t_old * 1000:.2f} ms | atual {t_new * 1000:.2f} ms '
+                f'({t_old / t_new if t_new else 0:.2f}x)'
+            )
+
+        # Fuzz: blocos e literais mutados aleatoriamente
+        days = list(contents.items())
+        for case in range(options['fuzz']):
+            date_str, html = rng.choice(days)
+            start = rng.randint(0, max(len(html) - 2000, 0))
+            sample = mutate(rng, html[start:start + rng.randint(200, 2000)])
+            if reference_parse_day(date_str, sample) != appointment_parser.parse_day(date_str, sample):
+                raise CommandError(f'❌ Divergência no caso de fuzz {case}: {sample!r}')
+            literal = mutate(rng, js_literal[start:start + 500])
+            if reference_clean_js_object(literal) != appointment_parser.clean_js_object(literal):
+                raise CommandError(f'❌ Divergência em clean_js_object no caso {case}: {literal!r}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Saída idêntica à implementação anterior ({options['fuzz']} casos de fuzz)"
+        ))
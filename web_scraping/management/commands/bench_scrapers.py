@@ -0,0 +1,248 @@
+"""
+Comando Django para medir os scrapers contra o sistema matriz de teste (offline)
+Uso:
+  python manage.py bench_scrapers
+  python manage.py bench_scrapers --latency 0.15 --jitter 0.05 --iterations 3
+  python manage.py bench_scrapers --only stock,calendar --vaccines 200
+  python manage.py bench_scrapers --no-headless
+
+Sobe o MatrixFixtureServer em uma porta livre, aponta MATRIX_SYSTEM_URL para
+ele e executa StockScraper, CalendarScraper, UsersScraper, PatientSearchScraper e
+PatientRegistrationScraper com o Chrome real, conferindo o resultado com os
+dados servidos. Nada é gravado no banco (apenas métodos de extração são usados).
+
+Requer Chrome/ChromeDriver (o mesmo ambiente dos workers).
+"""
+
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from web_scraping.services import appointment_parser
+from web_scraping.utils.browser_manager import BrowserManager
+from web_scraping.utils.matrix_fixture_server import FixtureData, MatrixFixtureServer, format_cpf
+
+SCRAPERS = ['stock', 'calendar', 'users', 'search', 'registration']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark dos scrapers contra um servidor local que imita o sistema matriz'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', type=str, default='',
+                            help=f'Scrapers separados por vírgula ({",".join(SCRAPERS)})')
+        parser.add_argument('--iterations', type=int, default=1, help='Repetições por scraper')
+        parser.add_argument('--latency', type=float, default=0.05, help='Atraso por resposta (segundos)')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Variação aleatória do atraso (segundos)')
+        parser.add_argument('--vaccines', type=int, default=45)
+        parser.add_argument('--patients', type=int, default=120)
+        parser.add_argument('--per-day', type=int, default=12, help='Máximo de agendamentos por dia')
+        parser.add_argument('--months', type=int, default=3, help='Meses no teste de intervalo do calendário')
+        parser.add_argument('--browsers', type=int, default=None,
+                            help='Navegadores no intervalo do calendário (padrão: CALENDAR_SCRAPER_MAX_BROWSERS)')
+        parser.add_argument('--no-headless', action='store_true', help='Mostra o navegador')
+        parser.add_argument('--seed', type=int, default=42)
+
+    # ------------------------------------------------------------------
+    # Infra
+    # ------------------------------------------------------------------
+    def _browser(self):
+        browser = BrowserManager()
+        try:
+            browser.start_browser(headless=not self.options['no_headless'])
+        except Exception as e:
+            raise CommandError(f'❌ Não foi possível iniciar o Chrome: {e}')
+        if not browser.driver:
+            raise CommandError('❌ Não foi possível iniciar o Chrome')
+        return browser
+
+    def _timed(self, label, fn, check):
+        """Executa `fn` N vezes, valida com `check(resultado, iteração)` e registra os tempos."""
+        times = []
+        for i in range(self.iterations):
+            started = time.perf_counter()
+            result = fn(i)
+            times.append(time.perf_counter() - started)
+            problem = check(result, i)
+            if problem:
+                self.failures.append(f'{label}: {problem}')
+                self.stdout.write(self.style.ERROR(f'  ❌ {label} (execução {i + 1}): {problem}'))
+        self.rows.append((label, times))
+        self.stdout.write(f'  ⏱️  {label}: {self._fmt(times)}')
+
+    @staticmethod
+    def _fmt(times):
+        return f'mín {min(times):.2f}s | mediana {statistics.median(times):.2f}s | máx {max(times):.2f}s'
+
+    def _login(self, scraper, label):
+        started = time.perf_counter()
+        if not scraper.ensure_login():
+            raise CommandError(f'❌ Login falhou no servidor de teste ({label})')
+        self.rows.append((f'login ({label})', [time.perf_counter() - started]))
+
+    # ------------------------------------------------------------------
+    # Scrapers
+    # ------------------------------------------------------------------
+    def bench_stock(self, browser):
+        from web_scraping.services.stock_scraper import StockScraper
+
+        scraper = StockScraper(browser)
+        self._login(scraper, 'stock')
+        expected = {v['name'] for v in self.data.vaccines}
+
+        def check(result, i):
+            names = {item['name'] for item in result}
+            if names != expected:
+                return f'{len(names & expected)}/{len(expected)} vacinas extraídas'
+
+        self._timed('stock: scrape_stock_data', lambda i: scraper.scrape_stock_data(), check)
+
+    def bench_calendar(self, browser):
+        from web_scraping.services.calendar_scraper import CalendarScraper
+
+        scraper = CalendarScraper(browser)
+        self._login(scraper, 'calendar')
+        today = self.data.today
+
+        def expected(year, month):
+            return len(appointment_parser.parse_cell_contents(self.data.month_cell_contents(year, month)))
+
+        def check_month(result, i):
+            if len(result) != expected(today.year, today.month):
+                return f'{len(result)} agendamentos, esperado {expected(today.year, today.month)}'
+
+        self._timed('calendar: scrape_month', lambda i: scraper.scrape_month(today.year, today.month), check_month)
+
+        months = []
+        current = today.replace(day=1)
+        for _ in range(max(self.options['months'], 1)):
+            months.append(current)
+            current = (current + timedelta(days=32)).replace(day=1)
+        start, end = months[0].strftime('%Y-%m'), months[-1].strftime('%Y-%m')
+
+        def check_range(result, i):
+            total = sum(expected(m.year, m.month) for m in months)
+            if result['errors']:
+                return f"meses com erro: {result['errors']}"
+            if len(result['appointments']) > total or not result['appointments']:
+                return f"{len(result['appointments'])} agendamentos, esperado até {total}"
+
+        self._timed(
+            f'calendar: scrape_range {start}..{end}',
+            lambda i: scraper.scrape_range(start, end, max_browsers=self.options['browsers'], sync=False),
+            check_range,
+        )
+
+    def bench_users(self, browser):
+        from web_scraping.services.users_scraper import UsersScraper
+
+        scraper = UsersScraper(browser)
+        self._login(scraper, 'users')
+        oldest_recent = sorted(p['registered'] for p in self.data.patients)[-20]
+
+        def check(result, i):
+            if len(result) != 20:
+                return f'{len(result)} usuários, esperado 20'
+            older = [u for u in result if datetime.strptime(u['register_date'], '%d/%m/%Y').date() < oldest_recent]
+            if older:
+                return f'{len(older)} usuários fora dos 20 cadastros mais recentes'
+
+        self._timed('users: scrape_recent_users(20)', lambda i: scraper.scrape_recent_users(limit=20), check)
+
+    def bench_search(self, browser):
+        from web_scraping.services.patient_search_scraper import PatientSearchScraper
+
+        scraper = PatientSearchScraper(browser)
+        self._login(scraper, 'search')
+        rng = random.Random(self.options['seed'])
+        targets = [rng.choice(self.data.patients) for _ in range(self.iterations)]
+
+        def check_found(result, i):
+            if not result or result['name'] != targets[i]['name']:
+                return f"CPF {format_cpf(targets[i]['cpf'])} não encontrado corretamente: {result}"
+
+        self._timed('search: CPF existente', lambda i: scraper.search_by_cpf(targets[i]['cpf']), check_found)
+        self._timed(
+            'search: CPF inexistente',
+            lambda i: scraper.search_by_cpf('000.000.001-91'),
+            lambda result, i: f'resultado inesperado: {result}' if result else None,
+        )
+
+    def bench_registration(self, browser):
+        from web_scraping.services.patient_registration_scraper import PatientRegistrationScraper
+
+        scraper = PatientRegistrationScraper(browser)
+        self._login(scraper, 'registration')
+        rng = random.Random(self.options['seed'] + 1)
+        cpfs = []
+        while len(cpfs) < self.iterations:
+            cpf = ''.join(str(rng.randint(0, 9)) for _ in range(11))
+            if not self.data.find_patient(cpf) and cpf not in cpfs:
+                cpfs.append(cpf)
+
+        def register(i):
+            return scraper.register_patient_from_google_forms({
+                'Nome completo': f'Paciente Benchmark {i + 1}',
+                'CPF': format_cpf(cpfs[i]),
+                'Data de nascimento': '15/03/1990',
+                'Sexo': 'Feminino',
+                'Celular principal': '11987654321',
+                'Cidade': 'Arujá',
+                'UF (estado)': 'SP',
+                'CEP': '07400000',
+            })
+
+        def check(result, i):
+            if not result.get('success'):
+                return result.get('message')
+            if not self.data.find_patient(cpfs[i]):
+                return 'paciente não chegou ao servidor'
+
+        self._timed('registration: register_patient_from_google_forms', register, check)
+
+    # ------------------------------------------------------------------
+    def handle(self, *args, **options):
+        self.options = options
+        self.iterations = max(options['iterations'], 1)
+        selected = [s.strip() for s in options['only'].split(',') if s.strip()] or SCRAPERS
+        unknown = set(selected) - set(SCRAPERS)
+        if unknown:
+            raise CommandError(f'❌ Scraper desconhecido: {", ".join(sorted(unknown))}')
+
+        self.data = FixtureData(
+            vaccines=options['vaccines'],
+            patients=options['patients'],
+            appointments_per_day=options['per_day'],
+            seed=options['seed'],
+            today=date.today(),
+        )
+        self.rows, self.failures = [], []
+
+        with MatrixFixtureServer(self.data, latency=options['latency'], jitter=options['jitter']) as server:
+            self.stdout.write(
+                f'🧪 Sistema matriz de teste em {server.url} '
+                f'(latência {options["latency"]:.3f}s ± {options["jitter"]:.3f}s)'
+            )
+            with override_settings(MATRIX_SYSTEM_URL=server.url, MATRIX_SYSTEM_USERNAME='benchmark',
+                                   MATRIX_SYSTEM_PASSWORD='benchmark'):
+                for name in selected:
+                    self.stdout.write(f'\n🚀 {name}')
+                    browser = self._browser()
+                    try:
+                        getattr(self, f'bench_{name}')(browser)
+                    finally:
+                        browser.quit_browser()
+            requests = server.requests
+
+        self.stdout.write('\n📊 Resumo')
+        for label, times in self.rows:
+            self.stdout.write(f'  {label:<55} {self._fmt(times)}')
+        self.stdout.write(f'  Requisições ao servidor de teste: {requests}')
+
+        if self.failures:
+            raise CommandError(f'❌ {len(self.failures)} verificação(ões) falharam: ' + '; '.join(self.failures))
+        self.stdout.write(self.style.SUCCESS('✅ Todos os scrapers retornaram os dados esperados'))
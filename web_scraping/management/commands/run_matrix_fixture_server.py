@@ -0,0 +1,56 @@
+"""
+Sobe o servidor local que imita o sistema matriz (utils/matrix_fixture_server)
+Uso:
+  python manage.py run_matrix_fixture_server
+  python manage.py run_matrix_fixture_server --port 8765 --latency 0.2 --jitter 0.05
+
+Para apontar a aplicação para ele, use no .env:
+  MATRIX_SYSTEM_URL=http://127.0.0.1:8765
+  MATRIX_SYSTEM_USERNAME=<qualquer> / MATRIX_SYSTEM_PASSWORD=<qualquer>
+"""
+
+from django.core.management.base import BaseCommand
+
+from web_scraping.utils.matrix_fixture_server import FixtureData, MatrixFixtureServer
+
+
+class Command(BaseCommand):
+    help = 'Servidor local com páginas gravadas/sintéticas do sistema matriz (login, estoque, pacientes, agenda)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help='Atraso por resposta (segundos)')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Variação aleatória do atraso (segundos)')
+        parser.add_argument('--vaccines', type=int, default=45, help='Vacinas no grid de estoque')
+        parser.add_argument('--patients', type=int, default=120, help='Pacientes no grid de pacientes')
+        parser.add_argument('--per-day', type=int, default=12, help='Máximo de agendamentos por dia')
+        parser.add_argument('--username', default='', help='Usuário aceito (padrão: qualquer)')
+        parser.add_argument('--password', default='')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        data = FixtureData(
+            vaccines=options['vaccines'],
+            patients=options['patients'],
+            appointments_per_day=options['per_day'],
+            seed=options['seed'],
+        )
+        server = MatrixFixtureServer(
+            data,
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            username=options['username'],
+            password=options['password'],
+            verbose=options['verbosity'] > 1,
+        )
+        self.stdout.write(self.style.SUCCESS(f'🧪 Sistema matriz de teste em {server.url} (Ctrl+C para sair)'))
+        self.stdout.write(f'   Latência: {options["latency"]:.3f}s ± {options["jitter"]:.3f}s')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('\n🛑 Encerrando...')
+        finally:
+            server.stop()
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_scraping', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(choices=[('sync_calendar', 'Sincronização do Calendário'), ('sync_stock', 'Sincronização de Estoque'), ('sync_recent_users', 'Sincronização de Usuários Recentes')], max_length=40)),
+                ('dedup_key', models.CharField(help_text='Operação + argumentos; um job ativo por chave', max_length=120)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('running', 'Executando'), ('completed', 'Concluído'), ('failed', 'Falhou')], default='pending', max_length=20)),
+                ('phase', models.CharField(blank=True, default='queued', max_length=40)),
+                ('pages_done', models.IntegerField(default=0)),
+                ('rows_extracted', models.IntegerField(default=0)),
+                ('message', models.CharField(blank=True, default='', max_length=255)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('task_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('requested_by', models.CharField(blank=True, default='', max_length=150)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Job de Scraping',
+                'verbose_name_plural': 'Jobs de Scraping',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['job_type', 'status'], name='scraping_job_type_status_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='scrapingjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('dedup_key',), name='unique_active_scraping_job'),
+        ),
+    ]
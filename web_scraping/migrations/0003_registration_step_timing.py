@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_scraping', '0002_scraping_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientregistrationlog',
+            name='duration_ms',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='patientregistrationlog',
+            index=models.Index(fields=['step', 'timestamp'], name='registration_log_step_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_scraping', '0003_registration_step_timing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='googleformssync',
+            name='last_sheet_row',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='processedgoogleformsubmission',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, help_text="Enquanto 'processando': após este horário o worker é considerado morto e a submissão volta à fila", null=True),
+        ),
+        migrations.AddField(
+            model_name='processedgoogleformsubmission',
+            name='stage',
+            field=models.CharField(blank=True, choices=[('', 'Não iniciado'), ('validated', 'Validado'), ('dedup_checked', 'Duplicidade verificada'), ('form_opened', 'Formulário aberto'), ('filled', 'Formulário preenchido'), ('submitted', 'Enviado'), ('confirmed', 'Confirmado')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='processedgoogleformsubmission',
+            name='stage_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='processedgoogleformsubmission',
+            index=models.Index(fields=['status', 'lease_expires_at'], name='submission_status_lease_idx'),
+        ),
+    ]
@@ -3,6 +3,7 @@ Modelos para rastreamento de sincronização de web scraping
 """
 
 from django.db import models
+from django.utils import timezone
 from core.models import User
 
 
@@ -11,6 +12,14 @@ class ProcessedGoogleFormSubmission(models.Model):
     Rastreia submissões do Google Forms que foram processadas para evitar duplicatas
     """
     
+    # Etapas do cadastro, em ordem (checkpoint persistido após cada uma)
+    STAGE_VALIDATED = 'validated'
+    STAGE_DEDUP_CHECKED = 'dedup_checked'
+    STAGE_FORM_OPENED = 'form_opened'
+    STAGE_FILLED = 'filled'
+    STAGE_SUBMITTED = 'submitted'
+    STAGE_CONFIRMED = 'confirmed'
+    
     cpf = models.CharField(max_length=14, unique=True, db_index=True)
     email = models.EmailField(blank=True, null=True)
     full_name = models.CharField(max_length=255)
@@ -35,6 +44,27 @@ class ProcessedGoogleFormSubmission(models.Model):
     attempts = models.IntegerField(default=0)
     last_attempt_at = models.DateTimeField(blank=True, null=True)
     
+    # Checkpoint do pipeline de cadastro (web_scraping.services.registration_pipeline)
+    stage = models.CharField(
+        max_length=20,
+        choices=[
+            ('', 'Não iniciado'),
+            (STAGE_VALIDATED, 'Validado'),
+            (STAGE_DEDUP_CHECKED, 'Duplicidade verificada'),
+            (STAGE_FORM_OPENED, 'Formulário aberto'),
+            (STAGE_FILLED, 'Formulário preenchido'),
+            (STAGE_SUBMITTED, 'Enviado'),
+            (STAGE_CONFIRMED, 'Confirmado'),
+        ],
+        blank=True,
+        default=''
+    )
+    stage_updated_at = models.DateTimeField(blank=True, null=True)
+    lease_expires_at = models.DateTimeField(
+        blank=True, null=True,
+        help_text="Enquanto 'processando': após este horário o worker é considerado morto e a submissão volta à fila"
+    )
+    
     # Referência a User do sistema (se aplicável)
     local_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     
@@ -45,6 +75,9 @@ class ProcessedGoogleFormSubmission(models.Model):
         verbose_name = "Submissão de Google Form Processada"
         verbose_name_plural = "Submissões de Google Forms Processadas"
         ordering = ['-processed_at']
+        indexes = [
+            models.Index(fields=['status', 'lease_expires_at'], name='submission_status_lease_idx'),
+        ]
     
     def __str__(self):
         return f"{self.full_name} ({self.cpf}) - {self.get_status_display()}"
@@ -78,10 +111,16 @@ class PatientRegistrationLog(models.Model):
         ]
     )
     
+    # Tempo gasto na etapa (BaseScraper.trace_step); vazio em logs antigos
+    duration_ms = models.IntegerField(blank=True, null=True)
+    
     class Meta:
         verbose_name = "Log de Registro de Paciente"
         verbose_name_plural = "Logs de Registros de Pacientes"
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['step', 'timestamp'], name='registration_log_step_idx'),
+        ]
     
     def __str__(self):
         return f"Tentativa {self.attempt_number} - {self.submission.full_name}"
@@ -115,6 +154,9 @@ class GoogleFormsSync(models.Model):
     error_message = models.TextField(blank=True, null=True)
     duration_seconds = models.IntegerField(blank=True, null=True)
     
+    # Última linha da planilha já ingerida (a próxima sincronização lê a partir da seguinte)
+    last_sheet_row = models.IntegerField(blank=True, null=True)
+    
     class Meta:
         verbose_name = "Sincronização de Google Forms"
         verbose_name_plural = "Sincronizações de Google Forms"
@@ -122,3 +164,115 @@ class GoogleFormsSync(models.Model):
     
     def __str__(self):
         return f"Sincronização {self.synced_at.strftime('%d/%m/%Y %H:%M:%S')} - {self.get_status_display()}"
+
+
+class ScrapingJob(models.Model):
+    """
+    Job assíncrono de scraping (executado por um worker Celery).
+
+    As views apenas enfileiram o job e devolvem o id; o progresso (fase,
+    páginas processadas, linhas extraídas) é gravado pelo worker e consultado
+    por polling ou SSE. A restrição única parcial em `dedup_key` garante no
+    máximo um job ativo (pendente/executando) por operação.
+    """
+
+    TYPE_SYNC_CALENDAR = 'sync_calendar'
+    TYPE_SYNC_STOCK = 'sync_stock'
+    TYPE_SYNC_RECENT_USERS = 'sync_recent_users'
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+
+    job_type = models.CharField(
+        max_length=40,
+        choices=[
+            (TYPE_SYNC_CALENDAR, 'Sincronização do Calendário'),
+            (TYPE_SYNC_STOCK, 'Sincronização de Estoque'),
+            (TYPE_SYNC_RECENT_USERS, 'Sincronização de Usuários Recentes'),
+        ]
+    )
+    dedup_key = models.CharField(max_length=120, help_text="Operação + argumentos; um job ativo por chave")
+    params = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (STATUS_PENDING, 'Pendente'),
+            (STATUS_RUNNING, 'Executando'),
+            (STATUS_COMPLETED, 'Concluído'),
+            (STATUS_FAILED, 'Falhou'),
+        ],
+        default=STATUS_PENDING
+    )
+
+    # Progresso
+    phase = models.CharField(max_length=40, blank=True, default='queued')
+    pages_done = models.IntegerField(default=0)
+    rows_extracted = models.IntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True, default='')
+
+    # Resultado
+    result = models.JSONField(blank=True, null=True)
+    error_message = models.TextField(blank=True, null=True)
+
+    # Rastreamento
+    task_id = models.CharField(max_length=255, blank=True, null=True)
+    requested_by = models.CharField(max_length=150, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Job de Scraping"
+        verbose_name_plural = "Jobs de Scraping"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['job_type', 'status'], name='scraping_job_type_status_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='unique_active_scraping_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_job_type_display()} #{self.pk} - {self.get_status_display()}"
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    @property
+    def duration_seconds(self):
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        return round((end - self.started_at).total_seconds(), 1)
+
+    def to_dict(self, include_result=True):
+        """Representação JSON usada pelos endpoints de status."""
+        data = {
+            'id': self.pk,
+            'job_type': self.job_type,
+            'status': self.status,
+            'phase': self.phase,
+            'pages_done': self.pages_done,
+            'rows_extracted': self.rows_extracted,
+            'message': self.message,
+            'error_message': self.error_message,
+            'requested_by': self.requested_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_seconds': self.duration_seconds,
+            'done': not self.is_active,
+        }
+        if include_result:
+            data['result'] = self.result
+        return data
@@ -0,0 +1,112 @@
+# web_scraping/services/appointment_parser.py
+"""
+Parser do HTML de agendamentos do `cellContents` (AgendaAtendimentos.aspx).
+
+Cada data do cellContents traz blocos
+    <div align=left style="...margin: 1px;...background-color: #F4511E...">
+        <font ...>HH:MM Nome<BR>Vacina<BR>Obs...</font> ... telefone ...
+    </div>
+
+Os padrões são compilados uma única vez no módulo e o HTML de cada dia é
+percorrido em uma passada (finditer sobre os blocos); dentro de cada bloco
+apenas o primeiro <font> é localizado (search, não findall) e quebrado nos <BR>.
+
+O resultado é idêntico ao parser anterior do CalendarScraper (que usava
+re.findall/re.search/re.split com padrões em string a cada chamada); a
+equivalência e o ganho de tempo podem ser conferidos com
+`python manage.py bench_appointment_parser`.
+"""
+
+import json
+import re
+from typing import Dict, List, Optional
+
+BLOCK_RE = re.compile(
+    r'<div align=left style="[^"]*margin: 1px;[^"]*background-color: #F4511E[^"]*"[^>]*>(.*?)</div>',
+    re.DOTALL | re.IGNORECASE,
+)
+FONT_RE = re.compile(r'<font[^>]*>(.*?)</font>', re.DOTALL)
+BR_RE = re.compile(r'<BR\s*/?>')
+TIME_RE = re.compile(r'(\d{1,2}:\d{2})')
+PHONE_RE = re.compile(r'(\d{2}\s*\d{4,5}-\d{4})')
+CELL_CONTENTS_RE = re.compile(r'var\s+cellContents\s*=\s*(\{.*?\});', re.DOTALL)
+TRAILING_COMMA_RE = re.compile(r',\s*[}\]]')
+
+DEFAULT_TIME = "09:00"
+NO_VACCINE = "Vacina não especificada"
+NO_PHONE = "Não informado"
+
+
+def parse_appointment(appointment_html: str, date_str: str) -> Optional[Dict]:
+    """Interpreta um bloco de agendamento. Retorna None se não houver conteúdo."""
+    font = FONT_RE.search(appointment_html)
+    if font is None:
+        return None
+
+    lines = []
+    for part in BR_RE.split(font.group(1)):
+        part = part.strip()
+        if part:
+            lines.append(part)
+    if not lines:
+        return None
+
+    data = {'date': date_str, 'lines': lines}
+
+    # Primeira linha: horário e nome
+    first_line = lines[0]
+    time_match = TIME_RE.search(first_line)
+    if time_match:
+        data['time'] = time_match.group(1)
+        data['patient_name'] = first_line.replace(time_match.group(1), '').strip()
+    else:
+        data['time'] = DEFAULT_TIME
+        data['patient_name'] = first_line
+
+    # Segunda linha: vacina; demais: observações
+    data['vaccine_info'] = lines[1] if len(lines) > 1 else NO_VACCINE
+    data['observations'] = ' | '.join(lines[2:]) if len(lines) > 2 else ""
+
+    phone = PHONE_RE.search(appointment_html)
+    data['phone'] = phone.group(1) if phone else NO_PHONE
+    return data
+
+
+def parse_day(date_str: str, html_content: str) -> List[Dict]:
+    """Todos os agendamentos de uma data do cellContents."""
+    appointments = []
+    for block in BLOCK_RE.finditer(html_content):
+        appointment = parse_appointment(block.group(1), date_str)
+        if appointment:
+            appointments.append(appointment)
+    return appointments
+
+
+def parse_cell_contents(cell_contents: Dict[str, str]) -> List[Dict]:
+    """Agendamentos de todas as datas de um cellContents já decodificado."""
+    appointments = []
+    for date_str, html_content in cell_contents.items():
+        appointments.extend(parse_day(date_str, html_content))
+    return appointments
+
+
+def _keep_bracket(match):
+    return match.group()[-1]
+
+
+def clean_js_object(js_obj_str: str) -> str:
+    """
+    Converte o literal JavaScript do cellContents em JSON: aspas simples
+    viram duplas, vírgulas finais antes de } e ] saem (um único regex) e
+    quebras de linha são escapadas.
+    """
+    js_obj_str = TRAILING_COMMA_RE.sub(_keep_bracket, js_obj_str.replace("'", '"'))
+    return js_obj_str.replace('\n', '\\n').replace('\r', '\\r')
+
+
+def extract_cell_contents_from_html(html: str) -> Optional[Dict[str, str]]:
+    """Localiza `var cellContents = {...};` no HTML da página e decodifica."""
+    match = CELL_CONTENTS_RE.search(html)
+    if not match:
+        return None
+    return json.loads(clean_js_object(match.group(1)))
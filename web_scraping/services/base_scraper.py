@@ -4,6 +4,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
 import os
+from contextlib import contextmanager
 from django.conf import settings
 
 class BaseScraper:
@@ -13,17 +14,75 @@ class BaseScraper:
             print("🔄 Iniciando navegador...")
             self.browser.start_browser(headless=True)
         self.logged_in = False
+        # Callback opcional de progresso (ver services/scraping_jobs.JobProgress)
+        self.progress_callback = None
+        # Etapas cronometradas (ver trace_step)
+        self.step_timings = []
+        self._trace_stack = []
+
+    @staticmethod
+    def matrix_url(path=''):
+        """URL de uma página do sistema matriz (MATRIX_SYSTEM_URL + caminho)"""
+        base = getattr(settings, 'MATRIX_SYSTEM_URL', '') or 'https://aruja.gocfranquias.com.br'
+        return f"{base.rstrip('/')}/{path.lstrip('/')}"
+
+    def report_progress(self, **fields):
+        """Informa progresso (phase, pages_done, rows_extracted, message) ao job, se houver"""
+        if not self.progress_callback:
+            return
+        try:
+            self.progress_callback(**fields)
+        except Exception as e:
+            print(f"⚠️ Não foi possível registrar progresso: {e}")
     
+    @contextmanager
+    def trace_step(self, step, message=''):
+        """
+        Cronometra uma etapa e registra em self.step_timings:
+        {'step', 'duration_ms', 'success', 'message', 'error'}.
+
+        O bloco pode marcar falha com `span['success'] = False`; exceções
+        também marcam falha (e são propagadas). Etapas aninhadas descontam o
+        próprio tempo da etapa externa, então as durações não se sobrepõem.
+        """
+        span = {'step': step, 'success': True, 'message': message, 'error': None, '_children_ms': 0}
+        started = time.perf_counter()
+        self._trace_stack.append(span)
+        try:
+            yield span
+        except Exception as e:
+            span['success'] = False
+            span['error'] = str(e)
+            raise
+        finally:
+            self._trace_stack.pop()
+            elapsed_ms = int((time.perf_counter() - started) * 1000)
+            if self._trace_stack:
+                self._trace_stack[-1]['_children_ms'] += elapsed_ms
+            span['duration_ms'] = max(elapsed_ms - span.pop('_children_ms'), 0)
+            self.step_timings.append(span)
+
+    def reset_trace(self):
+        """Descarta as etapas cronometradas (início de uma nova operação)"""
+        self.step_timings = []
+        self._trace_stack = []
+
     def login(self, username=None, password=None):
         """Faz login no sistema matriz"""
         if self.logged_in:
             return True
-            
+
+        with self.trace_step('login') as span:
+            span['success'] = self._perform_login(username, password)
+        return span['success']
+
+    def _perform_login(self, username=None, password=None):
         if not self.browser or not self.browser.driver:
             print("❌ Navegador não foi inicializado corretamente")
             return False
             
         print("🔐 Realizando login no sistema matriz...")
+        self.report_progress(phase='login', message='Realizando login no sistema matriz...')
         
         # Usa credenciais do Django settings (que lê do .env) ou variáveis de ambiente como fallback
         username = username or getattr(settings, 'MATRIX_SYSTEM_USERNAME', None) or os.getenv('MATRIX_SYSTEM_USERNAME', '')
@@ -36,7 +95,7 @@ class BaseScraper:
         
         try:
             # Navega para página de login
-            login_url = "https://aruja.gocfranquias.com.br/login.aspx"
+            login_url = self.matrix_url("login.aspx")
             self.browser.driver.get(login_url)
             
             print(f"📄 Página de login carregada: {self.browser.driver.current_url}")
@@ -2,13 +2,68 @@
 import time
 import re
 import json
-from datetime import datetime
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
+from queue import Queue, Empty
+from django.conf import settings
+from django.db import connection, transaction
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from .base_scraper import BaseScraper
+from . import appointment_parser
+from ..utils.browser_manager import BrowserManager
 from core.models import Appointment, User, Vaccine
 
+PT_MONTHS = [
+    'janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho',
+    'julho', 'agosto', 'setembro', 'outubro', 'novembro', 'dezembro',
+]
+MONTH_HEADER_RE = re.compile(r'(' + '|'.join(PT_MONTHS) + r')\W+(?:de\s+)?(\d{4})')
+
+# Botões de mês seguinte/anterior (jQuery UI datepicker ou Calendar do ASP.NET)
+NEXT_MONTH_SELECTORS = [
+    '#DatePicker .ui-datepicker-next',
+    '#DatePicker a[title*="Próximo"]',
+    '#DatePicker a[title*="próximo"]',
+    '#DatePicker a[title*="Next"]',
+]
+PREV_MONTH_SELECTORS = [
+    '#DatePicker .ui-datepicker-prev',
+    '#DatePicker a[title*="Anterior"]',
+    '#DatePicker a[title*="anterior"]',
+    '#DatePicker a[title*="Prev"]',
+]
+
+
+def parse_month(value):
+    """'YYYY-MM' -> (ano, mês). Lança ValueError se inválido."""
+    try:
+        year, month = (int(part) for part in str(value).split('-'))
+    except Exception:
+        raise ValueError(f'Mês inválido: "{value}". Use o formato AAAA-MM.')
+    if not (1 <= month <= 12 and 2000 <= year <= 2100):
+        raise ValueError(f'Mês inválido: "{value}". Use o formato AAAA-MM.')
+    return year, month
+
+
+def month_range(start_month, end_month):
+    """Lista de (ano, mês) de start_month até end_month (inclusive)."""
+    start = parse_month(start_month)
+    end = parse_month(end_month)
+    if end < start:
+        raise ValueError('O mês final deve ser igual ou posterior ao inicial.')
+    months = []
+    year, month = start
+    while (year, month) <= end:
+        months.append((year, month))
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return months
+
 class CalendarScraper(BaseScraper):
     def __init__(self, browser_manager):
         if not browser_manager.driver:
@@ -16,7 +71,7 @@ class CalendarScraper(BaseScraper):
             browser_manager.start_browser(headless=True)  # Modo headless
             
         super().__init__(browser_manager)
-        self.calendar_url = "https://aruja.gocfranquias.com.br/Cadastro/AgendaAtendimentos.aspx"
+        self.calendar_url = self.matrix_url("Cadastro/AgendaAtendimentos.aspx")
 
     def scrape_calendar(self):
         """Extrai todos os agendamentos do calendário"""
@@ -32,6 +87,7 @@ class CalendarScraper(BaseScraper):
             return []
 
         print("🔄 Navegando para página de agenda...")
+        self.report_progress(phase='navigation', message='Abrindo agenda...')
         self.browser.driver.get(self.calendar_url)
 
         # Aguarda o calendário carregar
@@ -49,6 +105,10 @@ class CalendarScraper(BaseScraper):
         appointments = self._extract_appointments_from_script()
         
         print(f"📊 Total de agendamentos extraídos: {len(appointments)}")
+        self.report_progress(
+            phase='saving', pages_done=1, rows_extracted=len(appointments),
+            message=f'{len(appointments)} agendamentos extraídos; gravando no banco...',
+        )
         
         # Sincroniza com o banco
         self._sync_appointments_to_db(appointments)
@@ -94,10 +154,7 @@ class CalendarScraper(BaseScraper):
             
             for date_str, html_content in cell_contents.items():
                 try:
-                    day_appointments = self._parse_appointments_for_date(date_str, html_content)
-                    appointments.extend(day_appointments)
-                    print(f"  📋 {date_str}: {len(day_appointments)} agendamentos")
-                    
+                    appointments.extend(appointment_parser.parse_day(date_str, html_content))
                 except Exception as e:
                     print(f"❌ Erro ao processar data {date_str}: {e}")
                     continue
@@ -109,79 +166,12 @@ class CalendarScraper(BaseScraper):
 
     def _parse_appointments_for_date(self, date_str, html_content):
         """Extrai todos os agendamentos de uma data específica"""
-        appointments = []
-        
-        # Encontra todos os blocos de agendamento
-        appointment_pattern = r'<div align=left style="[^"]*margin: 1px;[^"]*background-color: #F4511E[^"]*"[^>]*>(.*?)</div>'
-        
-        matches = re.findall(appointment_pattern, html_content, re.DOTALL | re.IGNORECASE)
-        
-        for i, match in enumerate(matches):
-            appointment_data = self._parse_single_appointment(match, date_str, i)
-            if appointment_data:
-                appointments.append(appointment_data)
-                
-        return appointments
+        return appointment_parser.parse_day(date_str, html_content)
 
     def _parse_single_appointment(self, appointment_html, date_str, index):
         """Parse de um agendamento individual"""
         try:
-            # Encontra conteúdo dentro das tags <font>
-            font_pattern = r'<font[^>]*>(.*?)</font>'
-            font_matches = re.findall(font_pattern, appointment_html, re.DOTALL)
-            
-            if not font_matches:
-                return None
-                
-            font_content = font_matches[0]
-            
-            # Divide o conteúdo em linhas (considerando <BR>)
-            lines = [line.strip() for line in re.split(r'<BR\s*/?>', font_content) if line.strip()]
-            
-            if not lines:
-                return None
-            
-            # Parse das informações
-            appointment_data = {
-                'date': date_str,
-                'lines': lines
-            }
-            
-            # Primeira linha geralmente tem horário e nome
-            first_line = lines[0]
-            
-            # Extrai horário (padrão: HH:MM)
-            time_match = re.search(r'(\d{1,2}:\d{2})', first_line)
-            if time_match:
-                appointment_data['time'] = time_match.group(1)
-                # Remove o horário para obter o nome
-                name_part = first_line.replace(time_match.group(1), '').strip()
-                appointment_data['patient_name'] = name_part
-            else:
-                appointment_data['time'] = "09:00"  # Horário padrão
-                appointment_data['patient_name'] = first_line
-            
-            # Segunda linha geralmente tem informações da vacina
-            if len(lines) > 1:
-                appointment_data['vaccine_info'] = lines[1]
-            else:
-                appointment_data['vaccine_info'] = "Vacina não especificada"
-            
-            # Linhas restantes são observações
-            if len(lines) > 2:
-                appointment_data['observations'] = ' | '.join(lines[2:])
-            else:
-                appointment_data['observations'] = ""
-            
-            # Extrai telefone se disponível
-            phone_match = re.search(r'(\d{2}\s*\d{4,5}-\d{4})', appointment_html)
-            if phone_match:
-                appointment_data['phone'] = phone_match.group(1)
-            else:
-                appointment_data['phone'] = "Não informado"
-            
-            return appointment_data
-            
+            return appointment_parser.parse_appointment(appointment_html, date_str)
         except Exception as e:
             print(f"❌ Erro ao parsear agendamento {index} para {date_str}: {e}")
             return None
@@ -189,127 +179,329 @@ class CalendarScraper(BaseScraper):
     def _extract_from_html(self):
         """Método alternativo: extrai do HTML da página"""
         print("🔄 Extraindo agendamentos do HTML...")
-        appointments = []
         
         html = self.browser.driver.page_source
         
         # Procura pelo script que contém cellContents
-        script_pattern = r'var\s+cellContents\s*=\s*(\{.*?\});'
-        script_match = re.search(script_pattern, html, re.DOTALL)
-        
-        if script_match:
-            print("✅ cellContents encontrado no HTML")
-            try:
-                # Limpa e converte para JSON
-                cell_contents_str = script_match.group(1)
-                
-                # Processa o JavaScript para JSON
-                cell_contents_str = self._clean_js_object(cell_contents_str)
-                
-                appointments = self._parse_cell_contents_json(cell_contents_str)
-                
-            except Exception as e:
-                print(f"❌ Erro ao processar cellContents do HTML: {e}")
+        match = appointment_parser.CELL_CONTENTS_RE.search(html)
+        if not match:
+            return []
         
-        return appointments
+        print("✅ cellContents encontrado no HTML")
+        try:
+            return self._parse_cell_contents_json(self._clean_js_object(match.group(1)))
+        except Exception as e:
+            print(f"❌ Erro ao processar cellContents do HTML: {e}")
+            return []
 
     def _clean_js_object(self, js_obj_str):
         """Converte objeto JavaScript para JSON válido"""
         try:
-            # Substitui aspas simples por duplas
-            js_obj_str = js_obj_str.replace("'", '"')
-            
-            # Remove vírgulas finais
-            js_obj_str = re.sub(r',\s*}', '}', js_obj_str)
-            js_obj_str = re.sub(r',\s*]', ']', js_obj_str)
-            
-            # Escapa quebras de linha
-            js_obj_str = js_obj_str.replace('\n', '\\n')
-            js_obj_str = js_obj_str.replace('\r', '\\r')
-            
-            return js_obj_str
-            
+            return appointment_parser.clean_js_object(js_obj_str)
         except Exception as e:
             print(f"❌ Erro ao limpar objeto JS: {e}")
             return js_obj_str
 
     def _sync_appointments_to_db(self, appointments):
-        """Insere os agendamentos no banco de dados"""
-        created_count = 0
-        updated_count = 0
-        
+        """
+        Insere/atualiza os agendamentos no banco em lote.
+
+        Pacientes, vacinas e agendamentos existentes são carregados uma vez;
+        as gravações usam bulk_create/bulk_update em uma única transação.
+        """
         print(f"💾 Sincronizando {len(appointments)} agendamentos com o banco...")
-        
+
+        rows = []
         for appt in appointments:
             try:
-                # Converte data do formato DD-MM-YYYY
                 appt_date = datetime.strptime(appt['date'], '%d-%m-%Y').date()
-                
-                # Busca ou cria usuário
-                user, user_created = User.objects.get_or_create(
-                    name=appt['patient_name'],
-                    defaults={
-                        'phone': appt.get('phone', 'Não informado'),
-                        'via_chatbot': False,
-                        'synced': True
-                    }
-                )
-                
-                # Atualiza telefone se necessário
-                if not user_created and appt.get('phone') != 'Não informado':
-                    user.phone = appt['phone']
-                    user.save()
-                
-                # Busca ou cria vacina
-                vaccine = None
-                vaccine_info = appt.get('vaccine_info', '')
-                if vaccine_info and vaccine_info != 'Vacina não especificada':
-                    # Limpa o nome da vacina
-                    vaccine_name = vaccine_info.strip()
-                    if len(vaccine_name) > 200:
-                        vaccine_name = vaccine_name[:200]
-                    
-                    vaccine = Vaccine.objects.filter(name__icontains=vaccine_name).first()
-                    if not vaccine:
-                        vaccine = Vaccine.objects.create(
-                            name=vaccine_name,
-                            current_stock=0,
-                            minimum_stock=10
-                        )
-                
-                # Verifica se agendamento já existe
-                existing = Appointment.objects.filter(
+            except (KeyError, ValueError) as e:
+                print(f"❌ Data inválida no agendamento {appt.get('patient_name', 'N/A')}: {e}")
+                continue
+            if not appt.get('patient_name'):
+                continue
+            rows.append((appt, appt_date))
+
+        if not rows:
+            print("📊 Sincronização concluída: 0 novos, 0 atualizados")
+            return {'created': 0, 'updated': 0}
+
+        with transaction.atomic():
+            # Pacientes (por nome, como antes)
+            names = {appt['patient_name'] for appt, _ in rows}
+            users = {}
+            for user in User.objects.filter(name__in=names).order_by('id'):
+                users.setdefault(user.name, user)
+            new_users = []
+            phone_updates = {}
+            for appt, _ in rows:
+                name = appt['patient_name']
+                phone = appt.get('phone', 'Não informado')
+                user = users.get(name)
+                if user is None:
+                    user = User(name=name, phone=phone, via_chatbot=False, synced=True)
+                    users[name] = user
+                    new_users.append(user)
+                elif user.pk and phone != 'Não informado' and user.phone != phone:
+                    user.phone = phone
+                    phone_updates[user.pk] = user
+            if new_users:
+                User.objects.bulk_create(new_users, batch_size=500)
+                # Backends sem RETURNING: recarrega os ids pelo nome
+                if any(u.pk is None for u in new_users):
+                    for user in User.objects.filter(name__in=[u.name for u in new_users]).order_by('id'):
+                        users[user.name] = user
+            if phone_updates:
+                User.objects.bulk_update(list(phone_updates.values()), ['phone'], batch_size=500)
+
+            # Vacinas (mesma regra do name__icontains, resolvida em memória)
+            all_vaccines = list(Vaccine.objects.order_by('id'))
+            vaccines = {}
+            for appt, _ in rows:
+                vaccine_info = (appt.get('vaccine_info') or '').strip()
+                if not vaccine_info or vaccine_info == 'Vacina não especificada':
+                    continue
+                vaccine_name = vaccine_info[:200]
+                if vaccine_name in vaccines:
+                    continue
+                needle = vaccine_name.casefold()
+                vaccine = next((v for v in all_vaccines if needle in v.name.casefold()), None)
+                if vaccine is None:
+                    vaccine = Vaccine.objects.create(name=vaccine_name, current_stock=0, minimum_stock=10)
+                    all_vaccines.append(vaccine)
+                vaccines[vaccine_name] = vaccine
+
+            # Agendamentos existentes no intervalo
+            dates = [d for _, d in rows]
+            existing = {}
+            for appointment in Appointment.objects.filter(
+                user__in=[u for u in users.values() if u.pk],
+                appointment_date__range=(min(dates), max(dates)),
+            ).order_by('id'):
+                existing.setdefault((appointment.user_id, appointment.appointment_date, appointment.appointment_time), appointment)
+
+            to_create, to_update = [], {}
+            for appt, appt_date in rows:
+                user = users[appt['patient_name']]
+                time_str = appt.get('time', '09:00')
+                vaccine = vaccines.get((appt.get('vaccine_info') or '').strip()[:200])
+                key = (user.pk, appt_date, time_str)
+                appointment = existing.get(key)
+                if appointment is not None:
+                    appointment.vaccine = vaccine
+                    appointment.observations = appt.get('observations', '')
+                    appointment.status = 'scheduled'
+                    to_update[appointment.pk] = appointment
+                    continue
+                appointment = Appointment(
                     user=user,
+                    vaccine=vaccine,
                     appointment_date=appt_date,
-                    appointment_time=appt.get('time', '09:00')
-                ).first()
-                
-                if existing:
-                    # Atualiza dados existentes
-                    existing.vaccine = vaccine
-                    existing.observations = appt.get('observations', '')
-                    existing.status = 'scheduled'
-                    existing.save()
-                    updated_count += 1
-                else:
-                    # Cria novo agendamento - SEM appointment_type
-                    Appointment.objects.create(
-                        user=user,
-                        vaccine=vaccine,
-                        appointment_date=appt_date,
-                        appointment_time=appt.get('time', '09:00'),
-                        dose='',
-                        status='scheduled',
-                        via_chatbot=False,
-                        observations=appt.get('observations', '')
+                    appointment_time=time_str,
+                    dose='',
+                    status='scheduled',
+                    via_chatbot=False,
+                    observations=appt.get('observations', ''),
+                )
+                existing[key] = appointment
+                to_create.append(appointment)
+
+            if to_create:
+                Appointment.objects.bulk_create(to_create, batch_size=500)
+            if to_update:
+                Appointment.objects.bulk_update(
+                    list(to_update.values()), ['vaccine', 'observations', 'status'], batch_size=500
+                )
+
+        print(f"📊 Sincronização concluída: {len(to_create)} novos, {len(to_update)} atualizados")
+        return {'created': len(to_create), 'updated': len(to_update)}
+
+    # ------------------------------------------------------------------
+    # Intervalos de meses
+    # ------------------------------------------------------------------
+    def _page_marker(self):
+        """Texto do DatePicker + cellContents: muda quando o mês exibido muda."""
+        script = """
+        var dp = document.getElementById('DatePicker');
+        var cc = (typeof cellContents !== 'undefined') ? JSON.stringify(cellContents) : '';
+        return (dp ? dp.innerText : '') + '|' + cc;
+        """
+        try:
+            return self.browser.driver.execute_script(script)
+        except Exception:
+            return None
+
+    def _displayed_month(self):
+        """(ano, mês) exibido no DatePicker, ou None se não for possível identificar."""
+        marker = self._page_marker() or ''
+        header, _, cell_json = marker.partition('|')
+        match = MONTH_HEADER_RE.search(header.casefold())
+        if match:
+            return int(match.group(2)), PT_MONTHS.index(match.group(1)) + 1
+        # Sem cabeçalho legível: mês mais frequente nas datas do cellContents
+        counts = Counter(
+            (int(y), int(m)) for _, m, y in re.findall(r'"(\d{2})-(\d{2})-(\d{4})"', cell_json)
+        )
+        return counts.most_common(1)[0][0] if counts else None
+
+    def _wait_marker_change(self, before, timeout=15):
+        try:
+            WebDriverWait(self.browser.driver, timeout).until(
+                lambda d: self._page_marker() not in (None, before)
+                and d.find_elements(By.ID, "DatePicker")
+            )
+            return True
+        except Exception:
+            return False
+
+    def _click_month_nav(self, forward):
+        """Clica em próximo/anterior no DatePicker (jQuery UI ou Calendar do ASP.NET)."""
+        selectors = NEXT_MONTH_SELECTORS if forward else PREV_MONTH_SELECTORS
+        for selector in selectors:
+            elements = self.safe_find_elements(By.CSS_SELECTOR, selector)
+            if elements:
+                before = self._page_marker()
+                self.browser.driver.execute_script("arguments[0].click();", elements[0])
+                return self._wait_marker_change(before)
+        return False
+
+    def _postback_month(self, year, month):
+        """Navegação via postback do Calendar do ASP.NET ('V' + dias desde 01/01/2000)."""
+        days = (date(year, month, 1) - date(2000, 1, 1)).days
+        before = self._page_marker()
+        self.browser.driver.execute_script(
+            "if (typeof __doPostBack === 'function') { __doPostBack(arguments[0], arguments[1]); }",
+            'DatePicker', f'V{days}'
+        )
+        return self._wait_marker_change(before, timeout=20)
+
+    def _navigate_to_month(self, year, month):
+        """Leva o DatePicker até o mês pedido. Lança RuntimeError se não conseguir."""
+        current = self._displayed_month()
+        if current == (year, month):
+            return
+        if current is not None:
+            steps = (year - current[0]) * 12 + (month - current[1])
+            ok = True
+            for _ in range(abs(steps)):
+                if not self._click_month_nav(forward=steps > 0):
+                    ok = False
+                    break
+            if ok and self._displayed_month() in ((year, month), None):
+                return
+        if self._postback_month(year, month) and self._displayed_month() in ((year, month), None):
+            return
+        raise RuntimeError(f'Não foi possível navegar até {month:02d}/{year}')
+
+    def scrape_month(self, year, month):
+        """Extrai os agendamentos de um mês específico (sem gravar no banco)"""
+        if not self.ensure_login():
+            raise RuntimeError('Falha no login - não é possível acessar o calendário')
+
+        if not self.safe_find_elements(By.ID, "DatePicker"):
+            self.browser.driver.get(self.calendar_url)
+            WebDriverWait(self.browser.driver, 20).until(
+                EC.presence_of_element_located((By.ID, "DatePicker"))
+            )
+
+        self._navigate_to_month(year, month)
+        suffix = f"-{month:02d}-{year}"
+        appointments = [a for a in self._extract_appointments_from_script() if a['date'].endswith(suffix)]
+        print(f"📅 {month:02d}/{year}: {len(appointments)} agendamentos")
+        return appointments
+
+    def scrape_range(self, start_month, end_month, max_browsers=None, sync=True):
+        """
+        Extrai os agendamentos de um intervalo de meses ('YYYY-MM') e grava tudo
+        em uma única sincronização em lote.
+
+        Os meses são distribuídos entre até `max_browsers` navegadores
+        (CALENDAR_SCRAPER_MAX_BROWSERS), cada um com seu login; este scraper
+        usa o próprio navegador como o primeiro do pool.
+        """
+        months = month_range(start_month, end_month)
+        max_browsers = max_browsers or getattr(settings, 'CALENDAR_SCRAPER_MAX_BROWSERS', 3)
+        workers = max(1, min(max_browsers, len(months)))
+        print(f"🚀 Scraping do calendário de {start_month} a {end_month} ({len(months)} meses, {workers} navegadores)")
+        self.report_progress(phase='extracting', message=f'{len(months)} meses em {workers} navegadores')
+
+        pending = Queue()
+        for ym in months:
+            pending.put(ym)
+        results, errors = {}, {}
+        lock = threading.Lock()
+
+        def worker(index):
+            scraper = self
+            try:
+                if index > 0:
+                    scraper = CalendarScraper(BrowserManager())
+                while True:
+                    try:
+                        year, month = pending.get_nowait()
+                    except Empty:
+                        return
+                    label = f"{year:04d}-{month:02d}"
+                    try:
+                        month_appointments = scraper.scrape_month(year, month)
+                    except Exception as e:
+                        print(f"❌ Erro no mês {label}: {e}")
+                        with lock:
+                            errors[label] = str(e)
+                        continue
+                    with lock:
+                        results[label] = month_appointments
+                        done = len(results)
+                        rows = sum(len(v) for v in results.values())
+                    self.report_progress(
+                        phase='extracting', pages_done=done, rows_extracted=rows,
+                        message=f'{done}/{len(months)} meses extraídos',
                     )
-                    created_count += 1
-                    
             except Exception as e:
-                print(f"❌ Erro ao sincronizar agendamento {appt.get('patient_name', 'N/A')}: {e}")
-                continue
+                print(f"❌ Navegador {index + 1} falhou: {e}")
+            finally:
+                if scraper is not self:
+                    try:
+                        scraper.browser.quit_browser()
+                    except Exception:
+                        pass
+                if workers > 1:
+                    # Conexão de banco aberta por esta thread (progresso do job)
+                    connection.close()
+
+        if workers == 1:
+            worker(0)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(worker, range(workers)))
+
+        # Meses não processados (ex.: navegador extra não iniciou)
+        for year, month in months:
+            label = f"{year:04d}-{month:02d}"
+            if label not in results and label not in errors:
+                errors[label] = 'Mês não processado'
 
-        print(f"📊 Sincronização concluída: {created_count} novos, {updated_count} atualizados")
+        merged, seen = [], set()
+        for label in sorted(results):
+            for appt in results[label]:
+                key = (appt['date'], appt.get('time'), appt.get('patient_name'))
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(appt)
+
+        counts = {'created': 0, 'updated': 0}
+        if sync and merged:
+            self.report_progress(phase='saving', rows_extracted=len(merged),
+                                 message=f'Gravando {len(merged)} agendamentos...')
+            counts = self._sync_appointments_to_db(merged)
+
+        return {
+            'appointments': merged,
+            'months': {label: len(results[label]) for label in sorted(results)},
+            'errors': errors,
+            'created': counts['created'],
+            'updated': counts['updated'],
+        }
 
     def get_appointment_statistics(self):
         """Retorna estatísticas dos agendamentos"""
@@ -0,0 +1,213 @@
+# web_scraping/services/inventory_service.py
+"""
+Serviço único de inventário.
+
+- Armazenamento autoritativo: tabela core.Vaccine (indexada por nome).
+- Escritas de estoque: stock_ledger (movimentos auditáveis).
+- Leituras: snapshot processado e cacheado do stock_repository, compartilhado
+  entre o dashboard e a API de estoque.
+- Adaptadores: import/export do data/vaccines.json e reconciliação em lote
+  com os dados extraídos do sistema matriz (StockScraper).
+"""
+
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from .stock_ledger import StockLedger, stock_ledger
+from .stock_repository import StockRepository, StockSnapshot, stock_repository
+
+
+# Campos comparados/gravados pelos adaptadores em lote
+DIFF_FIELDS = (
+    'laboratory', 'current_stock', 'available_stock', 'minimum_stock',
+    'purchase_price', 'sale_price', 'min_age_months', 'max_age_months',
+)
+# Nome do campo no relatório de alterações (formato do vaccines.json)
+REPORT_FIELD_NAMES = {'minimum_stock': 'min_stock'}
+
+
+class InventoryService:
+    """Fachada de leitura/escrita do estoque interno."""
+
+    def __init__(self, repository: Optional[StockRepository] = None, ledger: Optional[StockLedger] = None):
+        self.repository = repository or stock_repository
+        self.ledger = ledger or stock_ledger
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def snapshot(self) -> StockSnapshot:
+        """Snapshot cacheado (recarregado apenas quando o estoque muda)."""
+        return self.repository.get_snapshot()
+
+    def query(self, **filters) -> Dict:
+        """Filtro/ordenação/paginação sobre o snapshot (ver StockRepository.query)."""
+        return self.repository.query(**filters)
+
+    def dashboard_stock(self) -> Dict:
+        """Séries de estoque usadas no dashboard, a partir do mesmo snapshot da API."""
+        snapshot = self.snapshot()
+        names = [it['name'] for it in snapshot.items]
+        current = [it['current_stock'] for it in snapshot.items]
+        minimum = [it['min_stock'] for it in snapshot.items]
+        return {
+            'names': names,
+            'current': current,
+            'minimum': minimum,
+            'stock_percentage': int((sum(current) / (sum(minimum) or 1)) * 100) if minimum else 0,
+            'summary': snapshot.summary,
+        }
+
+    # ------------------------------------------------------------------
+    # Escrita em lote
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _report_value(value):
+        if isinstance(value, Decimal):
+            return float(value)
+        return value
+
+    @staticmethod
+    def _same(old, new) -> bool:
+        """Compara valores do modelo tratando vazio/None/0 como equivalentes."""
+        if old in (None, '') and new in (None, ''):
+            return True
+        if old is None or new is None:
+            return (old or 0) == (new or 0)
+        return old == new
+
+    def _upsert(self, items: List[Dict], keep_prices_when_zero: bool = False) -> Dict:
+        """
+        Cria/atualiza vacinas em lote a partir de itens no formato do vaccines.json.
+
+        Carrega todas as vacinas uma única vez (mapa por nome), calcula as
+        diferenças campo a campo e grava, em uma transação, apenas as linhas
+        novas (bulk_create) e as alteradas (bulk_update só dos campos alterados).
+        Linhas sem alteração não são tocadas (o cache do snapshot continua válido).
+
+        Returns:
+            dict com created/updated/unchanged, `changes` por item
+            ({nome: {campo: {'old', 'new'}}}), contagem por campo e os itens
+            que passaram a ficar abaixo do mínimo (`low_stock`).
+        """
+        from core.models import Vaccine
+
+        now = timezone.now()
+        existing = {}
+        for vaccine in Vaccine.objects.order_by('id'):
+            existing.setdefault(vaccine.name.strip().casefold(), vaccine)
+
+        to_create, to_update = [], []
+        changed_fields = set()
+        changes: Dict[str, Dict] = {}
+        field_counts: Dict[str, int] = {}
+        low_stock = []
+        unchanged = 0
+        seen = set()
+        for item in items:
+            name = (item.get('name') or '').strip()
+            key = name.casefold()
+            if not name or key in seen:
+                continue
+            seen.add(key)
+
+            data = dict(item)
+            if keep_prices_when_zero:
+                # Preço zerado na extração não sobrescreve o preço cadastrado
+                for price in ('purchase_price', 'sale_price'):
+                    if not data.get(price):
+                        data.pop(price, None)
+
+            vaccine = existing.get(key)
+            if vaccine is None:
+                vaccine = Vaccine(name=name, updated_at=now)
+                vaccine.apply_stock_item(data)
+                to_create.append(vaccine)
+                continue
+
+            before = {f: getattr(vaccine, f) for f in DIFF_FIELDS}
+            was_low = vaccine.current_stock < vaccine.minimum_stock
+            vaccine.apply_stock_item(data)
+            diff = {
+                f: {'old': self._report_value(before[f]), 'new': self._report_value(getattr(vaccine, f))}
+                for f in DIFF_FIELDS if not self._same(before[f], getattr(vaccine, f))
+            }
+            if not diff:
+                unchanged += 1
+                continue
+
+            vaccine.updated_at = now
+            to_update.append(vaccine)
+            changed_fields.update(diff)
+            report = {REPORT_FIELD_NAMES.get(f, f): v for f, v in diff.items()}
+            changes[vaccine.name] = report
+            for f in report:
+                field_counts[f] = field_counts.get(f, 0) + 1
+            if not was_low and vaccine.current_stock < vaccine.minimum_stock:
+                low_stock.append(vaccine.name)
+
+        with transaction.atomic():
+            if to_create:
+                Vaccine.objects.bulk_create(to_create, batch_size=500)
+            if to_update:
+                # minimum_stock e min_stock andam juntos (alias)
+                if changed_fields & {'minimum_stock', 'min_stock'}:
+                    changed_fields |= {'minimum_stock', 'min_stock'}
+                fields = sorted(changed_fields) + ['updated_at']
+                Vaccine.objects.bulk_update(to_update, fields, batch_size=500)
+
+        return {
+            'created': len(to_create),
+            'updated': len(to_update),
+            'unchanged': unchanged,
+            'created_names': [v.name for v in to_create],
+            'changes': changes,
+            'field_counts': field_counts,
+            'low_stock': low_stock,
+        }
+
+    def import_json(self, path: Optional[str] = None, replay_journal: bool = True) -> Dict:
+        """
+        Importa o vaccines.json para a tabela de vacinas.
+        Com replay_journal, aplica antes os movimentos do diário posteriores ao snapshot.
+        """
+        doc = self.ledger.load_snapshot(path)
+        replayed = 0
+        if replay_journal:
+            doc, _, replayed = self.ledger.replay(doc)
+        result = self._upsert(doc.get('items', []))
+        result['replayed'] = replayed
+        result['total_items'] = len(doc.get('items', []))
+        return result
+
+    def export_json(self) -> Dict:
+        """Exporta os saldos atuais para o vaccines.json (snapshot compactado)."""
+        return self.ledger.compact()
+
+    def reconcile(self, scraped_items: List[Dict]) -> Dict:
+        """
+        Reconcilia em lote os itens extraídos do sistema matriz com o estoque interno.
+        Preços zerados na extração mantêm o valor atual. As alterações de cada
+        item são registradas no diário de movimentos (usuário 'sync-matriz').
+        """
+        items = []
+        for data in scraped_items:
+            items.append({
+                'name': data.get('name'),
+                'laboratory': data.get('laboratory', ''),
+                'current_stock': data.get('current_stock', 0),
+                'available_stock': data.get('available_stock', 0),
+                'min_stock': data.get('min_stock', data.get('minimum_stock', 0)),
+                'purchase_price': data.get('purchase_price', 0.0),
+                'sale_price': data.get('sale_price', 0.0),
+            })
+        result = self._upsert(items, keep_prices_when_zero=True)
+        self.ledger.record_sync(result['changes'], user='sync-matriz', note='sincronização com o sistema matriz')
+        return result
+
+
+# Instância global do serviço de inventário
+inventory_service = InventoryService()
@@ -22,18 +22,61 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementNotInteractableException
 from .base_scraper import BaseScraper
+from .patient_search_cache import patient_search_cache
 
 logger = logging.getLogger(__name__)
 
+# IDs resolvidos dos campos do formulário, por layout do FormView (prefixo do
+# ID do txtNome, ex.: ..._GridView1_ctl17_FormView1_). Evita repetir a busca
+# por seletores a cada cadastro no mesmo processo.
+_form_layout_cache = {}
+
+# Localiza todos os campos de uma vez: [[campo, id_em_cache, [seletores]], ...]
+_LOCATE_FIELDS_JS = """
+const result = {};
+for (const [name, cachedId, selectors] of arguments[0]) {
+    let el = cachedId ? document.getElementById(cachedId) : null;
+    for (const selector of (el ? [] : selectors)) {
+        try { el = document.querySelector(selector); } catch (e) { el = null; }
+        if (el) break;
+    }
+    if (!el || !el.id) { result[name] = null; continue; }
+    const info = {id: el.id, tag: el.tagName.toLowerCase()};
+    if (info.tag === 'select') {
+        info.options = Array.from(el.options).map(o => [o.value, o.text.trim()]);
+    }
+    result[name] = info;
+}
+return result;
+"""
+
+# Aplica todos os valores de uma vez: [[id, valor], ...] -> {id: valor lido}
+_APPLY_VALUES_JS = """
+const result = {};
+for (const [id, value] of arguments[0]) {
+    const el = document.getElementById(id);
+    if (!el) { result[id] = null; continue; }
+    el.focus();
+    el.value = value;
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    el.blur();
+    result[id] = el.value;
+}
+return result;
+"""
+
 
 class PatientRegistrationScraper(BaseScraper):
     """Scraper aprimorado para automatizar registros de pacientes na plataforma GoC Franquias"""
     
     def __init__(self, browser_manager):
         super().__init__(browser_manager)
-        self.registration_url = "https://aruja.gocfranquias.com.br/Cadastro/Paciente.aspx"
+        self.registration_url = self.matrix_url("Cadastro/Paciente.aspx")
         self.processed_patients = set()
         self.wait_timeout = 15
+        # Callback de checkpoint do cadastro em andamento (ver register_patient_from_google_forms)
+        self._checkpoint = None
     
     def _navigate_via_menu(self):
         """
@@ -365,7 +408,7 @@ class PatientRegistrationScraper(BaseScraper):
             # Se não estiver na página inicial, navegar para ela
             if "Inicio.aspx" not in current_url:
                 logger.info("Navegando para página inicial...")
-                self.browser.driver.get("https://aruja.gocfranquias.com.br/Login/Inicio.aspx")
+                self.browser.driver.get(self.matrix_url("Login/Inicio.aspx"))
                 time.sleep(3)
                 
                 # Verificar se foi redirecionado para login
@@ -517,30 +560,67 @@ class PatientRegistrationScraper(BaseScraper):
             logger.error(f"Erro ao verificar CPF: {str(e)}")
             return False
     
-    def register_patient_from_google_forms(self, form_data):
+    def register_patient_from_google_forms(self, form_data, resume_from='', checkpoint=None):
         """
         Registra um paciente na plataforma usando dados do Google Forms - Versão Aprimorada
+        
+        Args:
+            form_data: resposta do formulário
+            resume_from: última etapa concluída em uma execução anterior interrompida
+                (ver services/registration_pipeline)
+            checkpoint: callback chamado com o nome de cada etapa concluída
         """
         try:
+            self.reset_trace()
+            self._checkpoint = checkpoint
+
             # 1. Validar dados essenciais
-            validation_result = self._validate_form_data(form_data)
+            with self.trace_step('validation') as span:
+                validation_result = self._validate_form_data(form_data)
+                span['success'] = validation_result['valid']
             if not validation_result['valid']:
                 return {
                     'success': False,
                     'message': f"Validação falhou: {validation_result['errors']}",
                     'patient_id': None
                 }
+            self._reach_stage('validated')
             
             cpf = form_data.get('CPF', '').strip()
             cpf_clean = self._normalize_cpf(cpf)
             
             # 2. Verificar duplicatas
-            if self.check_cpf_exists(cpf):
-                return {
-                    'success': False,
-                    'message': f"Paciente com CPF {cpf} já existe na plataforma",
-                    'patient_id': None
-                }
+            if resume_from in ('filled', 'submitted'):
+                # A execução anterior pode ter clicado em "Gravar": conferir antes de reenviar
+                patient_search_cache.invalidate(cpf_clean)
+                with self.trace_step('cpf_check') as span:
+                    exists = self.check_cpf_exists(cpf)
+                    span['message'] = 'Cadastro anterior confirmado' if exists else ''
+                if exists:
+                    self._reach_stage('confirmed')
+                    self.processed_patients.add(cpf_clean)
+                    logger.info(f"Paciente {form_data.get('Nome completo')} já cadastrado na execução interrompida")
+                    return {
+                        'success': True,
+                        'message': "Cadastro confirmado na retomada (paciente já consta na plataforma)",
+                        'patient_id': None
+                    }
+                self._reach_stage('dedup_checked')
+            elif resume_from in ('dedup_checked', 'form_opened'):
+                logger.info(f"Retomando CPF {cpf} após '{resume_from}': verificação de duplicidade já feita")
+            else:
+                with self.trace_step('cpf_check') as span:
+                    exists = self.check_cpf_exists(cpf)
+                    span['message'] = 'CPF já cadastrado' if exists else ''
+                if exists:
+                    # Um "não encontrado" em cache estaria desatualizado
+                    patient_search_cache.invalidate(cpf_clean)
+                    return {
+                        'success': False,
+                        'message': f"Paciente com CPF {cpf} já existe na plataforma",
+                        'patient_id': None
+                    }
+                self._reach_stage('dedup_checked')
             
             # 3. Fazer login
             if not self.ensure_login():
@@ -550,39 +630,48 @@ class PatientRegistrationScraper(BaseScraper):
                     'patient_id': None
                 }
             
-            # 4. Navegar para página de cadastro
-            if not self.ensure_on_registration_page():
+            # 4. Navegar para página de cadastro e 5. clicar no botão "Novo"
+            with self.trace_step('navigation') as span:
+                on_page = self.ensure_on_registration_page()
+                opened = on_page and self._click_new_button()
+                span['success'] = opened
+            if not on_page:
                 return {
                     'success': False,
                     'message': "Falha ao acessar página de cadastro",
                     'patient_id': None
                 }
-            
-            # 5. Clicar no botão "Novo" para abrir formulário de cadastro
-            if not self._click_new_button():
+            if not opened:
                 return {
                     'success': False,
                     'message': "Falha ao abrir formulário de novo paciente",
                     'patient_id': None
                 }
+            self._reach_stage('form_opened')
             
-            # 6. Aguardar formulário carregar completamente
-            time.sleep(3)
-            
-            # 7. Preencher formulário
-            fill_result = self._fill_patient_form_enhanced(form_data)
+            # 6. Preencher (o preenchimento aguarda o formulário carregar)
+            with self.trace_step('form_fill') as span:
+                fill_result = self._fill_patient_form_enhanced(form_data)
+                span['success'] = fill_result['success']
+                span['message'] = fill_result['error'] or ''
             if not fill_result['success']:
                 return {
                     'success': False,
                     'message': f"Erro ao preencher formulário: {fill_result['error']}",
                     'patient_id': None
                 }
+            self._reach_stage('filled')
             
-            # 8. Submeter formulário
-            submit_result = self._submit_patient_form_enhanced()
+            # 8. Submeter formulário (a confirmação é cronometrada à parte)
+            with self.trace_step('form_submit') as span:
+                submit_result = self._submit_patient_form_enhanced()
+                span['success'] = submit_result['success']
+                span['message'] = submit_result['message']
             
             if submit_result['success']:
+                self._reach_stage('confirmed')
                 self.processed_patients.add(cpf_clean)
+                patient_search_cache.invalidate(cpf_clean)
                 logger.info(f"Paciente {form_data.get('Nome completo')} cadastrado com sucesso!")
             
             return submit_result
@@ -595,6 +684,15 @@ class PatientRegistrationScraper(BaseScraper):
                 'patient_id': None
             }
     
+    def _reach_stage(self, stage):
+        """Informa a etapa concluída ao callback de checkpoint, se houver"""
+        if not self._checkpoint:
+            return
+        try:
+            self._checkpoint(stage)
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar o checkpoint '{stage}': {e}")
+    
     def _click_new_button(self):
         """Clica no botão 'Novo' para abrir formulário de cadastro"""
         try:
@@ -765,57 +863,171 @@ class PatientRegistrationScraper(BaseScraper):
             logger.error(f"Erro ao clicar no botão Novo: {str(e)}")
             return False
     
+    def _form_field_mapping(self):
+        """
+        Campos do FormView1 (dentro do GridView1) e seus seletores.
+        O padrão dos IDs é: ctl00_ContentPlaceHolder1_GridView1_ctlNN_FormView1_[campo]
+        'masked' indica inputs com máscara de digitação, que podem exigir teclas reais.
+        """
+        return {
+            'Nome completo': {
+                'selectors': [
+                    '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtNome',
+                    'input[id*="FormView1_txtNome"]'
+                ],
+                'type': 'text',
+                'required': True
+            },
+            'CPF': {
+                'selectors': [
+                    '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtCPF',
+                    'input[id*="FormView1_txtCPF"]'
+                ],
+                'type': 'text',
+                'required': True,
+                'masked': True,
+                'transformer': self._normalize_cpf
+            },
+            'Data de nascimento': {
+                'selectors': [
+                    '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_TxtDataNascimento',
+                    'input[id*="FormView1_TxtDataNascimento"]'
+                ],
+                'type': 'text',
+                'required': True,
+                'masked': True
+            },
+            'Sexo': {
+                'selectors': [
+                    'select[id*="FormView1_drpSexo_hdpesjur"]',
+                    'select[id*="drpSexo_hdpesjur"]',
+                    'select[id*="FormView1_drpSexo"]'
+                ],
+                'type': 'select',
+                'required': True,
+                'transformer': self._normalize_gender
+            },
+            'RG': {
+                'selectors': [
+                    '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_TextBox16',
+                    'input[id*="FormView1_TextBox16"]'
+                ],
+                'type': 'text',
+                'required': False
+            },
+            'E-mail': {
+                'selectors': [
+                    'input[id*="TextBox9"][class*="form-control"]',
+                    'input[id$="_TextBox9"]',
+                    '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_TextBox9'
+                ],
+                'type': 'text',
+                'required': False
+            },
+            'Celular principal': {
+                'selectors': [
+                    '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_TextBox6',
+                    'input[id*="FormView1_TextBox6"]'
+                ],
+                'type': 'text',
+                'required': False,
+                'masked': True,
+                'transformer': self._normalize_phone
+            },
+            'Endereço completo (rua e número)': {
+                'selectors': [
+                    '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtEndereco',
+                    'input[id*="FormView1_txtEndereco"]'
+                ],
+                'type': 'text',
+                'required': False
+            },
+            'Bairro': {
+                'selectors': [
+                    'input[id*="txtBairro"][class*="form-control"]',
+                    'input[id$="_txtBairro"]',
+                    '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtBairro'
+                ],
+                'type': 'text',
+                'required': False
+            },
+            'Cidade': {
+                'selectors': [
+                    '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtCidade',
+                    'input[id*="FormView1_txtCidade"]'
+                ],
+                'type': 'text',
+                'required': False
+            },
+            'UF (estado)': {
+                'selectors': [
+                    'select[id*="drpUF"]:not([id*="_hd"])',
+                    '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_drpUF',
+                    'select[id*="FormView1_drpUF"]'
+                ],
+                'type': 'select',
+                'required': False,
+                'transformer': self._normalize_state_to_value
+            },
+            'CEP': {
+                'selectors': [
+                    '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtCEP',
+                    'input[id*="FormView1_txtCEP"]'
+                ],
+                'type': 'text',
+                'required': False,
+                'masked': True,
+                'transformer': self._normalize_zip
+            },
+            'Naturalidade': {
+                'selectors': [
+                    'input[id*="FormView1_txtNaturalidade"]:not([id*="_hd"])',
+                    '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtNaturalidade',
+                    'input[id*="txtNaturalidade"]:not([id*="_hd"])'
+                ],
+                'type': 'text',
+                'required': False
+            },
+            'Estado civil': {
+                'selectors': [
+                    'select[id*="drpEstadoCivil_hdpesjur"]',
+                    'select[id*="drpEstadoCivil"]'
+                ],
+                'type': 'select',
+                'required': False,
+                'transformer': self._normalize_civil_status
+            },
+            'Raça/Cor': {
+                'selectors': [
+                    'select[id*="drpRaca_hdpesjur"]',
+                    'select[id*="drpRaca"]'
+                ],
+                'type': 'select',
+                'required': False,
+                'transformer': self._normalize_race
+            },
+        }
+    
     def _fill_patient_form_enhanced(self, form_data):
         """
-        Preenchimento aprimorado do formulário com wait conditions
+        Preenchimento do formulário em lote.
+
+        Os IDs de todos os campos são resolvidos de uma vez (com cache por layout
+        do FormView) e os valores de textos e selects são aplicados em uma única
+        chamada de JavaScript, disparando input/change/blur. Só os inputs com
+        máscara que não aceitarem o valor são digitados com send_keys; campos não
+        localizados caem no preenchimento individual (_fill_single_field_enhanced).
         """
         try:
             logger.info("Iniciando preenchimento do formulário...")
             
-            # Primeiro, verificar se apareceu uma caixa de diálogo
+            # Aguarda o campo Nome: o prefixo do ID identifica o layout do FormView
             try:
-                dialog = self.browser.driver.find_element(By.ID, "CaixaDialogo")
-                if dialog.is_displayed():
-                    logger.info("✅ Caixa de diálogo detectada")
-            except:
-                logger.info("Nenhuma caixa de diálogo detectada")
-            
-            # Listar os inputs disponíveis para debug
-            try:
-                all_inputs = self.browser.driver.find_elements(By.TAG_NAME, "input")
-                text_inputs = [i for i in all_inputs if i.get_attribute('type') in ['text', 'email', 'tel', 'number', '']]
-                logger.info(f"Inputs de texto disponíveis: {len(text_inputs)}")
-                for inp in text_inputs[:10]:  # Mostrar primeiros 10
-                    inp_id = inp.get_attribute('id') or ""
-                    inp_name = inp.get_attribute('name') or ""
-                    if inp_id or inp_name:
-                        logger.info(f"  Input: id={inp_id}, name={inp_name}")
-            except Exception as e:
-                logger.warning(f"Erro ao listar inputs: {e}")
-            
-            # Aguarda formulário carregar completamente - tentar múltiplos seletores
-            # O formulário está dentro do GridView1 como FormView1
-            form_selectors = [
-                (By.ID, "ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtNome"),
-                (By.XPATH, "//input[contains(@id, 'FormView1_txtNome')]"),
-                (By.CSS_SELECTOR, "input[id*='FormView1_txtNome']"),
-            ]
-            
-            name_field = None
-            for by, selector in form_selectors:
-                try:
-                    name_field = WebDriverWait(self.browser.driver, 10).until(
-                        EC.presence_of_element_located((by, selector))
-                    )
-                    if name_field:
-                        logger.info(f"✅ Campo Nome encontrado com: {by}='{selector}'")
-                        break
-                except:
-                    continue
-            
-            if not name_field:
-                logger.error("❌ Campo txtNome não encontrado após todas as tentativas")
-                # Salvar screenshot para debug
+                name_field = WebDriverWait(self.browser.driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "input[id*='FormView1_txtNome']"))
+                )
+            except TimeoutException:
+                logger.error("❌ Campo txtNome não encontrado")
                 try:
                     page_source = self.browser.driver.page_source[:5000]
                     logger.error(f"HTML parcial: {page_source}")
@@ -823,177 +1035,154 @@ class PatientRegistrationScraper(BaseScraper):
                     pass
                 raise Exception("Formulário de cadastro não carregou")
             
-            # Mapeamento completo de campos - IDs do FormView1 dentro do GridView1
-            # O padrão é: ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_[campo]
-            field_mapping = {
-                'Nome completo': {
-                    'selectors': [
-                        '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtNome',
-                        'input[id*="FormView1_txtNome"]'
-                    ],
-                    'type': 'text',
-                    'required': True
-                },
-                'CPF': {
-                    'selectors': [
-                        '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtCPF',
-                        'input[id*="FormView1_txtCPF"]'
-                    ],
-                    'type': 'text',
-                    'required': True,
-                    'transformer': self._normalize_cpf
-                },
-                'Data de nascimento': {
-                    'selectors': [
-                        '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_TxtDataNascimento',
-                        'input[id*="FormView1_TxtDataNascimento"]'
-                    ],
-                    'type': 'text',
-                    'required': True
-                },
-                'Sexo': {
-                    'selectors': [
-                        'select[id*="FormView1_drpSexo_hdpesjur"]',
-                        'select[id*="drpSexo_hdpesjur"]',
-                        'select[id*="FormView1_drpSexo"]'
-                    ],
-                    'type': 'select',
-                    'required': True,
-                    'transformer': self._normalize_gender
-                },
-                'RG': {
-                    'selectors': [
-                        '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_TextBox16',
-                        'input[id*="FormView1_TextBox16"]'
-                    ],
-                    'type': 'text',
-                    'required': False
-                },
-                'E-mail': {
-                    'selectors': [
-                        'input[id*="TextBox9"][class*="form-control"]',
-                        'input[id$="_TextBox9"]',
-                        '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_TextBox9'
-                    ],
-                    'type': 'text',
-                    'required': False
-                },
-                'Celular principal': {
-                    'selectors': [
-                        '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_TextBox6',
-                        'input[id*="FormView1_TextBox6"]'
-                    ],
-                    'type': 'text',
-                    'required': False,
-                    'transformer': self._normalize_phone
-                },
-                'Endereço completo (rua e número)': {
-                    'selectors': [
-                        '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtEndereco',
-                        'input[id*="FormView1_txtEndereco"]'
-                    ],
-                    'type': 'text',
-                    'required': False
-                },
-                'Bairro': {
-                    'selectors': [
-                        'input[id*="txtBairro"][class*="form-control"]',
-                        'input[id$="_txtBairro"]',
-                        '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtBairro'
-                    ],
-                    'type': 'text',
-                    'required': False
-                },
-                'Cidade': {
-                    'selectors': [
-                        '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtCidade',
-                        'input[id*="FormView1_txtCidade"]'
-                    ],
-                    'type': 'text',
-                    'required': False
-                },
-                'UF (estado)': {
-                    'selectors': [
-                        'select[id*="drpUF"]:not([id*="_hd"])',
-                        '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_drpUF',
-                        'select[id*="FormView1_drpUF"]'
-                    ],
-                    'type': 'select',
-                    'required': False,
-                    'transformer': self._normalize_state_to_value
-                },
-                'CEP': {
-                    'selectors': [
-                        '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtCEP',
-                        'input[id*="FormView1_txtCEP"]'
-                    ],
-                    'type': 'text',
-                    'required': False,
-                    'transformer': self._normalize_zip
-                },
-                'Naturalidade': {
-                    'selectors': [
-                        'input[id*="FormView1_txtNaturalidade"]:not([id*="_hd"])',
-                        '#ctl00_ContentPlaceHolder1_GridView1_ctl17_FormView1_txtNaturalidade',
-                        'input[id*="txtNaturalidade"]:not([id*="_hd"])'
-                    ],
-                    'type': 'text',
-                    'required': False
-                },
-                'Estado civil': {
-                    'selectors': [
-                        'select[id*="drpEstadoCivil_hdpesjur"]',
-                        'select[id*="drpEstadoCivil"]'
-                    ],
-                    'type': 'select',
-                    'required': False,
-                    'transformer': self._normalize_civil_status
-                },
-                'Raça/Cor': {
-                    'selectors': [
-                        'select[id*="drpRaca_hdpesjur"]',
-                        'select[id*="drpRaca"]'
-                    ],
-                    'type': 'select',
-                    'required': False,
-                    'transformer': self._normalize_race
-                },
-            }
+            name_id = name_field.get_attribute('id') or ''
+            layout = name_id[:name_id.find('txtNome')] if 'txtNome' in name_id else name_id
             
-            filled_fields = 0
-            total_required = sum(1 for config in field_mapping.values() if config.get('required', False))
+            field_mapping = self._form_field_mapping()
             
+            # Valores a preencher (pula opcionais vazios, aplica transformadores)
+            values = {}
             for field_name, config in field_mapping.items():
                 value = form_data.get(field_name, '').strip()
-                
-                # Pular campos vazios não obrigatórios
                 if not value and not config.get('required', False):
                     continue
-                
-                # Aplicar transformador se existir
-                if 'transformer' in config and config['transformer']:
+                if config.get('transformer'):
                     value = config['transformer'](value)
-                
-                # Tentar preencher o campo
-                field_filled = self._fill_single_field_enhanced(field_name, value, config)
-                
-                if field_filled:
+                values[field_name] = value
+            
+            # 1. Resolver os IDs de todos os campos em uma única chamada
+            cached_ids = _form_layout_cache.get(layout, {})
+            specs = [[name, cached_ids.get(name), field_mapping[name]['selectors']] for name in values]
+            located = self.browser.driver.execute_script(_LOCATE_FIELDS_JS, specs) or {}
+            _form_layout_cache[layout] = {
+                **cached_ids,
+                **{name: info['id'] for name, info in located.items() if info},
+            }
+            
+            # 2. Montar o lote (selects: escolher a opção aqui, com as opções já lidas)
+            batch = []
+            pending = []  # campos que precisam do preenchimento individual
+            for field_name, value in values.items():
+                info = located.get(field_name)
+                if not info:
+                    pending.append(field_name)
+                    continue
+                if field_mapping[field_name]['type'] == 'select':
+                    option_value = self._match_select_option(field_name, value, info.get('options') or [])
+                    if option_value is None:
+                        pending.append(field_name)
+                        continue
+                    batch.append((field_name, info['id'], option_value))
+                else:
+                    batch.append((field_name, info['id'], value))
+            
+            # 3. Aplicar todos os valores de uma vez e conferir o que ficou nos campos
+            applied = self.browser.driver.execute_script(
+                _APPLY_VALUES_JS, [[element_id, value] for _, element_id, value in batch]
+            ) or {}
+            
+            filled_fields = 0
+            for field_name, element_id, value in batch:
+                config = field_mapping[field_name]
+                actual = applied.get(element_id)
+                if self._field_value_matches(config, value, actual):
                     filled_fields += 1
                     logger.info(f"✓ Campo {field_name} preenchido: {value[:50]}")
+                elif config.get('masked') and actual is not None and self._type_into_field(element_id, value):
+                    # A máscara rejeitou o valor injetado: digitar de verdade
+                    filled_fields += 1
+                    logger.info(f"✓ Campo {field_name} digitado (máscara): {value[:50]}")
                 else:
-                    if config.get('required', False):
-                        logger.error(f"✗ Campo obrigatório não preenchido: {field_name}")
-                        return {'success': False, 'error': f"Campo obrigatório não preenchido: {field_name}"}
-                    else:
-                        logger.warning(f"✗ Campo opcional não preenchido: {field_name}")
+                    pending.append(field_name)
             
-            logger.info(f"Preenchimento concluído: {filled_fields} campos preenchidos")
+            # 4. Fallback: preenchimento campo a campo
+            for field_name in pending:
+                config = field_mapping[field_name]
+                if self._fill_single_field_enhanced(field_name, values[field_name], config):
+                    filled_fields += 1
+                    logger.info(f"✓ Campo {field_name} preenchido (individual): {values[field_name][:50]}")
+                elif config.get('required', False):
+                    logger.error(f"✗ Campo obrigatório não preenchido: {field_name}")
+                    return {'success': False, 'error': f"Campo obrigatório não preenchido: {field_name}"}
+                else:
+                    logger.warning(f"✗ Campo opcional não preenchido: {field_name}")
+            
+            logger.info(
+                f"Preenchimento concluído: {filled_fields} campos preenchidos "
+                f"({len(pending)} pelo método individual)"
+            )
             return {'success': True, 'error': None}
             
         except Exception as e:
             logger.exception(f"Erro ao preencher formulário: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    @staticmethod
+    def _field_value_matches(config, expected, actual):
+        """Confere o valor lido do campo após o preenchimento em lote"""
+        if actual is None:
+            return False
+        if config.get('type') == 'select':
+            return actual == expected
+        if config.get('masked'):
+            # A máscara pode formatar (000.000.000-00), mas os dígitos devem bater
+            return re.sub(r'\D', '', actual) == re.sub(r'\D', '', expected) and bool(actual.strip())
+        return bool(actual.strip())
+    
+    def _type_into_field(self, element_id, value):
+        """Digita o valor tecla a tecla (inputs com máscara que ignoram o valor via JS)"""
+        try:
+            element = self.browser.driver.find_element(By.ID, element_id)
+            element.clear()
+            element.send_keys(value)
+            actual = element.get_attribute('value') or ''
+            return re.sub(r'\D', '', actual) == re.sub(r'\D', '', value)
+        except Exception as e:
+            logger.warning(f"Digitação falhou no campo {element_id}: {e}")
+            return False
+    
+    @staticmethod
+    def _match_select_option(field_name, value, options):
+        """
+        Escolhe o value da opção do select para `value`.
+        Mesma ordem de estratégias do preenchimento individual: valor exato, texto
+        exato, correspondência parcial e, para Sexo, o mapeamento M/F.
+
+        Args:
+            options: lista de [value, texto] lida do select
+        """
+        for opt_value, opt_text in options:
+            if opt_value == value:
+                return opt_value
+        for opt_value, opt_text in options:
+            if opt_text == value:
+                return opt_value
+        
+        value_lower = value.lower()
+        if value_lower:
+            # Texto antes do value: 'm' (de 'M') também está contido em 'fem'
+            for opt_value, opt_text in options:
+                text_lower = opt_text.lower()
+                if text_lower and (value_lower in text_lower or text_lower in value_lower):
+                    return opt_value
+            for opt_value, opt_text in options:
+                option_lower = (opt_value or '').lower()
+                if option_lower and (value_lower in option_lower or option_lower in value_lower):
+                    return opt_value
+        
+        if 'sexo' in field_name.lower():
+            gender_map = {
+                'masculino': ['M', 'Masculino', 'Masc', 'MASCULINO', 'MASC'],
+                'feminino': ['F', 'Feminino', 'Fem', 'FEMININO', 'FEM']
+            }
+            possible_values = gender_map.get(value_lower, [value])
+            for opt_value, opt_text in options:
+                if opt_text in possible_values or opt_value in possible_values:
+                    return opt_value
+        
+        return None
+    
+
     def _fill_single_field_enhanced(self, field_name, value, config):
         """
         Preenchimento aprimorado de campo individual
@@ -1281,16 +1470,22 @@ class PatientRegistrationScraper(BaseScraper):
             self.browser.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", submit_button)
             time.sleep(0.5)
             
+            # Gravado antes do clique: se o worker morrer daqui em diante, a
+            # retomada confere o CPF em vez de reenviar às cegas
+            self._reach_stage('submitted')
+            
             # Clicar via JavaScript (mais confiável)
             logger.info("Clicando no botão Gravar via JavaScript...")
             self.browser.driver.execute_script("arguments[0].click();", submit_button)
             logger.info("✅ Botão Gravar clicado!")
             
-            # Aguarda processamento
-            time.sleep(3)
-            
-            # Verifica resultado
-            return self._check_submission_result()
+            # Aguarda processamento e verifica resultado
+            with self.trace_step('confirmation') as span:
+                time.sleep(3)
+                result = self._check_submission_result()
+                span['success'] = result['success']
+                span['message'] = result['message']
+            return result
             
         except Exception as e:
             logger.exception(f"Erro ao submeter formulário: {str(e)}")
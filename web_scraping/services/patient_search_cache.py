@@ -0,0 +1,144 @@
+# web_scraping/services/patient_search_cache.py
+"""
+Cache das buscas de paciente por CPF no sistema legado.
+
+- Resultado encontrado: guardado por PATIENT_SEARCH_CACHE_TTL segundos.
+- "Não encontrado": guardado por PATIENT_SEARCH_NEGATIVE_TTL (mais curto),
+  já que o paciente pode ser cadastrado a qualquer momento.
+- Nosso fluxo de cadastro (PatientRegistrationScraper) invalida o CPF
+  cadastrado, então a busca seguinte já reflete o novo paciente.
+- Misses passam pelo single-flight: buscas simultâneas do mesmo CPF
+  usam um único navegador.
+
+Cada busca devolve metadados (hit/miss, latência, taxa de acerto) para a resposta da API.
+"""
+
+import re
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .single_flight import operation_key, single_flight
+
+_MISSING = object()
+
+
+def normalize_cpf(cpf) -> str:
+    """Apenas os dígitos do CPF."""
+    return re.sub(r'\D', '', str(cpf or ''))
+
+
+class PatientSearchCache:
+    """Cache positivo/negativo na frente de PatientSearchScraper.search_by_cpf."""
+
+    prefix = 'patient-search'
+
+    @staticmethod
+    def positive_ttl() -> int:
+        return getattr(settings, 'PATIENT_SEARCH_CACHE_TTL', 60 * 60)
+
+    @staticmethod
+    def negative_ttl() -> int:
+        return getattr(settings, 'PATIENT_SEARCH_NEGATIVE_TTL', 5 * 60)
+
+    def _key(self, digits: str) -> str:
+        return f'{self.prefix}:cpf:{digits}'
+
+    def _stat_key(self, name: str) -> str:
+        return f'{self.prefix}:stats:{name}'
+
+    # ------------------------------------------------------------------
+    # Estatísticas (contadores no cache compartilhado)
+    # ------------------------------------------------------------------
+    def _incr(self, name: str) -> None:
+        key = self._stat_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, 1, None):
+                cache.incr(key)
+
+    def stats(self) -> Dict:
+        hits = cache.get(self._stat_key('hits'), 0)
+        misses = cache.get(self._stat_key('misses'), 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 3) if total else 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Leitura/escrita
+    # ------------------------------------------------------------------
+    def get(self, cpf) -> Optional[Dict]:
+        """Entrada em cache ({'patient', 'cached_at'}) ou None."""
+        digits = normalize_cpf(cpf)
+        if not digits:
+            return None
+        return cache.get(self._key(digits))
+
+    def set(self, cpf, patient: Optional[Dict]) -> None:
+        digits = normalize_cpf(cpf)
+        if not digits:
+            return
+        ttl = self.positive_ttl() if patient else self.negative_ttl()
+        if ttl <= 0:
+            return
+        cache.set(self._key(digits), {'patient': patient, 'cached_at': timezone.now().isoformat()}, ttl)
+
+    def invalidate(self, cpf) -> None:
+        """Remove o CPF do cache (ex.: paciente acabou de ser cadastrado por nós)."""
+        digits = normalize_cpf(cpf)
+        if not digits:
+            return
+        cache.delete(self._key(digits))
+        single_flight.forget(operation_key('search_cpf', digits))
+
+    def search(self, cpf, fetch: Callable[[str], Optional[Dict]], refresh: bool = False) -> Tuple[Optional[Dict], Dict]:
+        """
+        Busca o CPF usando o cache; em caso de miss chama `fetch(cpf)`.
+
+        Args:
+            refresh: ignora a entrada em cache e consulta o sistema legado
+
+        Returns:
+            (paciente ou None, metadados da busca)
+        """
+        started = time.monotonic()
+        digits = normalize_cpf(cpf) or str(cpf)
+
+        entry = None if refresh else self.get(digits)
+        if entry is not None:
+            self._incr('hits')
+            meta = {
+                'cache': 'hit',
+                'negative': entry['patient'] is None,
+                'cached_at': entry.get('cached_at'),
+                'coalesced': False,
+            }
+            patient = entry['patient']
+        else:
+            self._incr('misses')
+            if refresh:
+                single_flight.forget(operation_key('search_cpf', digits))
+            patient, coalesced = single_flight.do(operation_key('search_cpf', digits), lambda: fetch(cpf))
+            if not coalesced:
+                self.set(digits, patient)
+            meta = {
+                'cache': 'miss',
+                'negative': patient is None,
+                'cached_at': None,
+                'coalesced': coalesced,
+            }
+
+        meta['latency_ms'] = round((time.monotonic() - started) * 1000, 1)
+        meta.update(self.stats())
+        return patient, meta
+
+
+# Instância global
+patient_search_cache = PatientSearchCache()
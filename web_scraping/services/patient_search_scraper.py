@@ -15,7 +15,7 @@ class PatientSearchScraper(BaseScraper):
 
     def __init__(self, browser_manager):
         super().__init__(browser_manager)
-        self.patients_url = "https://aruja.gocfranquias.com.br/Cadastro/Paciente.aspx"
+        self.patients_url = self.matrix_url("Cadastro/Paciente.aspx")
         # Inicializa o logger
         self.logger = logging.getLogger(__name__)
 
@@ -0,0 +1,107 @@
+# web_scraping/services/registration_metrics.py
+"""
+Tempos por etapa do cadastro automático de pacientes.
+
+O PatientRegistrationScraper cronometra cada etapa (BaseScraper.trace_step):
+validação, verificação de CPF, login, navegação/"Novo", preenchimento, envio e
+confirmação. `record_registration_attempt` grava uma linha de
+PatientRegistrationLog por etapa (com duration_ms) e `step_duration_stats`
+agrega p50/p95 por etapa para o dashboard.
+"""
+
+import math
+from typing import Dict, List, Optional
+
+from ..models import PatientRegistrationLog
+
+STEP_LABELS = dict(PatientRegistrationLog._meta.get_field('step').choices)
+STEP_ORDER = {step: i for i, step in enumerate(STEP_LABELS)}
+
+
+def _merge_spans(step_timings: List[Dict]) -> List[Dict]:
+    """Agrupa etapas repetidas na mesma tentativa (ex.: login refeito), na ordem do fluxo."""
+    merged: Dict[str, Dict] = {}
+    for span in step_timings:
+        current = merged.get(span['step'])
+        if current is None:
+            merged[span['step']] = dict(span)
+            continue
+        current['duration_ms'] += span['duration_ms']
+        current['success'] = current['success'] and span['success']
+        current['message'] = span['message'] or current['message']
+        current['error'] = span['error'] or current['error']
+    return sorted(merged.values(), key=lambda span: STEP_ORDER.get(span['step'], len(STEP_ORDER)))
+
+
+def record_registration_attempt(submission, attempt_number: int, result: Dict,
+                                step_timings: Optional[List[Dict]] = None,
+                                error_details: Optional[str] = None) -> List[PatientRegistrationLog]:
+    """
+    Grava o resultado de uma tentativa de cadastro como um log por etapa.
+
+    A etapa que falhou (ou a última, em caso de sucesso) recebe a mensagem do
+    resultado. Sem etapas cronometradas (ex.: erro antes de iniciar o scraper),
+    grava uma única linha 'form_submit', como antes.
+    """
+    spans = _merge_spans(step_timings or [])
+    if not spans:
+        spans = [{'step': 'form_submit', 'success': result.get('success', False),
+                  'message': '', 'error': None, 'duration_ms': None}]
+
+    outcome = len(spans) - 1
+    if not result.get('success'):
+        outcome = next((i for i, span in enumerate(spans) if not span['success']), outcome)
+
+    logs = []
+    for i, span in enumerate(spans):
+        logs.append(PatientRegistrationLog(
+            submission=submission,
+            attempt_number=attempt_number,
+            step=span['step'],
+            success=bool(span['success']) if i != outcome else bool(result.get('success')),
+            message=(result.get('message') or '') if i == outcome else (span['message'] or ''),
+            error_details=span['error'] or (error_details if i == outcome else None),
+            duration_ms=span['duration_ms'],
+        ))
+    return PatientRegistrationLog.objects.bulk_create(logs)
+
+
+def _percentile(sorted_values: List[int], pct: float) -> int:
+    """Percentil pelo método nearest-rank (lista já ordenada, não vazia)."""
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def step_duration_stats(since=None) -> List[Dict]:
+    """
+    p50/p95/média de duração por etapa (logs com duration_ms), na ordem do fluxo.
+
+    Args:
+        since: considera apenas logs a partir desta data/hora
+    """
+    qs = PatientRegistrationLog.objects.filter(duration_ms__isnull=False)
+    if since is not None:
+        qs = qs.filter(timestamp__gte=since)
+
+    durations: Dict[str, List[int]] = {}
+    failures: Dict[str, int] = {}
+    for step, duration_ms, success in qs.values_list('step', 'duration_ms', 'success').iterator():
+        durations.setdefault(step, []).append(duration_ms)
+        if not success:
+            failures[step] = failures.get(step, 0) + 1
+
+    stats = []
+    for step, label in STEP_LABELS.items():
+        values = sorted(durations.get(step, []))
+        if not values:
+            continue
+        stats.append({
+            'step': step,
+            'label': label,
+            'count': len(values),
+            'failures': failures.get(step, 0),
+            'p50_ms': _percentile(values, 50),
+            'p95_ms': _percentile(values, 95),
+            'avg_ms': round(sum(values) / len(values)),
+        })
+    return stats
@@ -0,0 +1,175 @@
+# web_scraping/services/registration_pipeline.py
+"""
+Pipeline de cadastro automático (Google Forms -> sistema matriz) com checkpoints.
+
+Cada submissão percorre etapas explícitas — validated, dedup_checked,
+form_opened, filled, submitted, confirmed — e a última etapa concluída fica
+gravada em ProcessedGoogleFormSubmission.stage. As respostas da planilha são
+primeiro ingeridas como submissões 'pending' (fila persistida); o worker então
+"aluga" uma submissão por vez (`claim`), com prazo em lease_expires_at renovado
+a cada checkpoint.
+
+Se o worker morrer no meio do lote, apenas a submissão em andamento fica em
+'processing'; `requeue_stale` devolve à fila as que passaram do prazo
+(GOOGLE_FORMS_REGISTRATION_LEASE_SECONDS) e a próxima execução retoma da etapa
+gravada. Uma submissão que parou em 'filled'/'submitted' (o "Gravar" pode ter
+sido clicado) é conferida pelo CPF antes de qualquer novo envio.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..models import ProcessedGoogleFormSubmission
+
+logger = logging.getLogger(__name__)
+
+STAGES = [stage for stage, _ in ProcessedGoogleFormSubmission._meta.get_field('stage').choices if stage]
+
+RETRYABLE_STATUSES = ('pending', 'error')
+FINAL_STATUSES = ('success', 'duplicate')
+
+
+def _lease() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'GOOGLE_FORMS_REGISTRATION_LEASE_SECONDS', 10 * 60))
+
+
+def _max_attempts() -> int:
+    return getattr(settings, 'GOOGLE_FORMS_REGISTRATION_MAX_ATTEMPTS', 5)
+
+
+def ingest_responses(responses: List[Dict]) -> int:
+    """
+    Grava as respostas do formulário como submissões na fila.
+
+    CPFs novos entram como 'pending'; submissões ainda não concluídas
+    (pendentes/com erro) recebem os dados da resposta mais recente. Retorna
+    quantas submissões novas foram criadas.
+    """
+    by_cpf = {}
+    for form_data in responses:
+        cpf = form_data.get('CPF', '').strip()
+        if not cpf:
+            logger.warning("Resposta sem CPF - pulando")
+            continue
+        by_cpf[cpf] = form_data
+    if not by_cpf:
+        return 0
+
+    existing = {s.cpf: s for s in ProcessedGoogleFormSubmission.objects.filter(cpf__in=list(by_cpf))}
+
+    new_submissions = []
+    for cpf, form_data in by_cpf.items():
+        submission = existing.get(cpf)
+        if submission is None:
+            new_submissions.append(ProcessedGoogleFormSubmission(
+                cpf=cpf,
+                email=form_data.get('E-mail', '').strip() or None,
+                full_name=form_data.get('Nome completo', '').strip(),
+                raw_form_data=form_data,
+                status='pending',
+            ))
+        elif submission.status in RETRYABLE_STATUSES and submission.raw_form_data != form_data:
+            ProcessedGoogleFormSubmission.objects.filter(pk=submission.pk).update(
+                raw_form_data=form_data,
+                full_name=form_data.get('Nome completo', '').strip() or submission.full_name,
+            )
+
+    ProcessedGoogleFormSubmission.objects.bulk_create(new_submissions, ignore_conflicts=True)
+    return len(new_submissions)
+
+
+def requeue_stale(now=None) -> int:
+    """Devolve à fila as submissões 'processing' cujo prazo expirou (worker morto)"""
+    now = now or timezone.now()
+    stale = Q(lease_expires_at__lt=now) | Q(lease_expires_at__isnull=True, last_attempt_at__lt=now - _lease())
+    count = ProcessedGoogleFormSubmission.objects.filter(stale, status='processing').update(
+        status='pending',
+        lease_expires_at=None,
+    )
+    if count:
+        logger.warning(f"♻️ {count} submissão(ões) presas em 'processando' devolvidas à fila")
+    return count
+
+
+def pending_queue() -> List[int]:
+    """IDs das submissões a processar, das mais antigas para as mais novas"""
+    return list(
+        ProcessedGoogleFormSubmission.objects
+        .filter(status__in=RETRYABLE_STATUSES, attempts__lt=_max_attempts())
+        .order_by('processed_at')
+        .values_list('pk', flat=True)
+    )
+
+
+def claim(submission_id: int) -> Optional[ProcessedGoogleFormSubmission]:
+    """
+    Reserva a submissão para este worker (UPDATE condicional) e abre uma
+    tentativa. Retorna None se outro worker já a pegou ou se ela foi concluída.
+    """
+    now = timezone.now()
+    claimed = ProcessedGoogleFormSubmission.objects.filter(
+        pk=submission_id, status__in=RETRYABLE_STATUSES
+    ).update(
+        status='processing',
+        attempts=F('attempts') + 1,
+        last_attempt_at=now,
+        lease_expires_at=now + _lease(),
+    )
+    if not claimed:
+        return None
+    return ProcessedGoogleFormSubmission.objects.get(pk=submission_id)
+
+
+def checkpoint(submission_id: int, stage: str) -> None:
+    """Grava a etapa concluída e renova o prazo da submissão"""
+    now = timezone.now()
+    ProcessedGoogleFormSubmission.objects.filter(pk=submission_id, status='processing').update(
+        stage=stage,
+        stage_updated_at=now,
+        lease_expires_at=now + _lease(),
+    )
+
+
+def checkpoint_callback(submission: ProcessedGoogleFormSubmission) -> Callable[[str], None]:
+    """Callback para PatientRegistrationScraper.register_patient_from_google_forms"""
+    def _checkpoint(stage):
+        checkpoint(submission.pk, stage)
+        submission.stage = stage
+    return _checkpoint
+
+
+def is_duplicate_result(result: Dict) -> bool:
+    message = (result.get('message') or '').lower()
+    return 'duplicado' in message or 'já existe' in message
+
+
+def finish(submission: ProcessedGoogleFormSubmission, result: Dict) -> str:
+    """
+    Encerra a tentativa com o resultado do scraper e libera o prazo.
+
+    Em erro a etapa volta ao início: a próxima tentativa (automática ou manual)
+    refaz a verificação de duplicidade em vez de confiar em um checkpoint antigo.
+    """
+    if result.get('success'):
+        submission.status = 'success'
+        submission.stage = ProcessedGoogleFormSubmission.STAGE_CONFIRMED
+        submission.patient_id_in_platform = result.get('patient_id') or submission.patient_id_in_platform
+        submission.error_message = None
+    elif is_duplicate_result(result):
+        submission.status = 'duplicate'
+        submission.stage = ProcessedGoogleFormSubmission.STAGE_DEDUP_CHECKED
+    else:
+        submission.status = 'error'
+        submission.stage = ''
+        submission.error_message = result.get('message')
+    submission.stage_updated_at = timezone.now()
+    submission.lease_expires_at = None
+    submission.save(update_fields=[
+        'status', 'stage', 'stage_updated_at', 'lease_expires_at', 'patient_id_in_platform', 'error_message',
+    ])
+    return submission.status
@@ -0,0 +1,299 @@
+# web_scraping/services/scraping_jobs.py
+"""
+Jobs assíncronos de scraping.
+
+As views não abrem mais o Chrome dentro da requisição: `enqueue()` cria um
+ScrapingJob e agenda a task Celery `run_scraping_job`, devolvendo o id na hora.
+O worker executa o scraper correspondente (`JOB_RUNNERS`) e grava o progresso
+(fase, páginas, linhas extraídas) no próprio job, consultado por polling/SSE.
+
+Um job ativo por operação (`dedup_key`, ver job_key): cliques repetidos
+reaproveitam o job em andamento, e um job concluído há menos de
+SINGLE_FLIGHT_RESULT_TTL segundos é devolvido em vez de abrir outro navegador.
+Jobs ativos sem atualização há mais de SCRAPING_JOB_STALE_SECONDS (worker
+morto) são marcados como falhos.
+"""
+
+import logging
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ..models import ScrapingJob
+from ..utils.browser_manager import BrowserManager
+from .single_flight import operation_key
+
+logger = logging.getLogger(__name__)
+
+
+def _stale_after() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'SCRAPING_JOB_STALE_SECONDS', 15 * 60))
+
+
+class JobProgress:
+    """
+    Callback de progresso passado aos scrapers (BaseScraper.report_progress).
+    Cada chamada grava apenas os campos informados com um UPDATE direto.
+    """
+
+    FIELDS = ('phase', 'pages_done', 'rows_extracted', 'message')
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+
+    def __call__(self, **fields):
+        data = {k: v for k, v in fields.items() if k in self.FIELDS and v is not None}
+        if 'message' in data:
+            data['message'] = str(data['message'])[:255]
+        data['updated_at'] = timezone.now()
+        ScrapingJob.objects.filter(pk=self.job_id).update(**data)
+
+
+# ----------------------------------------------------------------------
+# Execução dos scrapers (worker)
+# ----------------------------------------------------------------------
+def _start_browser(progress: JobProgress, attempts: int = 3) -> BrowserManager:
+    """Inicializa o navegador headless com retry."""
+    progress(phase='browser', message='Iniciando navegador...')
+    last_error = None
+    for attempt in range(attempts):
+        browser = BrowserManager()
+        try:
+            browser.start_browser(headless=True)
+            if browser.driver:
+                return browser
+        except Exception as e:
+            last_error = e
+            print(f"Tentativa {attempt + 1} falhou: {e}")
+        try:
+            browser.quit_browser()
+        except Exception:
+            pass
+        time.sleep(1)
+    raise RuntimeError(f'Não foi possível inicializar o navegador após {attempts} tentativas: {last_error}')
+
+
+def _run_sync_calendar(browser, progress: JobProgress, params: Dict) -> Dict:
+    from core.models import Appointment
+    from .calendar_scraper import CalendarScraper
+
+    scraper = CalendarScraper(browser)
+    scraper.progress_callback = progress
+
+    if params.get('start_month'):
+        start, end = params['start_month'], params.get('end_month') or params['start_month']
+        data = scraper.scrape_range(start, end)
+        count = len(data['appointments'])
+        if not count and data['errors']:
+            status = 'error'
+            message = f"Falha ao extrair o calendário de {start} a {end}"
+        elif not count:
+            status = 'warning'
+            message = 'Nenhum agendamento encontrado para sincronizar'
+        else:
+            status = 'success'
+            message = f"Sincronizados {count} agendamentos de {len(data['months'])} meses ({start} a {end})"
+            if data['errors']:
+                message += f"; {len(data['errors'])} meses com erro"
+        return {
+            'status': status,
+            'message': message,
+            'appointments': data['appointments'],
+            'appointments_count': count,
+            'new_appointments': data['created'],
+            'updated_appointments': data['updated'],
+            'months': data['months'],
+            'errors': data['errors'],
+            'total_appointments': Appointment.objects.count(),
+        }
+
+    before_count = Appointment.objects.count()
+    appointments = scraper.scrape_calendar()
+    after_count = Appointment.objects.count()
+
+    if not appointments:
+        return {
+            'status': 'warning',
+            'message': 'Nenhum agendamento encontrado para sincronizar',
+            'appointments_count': 0,
+            'new_appointments': 0,
+        }
+    return {
+        'status': 'success',
+        'message': f'Sincronizados {len(appointments)} agendamentos',
+        'appointments': appointments,
+        'appointments_count': len(appointments),
+        'new_appointments': after_count - before_count,
+        'total_appointments': after_count,
+    }
+
+
+def _run_sync_stock(browser, progress: JobProgress, params: Dict) -> Dict:
+    from .stock_scraper import StockScraper
+
+    scraper = StockScraper(browser)
+    scraper.progress_callback = progress
+    return scraper.sync_stock_to_database()
+
+
+def _run_sync_recent_users(browser, progress: JobProgress, params: Dict) -> Dict:
+    from .users_scraper import UsersScraper
+
+    scraper = UsersScraper(browser)
+    scraper.progress_callback = progress
+    return scraper.get_recent_users_for_display()
+
+
+JOB_RUNNERS: Dict[str, Callable] = {
+    ScrapingJob.TYPE_SYNC_CALENDAR: _run_sync_calendar,
+    ScrapingJob.TYPE_SYNC_STOCK: _run_sync_stock,
+    ScrapingJob.TYPE_SYNC_RECENT_USERS: _run_sync_recent_users,
+}
+
+
+def run_job(job_id: int) -> Dict:
+    """
+    Executa o job (chamado pela task Celery). A transição pending -> running é
+    condicional, então uma entrega duplicada da mesma task não roda o scraper duas vezes.
+    """
+    now = timezone.now()
+    claimed = ScrapingJob.objects.filter(pk=job_id, status=ScrapingJob.STATUS_PENDING).update(
+        status=ScrapingJob.STATUS_RUNNING, phase='starting', started_at=now, updated_at=now,
+    )
+    if not claimed:
+        logger.info(f'Job de scraping {job_id} já iniciado ou inexistente; ignorando')
+        return {'status': 'skipped', 'job_id': job_id}
+
+    job = ScrapingJob.objects.get(pk=job_id)
+    progress = JobProgress(job.pk)
+    runner = JOB_RUNNERS[job.job_type]
+    browser = None
+    try:
+        browser = _start_browser(progress)
+        result = runner(browser, progress, job.params or {})
+        failed = (result or {}).get('status') == 'error'
+        ScrapingJob.objects.filter(pk=job.pk).update(
+            status=ScrapingJob.STATUS_FAILED if failed else ScrapingJob.STATUS_COMPLETED,
+            phase='done',
+            result=result,
+            message=str((result or {}).get('message', ''))[:255],
+            error_message=(result or {}).get('message') if failed else None,
+            finished_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        return result
+    except Exception as e:
+        logger.exception(f'Erro no job de scraping {job.pk} ({job.job_type}): {e}')
+        ScrapingJob.objects.filter(pk=job.pk).update(
+            status=ScrapingJob.STATUS_FAILED,
+            phase='done',
+            message='Erro na sincronização',
+            error_message=str(e),
+            finished_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        return {'status': 'error', 'message': str(e)}
+    finally:
+        if browser and browser.driver:
+            try:
+                browser.quit_browser()
+            except Exception:
+                pass
+
+
+# ----------------------------------------------------------------------
+# Enfileiramento (views)
+# ----------------------------------------------------------------------
+def expire_stale_jobs(dedup_key: Optional[str] = None) -> int:
+    """Marca como falhos os jobs ativos sem progresso há muito tempo (worker morto/reiniciado)."""
+    qs = ScrapingJob.objects.filter(
+        status__in=ScrapingJob.ACTIVE_STATUSES,
+        updated_at__lt=timezone.now() - _stale_after(),
+    )
+    if dedup_key:
+        qs = qs.filter(dedup_key=dedup_key)
+    return qs.update(
+        status=ScrapingJob.STATUS_FAILED,
+        phase='done',
+        error_message='Job expirado sem resposta do worker',
+        finished_at=timezone.now(),
+    )
+
+
+def job_key(job_type: str, params: Optional[Dict] = None) -> str:
+    """Chave de coalescência do job: operação + argumentos relevantes."""
+    params = params or {}
+    if job_type == ScrapingJob.TYPE_SYNC_CALENDAR:
+        start = params.get('start_month') or timezone.localdate().strftime('%Y-%m')
+        end = params.get('end_month') or start
+        return operation_key(job_type, start if start == end else f'{start}..{end}')
+    return operation_key(job_type)
+
+
+def active_job(dedup_key: str) -> Optional[ScrapingJob]:
+    return ScrapingJob.objects.filter(dedup_key=dedup_key, status__in=ScrapingJob.ACTIVE_STATUSES).first()
+
+
+def recent_job(dedup_key: str) -> Optional[ScrapingJob]:
+    """Job concluído da mesma operação dentro do TTL de resultado."""
+    ttl = getattr(settings, 'SINGLE_FLIGHT_RESULT_TTL', 30)
+    if ttl <= 0:
+        return None
+    return ScrapingJob.objects.filter(
+        dedup_key=dedup_key,
+        status=ScrapingJob.STATUS_COMPLETED,
+        finished_at__gte=timezone.now() - timedelta(seconds=ttl),
+    ).order_by('-finished_at').first()
+
+
+def enqueue(job_type: str, requested_by: str = '', params: Optional[Dict] = None,
+            dedup_key: Optional[str] = None) -> Tuple[ScrapingJob, bool]:
+    """
+    Cria e agenda um job, ou reaproveita o job ativo (ou recém-concluído)
+    da mesma operação.
+
+    Returns:
+        (job, created) — created=False quando o job foi reaproveitado.
+    """
+    if job_type not in JOB_RUNNERS:
+        raise ValueError(f'Tipo de job inválido: "{job_type}"')
+    dedup_key = dedup_key or job_key(job_type, params)
+
+    expire_stale_jobs(dedup_key)
+    job = active_job(dedup_key) or recent_job(dedup_key)
+    if job is not None:
+        return job, False
+
+    try:
+        with transaction.atomic():
+            job = ScrapingJob.objects.create(
+                job_type=job_type,
+                dedup_key=dedup_key,
+                params=params or {},
+                requested_by=requested_by or '',
+            )
+    except IntegrityError:
+        # Outra requisição criou o job entre a consulta e o insert
+        job = active_job(dedup_key)
+        if job is not None:
+            return job, False
+        raise
+
+    from ..tasks import run_scraping_job
+    try:
+        task = run_scraping_job.delay(job.pk)
+    except Exception as e:
+        ScrapingJob.objects.filter(pk=job.pk).update(
+            status=ScrapingJob.STATUS_FAILED,
+            phase='done',
+            error_message=f'Não foi possível agendar o job: {e}',
+            finished_at=timezone.now(),
+        )
+        raise RuntimeError(f'Fila de tarefas indisponível: {e}')
+    ScrapingJob.objects.filter(pk=job.pk).update(task_id=task.id)
+    job.task_id = task.id
+    return job, True
@@ -0,0 +1,151 @@
+# web_scraping/services/single_flight.py
+"""
+Coalescência de requisições idênticas (single-flight).
+
+Chamadas simultâneas com a mesma chave de operação (ex.: `sync_stock`,
+`sync_calendar:2026-10`, `search_cpf:12345678901`) executam o trabalho uma
+única vez: a primeira chamada vira "líder" e as demais aguardam e recebem o
+mesmo resultado. O resultado fica disponível por um TTL curto no cache do
+Django, então cliques logo depois do término também não abrem outro navegador.
+
+- Mesmo processo: threading.Event por chave.
+- Entre processos/containers: lock via cache.add() + resultado no cache
+  (requer cache compartilhado, ver CACHE_URL; com LocMemCache vale por processo).
+"""
+
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+_MISSING = object()
+
+
+def operation_key(operation: str, *args) -> str:
+    """Monta a chave da operação: 'search_cpf:12345678901', 'sync_calendar:2026-10'..."""
+    parts = [operation] + [str(a) for a in args if a not in (None, '')]
+    return ':'.join(parts)
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Executa no máximo uma chamada em andamento por chave."""
+
+    def __init__(self, prefix: str = 'single-flight'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    @staticmethod
+    def _default_ttl() -> int:
+        return getattr(settings, 'SINGLE_FLIGHT_RESULT_TTL', 30)
+
+    @staticmethod
+    def _default_timeout() -> int:
+        return getattr(settings, 'SINGLE_FLIGHT_WAIT_TIMEOUT', 180)
+
+    def _result_key(self, key: str) -> str:
+        return f'{self.prefix}:result:{key}'
+
+    def _lock_key(self, key: str) -> str:
+        return f'{self.prefix}:lock:{key}'
+
+    def cached(self, key: str, default=None):
+        """Resultado recente da operação (dentro do TTL) ou `default`."""
+        value = cache.get(self._result_key(key), _MISSING)
+        return default if value is _MISSING else value
+
+    def forget(self, key: str) -> None:
+        """Descarta o resultado recente (ex.: após uma escrita que o invalida)."""
+        cache.delete(self._result_key(key))
+
+    def do(self, key: str, fn: Callable[[], Any], ttl: Optional[int] = None,
+           wait_timeout: Optional[int] = None,
+           cacheable: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, bool]:
+        """
+        Executa `fn` uma única vez por chave entre chamadas concorrentes.
+
+        Args:
+            key: chave da operação (ver operation_key)
+            fn: função sem argumentos que faz o trabalho
+            ttl: segundos em que o resultado é reaproveitado após o término
+            wait_timeout: espera máxima de quem não é líder
+            cacheable: decide se o resultado entra no cache (ex.: não guardar erros)
+
+        Returns:
+            (resultado, compartilhado) — compartilhado=True quando veio de
+            outra chamada (em andamento ou recente).
+        """
+        ttl = self._default_ttl() if ttl is None else ttl
+        wait_timeout = self._default_timeout() if wait_timeout is None else wait_timeout
+
+        value = cache.get(self._result_key(key), _MISSING)
+        if value is not _MISSING:
+            return value, True
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            if not call.event.wait(wait_timeout):
+                raise TimeoutError(f'Tempo esgotado aguardando a operação "{key}"')
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            result, shared = self._run_shared(key, fn, ttl, wait_timeout, cacheable)
+            call.result = result
+            return result, shared
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _run_shared(self, key, fn, ttl, wait_timeout, cacheable) -> Tuple[Any, bool]:
+        """Coordena entre processos: quem obtém o lock executa, os demais aguardam o resultado."""
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait_timeout
+
+        while True:
+            if cache.add(lock_key, token, wait_timeout):
+                try:
+                    result = fn()
+                    if ttl > 0 and (cacheable is None or cacheable(result)):
+                        cache.set(self._result_key(key), result, ttl)
+                    return result, False
+                finally:
+                    if cache.get(lock_key) == token:
+                        cache.delete(lock_key)
+
+            # Outro processo está executando: aguarda o resultado dele
+            while time.monotonic() < deadline:
+                time.sleep(0.5)
+                value = cache.get(self._result_key(key), _MISSING)
+                if value is not _MISSING:
+                    return value, True
+                if cache.get(lock_key) is None:
+                    break  # líder terminou sem resultado reaproveitável: tenta executar
+            else:
+                raise TimeoutError(f'Tempo esgotado aguardando a operação "{key}"')
+
+
+# Instância global
+single_flight = SingleFlight()
@@ -0,0 +1,394 @@
+# web_scraping/services/stock_ledger.py
+"""
+Livro-razão (ledger) do estoque interno.
+
+O saldo autoritativo de cada item fica na tabela core.Vaccine. Toda
+alteração de estoque é registrada como um movimento em um diário
+append-only (JSON Lines) e aplicada à linha do item na mesma transação:
+
+- entry:      entrada de unidades (quantity > 0 soma ao estoque)
+- exit:       saída/aplicação de unidades (quantity > 0 subtrai do estoque)
+- adjustment: ajuste/inventário — define valores absolutos em `fields`
+              (current_stock, available_stock, preços, mínimo, laboratório...)
+
+Cada escrita é um UPDATE de uma linha + um append no diário, serializado
+por lock de linha (select_for_update) e lock de arquivo. A compactação
+periódica (Celery) exporta o snapshot data/vaccines.json e grava em
+`journal_offset` até onde o diário já está refletido nele; snapshot +
+replay do diário a partir desse offset reconstrói os saldos (ver
+InventoryService.import_json). O diário nunca é truncado: é o histórico auditável.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: apenas lock entre threads
+    fcntl = None
+
+
+MOVEMENT_ENTRY = 'entry'
+MOVEMENT_EXIT = 'exit'
+MOVEMENT_ADJUSTMENT = 'adjustment'
+MOVEMENT_TYPES = (MOVEMENT_ENTRY, MOVEMENT_EXIT, MOVEMENT_ADJUSTMENT)
+
+# Campos que um ajuste pode definir
+ADJUSTABLE_FIELDS = (
+    'laboratory', 'current_stock', 'available_stock', 'min_stock',
+    'purchase_price', 'sale_price', 'min_age_months', 'max_age_months',
+)
+
+
+def get_stock_json_path() -> str:
+    """Caminho do JSON de estoque (settings.INTERNAL_STOCK_JSON ou BASE_DIR/data/vaccines.json)."""
+    json_path = getattr(settings, 'INTERNAL_STOCK_JSON', None)
+    if not json_path:
+        json_path = os.path.join(settings.BASE_DIR, 'data', 'vaccines.json')
+    return json_path
+
+
+def _utcnow_iso() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _parse_ts(value: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def _find_item(items: List[Dict], name: str) -> Optional[int]:
+    needle = (name or '').strip().casefold()
+    return next((i for i, it in enumerate(items) if (it.get('name') or '').strip().casefold() == needle), None)
+
+
+def apply_movement(item: Dict, movement: Dict) -> Dict:
+    """
+    Aplica um movimento a um item (in-place) e retorna o item.
+    Lança ValueError se o movimento deixar o item inconsistente.
+    """
+    mtype = movement.get('type')
+    if mtype in (MOVEMENT_ENTRY, MOVEMENT_EXIT):
+        qty = int(movement.get('quantity') or 0)
+        if mtype == MOVEMENT_EXIT:
+            qty = -qty
+        current = int(item.get('current_stock') or 0) + qty
+        if current < 0:
+            raise ValueError('Saída maior que o estoque atual.')
+        # Unidades reservadas (current - available) são consumidas por último
+        available = max(int(item.get('available_stock', item.get('current_stock')) or 0) + qty, 0)
+        item['current_stock'] = current
+        item['available_stock'] = available
+    elif mtype == MOVEMENT_ADJUSTMENT:
+        for key, value in (movement.get('fields') or {}).items():
+            if key in ADJUSTABLE_FIELDS:
+                item[key] = value
+        # Regras de consistência
+        if item.get('current_stock') is not None and item.get('available_stock') is None:
+            item['available_stock'] = item.get('current_stock')
+        if item.get('available_stock') is not None and item.get('current_stock') is None:
+            item['current_stock'] = item.get('available_stock')
+    else:
+        raise ValueError(f'Tipo de movimento inválido: "{mtype}".')
+
+    if (item.get('available_stock') is not None) and (item.get('current_stock') is not None):
+        if int(item['available_stock']) > int(item['current_stock']):
+            raise ValueError('available_stock não pode ser maior que current_stock.')
+    return item
+
+
+class StockLedger:
+    """
+    Diário de movimentos do estoque interno (saldos na tabela core.Vaccine).
+    O append no diário é serializado por um lock de arquivo (entre
+    processos/containers que compartilham o volume ./data) e por um lock de thread.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None, journal_path: Optional[str] = None):
+        self._snapshot_path = snapshot_path
+        self._journal_path = journal_path
+        self._thread_lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Caminhos / versão
+    # ------------------------------------------------------------------
+    @property
+    def snapshot_path(self) -> str:
+        return self._snapshot_path or get_stock_json_path()
+
+    @property
+    def journal_path(self) -> str:
+        return (
+            self._journal_path
+            or getattr(settings, 'STOCK_LEDGER_JOURNAL', None)
+            or os.path.join(os.path.dirname(self.snapshot_path), 'stock_movements.jsonl')
+        )
+
+    def version(self) -> str:
+        """Versão do estoque: muda a cada escrita na tabela de vacinas."""
+        from django.db.models import Count, Max
+        from core.models import Vaccine
+
+        agg = Vaccine.objects.aggregate(n=Count('id'), ts=Max('updated_at'))
+        ts = agg['ts'].isoformat() if agg['ts'] else ''
+        return f"{agg['n']}-{ts}"
+
+    @contextmanager
+    def _locked(self):
+        """Lock exclusivo entre threads e processos."""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            lock_path = f"{self.journal_path}.lock"
+            os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+            with open(lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def load_snapshot(self, path: Optional[str] = None) -> Dict:
+        """Lê o snapshot JSON (vaccines.json)."""
+        with open(path or self.snapshot_path, 'r', encoding='utf-8') as f:
+            return json.load(f) or {}
+
+    def _read_journal(self, offset: int = 0) -> Iterator[Tuple[int, Dict]]:
+        """Itera (offset_final, movimento) a partir de `offset`. Ignora linha final incompleta."""
+        try:
+            f = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(offset)
+            pos = offset
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # escrita interrompida; o próximo append a fecha com '\n' e ela é descartada
+                pos += len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    yield pos, json.loads(line.decode('utf-8'))
+                except ValueError:
+                    continue
+
+    def replay(self, doc: Dict) -> Tuple[Dict, int, int]:
+        """Aplica o diário pendente sobre um snapshot. Retorna (doc, offset_final, aplicados)."""
+        items = doc.setdefault('items', [])
+        offset = int(doc.get('journal_offset') or 0)
+        applied = 0
+        for offset, movement in self._read_journal(offset):
+            idx = _find_item(items, movement.get('item'))
+            if idx is None:
+                continue
+            try:
+                apply_movement(items[idx], movement)
+            except ValueError:
+                # Movimento inválido já gravado: ignora sem quebrar o replay
+                continue
+            doc['last_updated'] = movement.get('timestamp') or doc.get('last_updated')
+            applied += 1
+        return doc, offset, applied
+
+    def journal_size(self) -> int:
+        try:
+            return os.path.getsize(self.journal_path)
+        except OSError:
+            return 0
+
+    def current_document(self) -> Dict:
+        """Documento atual no formato do vaccines.json, lido da tabela de vacinas."""
+        from core.models import Vaccine
+
+        vaccines = list(Vaccine.objects.order_by('id'))
+        last = max((v.updated_at for v in vaccines if v.updated_at), default=None)
+        return {
+            'last_updated': last.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ') if last else None,
+            'source': 'internal-inventory',
+            'total_items': len(vaccines),
+            'items': [v.to_stock_item() for v in vaccines],
+        }
+
+    @staticmethod
+    def _lookup(name: str, pk: Optional[int] = None):
+        """QuerySet do item pelo id, ou pelo nome (exato, senão sem diferenciar maiúsculas)."""
+        from core.models import Vaccine
+
+        if pk is not None:
+            return Vaccine.objects.filter(pk=pk)
+        name = (name or '').strip()
+        qs = Vaccine.objects.filter(name=name)
+        if not qs.exists():
+            qs = Vaccine.objects.filter(name__iexact=name)
+        return qs.order_by('id')
+
+    def get_item(self, name: str) -> Optional[Dict]:
+        vaccine = self._lookup(name).first()
+        return vaccine.to_stock_item() if vaccine else None
+
+    def _append(self, *movements: Dict) -> None:
+        data = ''.join(json.dumps(m, ensure_ascii=False) + '\n' for m in movements).encode('utf-8')
+        with self._locked():
+            os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+            with open(self.journal_path, 'a+b') as f:
+                # Linha final sem '\n' (escrita interrompida): fecha a linha antes,
+                # senão o próximo movimento seria colado nela e descartado no replay
+                if os.fstat(f.fileno()).st_size:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        data = b'\n' + data
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+    def _build_movement(self, item_name: str, movement_type: str, quantity: Optional[int],
+                        fields: Optional[Dict], user: Optional[str], note: str) -> Dict:
+        return {
+            'timestamp': _utcnow_iso(),
+            'user': user or '',
+            'type': movement_type,
+            'item': item_name,
+            'quantity': quantity,
+            'fields': {k: v for k, v in (fields or {}).items() if k in ADJUSTABLE_FIELDS},
+            'note': note or '',
+        }
+
+    def record_initial(self, item: Dict, user: Optional[str] = None, note: str = 'cadastro') -> Dict:
+        """Registra no diário o estado inicial de um item recém-criado (sem escrever no banco)."""
+        movement = self._build_movement(item['name'], MOVEMENT_ADJUSTMENT, None, item, user, note)
+        self._append(movement)
+        return movement
+
+    def record_sync(self, changes: Dict[str, Dict], user: Optional[str] = None, note: str = '') -> int:
+        """
+        Registra no diário, em um único append, os ajustes já gravados em lote
+        por uma sincronização ({nome: {campo: {'old', 'new'}}}). Retorna o nº de movimentos.
+        """
+        movements = [
+            self._build_movement(name, MOVEMENT_ADJUSTMENT, None,
+                                 {f: v['new'] for f, v in fields.items()}, user, note)
+            for name, fields in changes.items()
+        ]
+        if movements:
+            self._append(*movements)
+        return len(movements)
+
+    def record(self, item_name: str, movement_type: str, quantity: Optional[int] = None,
+               fields: Optional[Dict] = None, user: Optional[str] = None, note: str = '',
+               pk: Optional[int] = None) -> Tuple[Dict, Dict]:
+        """
+        Registra um movimento: aplica na linha do item e faz append no diário
+        depois do commit da transação.
+        O item é localizado por `pk` quando informado, senão pelo nome.
+
+        Returns:
+            (movimento gravado, item resultante)
+
+        Raises:
+            LookupError: item não existe no estoque
+            ValueError: movimento inválido (ex.: saída maior que o estoque)
+        """
+        from django.db import transaction
+
+        if movement_type not in MOVEMENT_TYPES:
+            raise ValueError(f'Tipo de movimento inválido: "{movement_type}".')
+        if movement_type in (MOVEMENT_ENTRY, MOVEMENT_EXIT):
+            if quantity is None or int(quantity) <= 0:
+                raise ValueError('Campo "quantity" deve ser um inteiro positivo.')
+            quantity = int(quantity)
+
+        with transaction.atomic():
+            vaccine = self._lookup(item_name, pk).select_for_update().first()
+            if vaccine is None:
+                raise LookupError('Item não encontrado no estoque interno.')
+
+            item = vaccine.to_stock_item()
+            movement = self._build_movement(item['name'], movement_type, quantity, fields, user, note)
+            # Valida antes de gravar
+            apply_movement(item, movement)
+
+            vaccine.apply_stock_item(item)
+            vaccine.save()
+            # Só entra no diário o que foi de fato gravado (inclusive quando o
+            # chamador abre uma transação maior), e o fsync não prende a linha
+            transaction.on_commit(lambda: self._append(movement))
+
+        return movement, vaccine.to_stock_item()
+
+    def compact(self) -> Dict:
+        """Exporta o snapshot vaccines.json com os saldos atuais e o offset do diário."""
+        with self._locked():
+            offset = self.journal_size()
+            doc = self.current_document()
+            try:
+                previous = int(self.load_snapshot().get('journal_offset') or 0)
+            except (OSError, ValueError):
+                previous = 0
+            doc['journal_offset'] = offset
+
+            directory = os.path.dirname(self.snapshot_path) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(doc, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.snapshot_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        applied = sum(1 for _ in self._read_journal(previous)) if offset != previous else 0
+        return {'status': 'success', 'applied': applied, 'journal_offset': offset, 'total_items': doc['total_items']}
+
+    # ------------------------------------------------------------------
+    # Histórico / métricas
+    # ------------------------------------------------------------------
+    def history(self, item_name: Optional[str] = None, limit: Optional[int] = 100) -> List[Dict]:
+        """Movimentos mais recentes primeiro (opcionalmente de um item)."""
+        needle = (item_name or '').strip().casefold()
+        movements = [
+            m for _, m in self._read_journal(0)
+            if not needle or (m.get('item') or '').casefold() == needle
+        ]
+        movements.reverse()
+        return movements[:limit] if limit else movements
+
+    def consumption_rates(self, days: int = 30) -> Dict[str, Dict]:
+        """
+        Consumo por item nos últimos `days` dias (somente movimentos 'exit').
+        Retorna {nome: {'consumed': total, 'per_day': média diária}}.
+        """
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        totals: Dict[str, int] = {}
+        for _, m in self._read_journal(0):
+            if m.get('type') != MOVEMENT_EXIT:
+                continue
+            ts = _parse_ts(m.get('timestamp'))
+            if ts is None or ts < since:
+                continue
+            totals[m['item']] = totals.get(m['item'], 0) + int(m.get('quantity') or 0)
+        return {
+            name: {'consumed': total, 'per_day': round(total / days, 2) if days else float(total)}
+            for name, total in totals.items()
+        }
+
+
+# Instância global do ledger
+stock_ledger = StockLedger()
@@ -0,0 +1,218 @@
+# web_scraping/services/stock_repository.py
+"""
+Repositório de leitura do estoque interno.
+
+O documento atual vem do ledger (tabela core.Vaccine, ver stock_ledger) e
+é processado uma única vez por versão do estoque: os campos derivados de
+cada item (margem, valor de inventário, status) e o resumo ficam em cache
+em memória. Consultas com filtro, ordenação e
+paginação operam sobre esse snapshot.
+"""
+
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+from .stock_ledger import StockLedger, stock_ledger
+
+
+STATUS_OUT = 'out'
+STATUS_LOW = 'low'
+STATUS_AVAILABLE = 'available'
+
+# Campos aceitos em ?sort=
+SORTABLE_FIELDS = {
+    'name', 'laboratory', 'current_stock', 'available_stock', 'min_stock',
+    'purchase_price', 'sale_price', 'unit_margin', 'inventory_value',
+    'potential_revenue', 'min_age_months', 'max_age_months', 'status',
+}
+
+
+def build_stock_item(item: Dict) -> Dict:
+    """Normaliza um item do JSON e calcula os campos derivados."""
+    name = item.get('name') or 'Item'
+    lab = item.get('laboratory') or 'N/A'
+    current = int(item.get('current_stock', 0) or 0)
+    available = int(item.get('available_stock', current) or current)
+    min_stock = int(item.get('min_stock', 0) or 0)
+    purchase = float(item.get('purchase_price', 0) or 0)
+    sale = float(item.get('sale_price', 0) or 0)
+    min_age_m = int(item.get('min_age_months', 0) or 0)
+    max_age_m = int(item.get('max_age_months', 0) or 0)
+
+    if current <= 0:
+        status = STATUS_OUT
+        status_text = 'Esgotado'
+    elif current < min_stock:
+        status = STATUS_LOW
+        status_text = f'Estoque Baixo ({current} unidades)'
+    else:
+        status = STATUS_AVAILABLE
+        status_text = f'Disponível ({current} unidades)'
+
+    return {
+        'name': name,
+        'laboratory': lab,
+        'current_stock': current,
+        'stock': current,  # Alias para compatibilidade com frontend
+        'available_stock': available,
+        'min_stock': min_stock,
+        'purchase_price': purchase,
+        'sale_price': sale,
+        'unit_margin': round(sale - purchase, 2),
+        'inventory_value': round(current * purchase, 2),
+        'potential_revenue': round(available * sale, 2),
+        'min_age_months': min_age_m,
+        'max_age_months': max_age_m,
+        'status': status,
+        'status_class': f'status-{status}',
+        'status_text': status_text,
+    }
+
+
+class StockSnapshot:
+    """Versão processada (imutável) do documento de estoque."""
+
+    def __init__(self, payload: Dict, version: str):
+        self.version = version
+        self.last_updated = payload.get('last_updated')
+        self.items: List[Dict] = [build_stock_item(it) for it in payload.get('items', [])]
+
+        summary = {
+            'total_items': len(self.items),
+            'items_out': 0,
+            'items_low': 0,
+            'inventory_value': 0.0,      # soma(current_stock * purchase_price)
+            'potential_revenue': 0.0      # soma(available_stock * sale_price)
+        }
+        # Índices para filtros: status -> posições, laboratório -> posições
+        self.by_status: Dict[str, List[int]] = {STATUS_OUT: [], STATUS_LOW: [], STATUS_AVAILABLE: []}
+        self.by_laboratory: Dict[str, List[int]] = {}
+        self.search_keys: List[str] = []
+
+        for idx, item in enumerate(self.items):
+            summary['inventory_value'] += item['inventory_value']
+            summary['potential_revenue'] += item['potential_revenue']
+            if item['status'] == STATUS_OUT:
+                summary['items_out'] += 1
+            elif item['status'] == STATUS_LOW:
+                summary['items_low'] += 1
+
+            self.by_status[item['status']].append(idx)
+            self.by_laboratory.setdefault(item['laboratory'].casefold(), []).append(idx)
+            self.search_keys.append(f"{item['name']} {item['laboratory']}".casefold())
+
+        self.summary = summary
+        self.laboratories = sorted({it['laboratory'] for it in self.items}, key=str.casefold)
+
+
+class StockRepository:
+    """
+    Cache de leitura do estoque interno, invalidado pela versão do estoque.
+    Uma instância por processo (ver `stock_repository` no fim do módulo).
+    """
+
+    def __init__(self, ledger: Optional[StockLedger] = None):
+        self.ledger = ledger or stock_ledger
+        self._snapshot: Optional[StockSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get_snapshot(self) -> StockSnapshot:
+        """
+        Retorna o snapshot atual, reprocessando apenas se o estoque mudou.
+        """
+        version = self.ledger.version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+            payload = self.ledger.current_document()
+            snapshot = StockSnapshot(payload, version)
+            self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self) -> None:
+        """Descarta o cache (o ledger já muda a versão a cada escrita)."""
+        with self._lock:
+            self._snapshot = None
+
+    def query(self, status: Optional[str] = None, laboratory: Optional[str] = None,
+              search: Optional[str] = None, sort: Optional[str] = None,
+              page: Optional[int] = None, page_size: Optional[int] = None) -> Dict:
+        """
+        Filtra, ordena e pagina os itens do snapshot.
+
+        Args:
+            status: 'out', 'low' ou 'available' (aceita também 'status-out' etc.)
+            laboratory: nome exato do laboratório (sem diferenciar maiúsculas)
+            search: trecho do nome/laboratório
+            sort: campo de ordenação; prefixo '-' para decrescente
+            page / page_size: paginação (1-based); sem page_size retorna tudo
+        """
+        snapshot = self.get_snapshot()
+
+        positions = None
+        if status:
+            status = status.replace('status-', '')
+            if status not in snapshot.by_status:
+                raise ValueError(f'Status inválido: "{status}". Use out, low ou available.')
+            positions = snapshot.by_status[status]
+        if laboratory:
+            lab_positions = snapshot.by_laboratory.get(laboratory.strip().casefold(), [])
+            if positions is None:
+                positions = lab_positions
+            else:
+                lab_set = set(lab_positions)
+                positions = [p for p in positions if p in lab_set]
+        if positions is None:
+            positions = range(len(snapshot.items))
+        if search:
+            needle = search.strip().casefold()
+            positions = [p for p in positions if needle in snapshot.search_keys[p]]
+
+        items = [snapshot.items[p] for p in positions]
+
+        if sort:
+            reverse = sort.startswith('-')
+            field = sort.lstrip('-')
+            if field not in SORTABLE_FIELDS:
+                raise ValueError(f'Campo de ordenação inválido: "{field}".')
+            if isinstance(items[0][field] if items else '', str):
+                items.sort(key=lambda it: it[field].casefold(), reverse=reverse)
+            else:
+                items.sort(key=lambda it: it[field], reverse=reverse)
+
+        total = len(items)
+        pagination = None
+        if page_size:
+            page = max(int(page or 1), 1)
+            page_size = max(int(page_size), 1)
+            start = (page - 1) * page_size
+            items = items[start:start + page_size]
+            pagination = {
+                'page': page,
+                'page_size': page_size,
+                'total': total,
+                'pages': (total + page_size - 1) // page_size,
+            }
+
+        return {
+            'items': items,
+            'total': total,
+            'pagination': pagination,
+            'snapshot': snapshot,
+        }
+
+    @staticmethod
+    def make_etag(snapshot: StockSnapshot, query_string: str = '') -> str:
+        """ETag da resposta: versão do arquivo + parâmetros da consulta."""
+        digest = hashlib.md5(f"{snapshot.version}|{query_string}".encode('utf-8')).hexdigest()
+        return f'"{digest}"'
+
+
+# Instância global do repositório (cache por processo)
+stock_repository = StockRepository()
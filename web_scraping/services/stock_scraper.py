@@ -7,12 +7,12 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from django.conf import settings
 from .base_scraper import BaseScraper
-from core.models import Vaccine
+from .inventory_service import inventory_service
 
 class StockScraper(BaseScraper):
     def __init__(self, browser_manager):
         super().__init__(browser_manager)
-        self.stock_url = "https://aruja.gocfranquias.com.br/Cadastro/Vacinas.aspx"
+        self.stock_url = self.matrix_url("Cadastro/Vacinas.aspx")
         self.max_pages = getattr(settings, 'STOCK_SCRAPER_MAX_PAGES', 100)
     
     def scrape_stock_data(self):
@@ -21,6 +21,7 @@ class StockScraper(BaseScraper):
             return []
         
         print("🔄 Navegando para página de estoque...")
+        self.report_progress(phase='navigation', message='Abrindo página de estoque...')
         self.browser.driver.get(self.stock_url)
         
         # Aguarda a página carregar completamente (tabela ou container)
@@ -52,6 +53,10 @@ class StockScraper(BaseScraper):
             
             stock_data.extend(page_data)
             print(f"✅ Página {page}: {len(page_data)} itens extraídos (total: {len(stock_data)})")
+            self.report_progress(
+                phase='extracting', pages_done=page, rows_extracted=len(stock_data),
+                message=f'Página {page}: {len(stock_data)} itens extraídos',
+            )
             
             # Verifica se há próxima página
             if not self._has_next_page():
@@ -417,62 +422,29 @@ class StockScraper(BaseScraper):
                     'errors': []
                 }
             
-            updated_count = 0
-            created_count = 0
             errors = []
             
-            print(f"💾 Salvando {len(stock_data)} itens no banco de dados...")
+            print(f"💾 Reconciliando {len(stock_data)} itens com o inventário interno...")
+            self.report_progress(phase='saving', message=f'Reconciliando {len(stock_data)} itens com o inventário...')
             
-            for i, vaccine_data in enumerate(stock_data):
-                try:
-                    # Busca ou cria vacina
-                    vaccine, created = Vaccine.objects.get_or_create(
-                        name=vaccine_data['name'],
-                        defaults={
-                            'laboratory': vaccine_data.get('laboratory', ''),
-                            'current_stock': vaccine_data.get('current_stock', 0),
-                            'available_stock': vaccine_data.get('available_stock', 0),
-                            'min_stock': vaccine_data.get('min_stock', 0),
-                            'minimum_stock': vaccine_data.get('min_stock', 0),
-                            'purchase_price': vaccine_data.get('purchase_price', 0.0),
-                            'sale_price': vaccine_data.get('sale_price', 0.0),
-                        }
-                    )
-                    
-                    if not created:
-                        # Atualiza vacina existente
-                        vaccine.laboratory = vaccine_data.get('laboratory', vaccine.laboratory)
-                        vaccine.current_stock = vaccine_data.get('current_stock', vaccine.current_stock)
-                        vaccine.available_stock = vaccine_data.get('available_stock', vaccine.available_stock)
-                        vaccine.min_stock = vaccine_data.get('min_stock', vaccine.min_stock)
-                        vaccine.minimum_stock = vaccine_data.get('min_stock', vaccine.minimum_stock)
-                        
-                        if vaccine_data.get('purchase_price', 0.0) > 0:
-                            vaccine.purchase_price = vaccine_data['purchase_price']
-                        if vaccine_data.get('sale_price', 0.0) > 0:
-                            vaccine.sale_price = vaccine_data['sale_price']
-                    
-                    vaccine.save()
-                    
-                    if created:
-                        created_count += 1
-                    else:
-                        updated_count += 1
-                        
-                    if (i + 1) % 10 == 0:
-                        print(f"  📊 Progresso: {i+1}/{len(stock_data)}")
-                        
-                except Exception as e:
-                    error_msg = f"Erro ao salvar '{vaccine_data.get('name', 'Desconhecido')}': {str(e)}"
-                    errors.append(error_msg)
-                    print(f"  ❌ {error_msg}")
+            # Diff campo a campo + bulk_create/bulk_update em uma transação
+            reconciled = inventory_service.reconcile(stock_data)
+            created_count = reconciled['created']
+            updated_count = reconciled['updated']
             
             result = {
                 'status': 'success',
-                'message': f"Sincronização concluída! {created_count} criadas, {updated_count} atualizadas",
+                'message': (
+                    f"Sincronização concluída! {created_count} criadas, {updated_count} atualizadas, "
+                    f"{reconciled['unchanged']} sem alteração"
+                ),
                 'total_scraped': len(stock_data),
                 'created': created_count,
                 'updated': updated_count,
+                'unchanged': reconciled['unchanged'],
+                'changes': reconciled['changes'],
+                'field_counts': reconciled['field_counts'],
+                'low_stock': reconciled['low_stock'],
                 'errors': errors,
             }
             
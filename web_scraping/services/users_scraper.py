@@ -10,7 +10,7 @@ from datetime import datetime
 class UsersScraper(BaseScraper):
     def __init__(self, browser_manager):
         super().__init__(browser_manager)
-        self.users_url = "https://aruja.gocfranquias.com.br/Cadastro/Paciente.aspx"
+        self.users_url = self.matrix_url("Cadastro/Paciente.aspx")
     
     def scrape_recent_users(self, limit=20):
         """Extrai os últimos usuários cadastrados (limitado a 'limit' registros)"""
@@ -18,6 +18,7 @@ class UsersScraper(BaseScraper):
             return []
         
         print(f"🔄 Navegando para página de pacientes...")
+        self.report_progress(phase='navigation', message='Abrindo página de pacientes...')
         self.browser.driver.get(self.users_url)
         
         # Aguarda a tabela carregar
@@ -135,6 +136,11 @@ class UsersScraper(BaseScraper):
                         print(f"❌ Erro ao processar linha {i+1}: {e}")
                         continue
 
+                self.report_progress(
+                    phase='extracting', pages_done=page, rows_extracted=len(users_data),
+                    message=f'Página {page}: {len(users_data)} usuários extraídos',
+                )
+
                 if len(users_data) >= limit:
                     break
 
@@ -0,0 +1,37 @@
+"""
+Tarefas Celery do app web_scraping
+"""
+
+import logging
+
+from celery import shared_task
+
+from .services.stock_ledger import stock_ledger
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def compact_stock_ledger():
+    """
+    Exporta o snapshot do estoque (vaccines.json) com os saldos atuais do inventário
+    e o offset do diário já refletido nele. O diário é mantido integralmente como histórico.
+    """
+    try:
+        result = stock_ledger.compact()
+        if result['applied']:
+            logger.info(f"Snapshot de estoque exportado: {result['applied']} novos movimentos refletidos")
+        return result
+    except Exception as e:
+        logger.exception(f'Erro ao compactar ledger de estoque: {e}')
+        return {'status': 'error', 'message': str(e)}
+
+
+@shared_task(soft_time_limit=25 * 60)
+def run_scraping_job(job_id):
+    """
+    Executa um ScrapingJob (sincronização de calendário, estoque ou usuários recentes)
+    fora do ciclo de requisição HTTP. O progresso fica gravado no próprio job.
+    """
+    from .services.scraping_jobs import run_job
+    return run_job(job_id)
@@ -13,11 +13,17 @@ urlpatterns = [
     path('sync-stock/', views.sync_stock, name='sync_stock'),
     path('stock-data/', views.stock_data, name='stock_data'),
     path('stock-item/update/', views.update_stock_item, name='update_stock_item'),
+    path('stock-movements/', views.stock_movements, name='stock_movements'),
+    path('stock-movements/register/', views.register_stock_movement, name='register_stock_movement'),
     
     # Usuários recentes
     path('sync-recent-users/', views.sync_recent_users, name='sync_recent_users'),
     path('recent-users-data/', views.recent_users_data, name='recent_users_data'),
 
+    # Jobs assíncronos de scraping (progresso)
+    path('jobs/<int:job_id>/', views.scraping_job_status, name='scraping_job_status'),
+    path('jobs/<int:job_id>/stream/', views.scraping_job_stream, name='scraping_job_stream'),
+
     # Busca por CPF (paciente)
     path('search-patient/', views.search_patient_by_cpf, name='search_patient_by_cpf'),
     
@@ -0,0 +1,619 @@
+# web_scraping/utils/matrix_fixture_server.py
+"""
+Servidor local que imita as páginas do sistema matriz (GoC Franquias) usadas
+pelos scrapers, para rodar e medir os scrapers sem acessar o sistema real.
+
+Páginas servidas (mesmos ids/names de controles ASP.NET que os scrapers procuram):
+- login.aspx                      login (Login1$UserName/Password/LoginButton)
+- Login/Inicio.aspx               página inicial com menu e iframe ifrConteudo
+- Cadastro/Vacinas.aspx           grid de estoque paginado (Page$Next / Page$N)
+- Cadastro/Paciente.aspx          grid de pacientes: ordenação por data de cadastro,
+                                  filtro por CPF, paginação e FormView "Novo"/"Gravar"
+- Cadastro/AgendaAtendimentos.aspx  DatePicker (navegação 'V' + dias) e `var cellContents`
+
+O estado da página (página atual, ordenação, filtro, mês exibido) viaja no
+__VIEWSTATE e os postbacks usam __doPostBack, como no sistema real. Os dados
+são gerados de forma determinística a partir de uma semente (FixtureData).
+
+`latency` (+ `jitter`) segundos são somados a cada resposta para simular a rede.
+
+Uso:
+    with MatrixFixtureServer(latency=0.05) as server:
+        ...  # MATRIX_SYSTEM_URL = server.url
+Ver também os comandos `run_matrix_fixture_server` e `bench_scrapers`.
+"""
+
+import base64
+import calendar
+import html
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+GRID = 'ctl00_ContentPlaceHolder1_GridView1'
+GRID_NAME = 'ctl00$ContentPlaceHolder1$GridView1'
+FORM_PREFIX = f'{GRID}_ctl17_FormView1_'
+FORM_NAME_PREFIX = f'{GRID_NAME}$ctl17$FormView1$'
+SESSION_COOKIE = 'ASP.NET_SessionId'
+
+STOCK_PAGE_SIZE = 10
+PATIENT_PAGE_SIZE = 15
+
+# Imagem 1x1 (GIF) para os botões input type=image
+PIXEL = base64.b64decode('R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7')
+
+VACCINE_NAMES = [
+    'Gripe Tetravalente', 'Hexavalente Acelular', 'Meningocócica ACWY', 'Meningocócica B',
+    'Febre Amarela', 'HPV Nonavalente', 'Pneumocócica 20', 'Hepatite A', 'Hepatite B',
+    'Varicela', 'Tríplice Viral', 'Dengue', 'Herpes Zóster', 'Rotavírus Pentavalente',
+]
+LABS = ['Sanofi', 'GSK', 'MSD', 'Pfizer', 'Takeda', 'Butantan']
+FIRST_NAMES = ['Maria', 'João', 'Ana', 'Pedro', 'Lúcia', 'Théo', 'Helena', 'Miguel', 'Alice', 'Arthur']
+LAST_NAMES = ['Silva', 'Souza', 'Costa', 'Ferreira', 'Martins', 'Oliveira', 'Pereira', 'Almeida']
+
+GENDERS = [('', 'Selecione'), ('1', 'Masculino'), ('2', 'Feminino')]
+STATES = [
+    ('', 'Selecione'), ('3', 'AC'), ('15', 'AL'), ('7', 'AP'), ('4', 'AM'), ('17', 'BA'), ('11', 'CE'),
+    ('28', 'DF'), ('19', 'ES'), ('27', 'GO'), ('9', 'MA'), ('26', 'MT'), ('25', 'MS'), ('18', 'MG'),
+    ('6', 'PA'), ('13', 'PB'), ('22', 'PR'), ('14', 'PE'), ('10', 'PI'), ('20', 'RJ'), ('12', 'RN'),
+    ('24', 'RS'), ('2', 'RO'), ('5', 'RR'), ('23', 'SC'), ('21', 'SP'), ('16', 'SE'), ('8', 'TO'),
+]
+CIVIL_STATUS = [('', 'Selecione'), ('1', 'Solteiro'), ('2', 'Casado'), ('3', 'Separado'),
+                ('4', 'Divorciado'), ('5', 'Outros')]
+RACES = [('', 'Selecione'), ('1', 'Branco'), ('2', 'Pardo'), ('3', 'Negro'), ('4', 'Amarelo'), ('5', 'Indígena')]
+
+# Campos de texto do FormView de cadastro (sufixo do id)
+FORM_TEXT_FIELDS = ['txtNome', 'txtCPF', 'TxtDataNascimento', 'TextBox16', 'TextBox9', 'TextBox6',
+                    'txtEndereco', 'txtBairro', 'txtCidade', 'txtCEP', 'txtNaturalidade']
+FORM_SELECT_FIELDS = [('drpSexo_hdpesjur', GENDERS), ('drpUF', STATES),
+                      ('drpEstadoCivil_hdpesjur', CIVIL_STATUS), ('drpRaca_hdpesjur', RACES)]
+
+APPOINTMENT_STYLE = 'cursor: pointer; margin: 1px; padding: 2px; background-color: #F4511E; color: white'
+
+
+def format_cpf(digits: str) -> str:
+    return f'{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}'
+
+
+def _brl(value) -> str:
+    return f'R$ {value:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def _esc(value) -> str:
+    return html.escape(str(value if value is not None else ''), quote=True)
+
+
+class FixtureData:
+    """Dados sintéticos (determinísticos pela semente) servidos pelo MatrixFixtureServer."""
+
+    def __init__(self, vaccines: int = 45, patients: int = 120, appointments_per_day: int = 12,
+                 seed: int = 42, today: Optional[date] = None):
+        self.seed = seed
+        self.today = today or date.today()
+        self.appointments_per_day = appointments_per_day
+        self.lock = threading.Lock()
+        rng = random.Random(seed)
+
+        self.vaccines = []
+        for i in range(vaccines):
+            sale = rng.randint(80, 900)
+            self.vaccines.append({
+                'name': f'{VACCINE_NAMES[i % len(VACCINE_NAMES)]} {i + 1:03d}',
+                'laboratory': rng.choice(LABS),
+                'sale_price': sale,
+                'purchase_price': round(sale * rng.uniform(0.4, 0.8), 2),
+                'available_stock': rng.randint(0, 200),
+                'current_stock': rng.randint(0, 200),
+                'min_stock': rng.randint(1, 20),
+                'min_age': f'{rng.randint(0, 9)} anos',
+                'max_age': f'{rng.randint(10, 99)} anos',
+            })
+
+        self.patients = []
+        used = set()
+        for i in range(patients):
+            self.patients.append(self._make_patient(rng, used, self.today - timedelta(days=rng.randint(0, 720))))
+        self.next_patient_id = 1000 + patients
+        self._months: Dict[tuple, Dict[str, str]] = {}
+
+    @staticmethod
+    def _make_patient(rng, used, registered: date) -> Dict:
+        while True:
+            cpf = ''.join(str(rng.randint(0, 9)) for _ in range(11))
+            if cpf not in used and cpf != cpf[0] * 11:
+                used.add(cpf)
+                break
+        birth = date(rng.randint(1950, 2024), rng.randint(1, 12), rng.randint(1, 28))
+        return {
+            'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'cpf': cpf,
+            'birth_date': birth.strftime('%d/%m/%Y'),
+            'responsible1': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}' if birth.year > 2010 else '',
+            'responsible2': '',
+            'register_date': registered.strftime('%d/%m/%Y'),
+            'registered': registered,
+        }
+
+    def find_patient(self, cpf_digits: str) -> Optional[Dict]:
+        with self.lock:
+            return next((p for p in self.patients if p['cpf'] == cpf_digits), None)
+
+    def add_patient(self, fields: Dict[str, str]) -> Dict:
+        with self.lock:
+            self.next_patient_id += 1
+            patient = {
+                'id': self.next_patient_id,
+                'name': fields.get('txtNome', ''),
+                'cpf': ''.join(c for c in fields.get('txtCPF', '') if c.isdigit()),
+                'birth_date': fields.get('TxtDataNascimento', ''),
+                'responsible1': '',
+                'responsible2': '',
+                'register_date': self.today.strftime('%d/%m/%Y'),
+                'registered': self.today,
+                'fields': fields,
+            }
+            self.patients.append(patient)
+            return patient
+
+    def month_cell_contents(self, year: int, month: int) -> Dict[str, str]:
+        """cellContents do mês ({'DD-MM-AAAA': html dos agendamentos})."""
+        key = (year, month)
+        with self.lock:
+            if key not in self._months:
+                rng = random.Random(self.seed * 1000 + year * 12 + month)
+                contents = {}
+                for day in range(1, calendar.monthrange(year, month)[1] + 1):
+                    count = rng.randint(0, self.appointments_per_day)
+                    if count:
+                        contents[f'{day:02d}-{month:02d}-{year}'] = ''.join(
+                            self._appointment_block(rng) for _ in range(count)
+                        )
+                self._months[key] = contents
+            return self._months[key]
+
+    @staticmethod
+    def _appointment_block(rng) -> str:
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        lines = [f'{rng.randint(7, 18):02d}:{rng.choice(["00", "15", "30", "45"])} {name}',
+                 rng.choice(VACCINE_NAMES)]
+        if rng.random() < 0.5:
+            lines.append(f'Tel: 11 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}')
+        body = ''.join(line + '<BR>' for line in lines)
+        return (f'<div align=left style="{APPOINTMENT_STYLE}" onclick="abrir({rng.randint(1, 99999)})">'
+                f'<font size=1 color=white>{body}</font></div>')
+
+
+# ----------------------------------------------------------------------
+# Renderização
+# ----------------------------------------------------------------------
+def _encode_state(state: Dict) -> str:
+    return base64.b64encode(json.dumps(state).encode()).decode()
+
+
+def _decode_state(value: str) -> Dict:
+    try:
+        return json.loads(base64.b64decode(value.encode()).decode())
+    except Exception:
+        return {}
+
+
+def _page(title: str, action: str, state: Dict, body: str, scripts: str = '') -> str:
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{_esc(title)}</title>
+<script type="text/javascript">
+window.jQuery = window.jQuery || {{active: 0}};
+function __doPostBack(eventTarget, eventArgument) {{
+    var theForm = document.forms['aspnetForm'];
+    if (!theForm.onsubmit || (theForm.onsubmit() != false)) {{
+        theForm.__EVENTTARGET.value = eventTarget;
+        theForm.__EVENTARGUMENT.value = eventArgument;
+        theForm.submit();
+    }}
+}}
+{scripts}
+</script></head>
+<body>
+<form name="aspnetForm" method="post" action="{_esc(action)}" id="aspnetForm">
+<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="" />
+<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="" />
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{_encode_state(state)}" />
+{body}
+</form>
+</body></html>"""
+
+
+def _postback_href(target: str, argument: str) -> str:
+    return f"javascript:__doPostBack('{target}','{argument}')"
+
+
+def _pager_row(page: int, pages: int, colspan: int) -> str:
+    if pages <= 1:
+        return ''
+    links = []
+    if page > 1:
+        links.append(f'<a href="{_postback_href(GRID_NAME, "Page$Prev")}">&lt;</a>')
+    for n in range(1, pages + 1):
+        links.append(f'<span>{n}</span>' if n == page
+                     else f'<a href="{_postback_href(GRID_NAME, f"Page${n}")}">{n}</a>')
+    if page < pages:
+        links.append(f'<a href="{_postback_href(GRID_NAME, "Page$Next")}">&gt;</a>')
+        links.append(
+            f'<input type="image" src="../images/resultset_next.png" style="width:16px;height:16px" '
+            f'onclick="__doPostBack(\'{GRID_NAME}\',\'Page$Next\');return false;" />'
+        )
+    return f'<tr class="gridview-pager"><td colspan="{colspan}">{" ".join(links)}</td></tr>'
+
+
+def _apply_paging(state: Dict, argument: str, pages: int) -> None:
+    page = state.get('page', 1)
+    if argument == 'Page$Next':
+        page += 1
+    elif argument == 'Page$Prev':
+        page -= 1
+    elif argument == 'Page$First':
+        page = 1
+    elif argument == 'Page$Last':
+        page = pages
+    elif argument.startswith('Page$'):
+        try:
+            page = int(argument[5:])
+        except ValueError:
+            pass
+    state['page'] = max(1, min(page, max(pages, 1)))
+
+
+def _select(control_id: str, name: str, options, selected: str = '') -> str:
+    opts = ''.join(
+        f'<option value="{_esc(v)}"{" selected" if v == selected else ""}>{_esc(t)}</option>'
+        for v, t in options
+    )
+    return f'<select id="{control_id}" name="{name}" class="form-control">{opts}</select>'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'Microsoft-IIS/10.0'
+    protocol_version = 'HTTP/1.1'
+
+    # ------------------------------------------------------------------
+    # Infra
+    # ------------------------------------------------------------------
+    def log_message(self, format, *args):
+        if self.server.fixture.verbose:
+            super().log_message(format, *args)
+
+    def _delay(self):
+        fixture = self.server.fixture
+        if fixture.latency or fixture.jitter:
+            time.sleep(max(0.0, fixture.latency + random.uniform(-fixture.jitter, fixture.jitter)))
+
+    def _session(self) -> Optional[str]:
+        for part in (self.headers.get('Cookie') or '').split(';'):
+            name, _, value = part.strip().partition('=')
+            if name == SESSION_COOKIE and value in self.server.fixture.sessions:
+                return value
+        return None
+
+    def _send(self, status: int, body: bytes = b'', content_type: str = 'text/html; charset=utf-8',
+              headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _html(self, content: str):
+        self._send(200, content.encode('utf-8'))
+
+    def _redirect(self, location: str, headers: Optional[Dict[str, str]] = None):
+        self._send(302, b'', headers={'Location': location, **(headers or {})})
+
+    def _form(self) -> Dict[str, str]:
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length).decode('utf-8', errors='replace') if length else ''
+        return {k: v[0] for k, v in parse_qs(raw, keep_blank_values=True).items()}
+
+    def do_GET(self):
+        self._dispatch({})
+
+    def do_POST(self):
+        self._dispatch(self._form())
+
+    def _dispatch(self, form: Dict[str, str]):
+        self._delay()
+        self.server.fixture.requests += 1
+        path = urlsplit(self.path).path.lower()
+        if path.startswith('/images/'):
+            return self._send(200, PIXEL, content_type='image/gif')
+        if path in ('/', '/login.aspx', '/login/login.aspx'):
+            return self._login(form)
+        if not self._session():
+            return self._redirect('/login.aspx')
+        routes = {
+            '/login/inicio.aspx': self._inicio,
+            '/login/home.aspx': self._home,
+            '/cadastro/vacinas.aspx': self._vacinas,
+            '/cadastro/paciente.aspx': self._pacientes,
+            '/cadastro/agendaatendimentos.aspx': self._agenda,
+        }
+        handler = routes.get(path)
+        if handler is None:
+            return self._send(404, b'<html><body>404 - Not Found</body></html>')
+        handler(form)
+
+    # ------------------------------------------------------------------
+    # Login / início
+    # ------------------------------------------------------------------
+    def _login(self, form):
+        fixture = self.server.fixture
+        failure = ''
+        if form:
+            username, password = form.get('Login1$UserName', ''), form.get('Login1$Password', '')
+            if username and password and fixture.accepts(username, password):
+                session = uuid.uuid4().hex
+                fixture.sessions.add(session)
+                return self._redirect('/Login/Inicio.aspx',
+                                      {'Set-Cookie': f'{SESSION_COOKIE}={session}; path=/; HttpOnly'})
+            failure = 'Usuário ou senha inválidos.'
+        body = f"""
+<table id="Login1"><tr><td>
+<input name="Login1$UserName" type="text" id="Login1_UserName" />
+<input name="Login1$Password" type="password" id="Login1_Password" />
+<input type="submit" name="Login1$LoginButton" value="Entrar" id="Login1_LoginButton" />
+<span id="Login1_FailureText" style="color:Red;">{_esc(failure)}</span>
+</td></tr></table>"""
+        self._html(_page('Login', '/login.aspx', {}, body))
+
+    def _inicio(self, form):
+        body = """
+<div id="menu">
+<a href="../Cadastro/Paciente.aspx" target="ifrConteudo">Pacientes e Aplicações</a>
+<a href="../Cadastro/Vacinas.aspx" target="ifrConteudo">Vacinas</a>
+<a href="../Cadastro/AgendaAtendimentos.aspx" target="ifrConteudo">Agenda</a>
+</div>
+<iframe id="ifrConteudo" name="ifrConteudo" src="Home.aspx" style="width:100%;height:800px"></iframe>"""
+        self._html(_page('Início', 'Inicio.aspx', {}, body))
+
+    def _home(self, form):
+        self._html(_page('Home', 'Home.aspx', {}, '<h3>Bem-vindo ao sistema de gestão da clínica</h3>'))
+
+    # ------------------------------------------------------------------
+    # Estoque
+    # ------------------------------------------------------------------
+    def _vacinas(self, form):
+        vaccines = self.server.fixture.data.vaccines
+        pages = max(1, -(-len(vaccines) // STOCK_PAGE_SIZE))
+        state = _decode_state(form.get('__VIEWSTATE', '')) or {'page': 1}
+        if form.get('__EVENTTARGET') == GRID_NAME:
+            _apply_paging(state, form.get('__EVENTARGUMENT', ''), pages)
+
+        page = state['page']
+        rows = []
+        start = (page - 1) * STOCK_PAGE_SIZE
+        for i, v in enumerate(vaccines[start:start + STOCK_PAGE_SIZE]):
+            ctl = f'{GRID}_ctl{i + 2:02d}'
+            rows.append(
+                f'<tr><td><span id="{ctl}_Label1">{_esc(v["name"])}</span></td>'
+                f'<td><span id="{ctl}_Label2">{_esc(v["laboratory"])}</span></td>'
+                f'<td>{_brl(v["sale_price"])}</td><td>{_brl(v["purchase_price"])}</td>'
+                f'<td>{v["available_stock"]}</td><td>{v["current_stock"]}</td><td>{v["min_stock"]}</td>'
+                f'<td><span>{_esc(v["min_age"])}</span></td><td><span>{_esc(v["max_age"])}</span></td></tr>'
+            )
+        body = f"""
+<div id="ctl00_ContentPlaceHolder1_upgrid">
+<table class="GridPrincipal" id="{GRID}">
+<tr class="sticky"><th>Nome</th><th>Laboratório</th><th>Venda</th><th>Compra</th><th>Disponível</th>
+<th>Atual</th><th>Mínimo</th><th>Idade mín.</th><th>Idade máx.</th></tr>
+{''.join(rows)}
+{_pager_row(page, pages, 9)}
+</table></div>"""
+        self._html(_page('Vacinas', 'Vacinas.aspx', state, body))
+
+    # ------------------------------------------------------------------
+    # Pacientes (lista, filtro, ordenação, cadastro)
+    # ------------------------------------------------------------------
+    def _pacientes(self, form):
+        data = self.server.fixture.data
+        state = _decode_state(form.get('__VIEWSTATE', '')) or {'page': 1, 'sort': '', 'cpf': ''}
+        target = form.get('__EVENTTARGET', '')
+        argument = form.get('__EVENTARGUMENT', '')
+        message, message_class, inserting, new_id = '', '', False, None
+
+        def clicked(control):
+            name = f'{GRID_NAME}${control}'
+            return target == name or f'{name}.x' in form
+
+        if 'ctl00$ContentPlaceHolder1$GridView1$ctl01$fltCPF' in form:
+            state['cpf'] = form['ctl00$ContentPlaceHolder1$GridView1$ctl01$fltCPF']
+        if clicked('ctl01$BtnFiltrar'):
+            state['page'] = 1
+        elif clicked('ctl01$lnkDataCadastro'):
+            state['sort'] = 'DataCadastro DESC' if state.get('sort') == 'DataCadastro ASC' else 'DataCadastro ASC'
+            state['page'] = 1
+        elif clicked('ctl17$FormView1$ImageButton1'):
+            inserting = True
+        elif clicked('ctl17$FormView1$BtnGravar'):
+            fields = {name: form.get(f'{FORM_NAME_PREFIX}{name}', '').strip()
+                      for name in FORM_TEXT_FIELDS + [s for s, _ in FORM_SELECT_FIELDS]}
+            cpf = ''.join(c for c in fields['txtCPF'] if c.isdigit())
+            if not fields['txtNome'] or len(cpf) != 11 or not fields['TxtDataNascimento'] \
+                    or not fields['drpSexo_hdpesjur']:
+                message, message_class, inserting = 'Preencha os campos obrigatórios.', 'alert-danger', True
+            elif data.find_patient(cpf):
+                message, message_class, inserting = 'CPF já cadastrado para outro paciente.', 'alert-danger', True
+            else:
+                new_id = data.add_patient(fields)['id']
+                message, message_class = 'Paciente cadastrado com sucesso.', 'alert-success'
+
+        with data.lock:
+            patients = list(data.patients)
+        cpf_filter = ''.join(c for c in state.get('cpf', '') if c.isdigit())
+        if cpf_filter:
+            patients = [p for p in patients if cpf_filter in p['cpf']]
+        if state.get('sort'):
+            patients.sort(key=lambda p: p['registered'], reverse=state['sort'].endswith('DESC'))
+
+        pages = max(1, -(-len(patients) // PATIENT_PAGE_SIZE))
+        if target == GRID_NAME:
+            _apply_paging(state, argument, pages)
+        state['page'] = min(state.get('page', 1), pages)
+
+        start = (state['page'] - 1) * PATIENT_PAGE_SIZE
+        rows = []
+        for i, p in enumerate(patients[start:start + PATIENT_PAGE_SIZE]):
+            ctl = f'{GRID}_ctl{i + 2:02d}'
+            rows.append(
+                f'<tr><td><span id="{ctl}_Label1">{_esc(p["name"])}</span></td>'
+                f'<td><span id="{ctl}_Label2">{_esc(p["birth_date"])}</span></td>'
+                f'<td><span id="{ctl}_Label3">{_esc(p["responsible1"])}</span></td>'
+                f'<td><span id="{ctl}_Label4">{_esc(p["responsible2"])}</span></td>'
+                f'<td><span id="{ctl}_Label5">{_esc(p["register_date"])}</span></td>'
+                f'<td><span id="{ctl}_Label6">{format_cpf(p["cpf"])}</span></td></tr>'
+            )
+        if not rows:
+            rows.append('<tr class="EmptyData"><td colspan="6">Nenhum registro encontrado</td></tr>')
+
+        header = f"""
+<tr class="Grid">
+<th><a id="{GRID}_ctl01_lnkDataNome">Nome</a><br /><input name="{GRID_NAME}$ctl01$fltNome" type="text" id="{GRID}_ctl01_fltNome" /></th>
+<th>Nascimento</th><th>Responsável 1</th><th>Responsável 2</th>
+<th><a id="{GRID}_ctl01_lnkDataCadastro" href="{_postback_href(f'{GRID_NAME}$ctl01$lnkDataCadastro', '')}">Data de cadastro</a></th>
+<th>CPF<br /><input name="{GRID_NAME}$ctl01$fltCPF" type="text" value="{_esc(state.get('cpf', ''))}" id="{GRID}_ctl01_fltCPF" />
+<input type="image" name="{GRID_NAME}$ctl01$BtnFiltrar" id="{GRID}_ctl01_BtnFiltrar" title="Filtrar" src="../images/find.png" style="width:16px;height:16px" /></th>
+</tr>"""
+        body = f"""
+{self._message(message, message_class, new_id)}
+<table class="GridPrincipal" id="{GRID}">
+{header}
+{''.join(rows)}
+<tr class="GridFooter"><td colspan="6">{self._form_view(form if inserting and message else {}, inserting)}</td></tr>
+{_pager_row(state['page'], pages, 6)}
+</table>"""
+        self._html(_page('Pacientes', 'Paciente.aspx', state, body))
+
+    @staticmethod
+    def _message(message, message_class, new_id):
+        if not message:
+            return ''
+        patient_id = f'<span id="ctl00_ContentPlaceHolder1_lblId">{new_id}</span>' if new_id else ''
+        return f'<span id="ctl00_ContentPlaceHolder1_lblMessage" class="{message_class}">{_esc(message)}</span>{patient_id}'
+
+    @staticmethod
+    def _form_view(values: Dict[str, str], inserting: bool) -> str:
+        if not inserting:
+            return (f'<input type="image" name="{FORM_NAME_PREFIX}ImageButton1" id="{FORM_PREFIX}ImageButton1" '
+                    f'title="Novo" accesskey="N" src="../images/page_white.png" style="width:16px;height:16px" />')
+        inputs = []
+        for name in FORM_TEXT_FIELDS:
+            value = values.get(f'{FORM_NAME_PREFIX}{name}', '')
+            inputs.append(f'<input name="{FORM_NAME_PREFIX}{name}" type="text" value="{_esc(value)}" '
+                          f'id="{FORM_PREFIX}{name}" class="form-control" />')
+        for name, options in FORM_SELECT_FIELDS:
+            inputs.append(_select(f'{FORM_PREFIX}{name}', f'{FORM_NAME_PREFIX}{name}', options,
+                                  values.get(f'{FORM_NAME_PREFIX}{name}', '')))
+        return (f'<div id="CaixaDialogo"><div id="divCaixaDialogoConteudo">{"".join(inputs)}'
+                f'<input type="image" name="{FORM_NAME_PREFIX}BtnGravar" id="{FORM_PREFIX}BtnGravar" '
+                f'title="Gravar" src="../images/accept.png" style="width:16px;height:16px" /></div></div>')
+
+    # ------------------------------------------------------------------
+    # Agenda
+    # ------------------------------------------------------------------
+    def _agenda(self, form):
+        data = self.server.fixture.data
+        state = _decode_state(form.get('__VIEWSTATE', '')) or {
+            'year': data.today.year, 'month': data.today.month,
+        }
+        argument = form.get('__EVENTARGUMENT', '')
+        if form.get('__EVENTTARGET') == 'DatePicker' and argument.startswith('V'):
+            try:
+                target = date(2000, 1, 1) + timedelta(days=int(argument[1:]))
+                state = {'year': target.year, 'month': target.month}
+            except ValueError:
+                pass
+
+        year, month = state['year'], state['month']
+        first = date(year, month, 1)
+        prev_month = (first - timedelta(days=1)).replace(day=1)
+        next_month = (first + timedelta(days=32)).replace(day=1)
+        contents = data.month_cell_contents(year, month)
+        literal = ',\n'.join(
+            "'{}': '{}'".format(k, v.replace('\\', '\\\\').replace("'", "\\'")) for k, v in contents.items()
+        )
+        month_name = ['janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho', 'julho', 'agosto',
+                      'setembro', 'outubro', 'novembro', 'dezembro'][month - 1]
+        days = ''.join(f'<td>{d}</td>' for d in range(1, calendar.monthrange(year, month)[1] + 1))
+        body = f"""
+<table id="DatePicker" class="Calendar">
+<tr><td><a href="{_postback_href('DatePicker', f'V{(prev_month - date(2000, 1, 1)).days}')}" title="Ir para o mês anterior">&lt;</a></td>
+<td class="CalendarTitle">{month_name} de {year}</td>
+<td><a href="{_postback_href('DatePicker', f'V{(next_month - date(2000, 1, 1)).days}')}" title="Ir para o próximo mês">&gt;</a></td></tr>
+<tr>{days}</tr>
+</table>"""
+        scripts = f'var cellContents = {{\n{literal}\n}};'
+        self._html(_page('Agenda', 'AgendaAtendimentos.aspx', state, body, scripts))
+
+
+class MatrixFixtureServer:
+    """
+    Servidor HTTP (thread própria) com as páginas do sistema matriz.
+
+    Args:
+        data: dados servidos (padrão: FixtureData())
+        latency: atraso em segundos somado a cada resposta
+        jitter: variação aleatória (+/-) do atraso
+        username/password: credenciais aceitas (vazio = qualquer usuário/senha não vazios)
+    """
+
+    def __init__(self, data: Optional[FixtureData] = None, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0, username: str = '', password: str = '',
+                 verbose: bool = False):
+        self.data = data or FixtureData()
+        self.latency = latency
+        self.jitter = jitter
+        self.username = username
+        self.password = password
+        self.verbose = verbose
+        self.sessions = set()
+        self.requests = 0
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fixture = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def accepts(self, username: str, password: str) -> bool:
+        if not self.username:
+            return True
+        return username == self.username and password == self.password
+
+    def start(self) -> 'MatrixFixtureServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='matrix-fixture', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
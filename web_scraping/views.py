@@ -1,19 +1,22 @@
 # web_scraping/views.py
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from .utils.browser_manager import BrowserManager
-from .services.stock_scraper import StockScraper
-from .services.users_scraper import UsersScraper
-from .services.calendar_scraper import CalendarScraper
 from .services.patient_search_scraper import PatientSearchScraper
-from core.models import Vaccine, Appointment
+from .services.stock_repository import StockRepository
+from .services.inventory_service import inventory_service
+from .services.stock_ledger import stock_ledger, MOVEMENT_ADJUSTMENT
+from .services import scraping_jobs
+from .services.patient_search_cache import patient_search_cache
+from .services.calendar_scraper import month_range
+from .models import ScrapingJob
+from core.models import Vaccine
 from django.conf import settings
-import os
 import json
 import time
-from datetime import datetime, timezone
 
 
 def _is_admin(session_user: dict) -> bool:
@@ -28,182 +31,183 @@ def _is_admin(session_user: dict) -> bool:
     # Verifica se é admin
     return session_user.get('position') == 'Administrador' or session_user.get('role') == 'ADMIN'
 
-@require_http_methods(["POST"])
-@csrf_exempt
-def sync_calendar(request):
-    """Sincroniza agendamentos do sistema matriz"""
-    browser = None
+def _session_username(request) -> str:
+    session_user = request.session.get('user', {}) or {}
+    return session_user.get('username', '') if isinstance(session_user, dict) else ''
+
+
+def enqueue_job_response(request, job_type, params=None):
+    """
+    Enfileira um job de scraping e responde imediatamente (202) com o id.
+    Se já houver um job ativo da mesma operação, devolve esse job (already_running);
+    se um terminou há poucos segundos, devolve o resultado dele (status 'completed').
+    """
     try:
-        # Inicializa o browser com retry
-        for attempt in range(3):
-            try:
-                browser = BrowserManager()
-                browser.start_browser(headless=True)
-                if browser.driver:
-                    break
-            except Exception as e:
-                print(f"Tentativa {attempt + 1} falhou: {e}")
-                if browser:
-                    browser.quit_browser()
-                browser = None
-                time.sleep(1)
-        
-        if not browser or not browser.driver:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Não foi possível inicializar o navegador após 3 tentativas'
-            }, status=500)
-        
-        scraper = CalendarScraper(browser)
-        
-        # Armazena contagem antes de sincronizar
-        before_count = Appointment.objects.count()
-        
-        # Executa scraping
-        appointments = scraper.scrape_calendar()
-        
-        # Conta novo após sincronizar
-        after_count = Appointment.objects.count()
-        new_appointments = after_count - before_count
-        
-        if appointments is None or len(appointments) == 0:
-            return JsonResponse({
-                'status': 'warning',
-                'message': 'Nenhum agendamento encontrado para sincronizar',
-                'appointments_count': 0,
-                'new_appointments': 0
-            })
-        
-        return JsonResponse({
-            'status': 'success',
-            'message': f'Sincronizados {len(appointments)} agendamentos',
-            'appointments': appointments,
-            'appointments_count': len(appointments),
-            'new_appointments': new_appointments,
-            'total_appointments': after_count,
-        })
-        
+        job, created = scraping_jobs.enqueue(job_type, requested_by=_session_username(request), params=params)
     except Exception as e:
-        print(f"Erro na sincronização: {str(e)}")
         return JsonResponse({
             'status': 'error',
-            'message': f'Erro na sincronização do calendário: {str(e)}'
-        }, status=500)
-    finally:
-        if browser:
-            try:
-                browser.quit_browser()
-            except:
-                pass
+            'message': f'Erro ao iniciar sincronização: {str(e)}'
+        }, status=503)
+
+    if created:
+        status, message = 'queued', 'Sincronização iniciada'
+    elif job.is_active:
+        status, message = 'running', 'Sincronização já em andamento'
+    else:
+        status, message = 'completed', 'Sincronização concluída há instantes; resultado reaproveitado'
+
+    return JsonResponse({
+        'status': status,
+        'message': message,
+        'already_running': not created and job.is_active,
+        'coalesced': not created,
+        'job_id': job.pk,
+        'job': job.to_dict(include_result=not job.is_active),
+        'status_url': reverse('scraping:scraping_job_status', args=[job.pk]),
+        'stream_url': reverse('scraping:scraping_job_stream', args=[job.pk]),
+    }, status=202)
+
+
+def calendar_sync_params(request):
+    """Lê month / start_month / end_month do POST ou do corpo JSON e valida o intervalo."""
+    data = request.POST.dict() if request.POST else _parse_json_body(request)
+    start = data.get('start_month') or data.get('month')
+    end = data.get('end_month') or start
+    if not start:
+        return {}
+    months = month_range(start, end)
+    max_months = getattr(settings, 'CALENDAR_SYNC_MAX_MONTHS', 12)
+    if len(months) > max_months:
+        raise ValueError(f'Intervalo muito grande: máximo de {max_months} meses por sincronização.')
+    return {'start_month': f'{months[0][0]:04d}-{months[0][1]:02d}', 'end_month': f'{months[-1][0]:04d}-{months[-1][1]:02d}'}
+
 
 @require_http_methods(["POST"])
 @csrf_exempt
-def sync_stock(request):
-    """Sincroniza dados de estoque do sistema matriz"""
-    browser = None
+def sync_calendar(request):
+    """
+    Agenda a sincronização dos agendamentos do sistema matriz.
+    Sem parâmetros sincroniza o mês exibido pela agenda; aceita `month`
+    ou `start_month`/`end_month` (AAAA-MM) para backfill/antecipação.
+    """
     try:
-        browser = BrowserManager()
-        browser.start_browser(headless=True)
-        
-        scraper = StockScraper(browser)
-        result = scraper.sync_stock_to_database()
-        
-        return JsonResponse(result)
-        
-    except Exception as e:
-        return JsonResponse({
-            'status': 'error',
-            'message': f'Erro na sincronização: {str(e)}'
-        }, status=500)
-    finally:
-        if browser and browser.driver:
-            browser.quit_browser()
+        params = calendar_sync_params(request)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return enqueue_job_response(request, ScrapingJob.TYPE_SYNC_CALENDAR, params=params)
+
+@require_http_methods(["POST"])
+@csrf_exempt
+def sync_stock(request):
+    """Agenda a sincronização de estoque com o sistema matriz"""
+    return enqueue_job_response(request, ScrapingJob.TYPE_SYNC_STOCK)
+
+
+@require_http_methods(["GET"])
+def scraping_job_status(request, job_id):
+    """Status/progresso de um job de scraping (polling)"""
+    job = ScrapingJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return JsonResponse({'status': 'error', 'message': 'Job não encontrado'}, status=404)
+    if job.is_active:
+        scraping_jobs.expire_stale_jobs(job.dedup_key)
+        job.refresh_from_db()
+    return JsonResponse({'status': 'success', 'job': job.to_dict()})
+
+
+@require_http_methods(["GET"])
+def scraping_job_stream(request, job_id):
+    """
+    Progresso do job via Server-Sent Events.
+    Emite um evento `progress` a cada mudança e `done` ao terminar; a conexão é
+    encerrada após SCRAPING_JOB_STREAM_SECONDS (o cliente volta ao polling).
+    """
+    if not ScrapingJob.objects.filter(pk=job_id).exists():
+        return JsonResponse({'status': 'error', 'message': 'Job não encontrado'}, status=404)
+
+    interval = getattr(settings, 'SCRAPING_JOB_STREAM_INTERVAL', 1.0)
+    max_seconds = getattr(settings, 'SCRAPING_JOB_STREAM_SECONDS', 120)
+
+    def events():
+        last_payload = None
+        deadline = time.monotonic() + max_seconds
+        yield 'retry: 3000\n\n'
+        while True:
+            job = ScrapingJob.objects.filter(pk=job_id).first()
+            if job is None:
+                return
+            data = job.to_dict(include_result=not job.is_active)
+            payload = json.dumps(data, ensure_ascii=False)
+            if payload != last_payload:
+                last_payload = payload
+                yield f"event: {'progress' if job.is_active else 'done'}\ndata: {payload}\n\n"
+            if not job.is_active:
+                return
+            if time.monotonic() >= deadline:
+                yield 'event: timeout\ndata: {}\n\n'
+                return
+            time.sleep(interval)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 @require_http_methods(["GET"])
 def stock_data(request):
-    """Retorna dados do estoque atual a partir do banco interno (JSON)."""
+    """Retorna dados do estoque atual a partir do inventário interno.
+
+    Leitura via snapshot cacheado (inventory_service), recarregado apenas quando o estoque muda.
+    Parâmetros opcionais (GET):
+    - status: out | low | available
+    - laboratory: laboratório exato
+    - q: busca por nome/laboratório
+    - sort: campo de ordenação (prefixo '-' para decrescente)
+    - page, page_size: paginação (sem page_size retorna todos os itens)
+    Suporta If-None-Match: responde 304 se nada mudou desde a última consulta.
+    """
     try:
-        json_path = getattr(settings, 'INTERNAL_STOCK_JSON', None)
-        if not json_path:
-            # padrão: BASE_DIR/data/vaccines.json
-            json_path = os.path.join(settings.BASE_DIR, 'data', 'vaccines.json')
-
-        if not os.path.exists(json_path):
+        try:
+            page = int(request.GET.get('page') or 1)
+            page_size = int(request.GET.get('page_size') or 0) or None
+        except ValueError:
             return JsonResponse({
                 'status': 'error',
-                'message': f'Arquivo de estoque não encontrado: {json_path}'
-            }, status=404)
-
-        with open(json_path, 'r', encoding='utf-8') as f:
-            payload = json.load(f)
-
-        items = payload.get('items', [])
-        vaccines_data = []
-        summary = {
-            'total_items': len(items),
-            'items_out': 0,
-            'items_low': 0,
-            'inventory_value': 0.0,      # soma(current_stock * purchase_price)
-            'potential_revenue': 0.0      # soma(available_stock * sale_price)
-        }
-
-        for item in items:
-            name = item.get('name') or 'Item'
-            lab = item.get('laboratory') or 'N/A'
-            current = int(item.get('current_stock', 0) or 0)
-            available = int(item.get('available_stock', current) or current)
-            min_stock = int(item.get('min_stock', 0) or 0)
-            purchase = float(item.get('purchase_price', 0) or 0)
-            sale = float(item.get('sale_price', 0) or 0)
-            min_age_m = int(item.get('min_age_months', 0) or 0)
-            max_age_m = int(item.get('max_age_months', 0) or 0)
-            unit_margin = round(sale - purchase, 2)
-            inv_value = round(current * purchase, 2)
-            pot_revenue = round(available * sale, 2)
-
-            if current <= 0:
-                status_class = 'status-out'
-                status_text = 'Esgotado'
-            elif current < min_stock:
-                status_class = 'status-low'
-                status_text = f'Estoque Baixo ({current} unidades)'
-            else:
-                status_class = 'status-available'
-                status_text = f'Disponível ({current} unidades)'
-
-            vaccines_data.append({
-                'name': name,
-                'laboratory': lab,
-                'current_stock': current,
-                'stock': current,  # Alias para compatibilidade com frontend
-                'available_stock': available,
-                'min_stock': min_stock,
-                'purchase_price': purchase,
-                'sale_price': sale,
-                'unit_margin': unit_margin,
-                'inventory_value': inv_value,
-                'potential_revenue': pot_revenue,
-                'min_age_months': min_age_m,
-                'max_age_months': max_age_m,
-                'status_class': status_class,
-                'status_text': status_text
-            })
-
-            # Atualiza resumo
-            summary['inventory_value'] += inv_value
-            summary['potential_revenue'] += pot_revenue
-            if current == 0:
-                summary['items_out'] += 1
-            elif current < min_stock:
-                summary['items_low'] += 1
+                'message': 'Parâmetros "page" e "page_size" devem ser inteiros.'
+            }, status=400)
 
-        return JsonResponse({
-            'status': 'success',
-            'source': 'json',
-            'vaccines': vaccines_data,
-            'summary': summary,
-            'last_updated': payload.get('last_updated')
-        })
+        try:
+            result = inventory_service.query(
+                status=request.GET.get('status'),
+                laboratory=request.GET.get('laboratory'),
+                search=request.GET.get('q'),
+                sort=request.GET.get('sort'),
+                page=page,
+                page_size=page_size,
+            )
+        except ValueError as ve:
+            return JsonResponse({'status': 'error', 'message': str(ve)}, status=400)
+
+        snapshot = result['snapshot']
+        etag = StockRepository.make_etag(snapshot, request.META.get('QUERY_STRING', ''))
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=304)
+        else:
+            response = JsonResponse({
+                'status': 'success',
+                'source': 'inventory',
+                'vaccines': result['items'],
+                'summary': snapshot.summary,
+                'filtered_total': result['total'],
+                'pagination': result['pagination'],
+                'laboratories': snapshot.laboratories,
+                'last_updated': snapshot.last_updated
+            })
+        response['ETag'] = etag
+        # Força o navegador a revalidar (If-None-Match) a cada polling
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
     except Exception as e:
         return JsonResponse({
@@ -212,152 +216,176 @@ def stock_data(request):
         }, status=500)
 
 
-@require_http_methods(["POST"])
-def update_stock_item(request):
-    """Atualiza um item no estoque interno (JSON).
+def _to_int(v, *, field_name: str):
+    if v in (None, ''):
+        return None
+    try:
+        iv = int(v)
+    except (TypeError, ValueError):
+        raise ValueError(f'Campo "{field_name}" deve ser inteiro.')
+    if iv < 0:
+        raise ValueError(f'Campo "{field_name}" não pode ser negativo.')
+    return iv
 
-    Requer usuário autenticado e com permissão de admin.
-    Campos aceitos (opcionais): laboratory, current_stock, available_stock, min_stock,
-    purchase_price, sale_price, min_age_months, max_age_months.
-    Identificação do item: name (obrigatório).
-    """
+
+def _to_float(v, *, field_name: str):
+    if v in (None, ''):
+        return None
+    try:
+        fv = float(str(v).replace(',', '.'))
+    except (TypeError, ValueError):
+        raise ValueError(f'Campo "{field_name}" deve ser numérico.')
+    if fv < 0:
+        raise ValueError(f'Campo "{field_name}" não pode ser negativo.')
+    return round(fv, 2)
+
+
+def _require_stock_admin(request):
+    """Retorna JsonResponse de erro se o usuário não puder alterar o estoque, senão None."""
     if not request.session.get('user_authenticated'):
         return JsonResponse({'status': 'error', 'message': 'Não autenticado'}, status=401)
 
     session_user = request.session.get('user', {}) or {}
     if not _is_admin(session_user):
         return JsonResponse({'status': 'error', 'message': 'Apenas administradores podem atualizar o estoque.'}, status=403)
+    return None
 
-    try:
-        try:
-            payload = json.loads((request.body or b'').decode('utf-8') or '{}')
-        except Exception:
-            return JsonResponse({'status': 'error', 'message': 'JSON inválido.'}, status=400)
 
-        name = (payload.get('name') or '').strip()
-        if not name:
-            return JsonResponse({'status': 'error', 'message': 'Campo "name" é obrigatório.'}, status=400)
-
-        json_path = getattr(settings, 'INTERNAL_STOCK_JSON', None)
-        if not json_path:
-            json_path = os.path.join(settings.BASE_DIR, 'data', 'vaccines.json')
+def _parse_json_body(request):
+    try:
+        return json.loads((request.body or b'').decode('utf-8') or '{}')
+    except Exception:
+        raise ValueError('JSON inválido.')
 
-        if not os.path.exists(json_path):
-            return JsonResponse({'status': 'error', 'message': f'Arquivo de estoque não encontrado: {json_path}'}, status=404)
 
-        with open(json_path, 'r', encoding='utf-8') as f:
-            doc = json.load(f) or {}
+@require_http_methods(["POST"])
+def update_stock_item(request):
+    """Atualiza um item no estoque interno.
 
-        items = doc.get('items', [])
-        if not isinstance(items, list):
-            return JsonResponse({'status': 'error', 'message': 'Formato inválido do arquivo de estoque (items).'}, status=500)
+    Requer usuário autenticado e com permissão de admin.
+    Campos aceitos (opcionais): laboratory, current_stock, available_stock, min_stock,
+    purchase_price, sale_price, min_age_months, max_age_months.
+    Identificação do item: name (obrigatório).
 
-        needle = name.casefold()
-        idx = next((i for i, it in enumerate(items) if (it.get('name') or '').strip().casefold() == needle), None)
-        if idx is None:
-            return JsonResponse({'status': 'error', 'message': 'Item não encontrado no estoque interno.'}, status=404)
+    A alteração é gravada como um movimento 'adjustment' no ledger
+    (UPDATE da linha do item + append no diário).
+    """
+    denied = _require_stock_admin(request)
+    if denied:
+        return denied
 
-        item = items[idx]
+    try:
+        payload = _parse_json_body(request)
 
-        def to_int(v, *, field_name: str):
-            if v in (None, ''):
-                return None
-            try:
-                iv = int(v)
-            except (TypeError, ValueError):
-                raise ValueError(f'Campo "{field_name}" deve ser inteiro.')
-            if iv < 0:
-                raise ValueError(f'Campo "{field_name}" não pode ser negativo.')
-            return iv
-
-        def to_float(v, *, field_name: str):
-            if v in (None, ''):
-                return None
-            try:
-                fv = float(str(v).replace(',', '.'))
-            except (TypeError, ValueError):
-                raise ValueError(f'Campo "{field_name}" deve ser numérico.')
-            if fv < 0:
-                raise ValueError(f'Campo "{field_name}" não pode ser negativo.')
-            return round(fv, 2)
+        name = (payload.get('name') or '').strip()
+        if not name:
+            return JsonResponse({'status': 'error', 'message': 'Campo "name" é obrigatório.'}, status=400)
 
+        fields = {}
         # Strings
         if 'laboratory' in payload:
-            item['laboratory'] = (payload.get('laboratory') or '').strip()
+            fields['laboratory'] = (payload.get('laboratory') or '').strip()
 
         # Inteiros
-        if 'current_stock' in payload:
-            item['current_stock'] = to_int(payload.get('current_stock'), field_name='current_stock')
-        if 'available_stock' in payload:
-            item['available_stock'] = to_int(payload.get('available_stock'), field_name='available_stock')
-        if 'min_stock' in payload:
-            item['min_stock'] = to_int(payload.get('min_stock'), field_name='min_stock')
-        if 'min_age_months' in payload:
-            item['min_age_months'] = to_int(payload.get('min_age_months'), field_name='min_age_months')
-        if 'max_age_months' in payload:
-            item['max_age_months'] = to_int(payload.get('max_age_months'), field_name='max_age_months')
+        for key in ('current_stock', 'available_stock', 'min_stock', 'min_age_months', 'max_age_months'):
+            if key in payload:
+                fields[key] = _to_int(payload.get(key), field_name=key)
 
         # Preços
-        if 'purchase_price' in payload:
-            item['purchase_price'] = to_float(payload.get('purchase_price'), field_name='purchase_price')
-        if 'sale_price' in payload:
-            item['sale_price'] = to_float(payload.get('sale_price'), field_name='sale_price')
-
-        # Regras de consistência
-        if item.get('current_stock') is not None and item.get('available_stock') is None:
-            item['available_stock'] = item.get('current_stock')
-        if item.get('available_stock') is not None and item.get('current_stock') is None:
-            item['current_stock'] = item.get('available_stock')
-        if (item.get('available_stock') is not None) and (item.get('current_stock') is not None):
-            if int(item['available_stock']) > int(item['current_stock']):
-                return JsonResponse({'status': 'error', 'message': 'available_stock não pode ser maior que current_stock.'}, status=400)
-
-        # Salva de forma atômica
-        items[idx] = item
-        doc['items'] = items
-        doc['last_updated'] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-        doc['source'] = doc.get('source') or 'internal-inventory'
-        doc['total_items'] = len(items)
-
-        tmp_path = f"{json_path}.tmp"
-        with open(tmp_path, 'w', encoding='utf-8') as f:
-            json.dump(doc, f, ensure_ascii=False, indent=2)
-        os.replace(tmp_path, json_path)
+        for key in ('purchase_price', 'sale_price'):
+            if key in payload:
+                fields[key] = _to_float(payload.get(key), field_name=key)
+
+        username = request.session.get('username') or ''
+        movement, item = stock_ledger.record(
+            name, MOVEMENT_ADJUSTMENT, fields=fields, user=username,
+            note=(payload.get('note') or '').strip(),
+        )
 
         return JsonResponse({
             'status': 'success',
             'message': 'Item de estoque atualizado com sucesso.',
             'item': item,
-            'last_updated': doc.get('last_updated'),
+            'last_updated': movement['timestamp'],
         })
 
+    except LookupError as le:
+        return JsonResponse({'status': 'error', 'message': str(le)}, status=404)
     except ValueError as ve:
         return JsonResponse({'status': 'error', 'message': str(ve)}, status=400)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': f'Erro ao atualizar item: {str(e)}'}, status=500)
 
+
 @require_http_methods(["POST"])
-@csrf_exempt
-def sync_recent_users(request):
-    """Sincroniza os últimos 20 usuários cadastrados"""
-    browser = None
+def register_stock_movement(request):
+    """Registra uma entrada, saída ou ajuste de estoque no ledger.
+
+    Body JSON: name (obrigatório), type (entry | exit | adjustment),
+    quantity (entry/exit), fields (adjustment), note (opcional).
+    """
+    denied = _require_stock_admin(request)
+    if denied:
+        return denied
+
     try:
-        browser = BrowserManager()
-        browser.start_browser(headless=True)
-        
-        scraper = UsersScraper(browser)
-        result = scraper.get_recent_users_for_display()
-        
-        return JsonResponse(result)
-        
+        payload = _parse_json_body(request)
+
+        name = (payload.get('name') or '').strip()
+        if not name:
+            return JsonResponse({'status': 'error', 'message': 'Campo "name" é obrigatório.'}, status=400)
+
+        movement_type = (payload.get('type') or '').strip()
+        quantity = _to_int(payload.get('quantity'), field_name='quantity')
+        fields = payload.get('fields') or {}
+        if not isinstance(fields, dict):
+            return JsonResponse({'status': 'error', 'message': 'Campo "fields" deve ser um objeto.'}, status=400)
+
+        movement, item = stock_ledger.record(
+            name, movement_type, quantity=quantity, fields=fields,
+            user=request.session.get('username') or '',
+            note=(payload.get('note') or '').strip(),
+        )
+        return JsonResponse({'status': 'success', 'movement': movement, 'item': item})
+
+    except LookupError as le:
+        return JsonResponse({'status': 'error', 'message': str(le)}, status=404)
+    except ValueError as ve:
+        return JsonResponse({'status': 'error', 'message': str(ve)}, status=400)
     except Exception as e:
-        return JsonResponse({
-            'status': 'error',
-            'message': f'Erro na sincronização: {str(e)}'
-        }, status=500)
-    finally:
-        if browser and browser.driver:
-            browser.quit_browser()
+        return JsonResponse({'status': 'error', 'message': f'Erro ao registrar movimento: {str(e)}'}, status=500)
+
+
+@require_http_methods(["GET"])
+def stock_movements(request):
+    """Histórico de movimentos do estoque (mais recentes primeiro) e consumo por item.
+
+    Parâmetros opcionais: name (item), limit (padrão 100), days (janela de consumo, padrão 30).
+    """
+    try:
+        limit = int(request.GET.get('limit') or 100)
+        days = int(request.GET.get('days') or 30)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Parâmetros "limit" e "days" devem ser inteiros.'}, status=400)
+
+    name = (request.GET.get('name') or '').strip() or None
+    rates = stock_ledger.consumption_rates(days=days)
+    if name:
+        rates = {k: v for k, v in rates.items() if k.casefold() == name.casefold()}
+
+    return JsonResponse({
+        'status': 'success',
+        'movements': stock_ledger.history(name, limit=limit),
+        'consumption': rates,
+        'days': days,
+    })
+
+
+@require_http_methods(["POST"])
+@csrf_exempt
+def sync_recent_users(request):
+    """Agenda a sincronização dos últimos 20 usuários cadastrados"""
+    return enqueue_job_response(request, ScrapingJob.TYPE_SYNC_RECENT_USERS)
 
 @require_http_methods(["GET"])
 def recent_users_data(request):
@@ -381,44 +409,62 @@ def recent_users_data(request):
 # Rotas de geração de dados fictícios foram removidas para garantir que
 # todo dado exibido no dashboard venha exclusivamente de scraping.
 
+def _run_cpf_search(cpf):
+    """Abre um navegador e busca o CPF no sistema legado"""
+    browser = None
+    try:
+        browser = BrowserManager()
+        browser.start_browser(headless=True)
+        scraper = PatientSearchScraper(browser)
+        result = scraper.search_by_cpf(cpf)
+        if not result and not scraper.logged_in:
+            # Falha de login não é "não encontrado" (e não deve entrar no cache negativo)
+            raise RuntimeError('Falha no login no sistema legado')
+        return result
+    finally:
+        if browser and browser.driver:
+            try:
+                browser.quit_browser()
+            except Exception:
+                pass
+
+
 @require_http_methods(["POST"])
 @csrf_exempt
 def search_patient_by_cpf(request):
-    """Busca paciente no sistema legado por CPF (web scraping)"""
-    browser = None
+    """
+    Busca paciente no sistema legado por CPF (web scraping).
+    Resultados ficam em cache (positivo e negativo, ver patient_search_cache) e
+    buscas simultâneas do mesmo CPF compartilham um único navegador.
+    Envie "refresh": true para ignorar o cache.
+    """
     try:
         body = request.body.decode('utf-8') if request.body else ''
-        cpf = request.POST.get('cpf') or (json.loads(body).get('cpf') if body else None)
+        payload = json.loads(body) if body and not request.POST else {}
+        cpf = request.POST.get('cpf') or payload.get('cpf')
         if not cpf:
             return JsonResponse({
                 'status': 'error',
                 'message': 'Informe o CPF.'
             }, status=400)
+        refresh = str(request.POST.get('refresh') or payload.get('refresh') or '').lower() in ('1', 'true', 'yes')
 
-        browser = BrowserManager()
-        browser.start_browser(headless=True)
-
-        scraper = PatientSearchScraper(browser)
-        result = scraper.search_by_cpf(cpf)
+        result, meta = patient_search_cache.search(cpf, _run_cpf_search, refresh=refresh)
 
         if not result:
             return JsonResponse({
                 'status': 'not_found',
-                'message': 'Nenhum paciente encontrado para este CPF.'
+                'message': 'Nenhum paciente encontrado para este CPF.',
+                'meta': meta,
             })
 
         return JsonResponse({
             'status': 'success',
-            'patient': result
+            'patient': result,
+            'meta': meta,
         })
     except Exception as e:
         return JsonResponse({
             'status': 'error',
             'message': f'Erro ao buscar paciente: {str(e)}'
         }, status=500)
-    finally:
-        if browser and browser.driver:
-            try:
-                browser.quit_browser()
-            except Exception:
-                pass
\ No newline at end of file
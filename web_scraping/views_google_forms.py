@@ -10,10 +10,13 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.utils.decorators import method_decorator
 from django.views import View
 import json
+from datetime import timedelta
 from django.utils import timezone
 
 from .utils.browser_manager import BrowserManager
 from .services.patient_registration_scraper import PatientRegistrationScraper
+from .services.registration_metrics import record_registration_attempt, step_duration_stats
+from .services import registration_pipeline
 from .models import (
     ProcessedGoogleFormSubmission,
     GoogleFormsSync,
@@ -21,6 +24,9 @@ from .models import (
 )
 from core.google_forms_tasks import sync_google_forms_and_register_patients
 
+# Janela máxima (dias) dos tempos por etapa no dashboard
+MAX_TIMING_DAYS = 90
+
 
 @require_http_methods(["POST"])
 @csrf_exempt
@@ -29,10 +35,13 @@ def trigger_google_forms_sync(request):
     Dispara sincronização do Google Forms via API
     
     POST /api/web_scraping/sync-google-forms/
+    Query params:
+        - full_rescan=1: relê a planilha inteira em vez de continuar da última linha
     """
     try:
         # Iniciar tarefa Celery
-        task = sync_google_forms_and_register_patients.delay()
+        full_rescan = request.GET.get('full_rescan') in ('1', 'true')
+        task = sync_google_forms_and_register_patients.delay(full_rescan=full_rescan)
         
         return JsonResponse({
             'status': 'triggered',
@@ -158,6 +167,7 @@ def patient_detail(request, patient_id):
                 'success': log.success,
                 'message': log.message,
                 'error_details': log.error_details,
+                'duration_ms': log.duration_ms,
                 'timestamp': log.timestamp.isoformat()
             })
         
@@ -171,6 +181,7 @@ def patient_detail(request, patient_id):
                 'status': patient.status,
                 'patient_id_in_platform': patient.patient_id_in_platform,
                 'attempts': patient.attempts,
+                'stage': patient.stage,
                 'processed_at': patient.processed_at.isoformat(),
                 'last_attempt_at': patient.last_attempt_at.isoformat() if patient.last_attempt_at else None,
                 'error_message': patient.error_message,
@@ -208,7 +219,13 @@ def retry_patient_registration(request, patient_id):
                 'status': 'error',
                 'message': 'Dados do formulário não disponíveis para retry'
             }, status=400)
-        
+
+        if patient.status == 'processing' and patient.lease_expires_at and patient.lease_expires_at > timezone.now():
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Cadastro em andamento em um worker; aguarde a conclusão'
+            }, status=409)
+
         # Inicializar scraper
         browser = BrowserManager()
         browser.start_browser(headless=True)
@@ -226,27 +243,11 @@ def retry_patient_registration(request, patient_id):
             # Atualizar submission
             patient.attempts += 1
             patient.last_attempt_at = timezone.now()
+            patient.save(update_fields=['attempts', 'last_attempt_at'])
+            registration_pipeline.finish(patient, result)
             
-            if result['success']:
-                patient.status = 'success'
-                patient.patient_id_in_platform = result.get('patient_id')
-            else:
-                if 'duplicado' in result['message'].lower() or 'já existe' in result['message'].lower():
-                    patient.status = 'duplicate'
-                else:
-                    patient.status = 'error'
-                    patient.error_message = result['message']
-            
-            patient.save()
-            
-            # Registrar tentativa
-            PatientRegistrationLog.objects.create(
-                submission=patient,
-                attempt_number=patient.attempts,
-                success=result['success'],
-                message=result['message'],
-                step='form_submit'
-            )
+            # Registrar tentativa (um log por etapa, com duração)
+            record_registration_attempt(patient, patient.attempts, result, scraper.step_timings)
             
             return JsonResponse({
                 'status': 'success',
@@ -277,7 +278,17 @@ def dashboard(request):
     Dashboard com estatísticas da sincronização
     
     GET /admin/web_scraping/dashboard/
+    Query params:
+        - days: janela dos tempos por etapa (padrão 7, de 1 a MAX_TIMING_DAYS)
     """
+    try:
+        days = min(max(int(request.GET.get('days', 7)), 1), MAX_TIMING_DAYS)
+    except ValueError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Parâmetro "days" deve ser um inteiro.'
+        }, status=400)
+
     try:
         # Estatísticas gerais
         total_submissions = ProcessedGoogleFormSubmission.objects.count()
@@ -302,6 +313,9 @@ def dashboard(request):
                 'duration_seconds': sync.duration_seconds
             })
         
+        # Tempos por etapa do cadastro (p50/p95)
+        step_timings = step_duration_stats(since=timezone.now() - timedelta(days=days))
+        
         return JsonResponse({
             'status': 'success',
             'statistics': {
@@ -311,7 +325,11 @@ def dashboard(request):
                 'errors': errors,
                 'pending': pending,
             },
-            'recent_syncs': syncs_data
+            'recent_syncs': syncs_data,
+            'step_timings': {
+                'days': days,
+                'steps': step_timings,
+            }
         })
     
     except Exception as e: